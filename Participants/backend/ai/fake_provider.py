@@ -0,0 +1,44 @@
+# backend/ai/fake_provider.py
+import hashlib
+import os
+import re
+import time
+from typing import Iterator, Optional
+
+from ai.watsonx_provider import WatsonxLLM, WXConfig
+
+class FakeLLM(WatsonxLLM):
+    """Local stand-in for watsonx.ai (AI_PROVIDER=fake).
+
+    Needs no credentials or network and answers deterministically after a
+    configurable delay, so the AI endpoints, gateway and cache can be load
+    tested locally: FAKE_LLM_LATENCY_MS before the first token,
+    FAKE_LLM_TOKEN_DELAY_MS between streamed tokens.
+    """
+
+    def __init__(self, cfg: Optional[WXConfig] = None, latency_ms: Optional[int] = None,
+                 token_delay_ms: Optional[int] = None):
+        self.cfg = cfg or WXConfig()
+        self.latency = (latency_ms if latency_ms is not None else int(os.getenv("FAKE_LLM_LATENCY_MS", "800"))) / 1000
+        self.token_delay = (token_delay_ms if token_delay_ms is not None else int(os.getenv("FAKE_LLM_TOKEN_DELAY_MS", "20"))) / 1000
+        self.model = None
+
+    def _answer(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        first_line = prompt.strip().splitlines()[0] if prompt.strip() else ""
+        return (
+            f"**Draft ({digest})**\n\n"
+            f"- Request: {first_line[:120]}\n"
+            f"- This text comes from the fake model for local testing.\n"
+            f"- Prompt length: {len(prompt)} characters.\n"
+        )
+
+    def _gen(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return self._answer(prompt)
+
+    def _stream(self, prompt: str) -> Iterator[str]:
+        time.sleep(self.latency)
+        for word in re.findall(r"\S+\s*", self._answer(prompt)):
+            yield word
+            time.sleep(self.token_delay)
@@ -1,10 +1,8 @@
 # backend/ai/watsonx_provider.py
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Iterator, List, Optional
 from dataclasses import dataclass
 from dotenv import load_dotenv, find_dotenv
-from ibm_watsonx_ai.client import Credentials
-from ibm_watsonx_ai.foundation_models import ModelInference
 
 # Load root .env regardless of run dir
 load_dotenv(find_dotenv(filename=".env", usecwd=True), override=True)
@@ -19,19 +17,43 @@ class WXConfig:
     max_new_tokens: int = int(os.getenv("WATSONX_MAX_NEW_TOKENS", "512"))
     temperature: float = float(os.getenv("WATSONX_TEMPERATURE", "0.2"))
 
+def is_auth_error(exc: Exception) -> bool:
+    """True for a rejected or expired IAM token / API key (HTTP 401/403)."""
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) in (401, 403):
+        return True
+    message = str(exc).lower()
+    return "401" in message or "unauthorized" in message or "authentication" in message
+
+
 class WatsonxLLM:
     """watsonx.ai adapter for Participant AI use cases."""
 
-    def __init__(self, cfg: Optional[WXConfig] = None):
+    def __init__(
+        self,
+        cfg: Optional[WXConfig] = None,
+        api_client: Optional[Any] = None,
+        on_auth_error: Optional[Callable[[], None]] = None,
+    ):
         self.cfg = cfg or WXConfig()
+        # Called when watsonx rejects the credentials, so a shared client is rebuilt
+        self.on_auth_error = on_auth_error
         if not self.cfg.url or not self.cfg.api_key or not self.cfg.project_id:
             raise ValueError("Missing watsonx env: WATSONX_URL / WATSONX_API_KEY / WATSONX_PROJECT_ID")
 
-        creds = Credentials(url=self.cfg.url, api_key=self.cfg.api_key)
+        # Imported here so the prompts (and FakeLLM) work without the SDK
+        from ibm_watsonx_ai.client import Credentials
+        from ibm_watsonx_ai.foundation_models import ModelInference
+
+        # A shared APIClient (see app/services/ai/llm_registry.py) reuses its
+        # IAM token and HTTP session; otherwise authenticate from credentials
+        connection = {"api_client": api_client} if api_client is not None else {
+            "credentials": Credentials(url=self.cfg.url, api_key=self.cfg.api_key)
+        }
         self.model = ModelInference(
             model_id=self.cfg.model_id,
-            credentials=creds,
             project_id=self.cfg.project_id,
+            **connection,
             params={
                 "decoding_method": self.cfg.decoding_method,
                 "max_new_tokens": self.cfg.max_new_tokens,
@@ -39,14 +61,32 @@ class WatsonxLLM:
             },
         )
 
+    def _auth_failed(self, exc: Exception) -> None:
+        if self.on_auth_error is not None and is_auth_error(exc):
+            self.on_auth_error()
+
     def _gen(self, prompt: str) -> str:
-        out = self.model.generate(prompt=prompt)
+        try:
+            out = self.model.generate(prompt=prompt)
+        except Exception as e:
+            self._auth_failed(e)
+            raise
         if isinstance(out, dict):
             return out.get("results", [{}])[0].get("generated_text") or str(out)
         return str(out)
 
-    def care_plan_markdown(self, participant: Dict[str, Any]) -> str:
-        prompt = f"""You are an NDIS support planner.
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion in pieces as the model produces them."""
+        try:
+            for piece in self.model.generate_text_stream(prompt=prompt):
+                if piece:
+                    yield piece
+        except Exception as e:
+            self._auth_failed(e)
+            raise
+
+    def care_plan_prompt(self, participant: Dict[str, Any]) -> str:
+        return f"""You are an NDIS support planner.
 Return a concise markdown **Care Plan** with:
 - 3 goals
 - 3 recommended supports (include category hints if obvious)
@@ -57,11 +97,13 @@ Keep neutral language. No medical advice.
 Participant (YAML-like):
 {participant}
 """
-        return self._gen(prompt)
 
-    def risk_summary(self, notes: List[str]) -> str:
+    def care_plan_markdown(self, participant: Dict[str, Any]) -> str:
+        return self._gen(self.care_plan_prompt(participant))
+
+    def risk_prompt(self, notes: List[str]) -> str:
         joined = "\n- ".join(notes) if notes else "None provided."
-        prompt = f"""You are a risk assessor. From these case notes, output:
+        return f"""You are a risk assessor. From these case notes, output:
 - Risk level: Low / Medium / High (justify in one sentence)
 - Top 3 risks (bullets)
 - Mitigations (bullets, <=5, practical + respectful)
@@ -70,11 +112,15 @@ Avoid clinical diagnoses. Be concise.
 Case notes:
 - {joined}
 """
-        return self._gen(prompt)
 
-    def soap_note(self, interaction_summary: str) -> str:
-        prompt = f"""Write a succinct **SOAP** progress note (<=120 words) for this interaction:
+    def risk_summary(self, notes: List[str]) -> str:
+        return self._gen(self.risk_prompt(notes))
+
+    def soap_prompt(self, interaction_summary: str) -> str:
+        return f"""Write a succinct **SOAP** progress note (<=120 words) for this interaction:
 {interaction_summary}
 Use plain language and avoid sensitive PII; this is a draft for human review.
 """
-        return self._gen(prompt)
\ No newline at end of file
+
+    def soap_note(self, interaction_summary: str) -> str:
+        return self._gen(self.soap_prompt(interaction_summary))
\ No newline at end of file
@@ -59,6 +59,13 @@ try:
 except ImportError as e:
     logger.error(f"❌ Failed to load AI status router: {e}")
 
+try:
+    from app.api.v1.endpoints.ai_drafts import router as ai_drafts_router
+    api_router.include_router(ai_drafts_router, tags=["ai-drafts"])
+    logger.info("✅ AI draft jobs router loaded")
+except ImportError as e:
+    logger.error(f"❌ Failed to load AI draft jobs router: {e}")
+
 # DOCUMENT RAG ROUTER
 try:
     from app.api.v1.endpoints.document_rag import router as document_rag_router
@@ -0,0 +1,78 @@
+# backend/app/api/v1/endpoints/ai_drafts.py - BATCH AI DRAFT JOBS
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel
+import logging
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.ai_draft_job import AIDraftJob
+from app.services.ai.draft_batch import (
+    cancel_draft_job,
+    create_draft_job,
+    draft_job_failures,
+    draft_job_progress,
+    resume_draft_job,
+    start_draft_job,
+)
+
+router = APIRouter(prefix="/ai/draft-jobs", tags=["ai-drafts"])
+logger = logging.getLogger(__name__)
+
+class DraftJobRequest(BaseModel):
+    draft_type: str = "care_plan"  # care_plan | risk
+    participant_ids: Optional[List[int]] = None
+    participant_status: Optional[str] = None  # e.g. "active"; combined with participant_ids if both given
+    created_by: Optional[str] = None
+
+def get_job(db: Session, job_id: int) -> AIDraftJob:
+    job = db.get(AIDraftJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Draft job not found")
+    return job
+
+@router.post("", status_code=202)
+def create_job(request: DraftJobRequest, db: Session = Depends(get_db)):
+    """Queue AI drafts for a set of participants and start working through them."""
+    if not settings.is_ai_configured:
+        raise HTTPException(status_code=503, detail="AI service unavailable. Check Watsonx configuration.")
+    try:
+        job = create_draft_job(
+            db,
+            request.draft_type,
+            participant_ids=request.participant_ids,
+            participant_status=request.participant_status,
+            created_by=request.created_by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    start_draft_job(job.id)
+    return draft_job_progress(db, job)
+
+@router.get("/{job_id}")
+def get_job_progress(job_id: int, db: Session = Depends(get_db)):
+    """Progress of a draft job, with any participants whose draft failed."""
+    job = get_job(db, job_id)
+    progress = draft_job_progress(db, job)
+    progress["failures"] = draft_job_failures(db, job_id) if progress["failed"] else []
+    return progress
+
+@router.post("/{job_id}/resume", status_code=202)
+def resume_job(job_id: int, retry_failed: bool = False, db: Session = Depends(get_db)):
+    """Continue a cancelled or interrupted job; retry_failed=true also retries failed drafts."""
+    job = get_job(db, job_id)
+    if not settings.is_ai_configured:
+        raise HTTPException(status_code=503, detail="AI service unavailable. Check Watsonx configuration.")
+    resume_draft_job(db, job_id, retry_failed=retry_failed)
+    db.refresh(job)
+    return draft_job_progress(db, job)
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """Stop a job after the batch in progress; drafts already saved are kept."""
+    job = get_job(db, job_id)
+    if not cancel_draft_job(db, job_id):
+        raise HTTPException(status_code=409, detail=f"Draft job is already {job.status}")
+    db.refresh(job)
+    return draft_job_progress(db, job)
@@ -7,6 +7,9 @@ import logging
 
 from app.core.database import get_db
 from app.services.ai_suggestion_service import get_suggestion_statistics
+from app.services.ai.generation_cache import generation_cache
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.llm_registry import get_llm, is_configured, probe_llm, registry_status
 
 router = APIRouter(prefix="/ai", tags=["ai-status"])
 logger = logging.getLogger(__name__)
@@ -16,25 +19,11 @@ def get_ai_status():
     """Get AI service availability and configuration status"""
     try:
         # Check if Watsonx is configured
-        watsonx_configured = bool(
-            os.getenv("WATSONX_URL") and 
-            os.getenv("WATSONX_API_KEY") and 
-            os.getenv("WATSONX_PROJECT_ID")
-        )
+        watsonx_configured = is_configured()
         
-        if watsonx_configured:
-            try:
-                # Test Watsonx connection
-                from ai.watsonx_provider import WatsonxLLM
-                wx = WatsonxLLM()
-                # Try a simple generation to test connectivity
-                test_response = wx._gen("Test connection. Respond with 'OK'.")
-                watsonx_working = bool(test_response and len(test_response) > 0)
-            except Exception as e:
-                logger.warning(f"Watsonx connection test failed: {e}")
-                watsonx_working = False
-        else:
-            watsonx_working = False
+        # Real generation on the shared client, rate-limited by the registry
+        probe = probe_llm() if watsonx_configured else None
+        watsonx_working = bool(probe and probe["ok"])
         
         available_features = []
         if watsonx_working:
@@ -57,6 +46,10 @@ def get_ai_status():
                 "max_tokens": int(os.getenv("WATSONX_MAX_NEW_TOKENS", "512")),
                 "temperature": float(os.getenv("WATSONX_TEMPERATURE", "0.2"))
             },
+            "probe": probe,
+            "client": registry_status(),
+            "generation_cache": generation_cache.stats(),
+            "gateway": llm_gateway.stats(),
             "endpoints": {
                 "care_plan_suggest": "/participants/{id}/ai/care-plan/suggest",
                 "risk_assess": "/participants/{id}/ai/risk/assess", 
@@ -107,8 +100,7 @@ def ai_health_check():
         # Check Watsonx connectivity
         watsonx_status = "healthy"
         try:
-            from ai.watsonx_provider import WatsonxLLM
-            wx = WatsonxLLM()
+            wx = get_llm()
             test_response = wx._gen("Health check. Respond with 'HEALTHY'.")
             if not test_response or "error" in test_response.lower():
                 watsonx_status = "degraded"
@@ -4,38 +4,70 @@ Complete Document Management API
 Combines IBM COS storage with local file storage and version control
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
 from fastapi.responses import StreamingResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc
 from typing import List, Optional, Dict, Any, Tuple
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 import os
 import uuid
-import shutil
 import json
 import logging
 import mimetypes
-import hashlib
 
 # Internal imports
 from app.dependencies import get_db
 from app.models.participant import Participant
+from app.models.referral import Referral
 from app.models.document import Document, DocumentCategory, DocumentAccess
 from app.models.document_workflow import DocumentVersion
-from app.services.document_service import DocumentService
+from app.models.stored_blob import StoredBlob
+from app.services.document_service import DocumentService, invalidate_document_stats
+from app.services.document_search import search_documents
+from app.services.document_export import build_document_export, export_documents_query
 from app.services.enhanced_document_service import EnhancedDocumentService
 from app.services.enhanced_version_control_service import EnhancedVersionControlService
-from app.services.storage.cos_storage_ibm import object_key, put_bytes, get_object_stream, delete_object
+from app.services.rendition_service import (
+    RenditionUnavailable,
+    generate_renditions,
+    rendition_response,
+    rendition_url,
+    supports_renditions,
+)
+from app.services.storage import get_object_stream, delete_object, get_storage, RangeNotSatisfiableError
+from app.services.storage.local_storage import LocalStorage
+from app.services.storage.uploads import UploadValidationError
+from app.services.blob_store import (
+    attach_blob,
+    blob_location,
+    commit_staged_upload,
+    document_blob_ids,
+    find_owned_blob,
+    recount_blob_refs,
+    stage_upload,
+)
+from app.services.storage.delivery import (
+    Opener,
+    build_file_response,
+    document_validators,
+    is_initial_request,
+    path_opener,
+    storage_opener,
+    version_validators,
+)
 from app.core.config import settings
 
 # Configuration and Setup
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Upload configuration for local storage
-UPLOAD_DIR = Path("uploads/documents")
+# Upload configuration for local storage: keys under "documents/" in the
+# shared local backend (LOCAL_STORAGE_ROOT, default "uploads")
+LOCAL_DOCUMENTS_PREFIX = "documents"
+UPLOAD_DIR = get_storage("local").path_for(LOCAL_DOCUMENTS_PREFIX)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # File validation constants
@@ -165,32 +197,38 @@ def validate_file(file: UploadFile) -> Optional[str]:
 
 def ensure_upload_directory_exists(participant_id: int) -> Path:
     """Ensure upload directory exists and return the path."""
-    upload_dir = Path("uploads/documents") / str(participant_id)
+    upload_dir = get_storage("local").path_for(f"{LOCAL_DOCUMENTS_PREFIX}/{participant_id}")
     upload_dir.mkdir(parents=True, exist_ok=True)
     return upload_dir
 
 
-def save_uploaded_file(file: UploadFile, participant_id: int) -> Tuple[str, str]:
-    """Save uploaded file locally and return (filename, file_path)."""
-    file_extension = Path(file.filename).suffix if file.filename else ""
-    unique_filename = f"{participant_id}_{uuid.uuid4().hex}{file_extension}"
-    
-    participant_dir = ensure_upload_directory_exists(participant_id)
-    file_path = participant_dir / unique_filename
-    
+async def store_upload_blob(db: Session, file: UploadFile, provider: str) -> Tuple[Dict[str, Any], StoredBlob]:
+    """
+    Stream an upload into the blob store, sniffing its type and hashing it on the way.
+
+    Returns the upload info ({"key", "content_type", "size", "sha256",
+    "deduplicated"}) and the blob it now lives in; identical bytes already
+    stored are not kept twice.
+    """
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        logger.info(f"Successfully saved file to: {file_path}")
-        return unique_filename, str(file_path.absolute())
-        
-    except Exception as e:
-        logger.error(f"Error saving file: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Failed to save file: {str(e)}"
+        upload = await run_in_threadpool(
+            stage_upload,
+            provider,
+            file.file,
+            file.filename or "",
+            allowed_types=ALLOWED_MIME_TYPES,
+            max_bytes=MAX_FILE_SIZE,
         )
+    except UploadValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return upload, commit_staged_upload(db, upload)
+
+
+def generated_filename(participant_id: Optional[int], original_filename: Optional[str], *parts: Any) -> str:
+    """Unique display filename for an upload; the bytes themselves live in the blob store."""
+    file_extension = Path(original_filename).suffix if original_filename else ""
+    prefix = "_".join(str(part) for part in (participant_id, *parts) if part is not None)
+    return f"{prefix}_{uuid.uuid4().hex}{file_extension}" if prefix else f"{uuid.uuid4().hex}{file_extension}"
 
 
 def format_document_response(doc: Document, participant_id: int) -> Dict[str, Any]:
@@ -218,6 +256,13 @@ def format_document_response(doc: Document, participant_id: int) -> Dict[str, An
         "storage_provider": getattr(doc, 'storage_provider', 'local'),
         "storage_key": getattr(doc, 'storage_key', None),
         "download_url": f"/api/v1/participants/{participant_id}/documents/{doc.id}/download",
+        "thumbnail_url": (
+            rendition_url(
+                f"/api/v1/participants/{participant_id}/documents/{doc.id}/renditions/thumb",
+                (doc.extra_metadata or {}).get("sha256"),
+            )
+            if supports_renditions(doc.mime_type) else None
+        ),
         "status": doc.status
     }
 
@@ -280,6 +325,7 @@ def resolve_file_path(document: Document, participant_id: int) -> Path:
     
     # Try alternative paths
     alternative_paths = [
+        get_storage("local").path_for(f"{LOCAL_DOCUMENTS_PREFIX}/{participant_id}/{document.filename}"),
         Path("uploads/documents") / str(participant_id) / document.filename,
         Path.cwd() / "uploads/documents" / str(participant_id) / document.filename,
         Path.cwd() / "backend" / "uploads/documents" / str(participant_id) / document.filename,
@@ -296,6 +342,37 @@ def resolve_file_path(document: Document, participant_id: int) -> Path:
     )
 
 
+def document_rendition_source(document: Document, participant_id: int) -> Tuple[str, Optional[str]]:
+    """(source reference, sha256 if recorded) of a document's current file for rendition_service."""
+    content_hash = (document.extra_metadata or {}).get("sha256")
+    if document.storage_provider == "ibm-cos" and document.storage_key:
+        return document.storage_key, content_hash
+    return str(resolve_file_path(document, participant_id)), content_hash
+
+
+def document_file_opener(document: Document) -> Optional[Opener]:
+    """Opener for a document's current file, or None if it cannot be located."""
+    if document.storage_provider == "ibm-cos" and document.storage_key:
+        return storage_opener(get_storage(), document.storage_key)
+    if not document.file_path:
+        return None
+    try:
+        return path_opener(resolve_file_path(document, document.participant_id))
+    except HTTPException:
+        return None
+
+
+def schedule_renditions(background_tasks: BackgroundTasks, document: Document, participant_id: int) -> None:
+    """Render thumbnails after the response is sent; never fails the upload."""
+    if not supports_renditions(document.mime_type):
+        return
+    try:
+        source_ref, content_hash = document_rendition_source(document, participant_id)
+    except HTTPException:
+        return
+    background_tasks.add_task(generate_renditions, source_ref, document.mime_type, content_hash)
+
+
 def log_document_access_safe(db: Session, document_id: int, access_type: str, request: Request):
     """Safely log document access with error handling."""
     try:
@@ -319,12 +396,24 @@ def log_document_access_safe(db: Session, document_id: int, access_type: str, re
 
 @router.post("/documents/upload-cos")
 async def upload_document_cos(
-    file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
+    file: UploadFile | None = File(default=None),
     participant_id: int | None = Form(default=None),
     referral_id: int | None = Form(default=None),
+    content_sha256: str | None = Form(default=None),
+    filename: str | None = Form(default=None),
     db: Session = Depends(get_db),
 ):
-    """Upload document to IBM Cloud Object Storage."""
+    """
+    Upload document to IBM Cloud Object Storage.
+
+    Instead of a file, a client may send content_sha256 (and filename) to
+    re-attach bytes that the given participant / referral already has a
+    document for; nothing is transferred. Files held for anyone else are
+    never matched, so 404 only says the owner has no such file and it must
+    be uploaded. Cross-owner deduplication happens server-side, after the
+    bytes have been received and hashed.
+    """
     if not settings.is_cos_configured:
         raise HTTPException(
             status_code=503,
@@ -344,28 +433,21 @@ async def upload_document_cos(
         if not referral_exists:
             raise HTTPException(status_code=404, detail="Referral not found")
     
-    # Size validation
-    contents = await file.read()
-    max_bytes = settings.COS_MAX_UPLOAD_MB * 1024 * 1024
-    if len(contents) > max_bytes:
-        raise HTTPException(
-            status_code=413, 
-            detail=f"File exceeds {settings.COS_MAX_UPLOAD_MB} MB"
-        )
-    
-    # Build storage path
-    if participant_id:
-        prefix = f"participants/{participant_id}/"
-    elif referral_id:
-        prefix = f"referrals/{referral_id}/"
+    # Stream to COS; size and type are validated on the way through, and
+    # bytes already stored are kept once
+    if file is not None:
+        original_name = file.filename or f"upload-{uuid.uuid4().hex}"
+        upload, blob = await store_upload_blob(db, file, "ibm-cos")
+    elif content_sha256:
+        blob = find_owned_blob(db, content_sha256.strip(), "ibm-cos", participant_id, referral_id)
+        if not blob:
+            raise HTTPException(status_code=404, detail="No stored file with this content; upload the file instead")
+        original_name = filename or f"upload-{uuid.uuid4().hex}"
+        upload = {"key": blob.storage_key, "content_type": blob.mime_type, "size": blob.file_size,
+                  "sha256": blob.sha256, "deduplicated": True}
     else:
-        prefix = "misc/"
-    
-    # Upload to COS
-    original_name = file.filename or f"upload-{uuid.uuid4().hex}"
-    content_type = file.content_type or mimetypes.guess_type(original_name)[0] or "application/octet-stream"
-    key = object_key(prefix, original_name)
-    put_bytes(key, contents, content_type)
+        raise HTTPException(status_code=400, detail="file or content_sha256 required")
+    key = upload["key"]
     
     # Create database record
     doc = Document(
@@ -379,47 +461,46 @@ async def upload_document_cos(
         file_url=None,
         storage_provider="ibm-cos",
         storage_key=key,
-        file_size=len(contents),
-        mime_type=content_type,
+        file_size=upload["size"],
+        mime_type=upload["content_type"],
         status="active",
         uploaded_at=datetime.now(timezone.utc),
-        extra_metadata={"storage_key": key},
+        extra_metadata={"storage_key": key, "sha256": upload["sha256"]},
     )
     db.add(doc)
     db.flush()
+    attach_blob(doc, blob)
     doc.file_url = f"/api/v1/documents/{doc.id}/download-cos"
     db.commit()
     db.refresh(doc)
+    invalidate_document_stats(participant_id)
+    schedule_renditions(background_tasks, doc, participant_id)
     
     return {
         "doc_id": doc.id,
         "file_id": doc.file_id,
         "title": doc.title,
         "storage_provider": "ibm-cos",
-        "storage_key": key
+        "storage_key": key,
+        "deduplicated": upload["deduplicated"],
     }
 
 
 @router.get("/documents/{doc_id}/download-cos")
-def download_document_cos(doc_id: int, db: Session = Depends(get_db)):
-    """Download document from IBM Cloud Object Storage."""
+def download_document_cos(doc_id: int, request: Request, db: Session = Depends(get_db)):
+    """Download document from IBM Cloud Object Storage (supports Range and conditional GET)."""
     doc = db.query(Document).filter(Document.id == doc_id).first()
     if not doc or not doc.storage_key:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Get object from COS
-    obj = get_object_stream(doc.storage_key)
-    stream = obj["Body"]
-    
-    # Prepare headers
-    headers = {}
-    if "ContentType" in obj:
-        headers["Content-Type"] = obj["ContentType"]
-    
-    filename = doc.title or "download"
-    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
-    
-    return StreamingResponse(stream, headers=headers)
+    etag, last_modified = document_validators(doc)
+    return build_file_response(
+        request,
+        storage_opener(get_storage(), doc.storage_key),
+        etag=etag,
+        last_modified=last_modified,
+        filename=doc.title or "download",
+    )
 
 
 @router.delete("/documents/{doc_id}/delete-cos")
@@ -429,12 +510,20 @@ def delete_document_cos(doc_id: int, db: Session = Depends(get_db)):
     if not doc or not doc.storage_key:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Delete from COS
-    delete_object(doc.storage_key)
+    # Shared blobs are released, not deleted; the blob store removes them
+    # once nothing references them
+    if doc.blob_id:
+        blob_id = doc.blob_id
+        doc.blob_id = None
+        db.flush()
+        recount_blob_refs(db, [blob_id])
+    else:
+        delete_object(doc.storage_key)
     
     # Update database
     doc.status = "deleted"
     db.commit()
+    invalidate_document_stats(doc.participant_id)
     
     return {"ok": True}
 
@@ -474,6 +563,108 @@ def get_document_categories(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==========================================
+# BULK EXPORT ENDPOINTS
+# ==========================================
+
+def export_documents_response(
+    request: Request,
+    db: Session,
+    filename: str,
+    participant_id: Optional[int] = None,
+    category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """Stream matching documents as a ZIP with a manifest; resumable with Range/If-Range."""
+    documents = export_documents_query(db, participant_id, category, date_from, date_to).all()
+    if not documents:
+        raise HTTPException(status_code=404, detail="No documents match the export filters")
+    
+    archive, etag, counts = build_document_export(documents, document_file_opener)
+    
+    # Resumed downloads re-request the tail; log the export once
+    if is_initial_request(request):
+        try:
+            user_id, user_role = get_user_info_from_request(request)
+            db.add_all([
+                DocumentAccess(
+                    document_id=doc.id,
+                    user_id=user_id,
+                    user_role=user_role,
+                    access_type="export",
+                    ip_address=request.client.host if request.client else None,
+                    user_agent=request.headers.get("user-agent")
+                )
+                for doc in documents
+            ])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to log document export access: {e}")
+    
+    logger.info(f"Exporting {counts['included']} document(s) ({counts['missing']} missing) as {filename}, {archive.size} bytes")
+    return build_file_response(
+        request,
+        archive.open,
+        etag=etag,
+        filename=filename,
+        media_type="application/zip",
+        extra_headers={
+            "X-Export-Documents": str(counts["included"]),
+            "X-Export-Missing": str(counts["missing"]),
+        },
+    )
+
+
+@router.get("/documents/export")
+def export_documents(
+    request: Request,
+    participant_id: Optional[int] = None,
+    category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Export documents across participants, e.g. for a date range, as a streamed ZIP."""
+    try:
+        parts = [f"participant-{participant_id}" if participant_id else None, category,
+                 date_from.isoformat() if date_from else None, date_to.isoformat() if date_to else None]
+        filename = "-".join(["documents"] + [p for p in parts if p]) + ".zip"
+        return export_documents_response(request, db, filename, participant_id, category, date_from, date_to)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/participants/{participant_id}/documents/export")
+def export_participant_documents(
+    participant_id: int,
+    request: Request,
+    category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Export all of a participant's documents as a streamed ZIP."""
+    try:
+        participant = db.query(Participant).filter(Participant.id == participant_id).first()
+        if not participant:
+            raise HTTPException(status_code=404, detail="Participant not found")
+        
+        return export_documents_response(
+            request, db, f"participant-{participant_id}-documents.zip",
+            participant_id, category, date_from, date_to
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting documents for participant {participant_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==========================================
 # DOCUMENT CRUD ENDPOINTS WITH VERSION CONTROL
 # ==========================================
@@ -531,6 +722,7 @@ def get_document(
 async def upload_document(
     participant_id: int,
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: str = Form(...),
     category: str = Form(...),
@@ -583,9 +775,6 @@ async def upload_document(
                 Document.status.in_(["active", "pending_approval"])
             )
         ).first()
-        current_storage_key: Optional[str] = None
-        version_storage_key: Optional[str] = None
-        cos_version_committed = False
 
         if existing_document:
             logger.info(f"Document '{title}' exists (ID: {existing_document.id}). Creating new version.")
@@ -594,40 +783,16 @@ async def upload_document(
             previous_file_size = existing_document.file_size or 0
 
             if storage_type == "cos":
-                contents = await file.read()
-                if contents is None:
-                    contents = b""
-
                 original_filename = file.filename or f"document-{uuid.uuid4().hex}"
-                content_type = file.content_type or mimetypes.guess_type(original_filename)[0] or "application/octet-stream"
-                file_extension = Path(original_filename).suffix
-                unique_suffix = uuid.uuid4().hex
-                generated_filename = f"{participant_id}_{existing_document.id}_{unique_suffix}{file_extension}"
+                version_filename = generated_filename(participant_id, original_filename, existing_document.id)
 
-                base_prefix = f"participants/{participant_id}"
-                current_storage_key = object_key(base_prefix, generated_filename)
-                versions_prefix = f"{base_prefix}/versions"
-                version_storage_key = object_key(versions_prefix, generated_filename)
+                # The document and its new version share one blob
+                upload, blob = await store_upload_blob(db, file, "ibm-cos")
+                current_storage_key = version_storage_key = upload["key"]
 
-                try:
-                    put_bytes(current_storage_key, contents, content_type)
-                    put_bytes(version_storage_key, contents, content_type)
-                except Exception as storage_error:
-                    logger.error(f"Error uploading document {existing_document.id} to COS: {storage_error}")
-                    try:
-                        if current_storage_key:
-                            delete_object(current_storage_key)
-                    except Exception:
-                        pass
-                    try:
-                        if version_storage_key:
-                            delete_object(version_storage_key)
-                    except Exception:
-                        pass
-                    raise HTTPException(status_code=500, detail="Failed to store uploaded document in object storage")
-
-                file_size = len(contents)
-                file_hash = hashlib.sha256(contents).hexdigest()
+                content_type = upload["content_type"]
+                file_size = upload["size"]
+                file_hash = upload["sha256"]
 
                 latest_version = db.query(DocumentVersion).filter(
                     DocumentVersion.document_id == existing_document.id
@@ -650,7 +815,7 @@ async def upload_document(
                 new_version = DocumentVersion(
                     document_id=existing_document.id,
                     version_number=new_version_number,
-                    filename=generated_filename,
+                    filename=version_filename,
                     file_path=version_storage_key,
                     file_size=file_size,
                     mime_type=content_type,
@@ -666,7 +831,7 @@ async def upload_document(
                     latest_version.replaced_by_version_id = new_version.id
                     latest_version.replaced_at = now_utc
 
-                existing_document.filename = generated_filename
+                existing_document.filename = version_filename
                 existing_document.original_filename = original_filename
                 existing_document.file_path = None
                 existing_document.file_size = file_size
@@ -685,28 +850,16 @@ async def upload_document(
                     "storage_key": current_storage_key,
                     "version_storage_key": version_storage_key,
                     "original_filename": original_filename,
+                    "deduplicated": upload["deduplicated"],
                 })
                 existing_document.extra_metadata = metadata
+                attach_blob(new_version, blob)
+                attach_blob(existing_document, blob)
 
             else:
-                # FIXED: Save to versions subdirectory for version uploads
-                file_extension = Path(file.filename).suffix if file.filename else ""
-                unique_filename = f"{participant_id}_{existing_document.id}_{uuid.uuid4().hex}{file_extension}"
-                
-                # Create versions subdirectory
-                versions_dir = Path("uploads/documents") / str(participant_id) / "versions"
-                versions_dir.mkdir(parents=True, exist_ok=True)
-                version_file_path = versions_dir / unique_filename
-                
-                # Save file
-                with open(version_file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                
-                filename = unique_filename
-                file_path = str(version_file_path.absolute())
-                file_size = file.size or 0
-                
-                logger.info(f"Saved version file to: {file_path}")
+                upload, blob = await store_upload_blob(db, file, "local")
+                file_path, _ = blob_location(blob)
+                logger.info(f"Stored version file as blob {blob.sha256[:12]} (deduplicated: {upload['deduplicated']})")
 
                 try:
                     new_version = EnhancedVersionControlService.create_version_with_changes(
@@ -721,16 +874,11 @@ async def upload_document(
                             "ip_address": request.client.host if request.client else None,
                             "affected_fields": ["file_content", "description", "tags"] if description or tags else ["file_content"],
                             "storage_type": storage_type
-                        }
+                        },
+                        blob=blob,
                     )
                 except Exception as version_error:
                     logger.error(f"Error creating version for document {existing_document.id}: {str(version_error)}")
-                    # Clean up uploaded file on error
-                    if storage_type == "local" and 'version_file_path' in locals():
-                        try:
-                            os.remove(version_file_path)
-                        except:
-                            pass
                     raise HTTPException(status_code=500, detail=f"Failed to create version: {str(version_error)}")
             
             if description is not None:
@@ -745,10 +893,9 @@ async def upload_document(
             
             db.commit()
             db.refresh(existing_document)
+            invalidate_document_stats(participant_id)
             if new_version is not None:
                 db.refresh(new_version)
-            if storage_type == "cos":
-                cos_version_committed = True
             
             log_document_access_safe(db, existing_document.id, "version_upload", request)
             
@@ -763,6 +910,7 @@ async def upload_document(
             }
 
             document = existing_document
+            schedule_renditions(background_tasks, document, participant_id)
 
             # ============================================
             # RAG AUTO-PROCESSING - ADD THIS SECTION
@@ -822,25 +970,21 @@ async def upload_document(
             filename = file.filename or f"document-{uuid.uuid4().hex}"
             content_type = file.content_type or mimetypes.guess_type(file.filename or "")[0] or "application/octet-stream"
 
+            # Identical bytes already in the blob store are not stored again
+            upload, blob = await store_upload_blob(db, file, "ibm-cos" if storage_type == "cos" else "local")
+            content_type = upload["content_type"]
+            file_size = upload["size"]
+            storage_metadata = {"sha256": upload["sha256"], "deduplicated": upload["deduplicated"]}
+
             if storage_type == "cos":
-                contents = await file.read()
-                prefix = f"participants/{participant_id}/"
-                key = object_key(prefix, filename)
-                put_bytes(key, contents, content_type)
-                file_size = len(contents)
-                storage_key = key
-                current_storage_key = storage_key
-                storage_metadata = {"storage_key": key}
+                storage_key = upload["key"]
+                storage_metadata["storage_key"] = storage_key
                 file_path_db = None
-                version_file_path = key
+                version_file_path = storage_key
             else:
-                filename, file_path_local = save_uploaded_file(file, participant_id)
-                file_path_db = file_path_local
-                version_file_path = file_path_local
-                try:
-                    file_size = os.path.getsize(file_path_local)
-                except OSError:
-                    file_size = file.size or 0
+                filename = generated_filename(participant_id, file.filename)
+                file_path_db, _ = blob_location(blob)
+                version_file_path = file_path_db
 
             document, workflow = EnhancedDocumentService.create_document_with_workflow(
                 db=db,
@@ -895,14 +1039,17 @@ async def upload_document(
                 }
             )
             db.add(initial_version)
+            db.flush()
+            attach_blob(document, blob)
+            attach_blob(initial_version, blob)
             db.commit()
             db.refresh(initial_version)
-            if storage_provider_value == "ibm-cos":
-                cos_version_committed = True
+            invalidate_document_stats(participant_id)
             
             log_document_access_safe(db, document.id, "upload", request)
             
             logger.info(f"Successfully created new document {document.id}")
+            schedule_renditions(background_tasks, document, participant_id)
             
             response_data = format_document_response(document, participant_id)
             response_data["version_info"] = {
@@ -977,18 +1124,9 @@ async def upload_document(
         raise
     except Exception as e:
         logger.error(f"Error uploading document: {str(e)}")
-        if 'file_path' in locals() and storage_type == "local":
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
-        if storage_type == "cos" and not cos_version_committed:
-            for key_to_remove in (current_storage_key, version_storage_key):
-                if key_to_remove:
-                    try:
-                        delete_object(key_to_remove)
-                    except Exception:
-                        pass
+        # Uploaded bytes live in the shared blob store and may already be
+        # referenced elsewhere; blobs left unreferenced are collected later
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to upload document: {str(e)}")
 
 
@@ -1003,6 +1141,7 @@ def get_participant_documents(
     sort_order: str = "desc",
     page: int = 1,
     page_size: int = 20,
+    search_content: bool = False,
     db: Session = Depends(get_db)
 ):
     """Get documents for a participant with filtering and pagination."""
@@ -1021,7 +1160,8 @@ def get_participant_documents(
             sort_by=sort_by,
             sort_order=sort_order,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            search_content=search_content
         )
         
         return [format_document_response(doc, participant_id) for doc in documents]
@@ -1053,53 +1193,29 @@ def download_document(
         
         logger.info(f"Attempting to {'preview' if inline else 'download'} document {document_id}")
         
-        access_type = "preview" if inline else "download"
-        log_document_access_safe(db, document.id, access_type, request)
+        # A PDF viewer issues many range requests per view; log the first one only
+        if is_initial_request(request):
+            access_type = "preview" if inline else "download"
+            log_document_access_safe(db, document.id, access_type, request)
         
         if document.storage_provider == "ibm-cos" and document.storage_key:
-            obj = get_object_stream(document.storage_key)
-            stream = obj["Body"]
-            
-            headers = {}
-            if "ContentType" in obj:
-                headers["Content-Type"] = obj["ContentType"]
-            
-            if inline:
-                headers["Content-Disposition"] = f"inline; filename=\"{document.original_filename}\""
-            else:
-                headers["Content-Disposition"] = f"attachment; filename=\"{document.original_filename}\""
-            
-            return StreamingResponse(stream, headers=headers)
+            opener = storage_opener(get_storage(), document.storage_key)
+            media_type = None
         else:
-            file_path = resolve_file_path(document, participant_id)
-            
-            headers = {}
-            
-            if inline:
-                headers["Content-Disposition"] = f"inline; filename=\"{document.original_filename}\""
-                
-                if document.mime_type == "application/pdf":
-                    headers.update({
-                        "Content-Type": "application/pdf",
-                        "X-Content-Type-Options": "nosniff",
-                        "Cache-Control": "no-cache, no-store, must-revalidate",
-                        "Pragma": "no-cache",
-                        "Expires": "0"
-                    })
-                elif document.mime_type.startswith("image/"):
-                    headers.update({
-                        "Content-Type": document.mime_type,
-                        "Cache-Control": "max-age=3600"
-                    })
-            else:
-                headers["Content-Disposition"] = f"attachment; filename=\"{document.original_filename}\""
-            
-            return FileResponse(
-                path=str(file_path),
-                filename=document.original_filename,
-                media_type=document.mime_type,
-                headers=headers
-            )
+            opener = path_opener(resolve_file_path(document, participant_id))
+            media_type = document.mime_type
+        
+        etag, last_modified = document_validators(document)
+        return build_file_response(
+            request,
+            opener,
+            etag=etag,
+            last_modified=last_modified,
+            filename=document.original_filename,
+            media_type=media_type,
+            inline=inline,
+            extra_headers={"X-Content-Type-Options": "nosniff"} if inline else None,
+        )
         
     except HTTPException:
         raise
@@ -1111,6 +1227,33 @@ def download_document(
         )
 
 
+@router.get("/participants/{participant_id}/documents/{document_id}/renditions/{rendition}")
+def get_document_rendition(
+    participant_id: int,
+    document_id: int,
+    rendition: str,
+    request: Request,
+    v: Optional[str] = Query(None, description="Content hash; immutable caching when it matches the current file"),
+    db: Session = Depends(get_db)
+):
+    """Thumbnail ("thumb") or preview image of a document, cached by content hash."""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.participant_id == participant_id
+    ).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    source_ref, content_hash = document_rendition_source(document, participant_id)
+    try:
+        return rendition_response(
+            request, source_ref, document.mime_type, rendition,
+            source_hash=content_hash, filename=document.original_filename, version=v,
+        )
+    except RenditionUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.put("/participants/{participant_id}/documents/{document_id}")
 def update_document(
     participant_id: int,
@@ -1197,7 +1340,8 @@ def delete_document(
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        if document.storage_provider == "ibm-cos" and document.storage_key:
+        blob_ids = document_blob_ids(db, document_id)
+        if document.storage_provider == "ibm-cos" and document.storage_key and not document.blob_id:
             delete_object(document.storage_key)
         
         success = DocumentService.delete_document(
@@ -1208,6 +1352,10 @@ def delete_document(
         
         if not success:
             raise HTTPException(status_code=404, detail="Document not found")
+
+        if blob_ids:
+            recount_blob_refs(db, blob_ids)
+            db.commit()
         
         log_document_access_safe(db, document_id, "delete", request)
         
@@ -1244,9 +1392,11 @@ def preview_document_version_inline(
     document_id: int,
     version_id: int,
     request: Request,
+    rendition: Optional[str] = Query(None, description="thumb or preview for a cached image rendition"),
+    v: Optional[str] = Query(None, description="Version file hash; immutable caching of the rendition when it matches"),
     db: Session = Depends(get_db)
 ):
-    """Preview a specific document version inline."""
+    """Preview a specific document version inline, or one of its image renditions."""
     try:
         version = db.query(DocumentVersion).filter(
             and_(
@@ -1262,6 +1412,19 @@ def preview_document_version_inline(
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
 
+        if rendition:
+            source_ref = version.file_path or document.storage_key or document.file_path
+            if not source_ref:
+                raise HTTPException(status_code=404, detail="Version file not available")
+            try:
+                return rendition_response(
+                    request, source_ref,
+                    version.mime_type or document.mime_type, rendition,
+                    source_hash=version.file_hash, filename=version.filename, version=v,
+                )
+            except RenditionUnavailable as e:
+                raise HTTPException(status_code=404, detail=str(e))
+
         log_document_access_safe(db, document_id, "version_preview", request)
 
         media_type = version.mime_type or getattr(document, "mime_type", None) or "application/octet-stream"
@@ -1403,7 +1566,8 @@ def download_document_version(
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
 
-        log_document_access_safe(db, document_id, "version_download", request)
+        if is_initial_request(request):
+            log_document_access_safe(db, document_id, "version_download", request)
 
         media_type = version.mime_type or getattr(document, "mime_type", None) or "application/octet-stream"
         if not isinstance(media_type, str):
@@ -1424,40 +1588,31 @@ def download_document_version(
         if getattr(document, "storage_key", None):
             file_candidates.append(document.storage_key)
 
-        for file_ref in file_candidates:
-            if not file_ref:
-                continue
-
-            candidate_path = Path(file_ref)
-            if candidate_path.exists():
-                return FileResponse(
-                    path=str(candidate_path),
-                    filename=download_name,
-                    media_type=media_type,
-                    headers={"X-Document-Version": str(version.version_number)}
-                )
-
-            try:
-                obj = get_object_stream(file_ref)
-                stream = obj.get("Body")
-                if stream is None:
+        def open_version_file(byte_range):
+            storage = get_storage()
+            for file_ref in file_candidates:
+                if not file_ref:
                     continue
-
-                media_type_to_use = obj.get("ContentType") or media_type or "application/octet-stream"
-                if not isinstance(media_type_to_use, str):
-                    media_type_to_use = str(media_type_to_use)
-
-                headers = {
-                    "Content-Disposition": f'attachment; filename="{download_name}"',
-                    "X-Document-Version": str(version.version_number)
-                }
-
-                return StreamingResponse(stream, media_type=media_type_to_use, headers=headers)
-
-            except Exception:
-                continue
-
-        raise HTTPException(status_code=404, detail="Version file not available")
+                if Path(file_ref).exists():
+                    return LocalStorage.open_file(file_ref, byte_range)
+                try:
+                    return storage.get_object_stream(file_ref, byte_range)
+                except RangeNotSatisfiableError:
+                    raise
+                except Exception:
+                    continue
+            raise HTTPException(status_code=404, detail="Version file not available")
+
+        etag, last_modified = version_validators(version)
+        return build_file_response(
+            request,
+            open_version_file,
+            etag=etag,
+            last_modified=last_modified,
+            filename=download_name,
+            media_type=media_type,
+            extra_headers={"X-Document-Version": str(version.version_number)},
+        )
 
     except HTTPException:
         raise
@@ -1481,6 +1636,51 @@ def get_document_version_analytics(document_id: int, db: Session = Depends(get_d
 
 
 
+# ==========================================
+# SEARCH ENDPOINTS
+# ==========================================
+
+@router.get("/documents/search")
+def search_all_documents(
+    q: str = Query(..., min_length=1),
+    participant_id: Optional[int] = None,
+    category: Optional[str] = None,
+    search_content: bool = False,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Ranked full-text search across all participants' documents."""
+    try:
+        results, total = search_documents(
+            db,
+            q,
+            participant_id=participant_id,
+            category=category,
+            include_content=search_content,
+            page=page,
+            page_size=page_size
+        )
+        
+        return {
+            "query": q,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "results": [
+                {
+                    **format_document_response(doc, doc.participant_id),
+                    "rank": round(rank, 6)
+                }
+                for doc, rank in results
+            ]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error searching documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==========================================
 # EXPIRY MANAGEMENT ENDPOINTS
 # ==========================================
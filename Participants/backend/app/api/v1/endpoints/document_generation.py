@@ -6,6 +6,7 @@ from app.core.database import get_db
 from app.models.participant import Participant
 from app.models.document import Document
 from app.services.document_generation_service import DocumentGenerationService
+from app.services.document_service import invalidate_document_stats
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from datetime import datetime, timezone
@@ -133,6 +134,7 @@ def generate_document(
                 db.add(document)
                 db.commit()
                 db.refresh(document)
+                invalidate_document_stats(participant_id)
                 document_id = document.id
                 
                 logger.info(f"Document saved to database: ID={document_id}, Template={request.template_id}, Participant={participant_id}")
@@ -362,6 +364,7 @@ def bulk_generate_documents(
                                 db.add(document)
                                 db.commit()
                                 db.refresh(document)
+                                invalidate_document_stats(participant_id)
                                 generated_documents.append(document.id)
                                 
                                 logger.info(f"Bulk document saved: ID={document.id}, Template={template_id}")
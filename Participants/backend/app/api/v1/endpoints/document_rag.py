@@ -6,6 +6,7 @@ from app.models.document import Document
 from app.models.participant import Participant
 from app.services.document_chunking_service import DocumentChunkingService
 from app.services.embedding_service import EmbeddingService
+from app.services.embeddings import embedding_provider_status
 from app.services.rag_service import RAGService
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
@@ -273,6 +274,8 @@ def get_rag_status():
         return {
             "embeddings_available": embedding_service.embeddings_available,
             "embedding_model": embedding_service.model_id if embedding_service.embeddings_available else None,
+            "embedding_provider": embedding_service.provider.status() if embedding_service.provider else None,
+            "embedding_providers": embedding_provider_status(),
             "features": {
                 "semantic_search": embedding_service.embeddings_available,
                 "keyword_search": True,
@@ -8,15 +8,19 @@ from app.models.document import Document
 from app.models.document_workflow import DocumentVersion, DocumentApproval
 from app.models.user import User
 from app.api.deps import get_current_active_user
-from app.services.storage.cos_storage_ibm import object_key, put_bytes, get_object_stream, delete_object
+from app.services.storage import get_object_stream, get_storage
+from app.services.storage.delivery import build_file_response, path_opener, storage_opener, version_validators
+from app.services.blob_store import attach_blob, commit_staged_upload, recount_blob_refs, share_blob, stage_upload
+from app.services.storage.uploads import UploadValidationError
+from app.models.stored_blob import StoredBlob
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 from typing import List, Optional
 from datetime import datetime, timezone
+import io
 import logging
 import os
 import uuid
-import hashlib
-import mimetypes
 from pathlib import Path
 
 router = APIRouter()
@@ -97,6 +101,7 @@ def get_document_versions(
                 changes_summary="Initial version",
                 created_by=document.uploaded_by
             )
+            share_blob(db, current_version, document)
             db.add(current_version)
             db.commit()
             db.refresh(current_version)
@@ -157,10 +162,6 @@ async def upload_new_version(
                 detail="IBM Cloud Object Storage is not configured for this environment."
             )
 
-        current_key: Optional[str] = None
-        version_key: Optional[str] = None
-        cos_committed = False
-
         storage_choice = (storage_type or "cos").lower()
         if storage_choice != "cos":
             logger.warning(
@@ -168,36 +169,29 @@ async def upload_new_version(
                 storage_choice
             )
 
-        contents = await file.read()
-        if contents is None:
-            contents = b""
-
         original_filename = file.filename or f"document-{uuid.uuid4().hex}"
-        content_type = file.content_type or mimetypes.guess_type(original_filename)[0] or "application/octet-stream"
         file_extension = Path(original_filename).suffix
         unique_suffix = uuid.uuid4().hex
         generated_filename = f"{document.participant_id}_{document_id}_{unique_suffix}{file_extension}"
 
-        base_prefix = f"participants/{document.participant_id}"
-        current_key = object_key(base_prefix, generated_filename)
-        versions_prefix = f"{base_prefix}/versions"
-        version_key = object_key(versions_prefix, generated_filename)
-
+        # The document and the new version share one content-addressed blob;
+        # re-uploading bytes that are already stored transfers nothing to COS
         try:
-            put_bytes(current_key, contents, content_type)
-            put_bytes(version_key, contents, content_type)
+            upload = await run_in_threadpool(
+                stage_upload, "ibm-cos", file.file, original_filename,
+                allowed_types=ALLOWED_MIME_TYPES, max_bytes=MAX_FILE_SIZE,
+            )
+        except UploadValidationError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as storage_error:
             logger.error(f"Error uploading new version for document {document_id} to COS: {storage_error}")
-            for key_to_remove in (current_key, version_key):
-                if key_to_remove:
-                    try:
-                        delete_object(key_to_remove)
-                    except Exception:
-                        pass
             raise HTTPException(status_code=500, detail="Failed to store version in object storage")
+        blob = commit_staged_upload(db, upload)
+        current_key = version_key = blob.storage_key
 
-        file_size = len(contents)
-        file_hash = hashlib.sha256(contents).hexdigest()
+        content_type = upload["content_type"]
+        file_size = upload["size"]
+        file_hash = upload["sha256"]
         now_utc = datetime.now(timezone.utc)
         previous_file_size = document.file_size or 0
 
@@ -266,13 +260,15 @@ async def upload_new_version(
             "storage_key": current_key,
             "version_storage_key": version_key,
             "original_filename": original_filename,
+            "sha256": file_hash,
         })
         document.extra_metadata = metadata
+        attach_blob(new_version, blob)
+        attach_blob(document, blob)
 
         db.commit()
         db.refresh(document)
         db.refresh(new_version)
-        cos_committed = True
 
         # Log access
         log_document_access_safe(db, document_id, "version_upload", request, current_user)
@@ -292,16 +288,8 @@ async def upload_new_version(
         raise
     except Exception as e:
         logger.error(f"Error uploading new version for document {document_id}: {str(e)}")
-        if current_key and not cos_committed:
-            try:
-                delete_object(current_key)
-            except Exception:
-                pass
-        if version_key and not cos_committed:
-            try:
-                delete_object(version_key)
-            except Exception:
-                pass
+        # Blobs left unreferenced by the rollback are collected by the blob store task
+        db.rollback()
         raise HTTPException(status_code=500, detail="Failed to upload new version")
 
 
@@ -344,11 +332,15 @@ def restore_document_version(
         
         new_version_number = (latest_version.version_number + 1) if latest_version else 1
 
-        # Fetch existing version contents
+        # Fetch existing version contents; a version already in the blob
+        # store is restored by reference, without reading or writing bytes
         contents: Optional[bytes] = None
         content_type = version_to_restore.mime_type or "application/octet-stream"
+        blob = db.get(StoredBlob, version_to_restore.blob_id) if version_to_restore.blob_id else None
 
-        if version_to_restore.file_path and os.path.exists(version_to_restore.file_path):
+        if blob is not None:
+            pass
+        elif version_to_restore.file_path and os.path.exists(version_to_restore.file_path):
             try:
                 with open(version_to_restore.file_path, "rb") as source_file:
                     contents = source_file.read()
@@ -369,32 +361,25 @@ def restore_document_version(
                 logger.error(f"Error fetching version {version_id} from COS during restore: {storage_error}")
                 raise HTTPException(status_code=404, detail="Version file not found in storage")
 
-        if contents is None:
+        if blob is None and contents is None:
             raise HTTPException(status_code=500, detail="Failed to load version contents for restore")
 
         file_extension = Path(version_to_restore.filename or "").suffix or Path(version_to_restore.file_path or "").suffix
         unique_suffix = uuid.uuid4().hex
         generated_filename = f"{document.participant_id}_{document.id}_{unique_suffix}{file_extension}"
 
-        base_prefix = f"participants/{document.participant_id}"
-        current_key = object_key(base_prefix, generated_filename)
-        versions_prefix = f"{base_prefix}/versions"
-        version_key = object_key(versions_prefix, generated_filename)
+        if blob is None:
+            try:
+                upload = stage_upload("ibm-cos", io.BytesIO(contents), generated_filename)
+                blob = commit_staged_upload(db, upload)
+            except Exception as storage_error:
+                logger.error(f"Error uploading restored version for document {document_id}: {storage_error}")
+                raise HTTPException(status_code=500, detail="Failed to store restored document in object storage")
+        current_key = version_key = blob.storage_key
 
-        try:
-            put_bytes(current_key, contents, content_type)
-            put_bytes(version_key, contents, content_type)
-        except Exception as storage_error:
-            logger.error(f"Error uploading restored version for document {document_id}: {storage_error}")
-            for key_to_remove in (current_key, version_key):
-                try:
-                    delete_object(key_to_remove)
-                except Exception:
-                    pass
-            raise HTTPException(status_code=500, detail="Failed to store restored document in object storage")
-
-        file_size = len(contents)
-        file_hash = hashlib.sha256(contents).hexdigest()
+        content_type = blob.mime_type or content_type
+        file_size = blob.file_size
+        file_hash = blob.sha256
         now_utc = datetime.now(timezone.utc)
 
         user_id = current_user.id if current_user else None
@@ -450,8 +435,11 @@ def restore_document_version(
             "storage_key": current_key,
             "version_storage_key": version_key,
             "restored_from_version": version_to_restore.version_number,
+            "sha256": file_hash,
         })
         document.extra_metadata = metadata
+        attach_blob(new_version, blob)
+        attach_blob(document, blob)
         
         db.commit()
         db.refresh(new_version)
@@ -567,9 +555,10 @@ def preview_document_version(
 def download_document_version(
     document_id: int,
     version_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Download a specific version of a document"""
+    """Download a specific version of a document (supports Range and conditional GET)"""
     try:
         version = db.query(DocumentVersion).filter(
             and_(
@@ -581,32 +570,28 @@ def download_document_version(
         if not version:
             raise HTTPException(status_code=404, detail="Document version not found")
         
-        if version.file_path and os.path.exists(version.file_path):
-            return FileResponse(
-                path=version.file_path,
-                filename=version.filename,
-                media_type=version.mime_type
-            )
-
         if version.file_path:
+            if os.path.exists(version.file_path):
+                opener = path_opener(version.file_path)
+            else:
+                opener = storage_opener(get_storage(), version.file_path)
+
+            etag, last_modified = version_validators(version)
             try:
-                obj = get_object_stream(version.file_path)
+                return build_file_response(
+                    request,
+                    opener,
+                    etag=etag,
+                    last_modified=last_modified,
+                    filename=version.filename,
+                    media_type=version.mime_type,
+                )
+            except HTTPException:
+                raise
             except Exception as storage_error:
                 logger.error(f"Error fetching version {version_id} from COS during download: {storage_error}")
                 raise HTTPException(status_code=404, detail="Version file not found")
 
-            stream = obj.get("Body")
-            if stream is None:
-                raise HTTPException(status_code=404, detail="Version file not found")
-
-            media_type = obj.get("ContentType") or version.mime_type or "application/octet-stream"
-            if not isinstance(media_type, str):
-                media_type = str(media_type)
-            headers = {
-                "Content-Disposition": f'attachment; filename="{version.filename}"'
-            }
-            return StreamingResponse(stream, media_type=media_type, headers=headers)
-
         raise HTTPException(status_code=404, detail="Version file not available")
         
     except HTTPException:
@@ -683,6 +668,7 @@ def create_document_version(
             changes_summary=changes_summary,
             created_by="System"  # This should come from auth context
         )
+        share_blob(db, new_version, document)
         
         db.add(new_version)
         db.flush()
@@ -737,15 +723,19 @@ def delete_document_version(
                 detail="Cannot delete current version. Restore a different version first."
             )
         
-        # Delete file from disk
+        # Delete file from disk; shared blobs are released instead
+        blob_id = version.blob_id
         try:
-            if os.path.exists(version.file_path):
+            if not blob_id and os.path.exists(version.file_path):
                 os.remove(version.file_path)
         except Exception as e:
             logger.warning(f"Could not delete version file {version.file_path}: {str(e)}")
         
         # Delete version record
         db.delete(version)
+        if blob_id:
+            db.flush()
+            recount_blob_refs(db, [blob_id])
         db.commit()
         
         return {"message": "Document version deleted successfully"}
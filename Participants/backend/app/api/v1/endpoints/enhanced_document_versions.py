@@ -5,6 +5,8 @@ from app.core.database import get_db
 from app.services.enhanced_version_control_service import EnhancedVersionControlService
 from app.models.document import Document
 from app.models.document_workflow import DocumentVersion
+from app.services.blob_store import share_blob
+from app.services.storage.delivery import set_content_hash
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import logging
@@ -104,6 +106,7 @@ def create_basic_version_history(db: Session, document_id: int, document: Docume
                     "file_size_change": 0
                 }
             )
+            share_blob(db, initial_version, document)
             db.add(initial_version)
             db.commit()
             db.refresh(initial_version)
@@ -404,15 +407,18 @@ def create_basic_rollback(db: Session, document_id: int, version_id: int, rollba
                 "rollback_reason": rollback_reason
             }
         )
+        share_blob(db, new_version, target_version)
         
         db.add(new_version)
         
         # Update the main document
         document.filename = target_version.filename
         document.file_path = target_version.file_path
+        share_blob(db, document, target_version)
         document.file_size = target_version.file_size
         document.version = new_version_number
         document.updated_at = datetime.now()
+        set_content_hash(document, target_version.file_hash)
         
         db.commit()
         db.refresh(new_version)
@@ -532,6 +538,7 @@ def create_initial_version(
                 "file_size_change": 0
             }
         )
+        share_blob(db, initial_version, document)
         
         db.add(initial_version)
         db.commit()
@@ -1,11 +1,11 @@
 # backend/app/api/v1/endpoints/files.py - WITH AI INTEGRATION
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import JSONResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
 import os
 import uuid
-import mimetypes
 from pathlib import Path
 from datetime import datetime, timezone
 import logging
@@ -15,12 +15,14 @@ from app.core.config import settings
 from app.models.document import Document
 from app.models.referral import Referral
 from app.models.participant import Participant
-from app.services.storage.cos_storage_ibm import (
+from app.services.storage import (
     object_key,
-    put_bytes,
     delete_object,
     copy_object,
 )
+from app.services.storage.uploads import UploadValidationError
+from app.services.blob_store import attach_blob, commit_staged_upload, recount_blob_refs, stage_upload
+from app.services.document_service import invalidate_document_stats
 from app.tasks.ingest_tasks import ingest_participant_documents
 
 router = APIRouter()
@@ -44,7 +46,8 @@ ALLOWED_MIME_TYPES = {
 MAX_FILE_SIZE_MB = settings.COS_MAX_UPLOAD_MB
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
-def validate_file(file: UploadFile, file_size: int) -> None:
+def validate_file(file: UploadFile) -> None:
+    """Check the filename; content type and size are checked while streaming."""
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided")
 
@@ -56,20 +59,6 @@ def validate_file(file: UploadFile, file_size: int) -> None:
             detail=f"File type {file_ext} not allowed. Allowed extensions: {allowed}",
         )
 
-    content_type = file.content_type or mimetypes.guess_type(file.filename)[0]
-    if content_type and content_type not in ALLOWED_MIME_TYPES:
-        allowed_types = ", ".join(sorted(ALLOWED_MIME_TYPES))
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type {content_type} not supported. Allowed types: {allowed_types}",
-        )
-
-    if file_size > MAX_FILE_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB",
-        )
-
 def is_temporary_referral_id(referral_id: int) -> bool:
     return referral_id > 1000000000
 
@@ -87,7 +76,6 @@ async def upload_file(
     Upload a file with optional AI ingestion.
     When auto_ingest_ai=True and participant_id is provided, document will be ingested for AI processing.
     """
-    uploaded_key: Optional[str] = None
     try:
         logger.info(f"File upload request: referral_id={referral_id}, participant_id={participant_id}, auto_ingest_ai={auto_ingest_ai}")
         
@@ -97,42 +85,46 @@ async def upload_file(
                 detail="Either referral_id or participant_id must be provided"
             )
 
-        file_bytes = await file.read()
-        file_size = len(file_bytes or b"")
-        if file_size == 0:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-        validate_file(file, file_size)
+        validate_file(file)
 
         resolved_referral_id: Optional[int] = None
         temp_referral = False
-        prefix = "misc/"
 
         if referral_id:
             if is_temporary_referral_id(referral_id):
                 logger.info(f"Using temporary referral ID: {referral_id}")
                 temp_referral = True
-                prefix = f"temp_referrals/{referral_id}/"
             else:
                 referral = db.query(Referral).filter(Referral.id == referral_id).first()
                 if not referral:
                     raise HTTPException(status_code=404, detail="Referral not found")
                 resolved_referral_id = referral_id
-                prefix = f"referrals/{referral_id}/"
 
         if participant_id:
             participant = db.query(Participant).filter(Participant.id == participant_id).first()
             if not participant:
                 raise HTTPException(status_code=404, detail="Participant not found")
-            prefix = f"participants/{participant_id}/"
 
+        # Same bytes re-attached to another referral or participant are
+        # stored once and shared through the blob store
         original_name = file.filename or f"upload-{uuid.uuid4().hex}"
-        content_type = file.content_type or mimetypes.guess_type(original_name)[0] or "application/octet-stream"
-        storage_key = object_key(prefix, original_name)
-        put_bytes(storage_key, file_bytes, content_type=content_type)
-        uploaded_key = storage_key
-
-        extra_metadata: Dict[str, Any] = {"storage_key": storage_key}
+        try:
+            upload = await run_in_threadpool(
+                stage_upload,
+                "ibm-cos",
+                file.file,
+                original_name,
+                allowed_types=ALLOWED_MIME_TYPES,
+                max_bytes=MAX_FILE_SIZE_BYTES,
+            )
+        except UploadValidationError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        blob = commit_staged_upload(db, upload)
+        storage_key = upload["key"]
+        content_type = upload["content_type"]
+        file_size = upload["size"]
+
+        extra_metadata: Dict[str, Any] = {"storage_key": storage_key, "sha256": upload["sha256"]}
         if temp_referral and referral_id:
             extra_metadata["temp_referral_id"] = referral_id
 
@@ -168,9 +160,11 @@ async def upload_file(
 
         db.add(document)
         db.flush()
+        attach_blob(document, blob)
         document.file_url = f"/api/v1/documents/{document.id}/download-cos"
         db.commit()
         db.refresh(document)
+        invalidate_document_stats(document.participant_id)
 
         # AI INGESTION: If participant_id provided and auto_ingest enabled, ingest for AI
         if participant_id and auto_ingest_ai and not temp_referral:
@@ -216,11 +210,6 @@ async def upload_file(
         raise
     except Exception as e:
         logger.error(f"File upload error: {e}")
-        if uploaded_key:
-            try:
-                delete_object(uploaded_key)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to clean up COS object {uploaded_key}: {cleanup_error}")
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
 @router.get("/{filename}")
@@ -275,7 +264,9 @@ async def delete_file(
         if not document:
             raise HTTPException(status_code=404, detail="File not found")
 
-        if document.storage_provider == "ibm-cos":
+        # A shared blob is released below and collected once unreferenced
+        blob_id = document.blob_id
+        if not blob_id and document.storage_provider == "ibm-cos":
             cos_key = document.storage_key or (document.extra_metadata or {}).get("storage_key")
             if cos_key:
                 try:
@@ -283,7 +274,7 @@ async def delete_file(
                     logger.info("Deleted COS object for file_id=%s key=%s", file_id, cos_key)
                 except Exception as cos_error:
                     logger.warning("Failed to delete COS object %s: %s", cos_key, cos_error)
-        else:
+        elif not blob_id:
             try:
                 if document.file_path and os.path.exists(document.file_path):
                     os.remove(document.file_path)
@@ -292,7 +283,11 @@ async def delete_file(
                 logger.warning(f"Could not delete physical file: {e}")
 
         db.delete(document)
+        if blob_id:
+            db.flush()
+            recount_blob_refs(db, [blob_id])
         db.commit()
+        invalidate_document_stats(document.participant_id)
         
         return {"message": "File deleted successfully", "file_id": file_id}
         
@@ -352,6 +347,7 @@ async def associate_temp_files_with_referral(
             doc.file_url = f"/api/v1/documents/{doc.id}/download-cos"
 
         db.commit()
+        invalidate_document_stats()
 
         return {
             "message": f"Successfully associated {len(documents)} files with referral {real_referral_id}",
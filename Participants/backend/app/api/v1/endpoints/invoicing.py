@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status as http_status, Query, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func
+from sqlalchemy import and_
 from datetime import date, time, datetime, timedelta
 from typing import List, Optional, Dict, Any
 import logging
@@ -22,6 +22,8 @@ from app.models.roster import Roster, RosterParticipant, RosterStatus
 from app.models.participant import Participant
 from app.models.user import User
 from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus, PaymentMethod
+from app.services.invoice_summary_service import get_invoice_summary, reconcile_invoice_summary
+from app.services.xero_sync_service import XeroSyncEngine, XeroSyncError, XeroNotConnectedError, get_sync_status
 
 router = APIRouter(dependencies=[Depends(require_roles("FINANCE", "SERVICE_MANAGER", "PROVIDER_ADMIN"))])
 
@@ -305,29 +307,15 @@ def generate_invoice_number(participant_id: int) -> str:
 
 @router.get("/stats", response_model=InvoiceStatsResponse)
 def get_invoice_stats(db: Session = Depends(get_db)):
-    """Get invoice statistics"""
+    """Get invoice statistics from the maintained invoice summary"""
     try:
-        total = db.query(func.count(Invoice.id)).scalar() or 0
-        outstanding = db.query(func.sum(Invoice.amount_outstanding)).filter(
-            Invoice.status.in_([InvoiceStatus.draft, InvoiceStatus.sent])
-        ).scalar() or 0.0
-        
-        overdue = db.query(func.sum(Invoice.amount_outstanding)).filter(
-            Invoice.status == InvoiceStatus.overdue
-        ).scalar() or 0.0
-        
-        # Paid this month
-        first_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        paid_this_month = db.query(func.sum(Invoice.total_amount)).filter(
-            Invoice.status == InvoiceStatus.paid,
-            Invoice.payment_date >= first_of_month
-        ).scalar() or 0.0
+        summary = get_invoice_summary(db)
         
         return InvoiceStatsResponse(
-            total_invoices=total,
-            total_outstanding=float(outstanding),
-            total_overdue=float(overdue),
-            total_paid_this_month=float(paid_this_month),
+            total_invoices=summary["total_invoices"],
+            total_outstanding=summary["total_outstanding"],
+            total_overdue=summary["total_overdue"],
+            total_paid_this_month=summary["total_paid_this_month"],
             average_payment_days=18
         )
     except Exception as e:
@@ -337,6 +325,30 @@ def get_invoice_stats(db: Session = Depends(get_db)):
             detail=f"Error getting invoice stats: {str(e)}"
         )
 
+@router.get("/stats/summary")
+def get_invoice_stats_summary(db: Session = Depends(get_db)):
+    """Invoice totals broken down by status and by issue month"""
+    try:
+        return get_invoice_summary(db)
+    except Exception as e:
+        logger.error(f"Error getting invoice summary: {str(e)}")
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting invoice summary: {str(e)}"
+        )
+
+@router.post("/stats/reconcile")
+def reconcile_invoice_stats(repair: bool = Query(True), db: Session = Depends(get_db)):
+    """Verify the invoice summary against the invoices table and repair drift"""
+    try:
+        return reconcile_invoice_summary(db, repair=repair)
+    except Exception as e:
+        logger.error(f"Error reconciling invoice summary: {str(e)}")
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reconciling invoice summary: {str(e)}"
+        )
+
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
 def get_invoice_detail(invoice_id: int, db: Session = Depends(get_db)):
     """Get detailed invoice information"""
@@ -507,26 +519,65 @@ def list_invoices(
         )
 
 # ==========================================
-# XERO INTEGRATION (Placeholder)
+# XERO INTEGRATION
 # ==========================================
 
+def _parse_sync_item_ids(item_ids: Optional[List[str]]) -> Optional[List[int]]:
+    """Turn sync item IDs such as "invoice_12" or "12" into invoice IDs"""
+    if not item_ids:
+        return None
+    invoice_ids = []
+    for item_id in item_ids:
+        suffix = str(item_id).rsplit("_", 1)[-1]
+        if suffix.isdigit():
+            invoice_ids.append(int(suffix))
+    return invoice_ids
+
 @router.get("/xero/status")
-def get_xero_status():
+def get_xero_status(db: Session = Depends(get_db)):
     """Get Xero connection status"""
+    try:
+        from app.services.xero_service import XeroTokenService
+        tenant_id = XeroTokenService(db).get_tenant_id()
+        sync_status = get_sync_status(db)
+    except Exception as e:
+        logger.error(f"Error getting Xero status: {str(e)}")
+        tenant_id, sync_status = None, {"last_sync": None, "entities": {}}
+
     return {
-        "connected": False,
-        "last_sync": None,
+        "connected": bool(tenant_id),
+        "last_sync": sync_status["last_sync"],
         "tenant_name": None,
-        "sync_status": "idle"
+        "sync_status": "idle",
+        "entities": sync_status["entities"]
     }
 
 @router.post("/xero/sync")
 def sync_xero(request: SyncRequest, db: Session = Depends(get_db)):
-    """Sync invoices with Xero"""
+    """Push contact and invoice changes to Xero in rate-limited batches"""
+    try:
+        engine = XeroSyncEngine.for_organization(db)
+    except XeroNotConnectedError as e:
+        return {
+            "synced": 0,
+            "failed": 0,
+            "message": str(e)
+        }
+
+    try:
+        result = engine.sync_all(invoice_ids=_parse_sync_item_ids(request.item_ids))
+    except XeroSyncError as e:
+        logger.error(f"Xero sync failed: {str(e)}")
+        raise HTTPException(
+            status_code=http_status.HTTP_502_BAD_GATEWAY,
+            detail=f"Xero sync failed: {str(e)}"
+        )
+
     return {
-        "synced": 0,
-        "failed": 0,
-        "message": "Xero integration not yet configured"
+        "synced": result["synced"],
+        "failed": result["failed"],
+        "message": f"Synced {result['synced']} records to Xero using {result['api_calls']} API calls",
+        "details": result
     }
 
 @router.post("/generate-automatic")
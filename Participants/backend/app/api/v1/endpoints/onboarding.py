@@ -12,6 +12,7 @@ from app.models.participant import Participant
 from app.models.document import Document
 from app.services.document_generation_service import DocumentGenerationService
 from app.services.signing_service import SigningService
+from app.services.document_service import invalidate_document_stats
 
 logger = logging.getLogger(__name__)
 
@@ -231,6 +232,7 @@ def generate_onboarding_documents(
         )
     
     db.commit()
+    invalidate_document_stats(participant_id)
     
     return {
         "message": "Onboarding documents generated successfully",
@@ -343,6 +345,7 @@ def send_onboarding_pack(
         )
     
     db.commit()
+    invalidate_document_stats(participant_id)
     
     # Create signing envelope with email
     signing_svc = SigningService(db)
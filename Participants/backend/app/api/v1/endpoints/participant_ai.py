@@ -1,14 +1,20 @@
 # backend/app/api/v1/endpoints/participant_ai.py - COMPLETE WITH RAG
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 import logging
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
 from app.models.participant import Participant
 from app.schemas.ai import AISuggestionCreate
+from app.services.ai.generation_cache import cached_generate, cached_stream
+from app.services.ai.llm_gateway import LLMSaturatedError
+from app.services.ai.streaming import generation_events, sse_response
 from app.services.ai_suggestion_service import save_suggestion
+from app.services.participant_context_service import get_participant_snapshot
 from app.services.rag_service import RAGService
 
 router = APIRouter(prefix="/participants/{participant_id}/ai", tags=["participant-ai"])
@@ -22,10 +28,10 @@ class AskRequest(BaseModel):
     question: str
 
 def get_ai_provider():
-    """Get the configured AI provider (WatsonxLLM)"""
+    """Get the shared AI provider (WatsonxLLM) from the client registry"""
     try:
-        from ai.watsonx_provider import WatsonxLLM
-        return WatsonxLLM()
+        from app.services.ai.llm_registry import get_llm
+        return get_llm()
     except Exception as e:
         logger.error(f"Failed to initialize AI provider: {e}")
         raise HTTPException(
@@ -33,31 +39,114 @@ def get_ai_provider():
             detail="AI service unavailable. Check Watsonx configuration."
         )
 
+def ai_busy(error: LLMSaturatedError) -> HTTPException:
+    """429 with Retry-After when the LLM gateway is shedding load"""
+    logger.warning(f"AI request shed: {error}")
+    return HTTPException(
+        status_code=429,
+        detail="AI service is busy. Please retry shortly.",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def release_session(db: Session) -> None:
+    """End the request's transaction and hand its connection back before a stream starts"""
+    db.commit()
+    db.close()
+
+def generate_released(db: Session, ai, prompt: str, participant_id: int) -> Optional[str]:
+    """
+    cached_generate with the request's connection back in the pool.
+
+    A caller can wait in the LLM gateway for AI_QUEUE_TIMEOUT_SECONDS and
+    then generate for minutes; holding a DB connection all that time would
+    let AI_MAX_CONCURRENCY + AI_MAX_QUEUE callers exhaust the pool. The
+    session checks a connection out again when the result is saved.
+    """
+    db.commit()
+    return cached_generate(ai, prompt, participant_id)
+
+def save_in_own_session(suggestion_data: AISuggestionCreate):
+    """save_suggestion for code that runs after the request's session is released"""
+    db = SessionLocal()
+    try:
+        return save_suggestion(db, suggestion_data)
+    finally:
+        db.close()
+
+def stream_suggestion(
+    db: Session,
+    ai,
+    prompt: str,
+    participant_id: int,
+    suggestion_type: str,
+    response_type: str,
+    payload_for,
+    confidence: str = "medium",
+    sources: Optional[Dict[str, Any]] = None,
+):
+    """
+    SSE response for a draft: sources, then tokens, then the saved suggestion.
+
+    The suggestion is saved exactly as the blocking endpoint saves it, once
+    the whole completion has arrived. Generation can take minutes, so the
+    request's session is released before streaming and the save uses a
+    session of its own rather than holding a pooled connection throughout.
+    """
+    async def save(content: str) -> Dict[str, Any]:
+        suggestion_data = AISuggestionCreate(
+            subject_id=participant_id,
+            suggestion_type=suggestion_type,
+            payload=payload_for(content),
+            raw_text=content,
+            provider="watsonx",
+            model=ai.cfg.model_id,
+            confidence=confidence,
+            created_by="api"
+        )
+        saved = await run_in_threadpool(save_in_own_session, suggestion_data)
+        logger.info(f"Streamed {response_type} suggestion {saved.id} for participant {participant_id}")
+        return {
+            "suggestion_id": saved.id,
+            "participant_id": participant_id,
+            "suggestion_type": response_type,
+            "provider": "watsonx",
+            "model": ai.cfg.model_id,
+            "created_at": saved.created_at.isoformat()
+        }
+
+    release_session(db)
+    return sse_response(generation_events(
+        cached_stream(ai, prompt, participant_id), sources, on_complete=save, min_length=10
+    ))
+
 @router.post("/care-plan/suggest")
 def suggest_care_plan(
     participant_id: int,
+    stream: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Generate AI-powered care plan suggestions for a participant (standard)"""
+    """Generate AI-powered care plan suggestions for a participant (standard).
+
+    With stream=true the draft is sent as Server-Sent Events while it is generated.
+    """
     try:
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
-        if not participant:
+        snapshot = get_participant_snapshot(db, participant_id)
+        if not snapshot:
             raise HTTPException(status_code=404, detail="Participant not found")
         
         ai = get_ai_provider()
         
-        # Safely build participant data with getattr
-        participant_data = {
-            "id": participant.id,
-            "name": f"{participant.first_name} {participant.last_name}",
-            "date_of_birth": participant.date_of_birth.isoformat() if hasattr(participant, 'date_of_birth') and participant.date_of_birth else None,
-            "ndis_number": getattr(participant, 'ndis_number', 'Not provided'),
-            "support_needs": getattr(participant, 'support_needs', 'Not specified'),
-            "communication_preferences": getattr(participant, 'communication_preferences', {}),
-        }
+        participant_data = snapshot["profile"]
+        
+        if stream:
+            return stream_suggestion(
+                db, ai, ai.care_plan_prompt(participant_data), participant_id,
+                suggestion_type="care_plan", response_type="care_plan",
+                payload_for=lambda content: {"markdown": content},
+            )
         
         # Generate AI care plan
-        care_plan_markdown = ai.care_plan_markdown(participant_data)
+        care_plan_markdown = generate_released(db, ai, ai.care_plan_prompt(participant_data), participant_id)
         
         # Validate AI response before saving
         if not care_plan_markdown:
@@ -101,6 +190,8 @@ def suggest_care_plan(
         
     except HTTPException:
         raise
+    except LLMSaturatedError as e:
+        raise ai_busy(e)
     except Exception as e:
         logger.error(f"Error generating care plan suggestion: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to generate care plan: {str(e)}")
@@ -113,31 +204,24 @@ def suggest_care_plan_with_context(
 ):
     """Generate AI-powered care plan WITH document context from RAG"""
     try:
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
-        if not participant:
+        snapshot = get_participant_snapshot(db, participant_id)
+        if not snapshot:
             raise HTTPException(status_code=404, detail="Participant not found")
         
         ai = get_ai_provider()
         
         # Get participant data
-        participant_data = {
-            "id": participant.id,
-            "name": f"{participant.first_name} {participant.last_name}",
-            "date_of_birth": participant.date_of_birth.isoformat() if hasattr(participant, 'date_of_birth') and participant.date_of_birth else None,
-            "ndis_number": getattr(participant, 'ndis_number', 'Not provided'),
-            "support_needs": getattr(participant, 'support_needs', 'Not specified'),
-            "communication_preferences": getattr(participant, 'communication_preferences', {}),
-        }
+        participant_data = snapshot["profile"]
         
         # Get relevant document context using RAG
         rag_service = RAGService()
-        query = f"care plan goals supports for {participant.first_name} {participant.last_name}"
+        query = f"care plan goals supports for {snapshot['profile']['name']}"
         
         document_context, sources = rag_service.get_context_for_ai(
             db=db,
             participant_id=participant_id,
             query=query,
-            max_context_length=1500
+            max_context_tokens=settings.RAG_CONTEXT_TOKENS
         )
         
         # Enhanced prompt with document context
@@ -172,7 +256,7 @@ Participant (YAML-like):
 """
         
         # Generate AI care plan
-        care_plan_markdown = ai._gen(enhanced_prompt)
+        care_plan_markdown = generate_released(db, ai, enhanced_prompt, participant_id)
         
         # Validate response
         if not care_plan_markdown or len(care_plan_markdown.strip()) < 10:
@@ -222,6 +306,8 @@ Participant (YAML-like):
         
     except HTTPException:
         raise
+    except LLMSaturatedError as e:
+        raise ai_busy(e)
     except Exception as e:
         logger.error(f"Error generating care plan with context: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to generate care plan: {str(e)}")
@@ -231,12 +317,17 @@ Participant (YAML-like):
 def ask_ai_about_participant(
     participant_id: int,
     request: AskRequest,
+    stream: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Ask AI a question about participant using RAG context"""
+    """Ask AI a question about participant using RAG context.
+
+    With stream=true the sources are sent first as Server-Sent Events and
+    the answer follows token by token.
+    """
     try:
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
-        if not participant:
+        snapshot = get_participant_snapshot(db, participant_id)
+        if not snapshot:
             raise HTTPException(status_code=404, detail="Participant not found")
         
         question = request.question
@@ -251,14 +342,14 @@ def ask_ai_about_participant(
             db=db,
             participant_id=participant_id,
             query=question,
-            max_context_length=2000
+            max_context_tokens=settings.RAG_CONTEXT_TOKENS
         )
         
         # Build prompt
         if document_context:
             prompt = f"""You are an NDIS care assistant with access to participant documents.
 
-PARTICIPANT: {participant.first_name} {participant.last_name}
+PARTICIPANT: {snapshot['profile']['name']}
 
 RELEVANT DOCUMENT EXCERPTS:
 {document_context}
@@ -269,14 +360,38 @@ Please answer the question based on the document excerpts above. If the document
         else:
             prompt = f"""You are an NDIS care assistant.
 
-PARTICIPANT: {participant.first_name} {participant.last_name}
+PARTICIPANT: {snapshot['profile']['name']}
 
 USER QUESTION: {question}
 
 Note: No participant documents are available. Please provide a general answer based on NDIS best practices."""
         
+        source_list = [
+            {
+                "document_id": source["document_id"],
+                "similarity_score": source["similarity_score"],
+                "document_title": source["metadata"].get("document_title", "Unknown")
+            }
+            for source in sources
+        ]
+        
+        if stream:
+            async def answered(content: str) -> Dict[str, Any]:
+                return {"participant_id": participant_id, "question": question}
+            
+            release_session(db)
+            return sse_response(generation_events(
+                cached_stream(ai, prompt, participant_id),
+                {
+                    "document_context_used": bool(document_context),
+                    "sources_count": len(sources),
+                    "sources": source_list
+                },
+                on_complete=answered
+            ))
+        
         # Get AI response
-        response = ai._gen(prompt)
+        response = generate_released(db, ai, prompt, participant_id)
         
         if not response:
             raise HTTPException(status_code=500, detail="AI returned no response")
@@ -287,18 +402,13 @@ Note: No participant documents are available. Please provide a general answer ba
             "answer": response,
             "document_context_used": bool(document_context),
             "sources_count": len(sources),
-            "sources": [
-                {
-                    "document_id": source["document_id"],
-                    "similarity_score": source["similarity_score"],
-                    "document_title": source["metadata"].get("document_title", "Unknown")
-                }
-                for source in sources
-            ]
+            "sources": source_list
         }
         
     except HTTPException:
         raise
+    except LLMSaturatedError as e:
+        raise ai_busy(e)
     except Exception as e:
         logger.error(f"Error answering question: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -307,33 +417,31 @@ Note: No participant documents are available. Please provide a general answer ba
 @router.post("/risk/assess")
 def assess_risk(
     participant_id: int,
+    stream: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Generate AI-powered risk assessment for a participant"""
+    """Generate AI-powered risk assessment for a participant.
+
+    With stream=true the assessment is sent as Server-Sent Events while it is generated.
+    """
     try:
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
-        if not participant:
+        snapshot = get_participant_snapshot(db, participant_id)
+        if not snapshot:
             raise HTTPException(status_code=404, detail="Participant not found")
         
         ai = get_ai_provider()
         
-        # Build notes list safely
-        notes = []
-        support_needs = getattr(participant, 'support_needs', None)
-        medical_info = getattr(participant, 'medical_information', None)
+        notes = snapshot["risk_notes"]
         
-        if support_needs:
-            notes.append(support_needs)
-        else:
-            notes.append("No support needs documented")
-            
-        if medical_info:
-            notes.append(medical_info)
-        else:
-            notes.append("No medical information available")
+        if stream:
+            return stream_suggestion(
+                db, ai, ai.risk_prompt(notes), participant_id,
+                suggestion_type="risk", response_type="risk_assessment",
+                payload_for=lambda content: {"summary": content},
+            )
         
         # Generate risk assessment
-        risk_summary = ai.risk_summary(notes)
+        risk_summary = generate_released(db, ai, ai.risk_prompt(notes), participant_id)
         
         # Validate AI response before saving
         if not risk_summary:
@@ -377,6 +485,8 @@ def assess_risk(
         
     except HTTPException:
         raise
+    except LLMSaturatedError as e:
+        raise ai_busy(e)
     except Exception as e:
         logger.error(f"Error generating risk assessment: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to assess risk: {str(e)}")
@@ -386,12 +496,16 @@ def assess_risk(
 def generate_clinical_note(
     participant_id: int,
     request: ClinicalNoteRequest,
+    stream: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Generate AI-powered clinical/SOAP note from interaction summary"""
+    """Generate AI-powered clinical/SOAP note from interaction summary.
+
+    With stream=true the note is sent as Server-Sent Events while it is generated.
+    """
     try:
-        participant = db.query(Participant).filter(Participant.id == participant_id).first()
-        if not participant:
+        snapshot = get_participant_snapshot(db, participant_id)
+        if not snapshot:
             raise HTTPException(status_code=404, detail="Participant not found")
         
         # Validate interaction summary
@@ -404,8 +518,15 @@ def generate_clinical_note(
         
         ai = get_ai_provider()
         
+        if stream:
+            return stream_suggestion(
+                db, ai, ai.soap_prompt(interaction_summary), participant_id,
+                suggestion_type="note", response_type="clinical_note",
+                payload_for=lambda content: {"soap_note": content},
+            )
+        
         # Generate SOAP note
-        soap_note = ai.soap_note(interaction_summary)
+        soap_note = generate_released(db, ai, ai.soap_prompt(interaction_summary), participant_id)
         
         # Validate AI response before saving
         if not soap_note:
@@ -449,6 +570,8 @@ def generate_clinical_note(
         
     except HTTPException:
         raise
+    except LLMSaturatedError as e:
+        raise ai_busy(e)
     except Exception as e:
         logger.error(f"Error generating clinical note: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to generate note: {str(e)}")
@@ -460,27 +583,33 @@ def get_suggestion_history(
     suggestion_type: Optional[str] = None,
     limit: int = 20,
     applied_only: bool = False,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get AI suggestion history for a participant"""
+    """Get AI suggestion history for a participant, newest first; pass next_cursor back for the next page"""
     try:
-        from app.services.ai_suggestion_service import get_participant_suggestions
+        from app.services.ai_suggestion_service import get_participant_suggestion_page
         
         participant = db.query(Participant).filter(Participant.id == participant_id).first()
         if not participant:
             raise HTTPException(status_code=404, detail="Participant not found")
         
-        suggestions = get_participant_suggestions(
-            db=db,
-            participant_id=participant_id,
-            suggestion_type=suggestion_type,
-            limit=limit,
-            applied_only=applied_only
-        )
+        try:
+            suggestions, next_cursor = get_participant_suggestion_page(
+                db=db,
+                participant_id=participant_id,
+                suggestion_type=suggestion_type,
+                limit=max(1, limit),
+                applied_only=applied_only,
+                cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         return {
             "participant_id": participant_id,
             "total": len(suggestions),
+            "next_cursor": next_cursor,
             "suggestions": [
                 {
                     "id": s.id,
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, UploadFile, File, Form
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, or_
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import date, datetime, timedelta
+import uuid
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.sil import (
     Home,
@@ -22,6 +25,15 @@ from app.models.sil import (
     HomeNote,
     HomeNoteAttachment,
 )
+from app.services.rendition_service import (
+    IMAGE_TYPES,
+    RenditionUnavailable,
+    generate_renditions,
+    rendition_response,
+)
+from app.services.storage import get_storage, object_key
+from app.services.storage.delivery import build_file_response, make_etag, path_opener, storage_opener
+from app.services.storage.uploads import UploadValidationError, stream_upload
 from app.schemas.sil import (
     HomeResponse,
     HomeSummary,
@@ -835,34 +847,104 @@ async def create_note(
 # ============================================================================
 
 
+ROOM_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+
 @router.post("/rooms/{room_id}/images", response_model=AttachmentResponse, status_code=201)
 async def upload_room_image(
     room_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
-    """Upload an image for a room."""
+    """Upload an image for a room; thumbnails are rendered in the background."""
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    # Handle file upload (simplified - you'd want to use S3)
+    # COS when configured, otherwise the local backend (referenced by absolute
+    # path, as local documents are)
+    storage = get_storage() if settings.is_cos_configured else get_storage("local")
+    file_name = file.filename or "image"
+    key = object_key(f"rooms/{room_id}/{uuid.uuid4().hex}", file_name)
+    try:
+        upload = await run_in_threadpool(
+            stream_upload, storage, key, file.file, file_name,
+            allowed_types=IMAGE_TYPES, max_bytes=ROOM_IMAGE_MAX_BYTES,
+        )
+    except UploadValidationError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
     image = RoomImage(
         room_id=room_id,
-        file_name=file.filename,
-        object_key=f"rooms/{room_id}/{file.filename}",
-        content_type=file.content_type,
+        file_name=file_name,
+        object_key=key if settings.is_cos_configured else str(storage.path_for(key)),
+        content_type=upload["content_type"],
+        file_size=upload["size"],
+        sha256=upload["sha256"],
     )
     db.add(image)
+    db.flush()
+    image.url = f"/api/v1/sil/rooms/{room_id}/images/{image.id}/file"
     db.commit()
     db.refresh(image)
 
+    background_tasks.add_task(generate_renditions, image.object_key, image.content_type, image.sha256)
+
     return AttachmentResponse(
         id=image.id,
         fileName=image.file_name,
         objectKey=image.object_key,
         url=image.url,
+        thumbnailUrl=image.thumbnail_url,
         contentType=image.content_type,
         fileSize=image.file_size,
         createdAt=image.created_at,
-    )
\ No newline at end of file
+    )
+
+
+def _get_room_image(db: Session, room_id: int, image_id: int) -> RoomImage:
+    image = db.query(RoomImage).filter(RoomImage.id == image_id, RoomImage.room_id == room_id).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Room image not found")
+    return image
+
+
+@router.get("/rooms/{room_id}/images/{image_id}/file")
+def get_room_image_file(room_id: int, image_id: int, request: Request, db: Session = Depends(get_db)):
+    """Original room image."""
+    image = _get_room_image(db, room_id, image_id)
+    if image.object_key.startswith("/"):
+        opener = path_opener(image.object_key)
+    else:
+        opener = storage_opener(get_storage(), image.object_key)
+    last_modified = image.updated_at or image.created_at
+    return build_file_response(
+        request,
+        opener,
+        etag=make_etag(None, "room-image", image.id, image.file_size),
+        last_modified=last_modified,
+        filename=image.file_name,
+        media_type=image.content_type,
+        inline=True,
+    )
+
+
+@router.get("/rooms/{room_id}/images/{image_id}/renditions/{rendition}")
+def get_room_image_rendition(
+    room_id: int,
+    image_id: int,
+    rendition: str,
+    request: Request,
+    v: Optional[str] = Query(None, description="Content hash; immutable caching when it matches the image"),
+    db: Session = Depends(get_db),
+):
+    """Thumbnail ("thumb") or preview of a room image, for list and gallery views."""
+    image = _get_room_image(db, room_id, image_id)
+    try:
+        return rendition_response(
+            request, image.object_key, image.content_type, rendition,
+            source_hash=image.sha256, filename=image.file_name, version=v,
+        )
+    except RenditionUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
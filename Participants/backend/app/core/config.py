@@ -18,6 +18,19 @@ class Settings(BaseSettings):
     
     # COS Upload Configuration
     COS_MAX_UPLOAD_MB: int = int(os.getenv("COS_MAX_UPLOAD_MB", "50"))
+    COS_MAX_POOL_CONNECTIONS: int = int(os.getenv("COS_MAX_POOL_CONNECTIONS", "20"))
+    COS_MULTIPART_PART_MB: int = max(5, int(os.getenv("COS_MULTIPART_PART_MB", "8")))  # S3 minimum part size is 5 MB
+    COS_MULTIPART_CONCURRENCY: int = int(os.getenv("COS_MULTIPART_CONCURRENCY", "4"))
+    
+    # Storage Configuration
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "ibm-cos")  # ibm-cos | local | memory
+    LOCAL_STORAGE_ROOT: str = os.getenv("LOCAL_STORAGE_ROOT", "uploads")
+    BLOB_GC_GRACE_HOURS: int = int(os.getenv("BLOB_GC_GRACE_HOURS", "24"))  # unreferenced blobs are kept this long
+    
+    # Document Configuration
+    DOCUMENT_EXPORT_CONCURRENCY: int = int(os.getenv("DOCUMENT_EXPORT_CONCURRENCY", "4"))  # parallel storage reads per export
+    DOCUMENT_EXPORT_PREFETCH_MB: int = int(os.getenv("DOCUMENT_EXPORT_PREFETCH_MB", "16"))  # larger files are streamed, not prefetched
+    DOCUMENT_STATS_CACHE_SECONDS: int = int(os.getenv("DOCUMENT_STATS_CACHE_SECONDS", "30"))  # 0 disables
     
     # Admin Authentication
     ADMIN_API_KEY: str | None = os.getenv("ADMIN_API_KEY")
@@ -25,10 +38,29 @@ class Settings(BaseSettings):
     # AI Configuration
     AI_PROVIDER: str = os.getenv("AI_PROVIDER", "watsonx")
     AI_MODEL: str = os.getenv("AI_MODEL", "ibm/granite-3-8b-instruct")
+    AI_STREAM_WORKERS: int = int(os.getenv("AI_STREAM_WORKERS", "16"))  # concurrent streamed AI generations
+    AI_GENERATION_CACHE_SIZE: int = int(os.getenv("AI_GENERATION_CACHE_SIZE", "512"))  # 0 disables
+    AI_GENERATION_CACHE_SECONDS: int = int(os.getenv("AI_GENERATION_CACHE_SECONDS", "3600"))
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", "8"))  # model calls in flight
+    AI_MAX_QUEUE: int = int(os.getenv("AI_MAX_QUEUE", "8"))  # callers waiting beyond that get 429; concurrency + queue must stay well below the 40-thread sync pool
+    AI_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("AI_QUEUE_TIMEOUT_SECONDS", "20"))
+    AI_GENERATION_TIMEOUT_SECONDS: float = float(os.getenv("AI_GENERATION_TIMEOUT_SECONDS", "120"))  # coalesced callers stop waiting after queue timeout + this
+    AI_DRAFT_WORKERS: int = int(os.getenv("AI_DRAFT_WORKERS", "4"))  # batch drafts in flight; keep below AI_MAX_CONCURRENCY
+    AI_DRAFT_BATCH_SIZE: int = int(os.getenv("AI_DRAFT_BATCH_SIZE", "20"))  # items claimed and saved per transaction
+    AI_DRAFT_MAX_ATTEMPTS: int = int(os.getenv("AI_DRAFT_MAX_ATTEMPTS", "3"))
+    AI_DRAFT_CLAIM_TIMEOUT_SECONDS: int = int(os.getenv("AI_DRAFT_CLAIM_TIMEOUT_SECONDS", "900"))  # then reclaimed from a dead runner
     
     # Embeddings Configuration
-    EMBEDDINGS_PROVIDER: str = os.getenv("EMBEDDINGS_PROVIDER", "watsonx")
+    EMBEDDINGS_PROVIDER: str = os.getenv("EMBEDDINGS_PROVIDER", "watsonx")  # watsonx | local | hashing
     EMBEDDINGS_MODEL: str = os.getenv("EMBEDDINGS_MODEL", "ibm/slate-125m-english-rtrvr")
+    EMBEDDINGS_FALLBACK: str = os.getenv("EMBEDDINGS_FALLBACK", "hashing")  # used when the provider is unavailable; empty disables
+    EMBEDDINGS_RETRY_SECONDS: float = float(os.getenv("EMBEDDINGS_RETRY_SECONDS", "30"))  # rebuild a failed provider after this, doubling per failure
+    EMBEDDINGS_RETRY_MAX_SECONDS: float = float(os.getenv("EMBEDDINGS_RETRY_MAX_SECONDS", "900"))
+    EMBEDDINGS_LOCAL_MODEL: str = os.getenv("EMBEDDINGS_LOCAL_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDINGS_LOCAL_BACKEND: str = os.getenv("EMBEDDINGS_LOCAL_BACKEND", "torch")  # torch | onnx | openvino
+    EMBEDDINGS_DIMENSIONS: int = int(os.getenv("EMBEDDINGS_DIMENSIONS", "384"))  # hashing provider
+    EMBEDDINGS_BATCH_SIZE: int = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "64"))
+    EMBEDDINGS_WORKERS: int = int(os.getenv("EMBEDDINGS_WORKERS", "0"))  # processes for large hashing batches; 0 = in-process
     
     # Watsonx AI Settings
     WATSONX_URL: str = os.getenv("WATSONX_URL", "")
@@ -47,6 +79,9 @@ class Settings(BaseSettings):
     RAG_MAX_CONTEXT_LENGTH: int = int(os.getenv("RAG_MAX_CONTEXT_LENGTH", "2000"))
     RAG_TOP_K_RESULTS: int = int(os.getenv("RAG_TOP_K_RESULTS", "5"))
     RAG_SIMILARITY_THRESHOLD: float = float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.5"))
+    RAG_CONTEXT_TOKENS: int = int(os.getenv("RAG_CONTEXT_TOKENS", "500"))  # document context per prompt
+    RAG_CANDIDATE_CHUNKS: int = int(os.getenv("RAG_CANDIDATE_CHUNKS", "15"))  # retrieved before dedup/packing
+    RAG_TOKENIZER: str = os.getenv("RAG_TOKENIZER", "")  # tokenizer.json path or HF name; empty = estimate
     
     # Email Configuration
     SMTP_SERVER: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -110,12 +145,14 @@ class Settings(BaseSettings):
                     self.WATSONX_PROJECT_ID
                 ])
             )
-        return False
+        return self.AI_PROVIDER == "fake"
     
     @property
     def is_embeddings_configured(self) -> bool:
-        """Return True when embeddings (Watsonx) are properly configured."""
-        # Embeddings use same Watsonx credentials as main AI
+        """Return True when an embedding provider (or fallback) is usable."""
+        if self.EMBEDDINGS_PROVIDER != "watsonx" or self.EMBEDDINGS_FALLBACK:
+            return True
+        # Watsonx embeddings use same credentials as main AI
         return self.is_ai_configured
     
     @property
@@ -5,17 +5,71 @@ Encryption utility for securely storing sensitive data like OAuth tokens.
 
 Uses Fernet symmetric encryption from the cryptography library.
 The encryption key is derived from the SECRET_KEY in .env file.
+
+Key derivation (PBKDF2, 100,000 iterations) runs once per secret per
+process; derived keys are cached. To rotate SECRET_KEY, move the old value
+into PREVIOUS_SECRET_KEYS (comma-separated): tokens encrypted with an old
+key still decrypt and can be re-encrypted with the current key on read.
 """
 
 import os
 import base64
 import hashlib
-from cryptography.fernet import Fernet
+import threading
+from typing import Dict, List, Optional, Tuple
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 
 
+KDF_SALT = b'xero_token_salt'  # Static salt for consistency
+KDF_ITERATIONS = 100000
+
+# Process-wide cache of derived Fernet keys, keyed by a digest of the secret
+_derived_keys: Dict[str, bytes] = {}
+_derived_keys_lock = threading.Lock()
+
+
+def derive_fernet_key(secret_key: str) -> bytes:
+    """
+    Derive (or fetch from cache) the Fernet key for a secret.
+
+    The cache is keyed by a SHA-256 digest so raw secrets are not held as dict keys.
+    """
+    cache_key = hashlib.sha256(secret_key.encode()).hexdigest()
+    with _derived_keys_lock:
+        cached = _derived_keys.get(cache_key)
+    if cached:
+        return cached
+
+    # Derive a 32-byte encryption key from the secret key using PBKDF2HMAC
+    # This ensures we have a proper Fernet-compatible key
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=KDF_SALT,
+        iterations=KDF_ITERATIONS,
+        backend=default_backend()
+    )
+    key = base64.urlsafe_b64encode(kdf.derive(secret_key.encode()))
+
+    with _derived_keys_lock:
+        _derived_keys[cache_key] = key
+    return key
+
+
+def clear_key_cache() -> None:
+    """Forget all derived keys (e.g. after rotating secrets in a running process)."""
+    with _derived_keys_lock:
+        _derived_keys.clear()
+
+
+def _previous_secret_keys() -> List[str]:
+    value = os.getenv("PREVIOUS_SECRET_KEYS", "")
+    return [key.strip() for key in value.split(",") if key.strip()]
+
+
 class TokenEncryption:
     """
     Handles encryption and decryption of OAuth tokens.
@@ -24,32 +78,34 @@ class TokenEncryption:
     This ensures that tokens are encrypted at rest in the database.
     """
 
-    def __init__(self):
+    def __init__(self, secret_key: Optional[str] = None, previous_secret_keys: Optional[List[str]] = None):
         """
         Initialize the encryption handler with a key derived from SECRET_KEY.
+
+        Args:
+            secret_key: Current secret; defaults to the SECRET_KEY env var
+            previous_secret_keys: Retired secrets still accepted for decryption;
+                defaults to the PREVIOUS_SECRET_KEYS env var
         """
         # Get secret key from environment
-        secret_key = os.getenv("SECRET_KEY")
+        secret_key = secret_key or os.getenv("SECRET_KEY")
         if not secret_key:
             raise ValueError(
                 "SECRET_KEY environment variable is required for token encryption. "
                 "Please add SECRET_KEY to your .env file."
             )
 
-        # Derive a 32-byte encryption key from the secret key using PBKDF2HMAC
-        # This ensures we have a proper Fernet-compatible key
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b'xero_token_salt',  # Static salt for consistency
-            iterations=100000,
-            backend=default_backend()
-        )
-        key_bytes = kdf.derive(secret_key.encode())
-
-        # Encode as base64 for Fernet
-        self.fernet_key = base64.urlsafe_b64encode(key_bytes)
+        if previous_secret_keys is None:
+            previous_secret_keys = _previous_secret_keys()
+
+        # Derived keys are cached, so constructing this repeatedly is cheap
+        self.fernet_key = derive_fernet_key(secret_key)
         self.cipher = Fernet(self.fernet_key)
+        self.previous_ciphers = [
+            Fernet(derive_fernet_key(key)) for key in previous_secret_keys if key != secret_key
+        ]
+        # Tries the current key first, then each retired key
+        self.multi_cipher = MultiFernet([self.cipher, *self.previous_ciphers])
 
     def encrypt(self, plaintext: str) -> str:
         """
@@ -83,12 +139,35 @@ class TokenEncryption:
         if not encrypted_text:
             return ""
 
-        # Decrypt the encrypted text
-        decrypted_bytes = self.cipher.decrypt(encrypted_text.encode())
+        # Decrypt the encrypted text (current key first, then retired keys)
+        decrypted_bytes = self.multi_cipher.decrypt(encrypted_text.encode())
 
         # Return as string
         return decrypted_bytes.decode()
 
+    def decrypt_and_rotate(self, encrypted_text: str) -> Tuple[str, Optional[str]]:
+        """
+        Decrypt a string and re-encrypt it if it was written with a retired key.
+
+        Args:
+            encrypted_text: The encrypted string from database
+
+        Returns:
+            (plaintext, rotated) where rotated is the value re-encrypted with the
+            current key, or None when the stored value is already current
+        """
+        if not encrypted_text:
+            return "", None
+
+        try:
+            return self.cipher.decrypt(encrypted_text.encode()).decode(), None
+        except InvalidToken:
+            if not self.previous_ciphers:
+                raise
+
+        plaintext = self.multi_cipher.decrypt(encrypted_text.encode()).decode()
+        return plaintext, self.encrypt(plaintext)
+
 
 # Global instance for use throughout the application
 token_encryptor = TokenEncryption()
@@ -112,3 +191,16 @@ def decrypt_token(encrypted_text: str) -> str:
         plaintext = decrypt_token(encrypted_from_db)
     """
     return token_encryptor.decrypt(encrypted_text)
+
+
+def decrypt_token_with_rotation(encrypted_text: str) -> Tuple[str, Optional[str]]:
+    """
+    Convenience function to decrypt a token and get a re-encrypted value when
+    it was stored under a retired key.
+
+    Usage:
+        plaintext, rotated = decrypt_token_with_rotation(record.access_token_encrypted)
+        if rotated:
+            record.access_token_encrypted = rotated
+    """
+    return token_encryptor.decrypt_and_rotate(encrypted_text)
@@ -140,6 +140,8 @@ def ensure_document_storage_schema(engine):
             conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_documents_file_id ON documents (file_id)"))
             conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_referral_id ON documents (referral_id)"))
             conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_participant_id ON documents (participant_id)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_expiry_status ON documents (expiry_date, status)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_document_notifications_document_type ON document_notifications (document_id, notification_type)"))
 
             conn.execute(text("UPDATE documents SET file_id = CONCAT('doc_', id) WHERE file_id IS NULL"))
             conn.execute(text("UPDATE documents SET file_url = CONCAT('/api/v1/files/', filename) WHERE file_url IS NOT NULL AND filename IS NOT NULL"))
@@ -152,6 +154,20 @@ def ensure_document_storage_schema(engine):
     except Exception as exc:
         print(f'[warn] Document schema check failed: {exc}')
 
+def ensure_room_image_schema(engine):
+    """Ensure room_images has the content hash used to version rendition URLs."""
+    try:
+        inspector = inspect(engine)
+        if "room_images" not in inspector.get_table_names():
+            return
+
+        columns = {col["name"] for col in inspector.get_columns("room_images")}
+        if "sha256" not in columns:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE room_images ADD COLUMN sha256 VARCHAR(64)"))
+    except Exception as exc:
+        print(f'[warn] Room image schema check failed: {exc}')
+
 @app.on_event("startup")
 async def startup_event():
     print('[info] Starting up NDIS Management System API...')
@@ -175,6 +191,25 @@ async def startup_event():
             print(f'[info] Database already initialized with {len(existing_tables)} tables')
         
         ensure_document_storage_schema(engine)
+        ensure_room_image_schema(engine)
+
+        from app.services.invoice_summary_service import ensure_invoice_summary_schema
+        ensure_invoice_summary_schema(engine)
+
+        from app.services.blob_store import ensure_blob_store_schema
+        ensure_blob_store_schema(engine)
+
+        from app.services.document_search import ensure_document_search_schema
+        ensure_document_search_schema(engine)
+
+        from app.services.participant_context_service import ensure_participant_context_schema
+        ensure_participant_context_schema(engine)
+
+        from app.services.ai.draft_batch import ensure_draft_job_schema
+        ensure_draft_job_schema(engine)
+
+        from app.services.ai_suggestion_service import ensure_ai_suggestion_schema
+        ensure_ai_suggestion_schema(engine)
         
         from app.core.database import SessionLocal
         from app.services.seed_dynamic_data import run as run_seeds
@@ -207,6 +242,21 @@ async def startup_event():
     print(f'[info] AI service configured: {ai_configured}')
     
     if ai_configured:
+        # Authenticate the shared watsonx client before the first AI request
+        from app.services.ai.llm_registry import start_warm_up
+        start_warm_up()
+        # Pick up batch draft jobs interrupted by the last shutdown
+        from app.core.database import SessionLocal
+        from app.services.ai.draft_batch import resume_unfinished_jobs
+        db = SessionLocal()
+        try:
+            resumed = resume_unfinished_jobs(db)
+            if resumed:
+                print(f'[info] Resumed AI draft jobs: {resumed}')
+        except Exception as e:
+            print(f'[warn] Could not resume AI draft jobs: {e}')
+        finally:
+            db.close()
         print('[info] AI Features:')
         print('  - Document ingestion and chunking')
         print('  - Care plan draft generation')
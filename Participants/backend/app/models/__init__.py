@@ -8,7 +8,10 @@ from .participant import Participant
 from .care_plan import CarePlan, RiskAssessment, ProspectiveWorkflow
 
 from .quotation import Quotation, QuotationItem
+from .xero_sync import XeroSyncState, XeroContactLink
+from .invoice_summary import InvoiceSummary
 
+from .stored_blob import StoredBlob
 from .document import Document, DocumentAccess, DocumentNotification, DocumentCategory
 from .document_generation import DocumentGenerationTemplate, GeneratedDocument, DocumentGenerationVariable, DocumentSignature
 from .document_workflow import DocumentWorkflow, DocumentVersion, DocumentApproval
@@ -26,6 +29,9 @@ from .roster import (
 
 from .support_worker_assignment import SupportWorkerAssignment
 from .ai_suggestion import AISuggestion
+from .ai_suggestion_daily import AISuggestionDaily
+from .participant_context_snapshot import ParticipantContextSnapshot
+from .ai_draft_job import AIDraftJob, AIDraftJobItem
 
 __all__ = [
     "DynamicData",
@@ -42,6 +48,10 @@ __all__ = [
     "ProspectiveWorkflow",
     "Quotation",
     "QuotationItem",
+    "XeroSyncState",
+    "XeroContactLink",
+    "InvoiceSummary",
+    "StoredBlob",
     "Document",
     "DocumentAccess",
     "DocumentNotification",
@@ -63,5 +73,9 @@ __all__ = [
     "RosterStatus",
     "SupportWorkerAssignment",
     "AISuggestion",
+    "AISuggestionDaily",
+    "ParticipantContextSnapshot",
+    "AIDraftJob",
+    "AIDraftJobItem",
 ]
 from app.models.care_plan_version import CarePlanVersion
@@ -0,0 +1,62 @@
+# backend/app/models/ai_draft_job.py
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Index
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from datetime import datetime
+
+
+class AIDraftJob(Base):
+    """
+    A batch of AI drafts (care plan or risk) for many participants.
+
+    Each participant is an AIDraftJobItem; progress lives on the items, so a
+    job interrupted by a restart or cancelled part-way can be resumed (see
+    app/services/ai/draft_batch.py).
+    """
+    __tablename__ = "ai_draft_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    draft_type = Column(String(32), nullable=False)  # 'care_plan'|'risk'
+    status = Column(String(20), nullable=False, default="queued")  # queued|running|completed|cancelled
+    criteria = Column(JSON, nullable=True)  # how the participant set was chosen
+
+    total_items = Column(Integer, nullable=False, default=0)
+    completed_items = Column(Integer, nullable=False, default=0)
+    failed_items = Column(Integer, nullable=False, default=0)
+
+    created_by = Column(String(128))
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    items = relationship("AIDraftJobItem", back_populates="job", cascade="all, delete-orphan", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<AIDraftJob(id={self.id}, type={self.draft_type}, status={self.status}, {self.completed_items}/{self.total_items})>"
+
+
+class AIDraftJobItem(Base):
+    """One participant's draft within an AIDraftJob."""
+    __tablename__ = "ai_draft_job_items"
+    __table_args__ = (
+        Index("ix_ai_draft_job_items_job_status", "job_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("ai_draft_jobs.id", ondelete="CASCADE"), nullable=False)
+    participant_id = Column(Integer, ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")  # pending|running|done|failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_by = Column(String(64), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    suggestion_id = Column(Integer, nullable=True)  # ai_suggestions.id once saved
+    error = Column(Text, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    job = relationship("AIDraftJob", back_populates="items")
+
+    def __repr__(self):
+        return f"<AIDraftJobItem(job_id={self.job_id}, participant_id={self.participant_id}, status={self.status})>"
@@ -1,11 +1,17 @@
 # backend/app/models/ai_suggestion.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class AISuggestion(Base):
     __tablename__ = "ai_suggestions"
+    __table_args__ = (
+        # Participant history, newest first (keyset pagination on created_at, id)
+        Index("ix_ai_suggestions_subject_created", "subject_type", "subject_id", "created_at", "id"),
+        Index("ix_ai_suggestions_type_created", "suggestion_type", "created_at"),
+        Index("ix_ai_suggestions_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     subject_type = Column(String(32), nullable=False, default="participant")
@@ -0,0 +1,32 @@
+# backend/app/models/ai_suggestion_daily.py
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, UniqueConstraint
+from app.core.database import Base
+from datetime import datetime
+
+
+class AISuggestionDaily(Base):
+    """
+    AI suggestion counts, one row per (day, suggestion type, provider).
+
+    Maintained in the same transaction as every write to ai_suggestions
+    (see app/services/ai_suggestion_service.py) and checked against that
+    table by the reconciliation task.
+    """
+    __tablename__ = "ai_suggestion_daily"
+    __table_args__ = (
+        UniqueConstraint("day", "suggestion_type", "provider", name="uq_ai_suggestion_daily_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    suggestion_type = Column(String(32), nullable=False)
+    provider = Column(String(32), nullable=False, default="")  # "" when unknown
+
+    suggestion_count = Column(Integer, nullable=False, default=0)
+    applied_count = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    def __repr__(self):
+        return f"<AISuggestionDaily(day={self.day}, type='{self.suggestion_type}', count={self.suggestion_count})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.ext.mutable import MutableDict, MutableList
@@ -26,6 +26,7 @@ class Document(Base):
     # Storage configuration - NEW FIELDS ADDED HERE
     storage_provider = Column(String(50), nullable=True, default="local")  # 'local' or 'ibm-cos'
     storage_key = Column(String(512), nullable=True)  # COS object key if using IBM COS
+    blob_id = Column(Integer, ForeignKey("stored_blobs.id"), nullable=True, index=True)  # deduplicated content, see StoredBlob
 
     description = Column(Text, nullable=True)
     document_type = Column(String(100), nullable=True)
@@ -138,3 +139,8 @@ class DocumentNotification(Base):
 
     def __repr__(self) -> str:
         return f"<DocumentNotification(id={self.id}, document_id={self.document_id}, type={self.notification_type})>"
+
+
+# Indexes for the set-based notification sweep
+Index('ix_documents_expiry_status', Document.expiry_date, Document.status)
+Index('ix_document_notifications_document_type', DocumentNotification.document_id, DocumentNotification.notification_type)
@@ -56,6 +56,7 @@ class DocumentVersion(Base):
     changes_summary = Column(Text)
     change_metadata = Column(JSON, default=dict)  # Detailed change information
     file_hash = Column(String(64))  # SHA-256 hash for integrity checking
+    blob_id = Column(Integer, ForeignKey("stored_blobs.id"), nullable=True, index=True)  # shared with identical files
     is_metadata_only = Column(Boolean, default=False)  # Flag for metadata-only changes
     
     # Version relationships
@@ -1,5 +1,5 @@
 # backend/app/models/invoice.py
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Numeric, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Numeric, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -91,3 +91,7 @@ class InvoiceItem(Base):
 
     # Relationship
     invoice = relationship("Invoice", back_populates="items")
+
+# Invoice list: newest first, optionally filtered by status
+Index('ix_invoices_status_created_at', Invoice.status, Invoice.created_at)
+Index('ix_invoices_created_at', Invoice.created_at)
@@ -0,0 +1,34 @@
+# backend/app/models/invoice_summary.py
+
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, UniqueConstraint
+from app.core.database import Base
+from datetime import datetime
+
+
+class InvoiceSummary(Base):
+    """
+    Running invoice totals, one row per (status, issue month, payment month).
+
+    Maintained in the same transaction as every ORM write to invoices
+    (see app/services/invoice_summary_service.py) and checked against the
+    invoices table by the reconciliation task.
+    """
+    __tablename__ = "invoice_summary"
+    __table_args__ = (
+        UniqueConstraint("status", "issue_month", "payment_month", name="uq_invoice_summary_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(20), nullable=False)
+    issue_month = Column(String(7), nullable=False)  # YYYY-MM
+    payment_month = Column(String(7), nullable=False, default="")  # YYYY-MM, "" when unpaid
+
+    invoice_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    amount_paid = Column(Numeric(14, 2), nullable=False, default=0)
+    amount_outstanding = Column(Numeric(14, 2), nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    def __repr__(self):
+        return f"<InvoiceSummary(status='{self.status}', issue_month='{self.issue_month}', count={self.invoice_count})>"
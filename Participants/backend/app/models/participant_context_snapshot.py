@@ -0,0 +1,24 @@
+# backend/app/models/participant_context_snapshot.py
+
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey, JSON
+from app.core.database import Base
+from datetime import datetime
+
+
+class ParticipantContextSnapshot(Base):
+    """
+    Compact summary of a participant used to prepare AI prompts.
+
+    Marked stale in the same transaction as any ORM write to the participant
+    and rebuilt on the next read (see app/services/participant_context_service.py).
+    """
+    __tablename__ = "participant_context_snapshots"
+
+    participant_id = Column(Integer, ForeignKey("participants.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    snapshot = Column(JSON, nullable=False)
+    stale = Column(Boolean, nullable=False, default=False)
+    built_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    def __repr__(self):
+        return f"<ParticipantContextSnapshot(participant_id={self.participant_id}, version={self.version}, stale={self.stale})>"
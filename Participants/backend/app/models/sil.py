@@ -185,10 +185,20 @@ class RoomImage(Base, TimestampMixin):
     object_key = Column(String, nullable=False)
     content_type = Column(String)
     file_size = Column(Integer)
+    sha256 = Column(String(64))
     url = Column(Text)
 
     room = relationship("Room", back_populates="images")
 
+    @property
+    def thumbnail_url(self):
+        """Small cached rendition for list views (see rendition_service)."""
+        from app.services.rendition_service import rendition_url
+
+        if not self.id or not (self.content_type or "").startswith("image/"):
+            return None
+        return rendition_url(f"/api/v1/sil/rooms/{self.room_id}/images/{self.id}/renditions/thumb", self.sha256)
+
 
 class Occupancy(Base, TimestampMixin):
     __tablename__ = "occupancies"
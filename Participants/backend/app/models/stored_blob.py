@@ -0,0 +1,35 @@
+# backend/app/models/stored_blob.py
+
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StoredBlob(Base):
+    """
+    One stored copy of a file's bytes, keyed by SHA-256.
+
+    Documents and document versions point at a blob through blob_id, so the
+    same PDF attached to many participants, or unchanged across versions,
+    is stored once. ref_count is the number of documents and versions using
+    the blob; unreferenced blobs are removed by the blob store task (see
+    app/services/blob_store.py).
+    """
+    __tablename__ = "stored_blobs"
+    __table_args__ = (
+        UniqueConstraint("sha256", "storage_provider", name="uq_stored_blobs_sha256_provider"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    storage_provider = Column(String(50), nullable=False, default="local")  # 'local' or 'ibm-cos'
+    storage_key = Column(String(512), nullable=False)
+    file_size = Column(Integer, nullable=False, default=0)
+    mime_type = Column(String(150), nullable=True)
+
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_referenced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<StoredBlob(sha256='{self.sha256[:12]}', provider='{self.storage_provider}', refs={self.ref_count})>"
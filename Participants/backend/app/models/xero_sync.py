@@ -0,0 +1,48 @@
+# backend/app/models/xero_sync.py
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, UniqueConstraint
+from app.core.database import Base
+from datetime import datetime
+
+
+class XeroSyncState(Base):
+    """
+    Per-entity sync watermark for the Xero sync engine.
+
+    Only records changed after last_synced_at are pushed on the next run.
+    """
+    __tablename__ = "xero_sync_state"
+    __table_args__ = (UniqueConstraint("organization_id", "entity_type", name="uq_xero_sync_state_org_entity"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, nullable=True, index=True)
+    entity_type = Column(String(50), nullable=False)  # contact, invoice
+
+    last_synced_at = Column(DateTime, nullable=True)  # Watermark: start time of the last clean run
+    last_run_at = Column(DateTime, nullable=True)
+    last_status = Column(String(20), nullable=True)  # success, partial, error
+    last_error = Column(Text, nullable=True)
+    items_synced = Column(Integer, nullable=False, default=0)
+    items_failed = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=True)
+
+    def __repr__(self):
+        return f"<XeroSyncState(entity_type='{self.entity_type}', last_synced_at={self.last_synced_at})>"
+
+
+class XeroContactLink(Base):
+    """
+    Maps a participant to the Xero contact created for them, so later
+    pushes update the same contact instead of creating duplicates.
+    """
+    __tablename__ = "xero_contact_links"
+
+    id = Column(Integer, primary_key=True, index=True)
+    participant_id = Column(Integer, ForeignKey("participants.id"), nullable=False, unique=True, index=True)
+    xero_contact_id = Column(String(100), nullable=False)
+    synced_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<XeroContactLink(participant_id={self.participant_id}, xero_contact_id='{self.xero_contact_id}')>"
@@ -59,6 +59,7 @@ class AttachmentResponse(BaseModel):
     file_name: str = Field(alias="fileName")
     object_key: str = Field(alias="objectKey")
     url: Optional[str] = None
+    thumbnail_url: Optional[str] = Field(default=None, alias="thumbnailUrl")
     content_type: Optional[str] = Field(default=None, alias="contentType")
     file_size: Optional[int] = Field(default=None, alias="fileSize")
     created_at: Optional[datetime] = Field(default=None, alias="createdAt")
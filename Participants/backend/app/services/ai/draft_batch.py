@@ -0,0 +1,397 @@
+# backend/app/services/ai/draft_batch.py
+"""
+Batch AI drafts (care plan or risk assessment) for many participants.
+
+A job holds one item per participant. A runner claims items in batches of
+AI_DRAFT_BATCH_SIZE and drafts them on a shared worker pool of
+AI_DRAFT_WORKERS threads: context snapshot, prompt, then the model call
+through the generation cache and LLM gateway, so batch work never takes
+more than its share of model slots from interactive requests. Each batch's
+suggestions are bulk inserted with the item and job progress in one
+transaction.
+
+Progress lives on the items, so a cancelled job, or one interrupted by a
+restart, resumes where it stopped. Items held by a runner that died are
+reclaimed after AI_DRAFT_CLAIM_TIMEOUT_SECONDS; an item that fails
+AI_DRAFT_MAX_ATTEMPTS times is marked failed. Drafts use the same prompts
+and payloads as the participant AI endpoints.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import and_, func, insert, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.ai_draft_job import AIDraftJob, AIDraftJobItem
+from app.models.participant import Participant, ParticipantStatus
+from app.schemas.ai import AISuggestionCreate
+from app.services.ai.generation_cache import cached_generate
+from app.services.ai.llm_gateway import LLMSaturatedError
+from app.services.ai.llm_registry import get_llm
+from app.services.ai_suggestion_service import save_suggestions
+from app.services.participant_context_service import get_participant_snapshot
+
+logger = logging.getLogger(__name__)
+
+# suggestion_type, payload key and prompt for each draft, as the endpoints save them
+DRAFT_TYPES = {
+    "care_plan": {
+        "suggestion_type": "care_plan",
+        "payload_key": "markdown",
+        "prompt": lambda ai, snapshot: ai.care_plan_prompt(snapshot["profile"]),
+    },
+    "risk": {
+        "suggestion_type": "risk",
+        "payload_key": "summary",
+        "prompt": lambda ai, snapshot: ai.risk_prompt(snapshot["risk_notes"]),
+    },
+}
+
+UNFINISHED = ("queued", "running")
+
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.AI_DRAFT_WORKERS), thread_name_prefix="ai-draft")
+_active: Set[int] = set()
+_active_lock = threading.Lock()
+
+
+# ==========================================
+# JOBS
+# ==========================================
+
+def create_draft_job(
+    db: Session,
+    draft_type: str,
+    participant_ids: Optional[List[int]] = None,
+    participant_status: Optional[str] = None,
+    created_by: Optional[str] = None,
+) -> AIDraftJob:
+    """Queue a draft for each selected participant (by id, status, or both)."""
+    if draft_type not in DRAFT_TYPES:
+        raise ValueError(f"Unknown draft type '{draft_type}'. Use one of: {', '.join(DRAFT_TYPES)}")
+    if participant_ids is None and not participant_status:
+        raise ValueError("Select participants by participant_ids or participant_status")
+
+    query = select(Participant.id)
+    if participant_ids is not None:
+        query = query.where(Participant.id.in_(set(participant_ids)))
+    if participant_status:
+        try:
+            query = query.where(Participant.status == ParticipantStatus(participant_status))
+        except ValueError:
+            raise ValueError(f"Unknown participant status '{participant_status}'")
+    ids = sorted(db.scalars(query))
+    if not ids:
+        raise ValueError("No participants match the selection")
+
+    job = AIDraftJob(
+        draft_type=draft_type,
+        status="queued",
+        criteria={"participant_ids": participant_ids, "participant_status": participant_status},
+        total_items=len(ids),
+        created_by=created_by or "api",
+    )
+    db.add(job)
+    db.flush()
+    db.execute(insert(AIDraftJobItem), [
+        {"job_id": job.id, "participant_id": participant_id, "status": "pending", "attempts": 0}
+        for participant_id in ids
+    ])
+    db.commit()
+    db.refresh(job)
+    logger.info(f"Queued {draft_type} draft job {job.id} for {len(ids)} participants")
+    return job
+
+
+def draft_job_progress(db: Session, job: AIDraftJob) -> Dict[str, Any]:
+    counts = dict(db.execute(
+        select(AIDraftJobItem.status, func.count())
+        .where(AIDraftJobItem.job_id == job.id)
+        .group_by(AIDraftJobItem.status)
+    ).all())
+    finished = counts.get("done", 0) + counts.get("failed", 0)
+    return {
+        "job_id": job.id,
+        "draft_type": job.draft_type,
+        "status": job.status,
+        "criteria": job.criteria,
+        "total": job.total_items,
+        "pending": counts.get("pending", 0),
+        "running": counts.get("running", 0),
+        "completed": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "percent": round(finished * 100 / job.total_items, 1) if job.total_items else 100.0,
+        "created_by": job.created_by,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def draft_job_failures(db: Session, job_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        select(AIDraftJobItem.participant_id, AIDraftJobItem.attempts, AIDraftJobItem.error)
+        .where(AIDraftJobItem.job_id == job_id, AIDraftJobItem.status == "failed")
+        .order_by(AIDraftJobItem.id)
+        .limit(limit)
+    ).all()
+    return [{"participant_id": r.participant_id, "attempts": r.attempts, "error": r.error} for r in rows]
+
+
+def cancel_draft_job(db: Session, job_id: int) -> bool:
+    """Stop a job after its current batch; resume_draft_job continues it."""
+    result = db.execute(
+        update(AIDraftJob)
+        .where(AIDraftJob.id == job_id, AIDraftJob.status.in_(UNFINISHED))
+        .values(status="cancelled", finished_at=datetime.now())
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def resume_draft_job(db: Session, job_id: int, retry_failed: bool = False) -> bool:
+    """Requeue a cancelled, interrupted or finished job; optionally retry its failed items."""
+    job = db.get(AIDraftJob, job_id)
+    if job is None:
+        return False
+    if retry_failed:
+        db.execute(
+            update(AIDraftJobItem)
+            .where(AIDraftJobItem.job_id == job_id, AIDraftJobItem.status == "failed")
+            .values(status="pending", attempts=0, error=None, finished_at=None)
+        )
+    db.execute(update(AIDraftJob).where(AIDraftJob.id == job_id).values(status="queued", finished_at=None))
+    _refresh_counts(db, job_id)
+    db.commit()
+    start_draft_job(job_id)
+    return True
+
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+def _claimable(job_id: int, now: datetime):
+    cutoff = now - timedelta(seconds=settings.AI_DRAFT_CLAIM_TIMEOUT_SECONDS)
+    return and_(
+        AIDraftJobItem.job_id == job_id,
+        AIDraftJobItem.attempts < settings.AI_DRAFT_MAX_ATTEMPTS,
+        or_(
+            AIDraftJobItem.status == "pending",
+            and_(AIDraftJobItem.status == "running", AIDraftJobItem.claimed_at < cutoff),
+        ),
+    )
+
+
+def _claim(db: Session, job_id: int, runner_id: str, limit: int):
+    """Claim up to ``limit`` items; the WHERE is re-checked so two runners never share one."""
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=settings.AI_DRAFT_CLAIM_TIMEOUT_SECONDS)
+
+    # Items abandoned by a dead runner with no attempts left
+    db.execute(
+        update(AIDraftJobItem)
+        .where(
+            AIDraftJobItem.job_id == job_id,
+            AIDraftJobItem.status == "running",
+            AIDraftJobItem.claimed_at < cutoff,
+            AIDraftJobItem.attempts >= settings.AI_DRAFT_MAX_ATTEMPTS,
+        )
+        .values(status="failed", error="Draft did not finish", finished_at=now)
+    )
+
+    ids = db.scalars(
+        select(AIDraftJobItem.id).where(_claimable(job_id, now)).order_by(AIDraftJobItem.id).limit(limit)
+    ).all()
+    if ids:
+        db.execute(
+            update(AIDraftJobItem)
+            .where(AIDraftJobItem.id.in_(ids), _claimable(job_id, now))
+            .values(status="running", claimed_by=runner_id, claimed_at=now, attempts=AIDraftJobItem.attempts + 1)
+        )
+    db.commit()
+    if not ids:
+        return []
+    return db.execute(
+        select(AIDraftJobItem.id, AIDraftJobItem.participant_id, AIDraftJobItem.attempts)
+        .where(AIDraftJobItem.id.in_(ids), AIDraftJobItem.claimed_by == runner_id,
+               AIDraftJobItem.status == "running")
+        .order_by(AIDraftJobItem.id)
+    ).all()
+
+
+def _draft(draft_type: str, participant_id: int, created_by: str) -> AISuggestionCreate:
+    """Context, prompt and model call for one participant (runs on the worker pool)."""
+    spec = DRAFT_TYPES[draft_type]
+    db = SessionLocal()
+    try:
+        snapshot = get_participant_snapshot(db, participant_id)
+        db.commit()
+    finally:
+        db.close()
+    if snapshot is None:
+        raise LookupError("Participant not found")
+
+    ai = get_llm()
+    content = cached_generate(ai, spec["prompt"](ai, snapshot), participant_id)
+    if not content or len(content.strip()) < 10:
+        raise ValueError("AI service returned an insufficient response")
+
+    return AISuggestionCreate(
+        subject_id=participant_id,
+        suggestion_type=spec["suggestion_type"],
+        payload={spec["payload_key"]: content},
+        raw_text=content,
+        provider="watsonx",
+        model=ai.cfg.model_id,
+        confidence="medium",
+        created_by=created_by,
+    )
+
+
+def _refresh_counts(db: Session, job_id: int) -> None:
+    done = select(func.count()).where(AIDraftJobItem.job_id == job_id, AIDraftJobItem.status == "done")
+    failed = select(func.count()).where(AIDraftJobItem.job_id == job_id, AIDraftJobItem.status == "failed")
+    db.execute(
+        update(AIDraftJob)
+        .where(AIDraftJob.id == job_id)
+        .values(completed_items=done.scalar_subquery(), failed_items=failed.scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _record(db: Session, job_id: int, saved, failed, requeued) -> None:
+    """Save a batch's suggestions and progress in one transaction."""
+    now = datetime.now()
+    rows = []
+    if saved:
+        suggestion_ids = save_suggestions(db, [suggestion for _, suggestion in saved], commit=False)
+        rows += [
+            {"id": item.id, "status": "done", "suggestion_id": suggestion_id, "error": None, "finished_at": now}
+            for (item, _), suggestion_id in zip(saved, suggestion_ids)
+        ]
+    for item, error in failed:
+        exhausted = item.attempts >= settings.AI_DRAFT_MAX_ATTEMPTS
+        rows.append({
+            "id": item.id,
+            "status": "failed" if exhausted else "pending",
+            "error": error[:1000],
+            "finished_at": now if exhausted else None,
+        })
+    # Shed by the gateway: not the item's fault, so the attempt doesn't count
+    rows += [{"id": item.id, "status": "pending", "attempts": item.attempts - 1} for item in requeued]
+    if rows:
+        db.execute(update(AIDraftJobItem), rows)
+    _refresh_counts(db, job_id)
+    db.commit()
+
+
+def run_draft_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """Work through a job's pending items; returns its progress when this runner stops."""
+    runner_id = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        job = db.get(AIDraftJob, job_id)
+        if job is None or job.status not in UNFINISHED:
+            return None
+        job.status = "running"
+        job.started_at = job.started_at or datetime.now()
+        db.commit()
+        logger.info(f"Running {job.draft_type} draft job {job_id}")
+
+        while True:
+            db.refresh(job)
+            if job.status == "cancelled":
+                logger.info(f"Draft job {job_id} cancelled")
+                break
+            claimed = _claim(db, job_id, runner_id, max(1, settings.AI_DRAFT_BATCH_SIZE))
+            if not claimed:
+                break
+
+            futures = [(item, _executor.submit(_draft, job.draft_type, item.participant_id, job.created_by))
+                       for item in claimed]
+            saved, failed, requeued, retry_after = [], [], [], 0
+            for item, future in futures:
+                try:
+                    saved.append((item, future.result()))
+                except LLMSaturatedError as e:
+                    requeued.append(item)
+                    retry_after = max(retry_after, e.retry_after)
+                except Exception as e:
+                    logger.warning(f"Draft for participant {item.participant_id} in job {job_id} failed: {e}")
+                    failed.append((item, str(e) or e.__class__.__name__))
+            _record(db, job_id, saved, failed, requeued)
+
+            if retry_after:
+                time.sleep(retry_after)
+
+        # Done once nothing is left to claim or held by another runner
+        remaining = db.scalar(
+            select(func.count()).where(AIDraftJobItem.job_id == job_id, AIDraftJobItem.status.in_(("pending", "running")))
+        )
+        if not remaining:
+            db.execute(
+                update(AIDraftJob)
+                .where(AIDraftJob.id == job_id, AIDraftJob.status == "running")
+                .values(status="completed", finished_at=datetime.now())
+            )
+            db.commit()
+        db.refresh(job)
+        progress = draft_job_progress(db, job)
+        logger.info(f"Draft job {job_id} {job.status}: {progress['completed']} drafted, {progress['failed']} failed")
+        return progress
+    except Exception as e:
+        logger.error(f"Draft job {job_id} stopped: {e}", exc_info=True)
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def start_draft_job(job_id: int) -> bool:
+    """Run a job on a background thread unless this process is already running it."""
+    with _active_lock:
+        if job_id in _active:
+            return False
+        _active.add(job_id)
+
+    def run():
+        try:
+            run_draft_job(job_id)
+        finally:
+            with _active_lock:
+                _active.discard(job_id)
+
+    threading.Thread(target=run, name=f"ai-draft-job-{job_id}", daemon=True).start()
+    return True
+
+
+def resume_unfinished_jobs(db: Session, wait: bool = False) -> List[int]:
+    """Restart queued or interrupted jobs; with wait=True run them here, one after another."""
+    job_ids = db.scalars(
+        select(AIDraftJob.id).where(AIDraftJob.status.in_(UNFINISHED)).order_by(AIDraftJob.id)
+    ).all()
+    for job_id in job_ids:
+        if wait:
+            run_draft_job(job_id)
+        else:
+            start_draft_job(job_id)
+    return list(job_ids)
+
+
+def ensure_draft_job_schema(engine) -> None:
+    """Create ai_draft_jobs and ai_draft_job_items on existing databases."""
+    try:
+        if "participants" not in inspect(engine).get_table_names():
+            return
+        AIDraftJob.__table__.create(bind=engine, checkfirst=True)
+        AIDraftJobItem.__table__.create(bind=engine, checkfirst=True)
+    except Exception as exc:
+        print(f'[warn] AI draft job schema check failed: {exc}')
@@ -0,0 +1,201 @@
+# backend/app/services/ai/generation_cache.py
+"""
+Cache of deterministic AI generations.
+
+With greedy decoding the same prompt always produces the same text, so a
+completion is cached under (model, generation params, prompt hash,
+participant, participant data version) and re-opening a participant page
+costs no model call. Sampled configurations are never cached.
+
+Entries live in a bounded LRU with a TTL. Any committed change to the
+participant, their documents or chunks, care plans or risk assessments
+bumps that participant's data version, which drops their entries; the
+prompt hash already covers changes that reach the prompt text, the version
+covers everything else a participant page depends on.
+
+Cache misses go through the LLM gateway, which also coalesces identical
+generations that are in flight at the same time.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.participant_context_service import changed_participant_ids
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[Any, ...]
+
+
+class GenerationCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._versions: Dict[Optional[int], int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def key(self, ai, prompt: str, participant_id: Optional[int]) -> Optional[CacheKey]:
+        """Cache key for a generation, or None if its output isn't deterministic."""
+        cfg = ai.cfg
+        if not self.enabled or cfg.decoding_method != "greedy":
+            return None
+        with self._lock:
+            version = self._versions.get(participant_id, 0)
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return (cfg.model_id, cfg.decoding_method, cfg.max_new_tokens, cfg.temperature,
+                prompt_hash, participant_id, version)
+
+    def get(self, key: Optional[CacheKey]) -> Optional[str]:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Optional[CacheKey], content: str) -> None:
+        if key is None or not content:
+            return
+        with self._lock:
+            if self._versions.get(key[5], 0) != key[6]:
+                return  # participant changed while this was generating
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, content)
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_participant(self, participant_id: Optional[int]) -> None:
+        with self._lock:
+            self._versions[participant_id] = self._versions.get(participant_id, 0) + 1
+            stale = [key for key in self._entries if key[5] == participant_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+generation_cache = GenerationCache(settings.AI_GENERATION_CACHE_SIZE, settings.AI_GENERATION_CACHE_SECONDS)
+
+
+def cached_generate(ai, prompt: str, participant_id: Optional[int] = None) -> str:
+    """ai._gen(prompt), answered from the cache when the same generation was seen."""
+    key = generation_cache.key(ai, prompt, participant_id)
+    content = generation_cache.get(key)
+    if content is None:
+        content = llm_gateway.generate(ai, prompt, key)
+        generation_cache.put(key, content)
+    return content
+
+
+class _CachingStream:
+    """Pass pieces through and cache the completion once streamed to the end."""
+
+    def __init__(self, pieces: Iterator[str], key: Optional[CacheKey]):
+        self._pieces = pieces
+        self._key = key
+        self._parts = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            piece = next(self._pieces)
+        except StopIteration:
+            generation_cache.put(self._key, "".join(self._parts))
+            raise
+        self._parts.append(piece)
+        return piece
+
+    def close(self) -> None:
+        self._pieces.close()
+
+
+def cached_stream(ai, prompt: str, participant_id: Optional[int] = None) -> Iterator[str]:
+    """
+    ai._stream(prompt); a cached completion is returned as one piece.
+
+    On a miss the gateway slot is taken now, so LLMSaturatedError is raised
+    to the caller before any response has started.
+    """
+    key = generation_cache.key(ai, prompt, participant_id)
+    content = generation_cache.get(key)
+    if content is not None:
+        return iter([content])
+    return _CachingStream(llm_gateway.stream(ai, prompt), key)
+
+
+def invalidate_participant_generations(participant_id: Optional[int]) -> None:
+    generation_cache.invalidate_participant(participant_id)
+
+
+# Participants flushed in the open transaction; invalidated once it commits.
+# Bumping the version at flush time would let a request that still reads the
+# old rows store its output under the new version.
+_PENDING_KEY = "generation_cache_participants"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_participants(session: Session, flush_context) -> None:
+    participant_ids = changed_participant_ids(session)
+    if participant_ids:
+        session.info.setdefault(_PENDING_KEY, set()).update(participant_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_participants(session: Session) -> None:
+    for participant_id in session.info.pop(_PENDING_KEY, ()):
+        generation_cache.invalidate_participant(participant_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_participants(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,288 @@
+# backend/app/services/ai/llm_gateway.py
+"""
+Gateway in front of the LLM provider.
+
+- Single-flight: identical deterministic generations that are already in
+  flight are not sent again; later callers wait for the first one's result.
+- Concurrency limit: at most AI_MAX_CONCURRENCY model calls run at once.
+  Further calls wait in a FIFO queue (served strictly in arrival order) of
+  at most AI_MAX_QUEUE callers for up to AI_QUEUE_TIMEOUT_SECONDS. Callers
+  waiting on a coalesced call count against the same limit and give up
+  after AI_QUEUE_TIMEOUT_SECONDS + AI_GENERATION_TIMEOUT_SECONDS.
+- Load shedding: a full queue or a timed-out wait raises LLMSaturatedError
+  carrying a Retry-After estimate; endpoints answer 429.
+
+The AI endpoints are sync and run on the threadpool, so the gateway is
+thread-based. Every blocked caller holds a threadpool thread (40 by
+default), so concurrency + queue must stay well below that or a saturated
+gateway stalls every other sync endpoint. Callers give their DB connection
+back before entering the gateway, so waiting and generating callers do not
+count against the DB pool (5 + 10 overflow). Queue depth, in-flight calls and latency histograms (queue
+wait and generation) are reported by stats() under /ai/status.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LLMSaturatedError(Exception):
+    """The gateway is at capacity; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"AI service busy ({reason}), retry in {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Cumulative, as Prometheus exposes histograms
+        cumulative, running = {}, 0
+        for bound, n in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += n
+            cumulative[bound] = running
+        return {"buckets": cumulative, "count": self.count, "sum": round(self.total, 3)}
+
+
+class _Slot:
+    """One concurrency slot; releasing twice is a no-op."""
+
+    def __init__(self, gateway: "LLMGateway"):
+        self._gateway = gateway
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._gateway._release()
+
+
+class _SlotStream:
+    """A streamed generation that holds its slot until exhausted or closed."""
+
+    def __init__(self, gateway: "LLMGateway", slot: _Slot, pieces: Iterator[str]):
+        self._gateway = gateway
+        self._slot = slot
+        self._pieces = pieces
+        self._started = time.monotonic()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._pieces)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._slot._released:
+            return
+        close = getattr(self._pieces, "close", None)
+        if close:
+            close()
+        self._gateway._observe_generation(time.monotonic() - self._started)
+        self._slot.release()
+
+    def __del__(self):
+        self.close()
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float,
+                 generation_timeout: float = 120.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.generation_timeout = generation_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting: deque = deque()
+        self._followers = 0  # callers waiting on a coalesced call
+        self._inflight: Dict[Hashable, Future] = {}
+        self._queue_wait = Histogram()
+        self._generation = Histogram()
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.failures = 0
+        self.max_queue_depth = 0
+
+    # ---- concurrency ----
+
+    def _queued(self) -> int:
+        return len(self._waiting) + self._followers
+
+    def _retry_after(self, queued: int) -> int:
+        per_call = self._generation.mean or 5.0
+        return max(1, math.ceil(per_call * (queued + 1) / self.max_concurrency))
+
+    def acquire(self) -> _Slot:
+        """Wait (FIFO) for a slot; raises LLMSaturatedError when shedding load."""
+        started = time.monotonic()
+        with self._cond:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                self.calls += 1
+                self._queue_wait.observe(0.0)
+                return _Slot(self)
+            if self._queued() >= self.max_queue:
+                self.rejected += 1
+                raise LLMSaturatedError(self._retry_after(self._queued()), "queue full")
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self.max_queue_depth = max(self.max_queue_depth, self._queued())
+            deadline = started + self.queue_timeout
+            while not (self._waiting[0] is ticket and self._active < self.max_concurrency):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    self.rejected += 1
+                    raise LLMSaturatedError(self._retry_after(len(self._waiting)), "queue timeout")
+                self._cond.wait(remaining)
+            self._waiting.popleft()
+            self._active += 1
+            self.calls += 1
+            self._queue_wait.observe(time.monotonic() - started)
+            # The next in line may also fit
+            self._cond.notify_all()
+            return _Slot(self)
+
+    def _release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _observe_generation(self, seconds: float) -> None:
+        with self._cond:
+            self._generation.observe(seconds)
+
+    # ---- calls ----
+
+    def _call(self, ai, prompt: str) -> str:
+        slot = self.acquire()
+        started = time.monotonic()
+        try:
+            return ai._gen(prompt)
+        except Exception:
+            with self._cond:
+                self.failures += 1
+            raise
+        finally:
+            self._observe_generation(time.monotonic() - started)
+            slot.release()
+
+    def generate(self, ai, prompt: str, key: Optional[Hashable] = None) -> str:
+        """
+        ai._gen(prompt) under the concurrency limit.
+
+        Calls with the same non-None ``key`` that overlap share one model
+        call; pass a key only when the output is deterministic.
+        """
+        if key is None:
+            return self._call(ai, prompt)
+
+        with self._cond:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                if self._queued() >= self.max_queue:
+                    self.rejected += 1
+                    raise LLMSaturatedError(self._retry_after(self._queued()), "queue full")
+                self.coalesced += 1
+                self._followers += 1
+                self.max_queue_depth = max(self.max_queue_depth, self._queued())
+        if not leader:
+            try:
+                return future.result(timeout=self.queue_timeout + self.generation_timeout)
+            except FutureTimeoutError:
+                with self._cond:
+                    self.rejected += 1
+                    retry_after = self._retry_after(self._queued())
+                raise LLMSaturatedError(retry_after, "coalesced wait timeout")
+            finally:
+                with self._cond:
+                    self._followers -= 1
+
+        try:
+            result = self._call(ai, prompt)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    def stream(self, ai, prompt: str) -> Iterator[str]:
+        """
+        ai._stream(prompt) holding a slot until the stream ends or is closed.
+
+        The slot is taken here, before the first piece, so a saturated
+        gateway is reported before a response has started.
+        """
+        slot = self.acquire()
+        try:
+            return _SlotStream(self, slot, iter(ai._stream(prompt)))
+        except BaseException:
+            slot.release()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout_seconds": self.queue_timeout,
+                "in_flight": self._active,
+                "queue_depth": len(self._waiting),
+                "coalesced_waiting": self._followers,
+                "max_queue_depth": self.max_queue_depth,
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "failures": self.failures,
+                "queue_wait_seconds": self._queue_wait.snapshot(),
+                "generation_seconds": self._generation.snapshot(),
+            }
+
+
+llm_gateway = LLMGateway(
+    settings.AI_MAX_CONCURRENCY,
+    settings.AI_MAX_QUEUE,
+    settings.AI_QUEUE_TIMEOUT_SECONDS,
+    settings.AI_GENERATION_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,237 @@
+# backend/app/services/ai/llm_registry.py
+"""
+Process-wide registry of watsonx.ai LLM clients.
+
+Constructing a WatsonxLLM exchanges the API key for an IAM token and
+fetches model metadata, which often takes over a second. The registry
+builds one client per (model, generation params) on its own APIClient and
+hands the same instance to every request, so the HTTP session and token
+are reused. The default client is warmed up at startup; each client is
+rebuilt in the background before its IAM token (valid for an hour)
+expires, while requests keep using the current one. A client whose
+credentials are rejected is dropped and rebuilt on the next request.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rebuild clients this long after creation, well inside the token lifetime
+LLM_CLIENT_REFRESH_SECONDS = int(os.getenv("LLM_CLIENT_REFRESH_SECONDS", "2700"))
+# /ai/status runs a real generation at most this often
+LLM_PROBE_SECONDS = int(os.getenv("LLM_PROBE_SECONDS", "60"))
+
+ConfigKey = Tuple[Any, ...]
+
+
+class _Entry:
+    def __init__(self, llm, build_seconds: float):
+        self.llm = llm
+        self.build_seconds = build_seconds
+        self.created = time.monotonic()
+        self.created_at = datetime.now(timezone.utc)
+        self.refreshing = False
+        self.uses = 0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created
+
+
+_entries: Dict[ConfigKey, _Entry] = {}
+_errors: Dict[ConfigKey, str] = {}
+_lock = threading.Lock()
+_build_locks: Dict[ConfigKey, threading.Lock] = {}
+_probe: Dict[str, Any] = {}
+_probe_checked = [0.0]  # monotonic time of the last probe
+_probe_lock = threading.Lock()
+
+
+def use_fake() -> bool:
+    return os.getenv("AI_PROVIDER", "watsonx") == "fake"
+
+
+def is_configured() -> bool:
+    if use_fake():
+        return True
+    return bool(os.getenv("WATSONX_URL") and os.getenv("WATSONX_API_KEY") and os.getenv("WATSONX_PROJECT_ID"))
+
+
+def _config_key(cfg) -> ConfigKey:
+    return (cfg.url, cfg.project_id, cfg.model_id, cfg.decoding_method, cfg.max_new_tokens, cfg.temperature)
+
+
+def _default_config():
+    from ai.watsonx_provider import WXConfig
+    return WXConfig()
+
+
+def _build_lock(key: ConfigKey) -> threading.Lock:
+    with _lock:
+        lock = _build_locks.get(key)
+        if lock is None:
+            lock = _build_locks[key] = threading.Lock()
+        return lock
+
+
+def _build(key: ConfigKey, cfg) -> _Entry:
+    """Create a client with its own APIClient (one token exchange + model fetch)."""
+    started = time.monotonic()
+    if use_fake():
+        from ai.fake_provider import FakeLLM
+        entry = _Entry(FakeLLM(cfg), 0.0)
+        with _lock:
+            _entries[key] = entry
+        return entry
+
+    from ai.watsonx_provider import WatsonxLLM
+    from ibm_watsonx_ai import APIClient, Credentials
+
+    try:
+        api_client = APIClient(
+            credentials=Credentials(url=cfg.url, api_key=cfg.api_key),
+            project_id=cfg.project_id,
+        )
+        llm = WatsonxLLM(cfg, api_client=api_client, on_auth_error=lambda: _auth_rejected(key, cfg))
+    except Exception as e:
+        with _lock:
+            _errors[key] = str(e)
+        raise
+    entry = _Entry(llm, time.monotonic() - started)
+    with _lock:
+        _entries[key] = entry
+        _errors.pop(key, None)
+    logger.info(f"watsonx client ready for {cfg.model_id} in {entry.build_seconds:.2f}s")
+    return entry
+
+
+def _auth_rejected(key: ConfigKey, cfg) -> None:
+    logger.warning(f"watsonx rejected the credentials for {cfg.model_id}; rebuilding the client")
+    invalidate_llm(cfg)
+    with _lock:
+        _errors[key] = "authentication rejected"
+
+
+def _refresh_in_background(key: ConfigKey, cfg, entry: _Entry) -> None:
+    with _lock:
+        if entry.refreshing or _entries.get(key) is not entry:
+            return
+        entry.refreshing = True
+
+    def refresh():
+        try:
+            with _build_lock(key):
+                _build(key, cfg)
+        except Exception as e:
+            # Keep serving the current client; the SDK still refreshes its token on demand
+            logger.warning(f"watsonx client refresh for {cfg.model_id} failed: {e}")
+            entry.refreshing = False
+
+    threading.Thread(target=refresh, name="llm-refresh", daemon=True).start()
+
+
+def get_llm(cfg=None):
+    """
+    Shared WatsonxLLM for ``cfg`` (default: WATSONX_* environment).
+
+    Raises if the client cannot be built (missing configuration, SDK or
+    credentials); callers turn that into a 503 as before.
+    """
+    cfg = cfg or _default_config()
+    key = _config_key(cfg)
+    entry = _entries.get(key)
+    if entry is None:
+        with _build_lock(key):
+            entry = _entries.get(key) or _build(key, cfg)
+    elif entry.age > LLM_CLIENT_REFRESH_SECONDS:
+        _refresh_in_background(key, cfg, entry)
+    entry.uses += 1
+    return entry.llm
+
+
+def invalidate_llm(cfg=None) -> None:
+    """Drop a client (e.g. after an authentication error) so the next call rebuilds it."""
+    if cfg is None:
+        with _lock:
+            _entries.clear()
+        return
+    with _lock:
+        _entries.pop(_config_key(cfg), None)
+
+
+def probe_llm() -> Dict[str, Any]:
+    """
+    Connectivity check for /ai/status: a one-line generation on the shared
+    default client, repeated at most every LLM_PROBE_SECONDS. Concurrent
+    callers get the last result instead of starting another generation.
+    """
+    if not _probe_lock.acquire(blocking=False):
+        return dict(_probe) or {"ok": False, "error": "probe in progress"}
+    try:
+        if _probe and time.monotonic() - _probe_checked[0] < LLM_PROBE_SECONDS:
+            return dict(_probe)
+        started = time.monotonic()
+        try:
+            response = get_llm()._gen("Test connection. Respond with 'OK'.")
+            result = {"ok": bool(response and response.strip()), "error": None}
+        except Exception as e:
+            logger.warning(f"watsonx connectivity probe failed: {e}")
+            result = {"ok": False, "error": str(e)}
+        result.update(
+            checked_at=datetime.now(timezone.utc).isoformat(),
+            latency_seconds=round(time.monotonic() - started, 3),
+        )
+        _probe_checked[0] = time.monotonic()
+        _probe.clear()
+        _probe.update(result)
+        return dict(_probe)
+    finally:
+        _probe_lock.release()
+
+
+def warm_up(cfg=None) -> bool:
+    """Build the client ahead of the first request; False if that failed."""
+    if cfg is None and not is_configured():
+        return False
+    try:
+        get_llm(cfg)
+        return True
+    except Exception as e:
+        logger.warning(f"watsonx warm-up failed: {e}")
+        return False
+
+
+def start_warm_up() -> threading.Thread:
+    """Warm up in the background so startup isn't held up by IAM or the network."""
+    thread = threading.Thread(target=warm_up, name="llm-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def registry_status() -> Dict[str, Any]:
+    """Readiness of the shared clients, for ai_status."""
+    with _lock:
+        clients = [
+            {
+                "model_id": key[2],
+                "params": {"decoding_method": key[3], "max_new_tokens": key[4], "temperature": key[5]},
+                "created_at": entry.created_at.isoformat(),
+                "age_seconds": round(entry.age),
+                "build_seconds": round(entry.build_seconds, 3),
+                "requests_served": entry.uses,
+                "refreshing": entry.refreshing,
+            }
+            for key, entry in _entries.items()
+        ]
+        errors = [{"model_id": key[2], "error": error} for key, error in _errors.items()]
+    return {
+        "configured": is_configured(),
+        "ready": bool(clients),
+        "clients": clients,
+        "errors": errors,
+    }
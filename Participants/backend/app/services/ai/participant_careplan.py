@@ -15,13 +15,22 @@ def generate_careplan_draft(chunks: List[Dict], participant: Dict, dynamic_data:
         Dict with goals, supports, and citations
     """
     try:
-        from ai.watsonx_provider import WatsonxLLM
+        from app.core.config import settings
+        from app.services.ai.generation_cache import cached_generate
+        from app.services.ai.llm_registry import get_llm
+        from app.services.context_packer import pack_context
         
-        wx = WatsonxLLM()
+        wx = get_llm()
         
         # Prepare context
-        chunk_texts = "\n\n".join([f"[Chunk {c.get('id', i)}]: {c['text'][:500]}..." 
-                                    for i, c in enumerate(chunks[:10])])
+        chunk_texts, _, _ = pack_context(
+            [dict(c, id=c.get('id', i)) for i, c in enumerate(chunks)],
+            settings.RAG_CONTEXT_TOKENS,
+            text_key='text',
+            score_key='score',
+            separator="\n\n",
+            label=lambda c: f"[Chunk {c['id']}]: ",
+        )
         
         participant_context = f"""
 Participant: {participant.get('name', 'Unknown')}
@@ -63,7 +72,7 @@ Return ONLY valid JSON in this exact format:
 }}
 """
         
-        response = wx._gen(prompt)
+        response = cached_generate(wx, prompt, participant.get('id'))
         
         try:
             clean_response = response.strip()
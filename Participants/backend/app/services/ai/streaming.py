@@ -0,0 +1,128 @@
+# backend/app/services/ai/streaming.py
+"""
+Server-Sent Events for streamed AI generations.
+
+The watsonx SDK streams through a blocking iterator. Each stream is
+drained on a small dedicated pool (AI_STREAM_WORKERS) and handed to the
+event loop through an asyncio.Queue, so the request handler stays async
+and doesn't hold one of the shared threadpool slots that sync endpoints
+and DB calls run on while the model is generating.
+
+Event sequence:
+    event: sources  data: {"sources": [...], ...}     (first, before any token)
+    event: token    data: {"text": "..."}             (one per streamed piece)
+    event: done     data: {"content": "...", ...}     (after the result is saved)
+    event: error    data: {"detail": "..."}           (instead of done)
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # stop nginx buffering the stream
+}
+
+
+def _stream_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.AI_STREAM_WORKERS),
+                thread_name_prefix="ai-stream",
+            )
+        return _executor
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def iterate_stream(pieces: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Consume a blocking iterator off the event loop.
+
+    If the consumer goes away (client disconnect), the worker stops at the
+    next piece and closes the iterator, which closes the HTTP stream to
+    watsonx instead of generating the rest of the completion.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def drain():
+        try:
+            for piece in pieces:
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, piece)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            close = getattr(pieces, "close", None)
+            if close:
+                close()
+            loop.call_soon_threadsafe(queue.put_nowait, _END)
+
+    loop.run_in_executor(_stream_executor(), drain)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+async def generation_events(
+    pieces: Iterator[str],
+    sources: Optional[Dict[str, Any]] = None,
+    on_complete: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+    min_length: int = 1,
+) -> AsyncIterator[str]:
+    """
+    SSE events for one generation.
+
+    ``on_complete(content)`` runs once the full text is in (e.g. to save the
+    suggestion) and its result is merged into the done event.
+    """
+    yield sse_event("sources", sources or {"sources": []})
+    parts = []
+    try:
+        async for piece in iterate_stream(pieces):
+            parts.append(piece)
+            yield sse_event("token", {"text": piece})
+
+        content = "".join(parts)
+        if len(content.strip()) < min_length:
+            yield sse_event("error", {"detail": "AI service returned an insufficient response"})
+            return
+        done = {"content": content}
+        if on_complete:
+            done.update(await on_complete(content))
+        yield sse_event("done", done)
+    except Exception as e:
+        logger.error(f"Streamed AI generation failed: {e}", exc_info=True)
+        yield sse_event("error", {"detail": f"AI generation failed: {e}"})
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
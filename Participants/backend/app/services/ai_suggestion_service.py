@@ -1,11 +1,34 @@
 # backend/app/services/ai_suggestion_service.py - FIXED FOR POSTGRESQL
-from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+"""
+AI suggestion log.
+
+Statistics are read from ai_suggestion_daily, a rollup of counts per
+(day, type, provider) kept up to date by an after_flush hook in the same
+transaction as the suggestion itself (as for the invoice summary);
+save_suggestions, which inserts without the ORM, applies its own deltas.
+reconcile_suggestion_rollup() recomputes the rollup from ai_suggestions
+and repairs any drift; on databases without INSERT ... ON CONFLICT the
+hook is skipped and the rollup is only maintained by reconciliation.
+Participant history is keyset-paginated on (created_at, id) over
+ix_ai_suggestions_subject_created.
+"""
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import and_, case, event, func, insert, inspect, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
 from app.models.ai_suggestion import AISuggestion
+from app.models.ai_suggestion_daily import AISuggestionDaily
 from app.schemas.ai import AISuggestionCreate
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import base64
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACKED_ATTRIBUTES = ("created_at", "suggestion_type", "provider", "applied")
+
+BucketKey = Tuple[date, str, str]  # day, suggestion_type, provider
 
 def save_suggestion(db: Session, data: AISuggestionCreate) -> AISuggestion:
     """Save an AI suggestion to the database"""
@@ -31,58 +54,76 @@ def save_suggestion(db: Session, data: AISuggestionCreate) -> AISuggestion:
     db.refresh(obj)
     return obj
 
+def save_suggestions(db: Session, items: List[AISuggestionCreate], commit: bool = True) -> List[int]:
+    """Save many AI suggestions in one INSERT; returns their ids in order.
+
+    With commit=False the caller commits, so other writes (e.g. batch job
+    progress) land in the same transaction.
+    """
+    if not items:
+        return []
+    rows = [
+        {
+            "subject_type": "participant",
+            "subject_id": data.subject_id,
+            "suggestion_type": data.suggestion_type,
+            "payload": data.payload,
+            "raw_text": data.raw_text,
+            "provider": data.provider,
+            "model": data.model,
+            "confidence": data.confidence,
+            "created_by": data.created_by or "api",
+        }
+        for data in items
+    ]
+    inserted = db.execute(
+        insert(AISuggestion).returning(AISuggestion.id, AISuggestion.created_at, sort_by_parameter_order=True),
+        rows
+    ).all()
+    # Core insert: the after_flush hook doesn't see these rows. Bucket by the
+    # created_at the database assigned, not the app's date
+    deltas: Dict[BucketKey, List[int]] = {}
+    for row, (_, created_at) in zip(rows, inserted):
+        _add(deltas, _bucket_key(created_at, row["suggestion_type"], row["provider"]), 1, 0)
+    apply_suggestion_deltas(db.connection(), deltas)
+    if commit:
+        db.commit()
+    return [suggestion_id for suggestion_id, _ in inserted]
+
 def get_suggestion_statistics(db: Session, days: int = 30) -> Dict[str, Any]:
-    """Get AI suggestion statistics for analytics"""
+    """Get AI suggestion statistics for analytics (from the daily rollup)"""
     try:
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # Total suggestions
-        total = db.query(AISuggestion).filter(
-            AISuggestion.created_at >= start_date
-        ).count()
+        start_day = date.today() - timedelta(days=days)
         
-        # Applied suggestions
-        applied = db.query(AISuggestion).filter(
-            AISuggestion.created_at >= start_date,
-            AISuggestion.applied == True
-        ).count()
-        
-        # By type
-        by_type = db.query(
-            AISuggestion.suggestion_type,
-            func.count(AISuggestion.id).label('count')
-        ).filter(
-            AISuggestion.created_at >= start_date
-        ).group_by(AISuggestion.suggestion_type).all()
-        
-        # By provider
-        by_provider = db.query(
-            AISuggestion.provider,
-            func.count(AISuggestion.id).label('count')
-        ).filter(
-            AISuggestion.created_at >= start_date
-        ).group_by(AISuggestion.provider).all()
+        rows = db.query(AISuggestionDaily).filter(
+            AISuggestionDaily.day >= start_day,
+            AISuggestionDaily.suggestion_count != 0
+        ).all()
         
-        # Daily stats - Fixed for PostgreSQL
-        daily_stats = db.query(
-            func.date_trunc('day', AISuggestion.created_at).label('date'),
-            func.count(AISuggestion.id).label('count')
-        ).filter(
-            AISuggestion.created_at >= start_date
-        ).group_by(func.date_trunc('day', AISuggestion.created_at)).all()
+        total = applied = 0
+        by_type: Dict[str, int] = {}
+        by_provider: Dict[str, int] = {}
+        by_day: Dict[date, int] = {}
+        for row in rows:
+            total += row.suggestion_count
+            applied += row.applied_count
+            by_type[row.suggestion_type] = by_type.get(row.suggestion_type, 0) + row.suggestion_count
+            provider = row.provider or "unknown"
+            by_provider[provider] = by_provider.get(provider, 0) + row.suggestion_count
+            by_day[row.day] = by_day.get(row.day, 0) + row.suggestion_count
         
         return {
             "period_days": days,
             "total_suggestions": total,
             "applied_suggestions": applied,
             "application_rate": round((applied / max(total, 1)) * 100, 2),
-            "suggestions_by_type": {item.suggestion_type: item.count for item in by_type},
-            "providers": {item.provider or "unknown": item.count for item in by_provider},
+            "suggestions_by_type": by_type,
+            "providers": by_provider,
             "daily_activity": [
-                {"date": str(item.date), "count": item.count} 
-                for item in daily_stats
+                {"date": day.isoformat(), "count": count} 
+                for day, count in sorted(by_day.items())
             ],
-            "most_active_day": max(daily_stats, key=lambda x: x.count).date.isoformat() if daily_stats else None,
+            "most_active_day": max(by_day, key=by_day.get).isoformat() if by_day else None,
         }
         
     except Exception as e:
@@ -98,37 +139,100 @@ def get_suggestion_statistics(db: Session, days: int = 30) -> Dict[str, Any]:
             "error": f"Statistics unavailable: {str(e)}"
         }
 
+def encode_cursor(suggestion: AISuggestion) -> str:
+    """Opaque keyset cursor for the page after ``suggestion``."""
+    raw = f"{suggestion.created_at.isoformat()}|{suggestion.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, suggestion_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(suggestion_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _page_key(db: Session):
+    """
+    created_at as ordered and compared for keyset pages.
+
+    SQLite keeps timestamps as text: server defaults as 'YYYY-MM-DD HH:MM:SS',
+    bound datetimes with microseconds, and '...:00' sorts before
+    '...:00.000000', so a cursor would never move past such a row. There
+    both sides are normalised to millisecond strings (no index range scan).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", AISuggestion.created_at)
+    return AISuggestion.created_at
+
+def _page_value(db: Session, created_at: datetime):
+    if db.get_bind().dialect.name == "sqlite":
+        return f"{created_at:%Y-%m-%d %H:%M:%S}.{created_at.microsecond // 1000:03d}"
+    return created_at
+
+def get_participant_suggestion_page(
+    db: Session,
+    participant_id: int,
+    suggestion_type: Optional[str] = None,
+    limit: int = 20,
+    applied_only: bool = False,
+    cursor: Optional[str] = None
+) -> Tuple[List[AISuggestion], Optional[str]]:
+    """
+    A page of a participant's AI suggestions, newest first, and the cursor
+    for the next page (None on the last page).
+
+    Keyset pagination: each page is an index range scan from the cursor,
+    however deep into the history it is. Raises ValueError for a bad cursor.
+    """
+    query = db.query(AISuggestion).filter(
+        AISuggestion.subject_type == "participant",
+        AISuggestion.subject_id == participant_id
+    )
+    
+    if suggestion_type:
+        query = query.filter(AISuggestion.suggestion_type == suggestion_type)
+        
+    if applied_only:
+        query = query.filter(AISuggestion.applied == True)
+    
+    page_key = _page_key(db)
+    if cursor:
+        created_at, suggestion_id = decode_cursor(cursor)
+        created_at = _page_value(db, created_at)
+        query = query.filter(or_(
+            page_key < created_at,
+            and_(page_key == created_at, AISuggestion.id < suggestion_id)
+        ))
+    
+    # One extra row tells us whether there is a next page
+    rows = query.order_by(page_key.desc(), AISuggestion.id.desc()).limit(limit + 1).all()
+    suggestions = rows[:limit]
+    
+    # Ensure payload is properly serializable
+    for suggestion in suggestions:
+        if suggestion.payload and isinstance(suggestion.payload, str):
+            try:
+                suggestion.payload = json.loads(suggestion.payload)
+            except:
+                pass  # Keep as string if not valid JSON
+    
+    next_cursor = encode_cursor(suggestions[-1]) if len(rows) > limit else None
+    return suggestions, next_cursor
+
 def get_participant_suggestions(
     db: Session, 
     participant_id: int, 
     suggestion_type: Optional[str] = None,
     limit: int = 20,
-    applied_only: bool = False
+    applied_only: bool = False,
+    cursor: Optional[str] = None
 ) -> List[AISuggestion]:
     """Get AI suggestions for a specific participant - FIXED FOR POSTGRESQL"""
     try:
-        query = db.query(AISuggestion).filter(
-            AISuggestion.subject_type == "participant",
-            AISuggestion.subject_id == participant_id
+        suggestions, _ = get_participant_suggestion_page(
+            db, participant_id, suggestion_type, limit, applied_only, cursor
         )
-        
-        if suggestion_type:
-            query = query.filter(AISuggestion.suggestion_type == suggestion_type)
-            
-        if applied_only:
-            query = query.filter(AISuggestion.applied == True)
-        
-        # Order by created_at descending and limit
-        suggestions = query.order_by(AISuggestion.created_at.desc()).limit(limit).all()
-        
-        # Ensure payload is properly serializable
-        for suggestion in suggestions:
-            if suggestion.payload and isinstance(suggestion.payload, str):
-                try:
-                    suggestion.payload = json.loads(suggestion.payload)
-                except:
-                    pass  # Keep as string if not valid JSON
-        
         return suggestions
         
     except Exception as e:
@@ -186,11 +290,219 @@ def delete_suggestion(db: Session, suggestion_id: int) -> bool:
         return False
 
 def get_recent_suggestions_count(db: Session, hours: int = 24) -> int:
-    """Get count of recent AI suggestions"""
+    """Get count of recent AI suggestions (a range scan of ix_ai_suggestions_created_at)"""
     try:
         since = datetime.now() - timedelta(hours=hours)
         return db.query(AISuggestion).filter(
             AISuggestion.created_at >= since
         ).count()
     except Exception:
-        return 0
\ No newline at end of file
+        return 0
+
+
+# ==========================================
+# DAILY ROLLUP
+# ==========================================
+
+def _day(value: Any) -> date:
+    if value is None:
+        return date.today()  # created_at is filled in by the database on insert
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
+
+def _bucket_key(created_at: Any, suggestion_type: str, provider: Optional[str]) -> BucketKey:
+    return _day(created_at), suggestion_type, provider or ""
+
+def _add(deltas: Dict[BucketKey, List[int]], key: BucketKey, count: int, applied: int) -> None:
+    bucket = deltas.setdefault(key, [0, 0])
+    bucket[0] += count
+    bucket[1] += applied
+
+def _previous_values(suggestion: AISuggestion) -> Dict[str, Any]:
+    values = {}
+    for attr in TRACKED_ATTRIBUTES:
+        history = attributes.get_history(suggestion, attr)
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.unchanged:
+            values[attr] = history.unchanged[0]
+        else:
+            values[attr] = getattr(suggestion, attr)
+    return values
+
+def _add_suggestion(deltas: Dict[BucketKey, List[int]], values: Dict[str, Any], sign: int) -> None:
+    key = _bucket_key(values["created_at"], values["suggestion_type"], values["provider"])
+    _add(deltas, key, sign, sign if values["applied"] else 0)
+
+def collect_suggestion_deltas(session: Session) -> Dict[BucketKey, List[int]]:
+    """Signed per-bucket (count, applied) deltas for the AISuggestion rows in the current flush."""
+    deltas: Dict[BucketKey, List[int]] = {}
+
+    for obj in session.new:
+        if isinstance(obj, AISuggestion):
+            _add_suggestion(deltas, {attr: getattr(obj, attr) for attr in TRACKED_ATTRIBUTES}, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, AISuggestion):
+            _add_suggestion(deltas, _previous_values(obj), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, AISuggestion) and session.is_modified(obj, include_collections=False):
+            _add_suggestion(deltas, _previous_values(obj), -1)
+            _add_suggestion(deltas, {attr: getattr(obj, attr) for attr in TRACKED_ATTRIBUTES}, 1)
+
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+_unsupported_dialects = set()
+
+def _upsert_statement(dialect_name: str):
+    """Dialect INSERT with on_conflict_do_update, or None where there is none."""
+    if dialect_name == "postgresql":
+        return postgresql.insert(AISuggestionDaily.__table__)
+    if dialect_name == "sqlite":
+        return sqlite.insert(AISuggestionDaily.__table__)
+    return None
+
+def apply_suggestion_deltas(connection, deltas: Dict[BucketKey, List[int]]) -> None:
+    """
+    Add deltas to ai_suggestion_daily with INSERT ... ON CONFLICT DO UPDATE.
+
+    Skipped (with one warning) on other databases, so suggestion writes
+    still succeed; run reconcile_suggestion_rollup() to bring the rollup up
+    to date there.
+    """
+    if not deltas:
+        return
+    dialect_name = connection.dialect.name
+    if _upsert_statement(dialect_name) is None:
+        if dialect_name not in _unsupported_dialects:
+            _unsupported_dialects.add(dialect_name)
+            logger.warning(f"AI suggestion rollup upsert not supported on {dialect_name}; "
+                           "the rollup is only updated by reconcile_suggestion_rollup()")
+        return
+
+    table = AISuggestionDaily.__table__
+    now = datetime.now()
+    for (day, suggestion_type, provider), (count, applied) in deltas.items():
+        stmt = _upsert_statement(connection.dialect.name).values(
+            day=day,
+            suggestion_type=suggestion_type,
+            provider=provider,
+            suggestion_count=count,
+            applied_count=applied,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "suggestion_type", "provider"],
+            set_={
+                "suggestion_count": table.c.suggestion_count + count,
+                "applied_count": table.c.applied_count + applied,
+                "updated_at": now,
+            },
+        )
+        connection.execute(stmt)
+
+@event.listens_for(Session, "after_flush")
+def _maintain_suggestion_rollup(session: Session, flush_context) -> None:
+    deltas = collect_suggestion_deltas(session)
+    if deltas:
+        apply_suggestion_deltas(session.connection(), deltas)
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+# active_history loads the old value before a set, so a suggestion changed
+# after its attributes were expired still moves out of the right bucket
+for _attr in TRACKED_ATTRIBUTES:
+    event.listen(getattr(AISuggestion, _attr), "set", _load_previous_value, active_history=True, retval=True)
+
+def reconcile_suggestion_rollup(db: Session, repair: bool = True) -> Dict[str, Any]:
+    """
+    Compare ai_suggestion_daily with a full aggregation of ai_suggestions.
+
+    On PostgreSQL the rollup is locked for the duration, so writers wait
+    instead of racing the comparison. Drifted buckets are rewritten when
+    repair is True.
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE ai_suggestion_daily IN EXCLUSIVE MODE"))
+
+        day = func.date(AISuggestion.created_at)
+        rows = db.query(
+            day, AISuggestion.suggestion_type, AISuggestion.provider,
+            func.count(AISuggestion.id),
+            func.coalesce(func.sum(case((AISuggestion.applied == True, 1), else_=0)), 0),
+        ).group_by(day, AISuggestion.suggestion_type, AISuggestion.provider).all()
+
+        expected: Dict[BucketKey, Tuple[int, int]] = {}
+        for row_day, suggestion_type, provider, count, applied in rows:
+            key = _bucket_key(row_day, suggestion_type, provider)
+            have = expected.get(key, (0, 0))
+            expected[key] = (have[0] + int(count), have[1] + int(applied))
+
+        buckets = {(r.day, r.suggestion_type, r.provider): r for r in db.query(AISuggestionDaily).all()}
+
+        drift = []
+        for key in sorted(set(expected) | set(buckets)):
+            want = expected.get(key, (0, 0))
+            row = buckets.get(key)
+            have = (row.suggestion_count, row.applied_count) if row else (0, 0)
+            if want == have:
+                continue
+
+            drift.append({
+                "day": key[0].isoformat(),
+                "suggestion_type": key[1],
+                "provider": key[2] or None,
+                "expected": {"count": want[0], "applied": want[1]},
+                "actual": {"count": have[0], "applied": have[1]},
+            })
+            if not repair:
+                continue
+            if key not in expected:
+                db.delete(row)
+                continue
+            if row is None:
+                row = AISuggestionDaily(day=key[0], suggestion_type=key[1], provider=key[2])
+                db.add(row)
+            row.suggestion_count, row.applied_count = want
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if drift:
+        logger.warning(f"AI suggestion rollup drift in {len(drift)} bucket(s){' (repaired)' if repair else ''}")
+
+    return {
+        "status": "ok" if not drift else ("repaired" if repair else "drift"),
+        "buckets_checked": len(set(expected) | set(buckets)),
+        "drift": drift,
+    }
+
+def ensure_ai_suggestion_schema(engine) -> None:
+    """Add the ai_suggestions indexes and ai_suggestion_daily on existing databases, seeding an empty rollup."""
+    try:
+        tables = inspect(engine).get_table_names()
+        if "ai_suggestions" not in tables:
+            return
+
+        with engine.begin() as conn:
+            for index in AISuggestion.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+        AISuggestionDaily.__table__.create(bind=engine, checkfirst=True)
+        db = Session(bind=engine)
+        try:
+            # Also covers a rollup table created (e.g. by create_all) before it was seeded
+            if db.query(AISuggestionDaily.day).first() is not None or db.query(AISuggestion.id).first() is None:
+                return
+            result = reconcile_suggestion_rollup(db)
+            print(f"[info] AI suggestion rollup seeded with {result['buckets_checked']} bucket(s)")
+        finally:
+            db.close()
+    except Exception as exc:
+        print(f'[warn] AI suggestion schema check failed: {exc}')
@@ -0,0 +1,489 @@
+# backend/app/services/blob_store.py
+"""
+Content-addressed, reference-counted storage for document files.
+
+An upload is streamed to a staging key while it is hashed; if a blob with
+the same SHA-256 already exists on that storage provider the staged copy is
+dropped, otherwise it is moved to ``blobs/<aa>/<sha256>``. Documents and
+document versions then point at the blob (blob_id) and keep the blob's
+location in their existing file_path / storage_key columns, so every
+download path works unchanged.
+
+ref_count is adjusted when a row starts using a blob and recounted from
+documents and document_versions whenever references may have gone away
+(deletes, version cleanup, bulk deletes that bypass the ORM). Blob objects
+are only removed by collect_unreferenced_blobs(), after a grace period, so
+a concurrent upload that has just matched a blob never loses it.
+"""
+
+import hashlib
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, inspect, or_, select, text, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.document_workflow import DocumentVersion
+from app.models.stored_blob import StoredBlob
+from app.services.storage import get_storage
+from app.services.storage.base import ObjectNotFoundError, StorageBackend
+from app.services.storage.uploads import stream_upload
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs"
+STAGING_PREFIX = f"{BLOB_PREFIX}/incoming"
+LOCAL = "local"
+COS = "ibm-cos"
+
+
+def blob_key(sha256: str) -> str:
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}"
+
+
+def storage_for(provider: str) -> StorageBackend:
+    return get_storage(LOCAL) if provider == LOCAL else get_storage()
+
+
+def blob_location(blob: StoredBlob) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (file_path, storage_key) to record on a document or version.
+
+    Local blobs are referenced by absolute path, as local uploads always
+    were; COS blobs by object key.
+    """
+    if blob.storage_provider == LOCAL:
+        return str(get_storage(LOCAL).path_for(blob.storage_key)), None
+    return None, blob.storage_key
+
+
+def find_blob(db: Session, sha256: str, provider: str) -> Optional[StoredBlob]:
+    return db.query(StoredBlob).filter(
+        StoredBlob.sha256 == sha256.lower(),
+        StoredBlob.storage_provider == provider,
+    ).first()
+
+
+def find_owned_blob(db: Session, sha256: str, provider: str,
+                    participant_id: Optional[int] = None,
+                    referral_id: Optional[int] = None) -> Optional[StoredBlob]:
+    """
+    The blob with ``sha256`` only if a document of every given owner already
+    references it (directly or through one of its versions).
+
+    For attaching by hash: a client can only reuse bytes it could already
+    read, and learns nothing about files held for anyone else.
+    """
+    if participant_id is None and referral_id is None:
+        return None
+
+    query = db.query(StoredBlob).filter(
+        StoredBlob.sha256 == sha256.lower(),
+        StoredBlob.storage_provider == provider,
+    )
+    for column, owner_id in ((Document.participant_id, participant_id), (Document.referral_id, referral_id)):
+        if owner_id is None:
+            continue
+        direct = select(Document.id).where(Document.blob_id == StoredBlob.id, column == owner_id)
+        via_version = select(DocumentVersion.id).join(Document, Document.id == DocumentVersion.document_id).where(
+            DocumentVersion.blob_id == StoredBlob.id, column == owner_id
+        )
+        query = query.filter(or_(direct.exists(), via_version.exists()))
+    return query.first()
+
+
+# ==========================================
+# UPLOADS
+# ==========================================
+
+def stage_upload(provider: str, fileobj: BinaryIO, filename: str = "",
+                 allowed_types: Optional[Iterable[str]] = None,
+                 max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Stream an upload to a staging key, sniffing and hashing it.
+
+    Storage I/O only, no database access, so it can run in a worker thread.
+    Returns stream_upload's result plus "provider".
+    """
+    key = f"{STAGING_PREFIX}/{uuid.uuid4().hex}"
+    upload = stream_upload(storage_for(provider), key, fileobj, filename,
+                           allowed_types=allowed_types, max_bytes=max_bytes)
+    upload["provider"] = provider
+    return upload
+
+
+def _reserve_blob(db: Session, sha256: str, provider: str, key: str, size: int,
+                  mime_type: Optional[str]) -> StoredBlob:
+    """
+    Commit a blob row in its own transaction and return it as seen by ``db``.
+
+    Called before the object is moved under blobs/, so every blob object
+    has a row even if the caller's transaction is later rolled back; such a
+    row stays unreferenced and collect_unreferenced_blobs() removes it and
+    its object after the grace period. A row a concurrent upload committed
+    first is returned as is.
+    """
+    with Session(bind=db.get_bind()) as own:
+        try:
+            own.add(StoredBlob(sha256=sha256, storage_provider=provider, storage_key=key,
+                               file_size=size, mime_type=mime_type, ref_count=0))
+            own.commit()
+        except IntegrityError:
+            own.rollback()
+    return find_blob(db, sha256, provider)
+
+
+def commit_staged_upload(db: Session, upload: Dict[str, Any]) -> StoredBlob:
+    """
+    Turn a staged upload into a blob.
+
+    If the bytes are already stored the staged copy is deleted and
+    upload["deduplicated"] is set; either way upload["key"] becomes the
+    blob's key. The caller attaches the blob to its rows and commits.
+    """
+    provider = upload["provider"]
+    storage = storage_for(provider)
+    sha256 = upload["sha256"]
+
+    blob = find_blob(db, sha256, provider)
+    if blob is not None and storage.exists(blob.storage_key):
+        storage.delete_object(upload["key"])
+        upload["deduplicated"] = True
+        logger.info(f"Upload matched existing blob {sha256[:12]}; nothing new stored")
+    else:
+        key = blob_key(sha256)
+        if blob is None:
+            blob = _reserve_blob(db, sha256, provider, key, upload["size"], upload["content_type"])
+        storage.copy_object(upload["key"], key)
+        # Also covers a row whose object was lost; the new upload restores it
+        blob.storage_key = key
+        upload["deduplicated"] = False
+
+    upload["key"] = blob.storage_key
+    return blob
+
+
+def attach_blob(target, blob: StoredBlob) -> None:
+    """
+    Point a Document or DocumentVersion at ``blob`` and count the reference.
+
+    Also records the blob's location and hash on the row. A row that
+    previously used another blob is not decremented here; recount_blob_refs()
+    catches that.
+    """
+    if target.blob_id != blob.id:
+        db = object_session(blob)
+        # Increment in SQL so concurrent uploads of the same file don't lose counts
+        db.execute(
+            update(StoredBlob)
+            .where(StoredBlob.id == blob.id)
+            .values(ref_count=StoredBlob.ref_count + 1, last_referenced_at=datetime.now(timezone.utc))
+        )
+        db.expire(blob, ["ref_count", "last_referenced_at"])
+        target.blob_id = blob.id
+
+    file_path, storage_key = blob_location(blob)
+    if isinstance(target, Document):
+        target.file_path = file_path
+        target.storage_key = storage_key
+        target.storage_provider = blob.storage_provider
+        metadata = dict(target.extra_metadata or {})
+        metadata["sha256"] = blob.sha256
+        if storage_key:
+            metadata["storage_key"] = storage_key
+        target.extra_metadata = metadata
+    else:
+        target.file_path = file_path or storage_key
+        target.file_hash = blob.sha256
+
+
+def share_blob(db: Session, target, source) -> None:
+    """
+    Point a new Document or DocumentVersion row at the blob ``source`` uses,
+    for rows that reuse another row's file_path (metadata-only versions,
+    initial versions, restores), and count the reference.
+
+    Without this the row is invisible to reference counting and the file
+    can be collected while it still points at it. No-op for files outside
+    the blob store.
+    """
+    blob_id = getattr(source, "blob_id", None)
+    if not blob_id or target.blob_id == blob_id:
+        return
+    db.execute(
+        update(StoredBlob)
+        .where(StoredBlob.id == blob_id)
+        .values(ref_count=StoredBlob.ref_count + 1, last_referenced_at=datetime.now(timezone.utc))
+    )
+    target.blob_id = blob_id
+
+
+# ==========================================
+# REFERENCE COUNTS
+# ==========================================
+
+def _reference_counts(db: Session, blob_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    refs = union_all(
+        select(Document.blob_id.label("blob_id")).where(Document.blob_id.isnot(None)),
+        select(DocumentVersion.blob_id.label("blob_id")).where(DocumentVersion.blob_id.isnot(None)),
+    ).subquery()
+    query = db.query(refs.c.blob_id, func.count()).group_by(refs.c.blob_id)
+    if blob_ids is not None:
+        query = query.filter(refs.c.blob_id.in_(list(blob_ids)))
+    return {blob_id: count for blob_id, count in query.all()}
+
+
+def recount_blob_refs(db: Session, blob_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Reset ref_count from the rows that actually reference each blob.
+
+    Call after deleting documents or versions; returns how many counts
+    changed. Does not commit.
+    """
+    ids = None if blob_ids is None else {blob_id for blob_id in blob_ids if blob_id}
+    if ids is not None and not ids:
+        return 0
+
+    counts = _reference_counts(db, ids)
+    query = db.query(StoredBlob)
+    if ids is not None:
+        query = query.filter(StoredBlob.id.in_(ids))
+
+    changed = 0
+    for blob in query.all():
+        count = counts.get(blob.id, 0)
+        if blob.ref_count != count:
+            blob.ref_count = count
+            changed += 1
+    return changed
+
+
+def document_blob_ids(db: Session, document_id: int) -> List[int]:
+    """Blob ids used by a document and its versions, for recounting after a delete."""
+    ids = {blob_id for (blob_id,) in db.query(Document.blob_id).filter(Document.id == document_id)}
+    ids |= {blob_id for (blob_id,) in db.query(DocumentVersion.blob_id).filter(DocumentVersion.document_id == document_id)}
+    return [blob_id for blob_id in ids if blob_id]
+
+
+def is_blob_path(path: Optional[str]) -> bool:
+    """True if a local file path is a shared blob, which must not be removed directly."""
+    if not path:
+        return False
+    try:
+        relative = Path(path).resolve().relative_to(get_storage(LOCAL).path_for(""))
+    except ValueError:
+        return False
+    return relative.parts[:1] == (BLOB_PREFIX,)
+
+
+def collect_unreferenced_blobs(db: Session, grace: Optional[timedelta] = None,
+                               dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Delete blobs nobody references any more.
+
+    Counts are recomputed first, and only blobs unreferenced for longer than
+    ``grace`` (BLOB_GC_GRACE_HOURS) are removed.
+    """
+    grace = grace if grace is not None else timedelta(hours=settings.BLOB_GC_GRACE_HOURS)
+    cutoff = datetime.now(timezone.utc) - grace
+
+    recount_blob_refs(db)
+    candidates = db.query(StoredBlob).filter(
+        StoredBlob.ref_count <= 0,
+        or_(StoredBlob.last_referenced_at.is_(None), StoredBlob.last_referenced_at < cutoff),
+    ).all()
+
+    removed, freed = 0, 0
+    for blob in candidates:
+        if dry_run:
+            removed += 1
+            freed += blob.file_size or 0
+            continue
+        try:
+            storage_for(blob.storage_provider).delete_object(blob.storage_key)
+        except ObjectNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not delete blob {blob.storage_key}: {e}")
+            continue
+        db.delete(blob)
+        removed += 1
+        freed += blob.file_size or 0
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+    if removed:
+        logger.info(f"{'Would remove' if dry_run else 'Removed'} {removed} unreferenced blob(s), {freed} bytes")
+    return {"removed": removed, "bytes_freed": freed, "dry_run": dry_run}
+
+
+# ==========================================
+# MIGRATION
+# ==========================================
+
+def _row_source(row) -> Tuple[Optional[str], Optional[str]]:
+    """(provider, key) of the file a pre-blob Document or DocumentVersion points at."""
+    if isinstance(row, Document):
+        if row.storage_provider == COS and row.storage_key:
+            return COS, row.storage_key
+        path = row.file_path
+    else:
+        path = row.file_path
+        provider = (row.change_metadata or {}).get("storage_provider")
+        if provider == COS or (path and not Path(path).is_absolute() and not Path(path).exists()):
+            return COS, path
+    if not path:
+        return None, None
+    try:
+        relative = Path(path).resolve().relative_to(get_storage(LOCAL).path_for(""))
+    except ValueError:
+        return None, None
+    return LOCAL, relative.as_posix()
+
+
+def _hash_object(storage: StorageBackend, key: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    body = storage.get_object_stream(key)["Body"]
+    try:
+        for chunk in body.iter_chunks():
+            digest.update(chunk)
+            size += len(chunk)
+    finally:
+        body.close()
+    return digest.hexdigest(), size
+
+
+def _still_referenced(db: Session, provider: str, key: str) -> bool:
+    """True if a row not yet on a blob still points at this original file."""
+    refs = [key]
+    if provider == LOCAL:
+        refs.append(str(get_storage(LOCAL).path_for(key)))
+    doc = db.query(Document.id).filter(
+        Document.blob_id.is_(None),
+        or_(Document.storage_key.in_(refs), Document.file_path.in_(refs)),
+    ).first()
+    version = db.query(DocumentVersion.id).filter(
+        DocumentVersion.blob_id.is_(None),
+        DocumentVersion.file_path.in_(refs),
+    ).first()
+    return bool(doc or version)
+
+
+def fold_existing_files(db: Session, dry_run: bool = False, batch_size: int = 200) -> Dict[str, Any]:
+    """
+    Move documents and versions that predate the blob store onto blobs.
+
+    Each file is hashed; the first file seen for a hash is copied to its
+    blob key and identical files are pointed at that blob. Originals are
+    deleted at the end, once no unmigrated row references them. Rows are
+    committed per batch, so the migration can be interrupted and re-run.
+    Files that cannot be read are left as they are.
+    """
+    stats = defaultdict(int)
+    migrated: Dict[Tuple[str, str], Optional[int]] = {}  # original (provider, key) -> blob id
+    seen_hashes = set()  # dry run only: (provider, sha256) a blob would exist for
+
+    def batches(model):
+        last_id = 0
+        while True:
+            query = db.query(model).filter(model.blob_id.is_(None), model.id > last_id)
+            if model is Document:
+                query = query.filter(or_(Document.status.is_(None), Document.status != "deleted"))
+            batch = query.order_by(model.id).limit(batch_size).all()
+            if not batch:
+                return
+            last_id = batch[-1].id
+            yield batch
+
+    for model in (Document, DocumentVersion):
+        for batch in batches(model):
+            for row in batch:
+                provider, key = _row_source(row)
+                if not provider or not key:
+                    stats["skipped"] += 1
+                    continue
+
+                if (provider, key) in migrated:
+                    # Another row already pointed at this very file
+                    if not dry_run:
+                        attach_blob(row, db.get(StoredBlob, migrated[(provider, key)]))
+                    stats["rows_migrated"] += 1
+                    continue
+
+                storage = storage_for(provider)
+                try:
+                    sha256, size = _hash_object(storage, key)
+                except (ObjectNotFoundError, OSError) as e:
+                    logger.warning(f"Blob migration: cannot read {key}: {e}")
+                    stats["missing"] += 1
+                    continue
+
+                if dry_run:
+                    known = (provider, sha256) in seen_hashes or find_blob(db, sha256, provider) is not None
+                    seen_hashes.add((provider, sha256))
+                    migrated[(provider, key)] = None
+                else:
+                    blob = find_blob(db, sha256, provider)
+                    known = blob is not None and storage.exists(blob.storage_key)
+                    if not known:
+                        if blob is None:
+                            blob = _reserve_blob(db, sha256, provider, blob_key(sha256), size,
+                                                 getattr(row, "mime_type", None))
+                        storage.copy(key, blob_key(sha256))
+                        blob.storage_key = blob_key(sha256)
+                    attach_blob(row, blob)
+                    migrated[(provider, key)] = blob.id
+
+                if known:
+                    stats["duplicates_folded"] += 1
+                    stats["bytes_saved"] += size
+                else:
+                    stats["blobs_created"] += 1
+                stats["rows_migrated"] += 1
+
+            if not dry_run:
+                db.commit()
+
+    if not dry_run:
+        recount_blob_refs(db)
+        db.commit()
+        for provider, key in migrated:
+            if key.startswith(f"{BLOB_PREFIX}/") or _still_referenced(db, provider, key):
+                continue
+            try:
+                storage_for(provider).delete_object(key)
+                stats["originals_removed"] += 1
+            except Exception as e:
+                logger.warning(f"Blob migration: could not delete {key}: {e}")
+
+    stats["dry_run"] = dry_run
+    return dict(stats)
+
+
+def ensure_blob_store_schema(engine) -> None:
+    """Create stored_blobs and the blob_id columns on existing databases."""
+    try:
+        inspector = inspect(engine)
+        tables = inspector.get_table_names()
+        StoredBlob.__table__.create(bind=engine, checkfirst=True)
+
+        with engine.begin() as conn:
+            for table in ("documents", "document_versions"):
+                if table not in tables:
+                    continue
+                columns = {col["name"] for col in inspector.get_columns(table)}
+                if "blob_id" not in columns:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN blob_id INTEGER REFERENCES stored_blobs(id)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_blob_id ON {table} (blob_id)"))
+    except Exception as exc:
+        print(f'[warn] Blob store schema check failed: {exc}')
@@ -0,0 +1,195 @@
+# backend/app/services/context_packer.py
+"""
+Token-budgeted packing of retrieved chunks into an AI prompt.
+
+Chunks are counted in model tokens rather than characters, near-duplicates
+(overlapping chunks, the same letter uploaded twice) are dropped by SimHash,
+and selection balances relevance against repeating one document. Whole
+chunks are added while they fit; the first one that doesn't is cut at a
+word boundary to fill what is left of the budget.
+
+Token counts come from the model's tokenizer when RAG_TOKENIZER names a
+tokenizer.json file or Hugging Face tokenizer and the optional `tokenizers`
+package is installed; otherwise a conservative estimate is used (it
+over-counts English text slightly, so packed context stays within budget).
+"""
+
+import hashlib
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_AVAILABLE = True
+except ImportError:
+    TOKENIZERS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+TRUNCATION_MARK = "..."
+
+# Chunks whose 64-bit SimHashes differ in at most this many bits are duplicates
+SIMHASH_MAX_DISTANCE = 3
+# Each further chunk from an already used document scores this much lower
+DOCUMENT_DIVERSITY_DECAY = 0.85
+# Don't add a truncated tail shorter than this
+MIN_PARTIAL_TOKENS = 40
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ==========================================
+# TOKEN COUNTING
+# ==========================================
+
+def estimate_tokens(text: str) -> int:
+    """Subword-style estimate: one token per punctuation mark, ~6 characters per word piece."""
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECE_RE.findall(text))
+
+
+@lru_cache(maxsize=1)
+def _load_tokenizer(name: str):
+    if not name or not TOKENIZERS_AVAILABLE:
+        return None
+    try:
+        if name.endswith(".json"):
+            return Tokenizer.from_file(name)
+        return Tokenizer.from_pretrained(name)
+    except Exception as e:
+        logger.warning(f"Tokenizer {name} unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _load_tokenizer(settings.RAG_TOKENIZER)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return estimate_tokens(text)
+
+
+# ==========================================
+# NEAR-DUPLICATES
+# ==========================================
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    weights = [0] * 64
+    for item in shingles:
+        h = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# ==========================================
+# PACKING
+# ==========================================
+
+def _truncate_to(text: str, budget: int, counter: Callable[[str], int]) -> Optional[str]:
+    """Longest word-boundary prefix of text that, with the mark, fits the budget."""
+    cuts = [m.start() for m in re.finditer(r"\s+", text)]
+    low, high, best = 0, len(cuts) - 1, None
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = text[:cuts[mid]].rstrip() + TRUNCATION_MARK
+        if counter(candidate) <= budget:
+            best, low = candidate, mid + 1
+        else:
+            high = mid - 1
+    return best
+
+
+def pack_context(
+    chunks: List[Dict[str, Any]],
+    token_budget: int,
+    counter: Callable[[str], int] = count_tokens,
+    text_key: str = "chunk_text",
+    score_key: str = "similarity_score",
+    separator: str = CHUNK_SEPARATOR,
+    label: Optional[Callable[[Dict[str, Any]], str]] = None,
+) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Pack ``chunks`` into at most ``token_budget`` tokens.
+
+    ``label(chunk)`` may prefix each chunk (e.g. "[Chunk 12]: "); the label
+    counts against the budget. Returns (context_text, chunks_used, stats).
+    """
+    separator_tokens = counter(separator)
+
+    # Drop near-duplicates, keeping the better-scoring copy
+    ranked = sorted(chunks, key=lambda c: c.get(score_key) or 0.0, reverse=True)
+    unique, fingerprints, duplicates = [], [], 0
+    for chunk in ranked:
+        text = (chunk.get(text_key) or "").strip()
+        if not text:
+            continue
+        fingerprint = simhash(text)
+        if any(hamming(fingerprint, seen) <= SIMHASH_MAX_DISTANCE for seen in fingerprints):
+            duplicates += 1
+            continue
+        fingerprints.append(fingerprint)
+        unique.append(chunk)
+
+    parts: List[str] = []
+    used: List[Dict[str, Any]] = []
+    per_document: Dict[Any, int] = {}
+    tokens = 0
+    truncated = False
+    remaining = list(unique)
+
+    while remaining and tokens < token_budget:
+        # Relevance, discounted for documents already represented
+        best = max(remaining, key=lambda c: (c.get(score_key) or 0.0)
+                   * DOCUMENT_DIVERSITY_DECAY ** per_document.get(c.get("document_id"), 0))
+        remaining.remove(best)
+
+        prefix = label(best) if label else ""
+        body = prefix + best[text_key].strip()
+        cost = counter(body) + (separator_tokens if parts else 0)
+        if tokens + cost <= token_budget:
+            parts.append(body)
+            tokens += cost
+        else:
+            space = token_budget - tokens - (separator_tokens if parts else 0)
+            if space < MIN_PARTIAL_TOKENS:
+                continue  # a shorter chunk further down may still fit whole
+            partial = _truncate_to(body, space, counter)
+            if partial is None or len(partial) <= len(prefix) + len(TRUNCATION_MARK):
+                continue
+            parts.append(partial)
+            tokens += counter(partial) + (separator_tokens if len(parts) > 1 else 0)
+            truncated = True
+        used.append(best)
+        per_document[best.get("document_id")] = per_document.get(best.get("document_id"), 0) + 1
+
+    stats = {
+        "tokens": tokens,
+        "token_budget": token_budget,
+        "candidates": len(chunks),
+        "duplicates_removed": duplicates,
+        "chunks_used": len(used),
+        "documents_used": len(per_document),
+        "truncated": truncated,
+    }
+    return separator.join(parts), used, stats
+
+
+def budget_from_characters(max_characters: int) -> int:
+    """Token budget equivalent to a legacy character limit (~4 characters per token)."""
+    return max(1, math.ceil(max_characters / 4))
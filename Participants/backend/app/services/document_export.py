@@ -0,0 +1,157 @@
+# backend/app/services/document_export.py
+"""
+Bulk document export as a streamed ZIP (see storage/zip_stream.py).
+
+The archive holds manifest.csv followed by every active document matching
+the filters, laid out as participant-<id>/<category>/<doc id>-<filename>.
+Sizes are probed concurrently before streaming so the archive layout, its
+Content-Length and its ETag are fixed; a resumed download with If-Range
+gets exactly the same bytes as long as no matching document changed.
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document import Document
+from app.services.storage.base import ByteRange, ObjectNotFoundError, RangeNotSatisfiableError
+from app.services.storage.delivery import make_etag
+from app.services.storage.zip_stream import ZipMember, ZipStream
+
+logger = logging.getLogger(__name__)
+
+Opener = Callable[[Optional[ByteRange]], Dict[str, Any]]
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = [
+    "document_id", "participant_id", "title", "category", "original_filename", "archive_path",
+    "file_size", "sha256", "mime_type", "uploaded_at", "expiry_date", "status",
+]
+
+_UNSAFE_CHARS = re.compile(r'[\x00-\x1f\\/:*?"<>|]+')
+
+
+def export_documents_query(
+    db: Session,
+    participant_id: Optional[int] = None,
+    category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """Active documents to export, in archive order; dates are inclusive upload dates (UTC)."""
+    query = db.query(Document).filter(Document.status == "active")
+    if participant_id is not None:
+        query = query.filter(Document.participant_id == participant_id)
+    if category:
+        query = query.filter(Document.category == category)
+    if date_from:
+        query = query.filter(Document.created_at >= datetime.combine(date_from, time.min, tzinfo=timezone.utc))
+    if date_to:
+        query = query.filter(Document.created_at < datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc))
+    return query.order_by(Document.participant_id, Document.category, Document.id)
+
+
+def _safe_name(value: Optional[str], fallback: str) -> str:
+    cleaned = _UNSAFE_CHARS.sub("_", value or "").strip(" .")
+    return cleaned[:150] or fallback
+
+
+def archive_path(document: Document) -> str:
+    filename = _safe_name(document.original_filename or document.filename, f"document-{document.id}")
+    category = _safe_name(document.category, "uncategorised")
+    return f"participant-{document.participant_id or 'none'}/{category}/{document.id}-{filename}"
+
+
+def probe_size(opener: Opener) -> Optional[int]:
+    """Exact object size via a one-byte ranged read; None if the object is missing."""
+    try:
+        obj = opener((0, 0))
+    except RangeNotSatisfiableError as e:
+        return e.size  # empty object
+    except (ObjectNotFoundError, FileNotFoundError):
+        return None
+    try:
+        content_range = obj.get("ContentRange")
+        if content_range:
+            return int(content_range.rsplit("/", 1)[1])
+        return obj.get("ContentLength")
+    finally:
+        obj["Body"].close()
+
+
+def _timestamp(document: Document) -> Optional[datetime]:
+    value = document.uploaded_at or document.created_at
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value
+
+
+def build_document_export(
+    documents: List[Document],
+    source_for: Callable[[Document], Optional[Opener]],
+    concurrency: Optional[int] = None,
+) -> Tuple[ZipStream, str, Dict[str, int]]:
+    """
+    Plan an export archive for ``documents``.
+
+    ``source_for(document)`` returns an opener for the document's file, or
+    None when it cannot be located. Returns (archive, etag, counts).
+    """
+    concurrency = concurrency or settings.DOCUMENT_EXPORT_CONCURRENCY
+    openers = [source_for(doc) for doc in documents]
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="export-probe") as pool:
+        sizes = list(pool.map(lambda opener: probe_size(opener) if opener else None, openers))
+
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_COLUMNS)
+    members: List[ZipMember] = []
+    identity = hashlib.sha256()
+    missing = 0
+
+    for doc, opener, size in zip(documents, openers, sizes):
+        content_hash = (doc.extra_metadata or {}).get("sha256")
+        path = archive_path(doc)
+        included = size is not None
+        if included:
+            members.append(ZipMember(
+                path,
+                size,
+                modified=_timestamp(doc),
+                opener=opener,
+                crc_key=content_hash or f"doc:{doc.id}:{doc.version}:{size}:{_timestamp(doc)}",
+            ))
+        else:
+            missing += 1
+            logger.warning(f"Export: file for document {doc.id} not found, listed as missing")
+        writer.writerow([
+            doc.id, doc.participant_id, doc.title, doc.category, doc.original_filename,
+            path if included else "", size if included else "", content_hash or "", doc.mime_type,
+            doc.uploaded_at.isoformat() if doc.uploaded_at else "",
+            doc.expiry_date.isoformat() if doc.expiry_date else "",
+            "included" if included else "missing",
+        ])
+        identity.update(f"{path}\0{size}\0{content_hash}\0{doc.version}\0{doc.updated_at}\n".encode("utf-8"))
+
+    # Excel opens a BOM-prefixed CSV as UTF-8
+    manifest_bytes = manifest.getvalue().encode("utf-8-sig")
+    newest = max((m.modified for m in members if m.modified), default=None)
+    members.insert(0, ZipMember(MANIFEST_NAME, len(manifest_bytes), modified=newest, data=manifest_bytes))
+    identity.update(manifest_bytes)
+
+    archive = ZipStream(
+        members,
+        prefetch=concurrency,
+        prefetch_max_bytes=settings.DOCUMENT_EXPORT_PREFETCH_MB * 1024 * 1024,
+    )
+    counts = {"documents": len(documents), "included": len(documents) - missing, "missing": missing}
+    return archive, make_etag(f"export-{identity.hexdigest()}"), counts
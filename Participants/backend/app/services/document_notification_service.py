@@ -1,19 +1,21 @@
 # backend/app/services/enhanced_notification_service.py - COMPLETE NOTIFICATION SYSTEM
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
-from app.models.document import Document, DocumentNotification
+from sqlalchemy import and_, case, desc, exists, func
+from app.models.document import Document, DocumentCategory, DocumentNotification
 from app.models.participant import Participant
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import smtplib
 import os
-from jinja2 import Environment, BaseLoader
 import json
 import requests  # For SMS integration
 
+from app.services.email_templates import template_engine
+
 logger = logging.getLogger(__name__)
 
 class NotificationSchedule:
@@ -58,8 +60,12 @@ class EnhancedNotificationService:
         # Notification configuration
         self.schedule = NotificationSchedule()
         
-        # Email templates
-        self.jinja_env = Environment(loader=BaseLoader())
+        # Open SMTP connection while inside smtp_batch()
+        self._smtp = None
+        self._smtp_batch_active = False
+        
+        # Email templates are compiled once per process by the shared engine
+        self.static_context = {'organization_name': self.organization_name}
         
         # Check if services are configured
         self.email_enabled = bool(self.smtp_username and self.smtp_password)
@@ -82,21 +88,23 @@ class EnhancedNotificationService:
         }
         
         try:
-            # Process expiry notifications
-            expiry_results = self.process_expiry_notifications(db)
-            self._merge_results(results, expiry_results, 'expiry')
-            
-            # Process approval notifications
-            approval_results = self.process_approval_notifications(db)
-            self._merge_results(results, approval_results, 'approval')
-            
-            # Process missing document notifications
-            missing_results = self.process_missing_document_notifications(db)
-            self._merge_results(results, missing_results, 'missing_docs')
-            
-            # Process custom scheduled notifications
-            custom_results = self.process_custom_notifications(db)
-            self._merge_results(results, custom_results, 'custom')
+            # One SMTP connection for the whole sweep
+            with self.smtp_batch():
+                # Process expiry notifications
+                expiry_results = self.process_expiry_notifications(db)
+                self._merge_results(results, expiry_results, 'expiry')
+                
+                # Process approval notifications
+                approval_results = self.process_approval_notifications(db)
+                self._merge_results(results, approval_results, 'approval')
+                
+                # Process missing document notifications
+                missing_results = self.process_missing_document_notifications(db)
+                self._merge_results(results, missing_results, 'missing_docs')
+                
+                # Process custom scheduled notifications
+                custom_results = self.process_custom_notifications(db)
+                self._merge_results(results, custom_results, 'custom')
             
             logger.info(f"Notification processing completed: {results}")
             
@@ -111,86 +119,121 @@ class EnhancedNotificationService:
         results = {'processed': 0, 'sent': 0, 'failed': 0, 'errors': []}
         
         try:
-            current_date = datetime.now().date()
+            due = self._collect_due_expiry_notifications(db, datetime.now().date())
             
-            for schedule_item in self.schedule.schedules['document_expiry']:
-                days_before = schedule_item['days_before']
-                notification_date = current_date + timedelta(days=days_before)
-                
-                # Find documents expiring on this notification date
-                expiring_docs = db.query(Document).filter(
-                    and_(
-                        func.date(Document.expiry_date) == notification_date,
-                        Document.status == 'active'
-                    )
-                ).all()
-                
-                for doc in expiring_docs:
+            with self.smtp_batch():
+                for document, participant, schedule_item in due:
                     results['processed'] += 1
                     
-                    # Check if notification already sent for this schedule
-                    existing_notification = db.query(DocumentNotification).filter(
-                        and_(
-                            DocumentNotification.document_id == doc.id,
-                            DocumentNotification.notification_type == f'expiry_{days_before}d',
-                            DocumentNotification.is_sent == True
-                        )
-                    ).first()
-                    
-                    if existing_notification:
-                        continue  # Skip if already sent
-                    
-                    # Get participant
-                    participant = db.query(Participant).filter(Participant.id == doc.participant_id).first()
-                    if not participant:
-                        continue
-                    
-                    # Send notification based on schedule
                     success = self._send_expiry_notification(
-                        db, doc, participant, schedule_item, days_before
+                        db, document, participant, schedule_item, schedule_item['days_before'],
+                        commit=False
                     )
                     
                     if success:
                         results['sent'] += 1
                     else:
                         results['failed'] += 1
+            
+            # Notification log rows for the whole batch go in one transaction
+            db.commit()
                         
         except Exception as e:
             logger.error(f"Error processing expiry notifications: {str(e)}")
             results['errors'].append(str(e))
+            db.rollback()
         
         return results
     
+    def _collect_due_expiry_notifications(self, db: Session, current_date: date) -> List[Tuple[Document, Participant, Dict]]:
+        """
+        Compute every expiry notification due today in a single query.
+        
+        Documents are matched against all schedule dates at once and
+        anti-joined against the notification log, so documents already
+        notified for their schedule slot never leave the database.
+        """
+        schedule_by_date = {
+            current_date + timedelta(days=item['days_before']): item
+            for item in self.schedule.schedules['document_expiry']
+        }
+        if not schedule_by_date:
+            return []
+        
+        expiry_day = func.date(Document.expiry_date)
+        notification_type = case(
+            {day: f"expiry_{item['days_before']}d" for day, item in schedule_by_date.items()},
+            value=expiry_day
+        )
+        already_sent = exists().where(
+            and_(
+                DocumentNotification.document_id == Document.id,
+                DocumentNotification.notification_type == notification_type,
+                DocumentNotification.is_sent == True
+            )
+        )
+        
+        # The range bounds let the expiry_date index narrow the scan
+        first_day = min(schedule_by_date)
+        last_day = max(schedule_by_date) + timedelta(days=2)
+        rows = db.query(Document, Participant, expiry_day).join(
+            Participant, Participant.id == Document.participant_id
+        ).filter(
+            and_(
+                Document.expiry_date >= datetime.combine(first_day - timedelta(days=1), datetime.min.time()),
+                Document.expiry_date < datetime.combine(last_day, datetime.min.time()),
+                expiry_day.in_(list(schedule_by_date)),
+                Document.status == 'active',
+                ~already_sent
+            )
+        ).order_by(Document.participant_id, Document.id).all()
+        
+        due = []
+        for document, participant, day in rows:
+            if not isinstance(day, date):
+                day = date.fromisoformat(str(day)[:10])
+            schedule_item = schedule_by_date.get(day)
+            if schedule_item:
+                due.append((document, participant, schedule_item))
+        return due
+    
     def process_approval_notifications(self, db: Session) -> Dict[str, Any]:
         """Process approval pending notifications"""
         results = {'processed': 0, 'sent': 0, 'failed': 0, 'errors': []}
         
         try:
-            # Find documents pending approval
-            pending_docs = db.query(Document).filter(
-                Document.status == 'pending_approval'
-            ).all()
+            current_date = datetime.now().date()
+            schedule_by_date = {
+                current_date - timedelta(days=item['days_after']): item
+                for item in self.schedule.schedules['approval_pending']
+            }
             
-            current_date = datetime.now()
+            # Documents pending approval that hit a reminder day, with their participant
+            created_day = func.date(Document.created_at)
+            rows = db.query(Document, Participant, created_day).join(
+                Participant, Participant.id == Document.participant_id
+            ).filter(
+                and_(
+                    Document.status == 'pending_approval',
+                    created_day.in_(list(schedule_by_date))
+                )
+            ).order_by(Document.id).all()
             
-            for doc in pending_docs:
-                results['processed'] += 1
-                
-                # Calculate days since submission
-                days_pending = (current_date - doc.created_at).days
-                
-                # Check if notification schedule matches
-                for schedule_item in self.schedule.schedules['approval_pending']:
-                    if days_pending == schedule_item['days_after']:
-                        # Send notification
-                        participant = db.query(Participant).filter(Participant.id == doc.participant_id).first()
-                        if participant:
-                            success = self._send_approval_reminder(db, doc, participant, schedule_item)
-                            if success:
-                                results['sent'] += 1
-                            else:
-                                results['failed'] += 1
-                        break
+            with self.smtp_batch():
+                for doc, participant, day in rows:
+                    results['processed'] += 1
+                    
+                    if not isinstance(day, date):
+                        day = date.fromisoformat(str(day)[:10])
+                    schedule_item = schedule_by_date.get(day)
+                    if not schedule_item:
+                        continue
+                    
+                    success = self._send_approval_reminder(db, doc, participant, schedule_item)
+                    if success:
+                        results['sent'] += 1
+                    else:
+                        results['failed'] += 1
                         
         except Exception as e:
             logger.error(f"Error processing approval notifications: {str(e)}")
@@ -203,19 +246,19 @@ class EnhancedNotificationService:
         results = {'processed': 0, 'sent': 0, 'failed': 0, 'errors': []}
         
         try:
-            # This would require a system to track required documents per participant
-            # For now, we'll implement a basic version
+            # Every (active participant, required category) pair without an active document
+            rows = self._missing_required_documents_query(db).order_by(
+                Participant.id, DocumentCategory.sort_order, DocumentCategory.name
+            ).all()
             
-            # Get all active participants
-            participants = db.query(Participant).filter(Participant.status == 'active').all()
+            missing_by_participant: Dict[int, Tuple[Participant, List[str]]] = {}
+            for participant, category_name in rows:
+                missing_by_participant.setdefault(participant.id, (participant, []))[1].append(category_name)
             
-            for participant in participants:
-                results['processed'] += 1
-                
-                # Check for missing required documents
-                missing_docs = self._check_missing_required_documents(db, participant.id)
-                
-                if missing_docs:
+            with self.smtp_batch():
+                for participant, missing_docs in missing_by_participant.values():
+                    results['processed'] += 1
+                    
                     success = self._send_missing_documents_notification(db, participant, missing_docs)
                     if success:
                         results['sent'] += 1
@@ -263,7 +306,7 @@ class EnhancedNotificationService:
         return results
     
     def _send_expiry_notification(self, db: Session, document: Document, participant: Participant, 
-                                schedule_item: Dict, days_before: int) -> bool:
+                                schedule_item: Dict, days_before: int, commit: bool = True) -> bool:
         """Send expiry notification via configured channels"""
         success = False
         
@@ -300,7 +343,7 @@ class EnhancedNotificationService:
                     success = True
             
             # Log notification
-            self._log_notification(db, document.id, participant.id, f'expiry_{days_before}d', success)
+            self._log_notification(db, document.id, participant.id, f'expiry_{days_before}d', success, commit=commit)
             
         except Exception as e:
             logger.error(f"Error sending expiry notification: {str(e)}")
@@ -380,8 +423,9 @@ class EnhancedNotificationService:
                 return False
             
             # Render template
-            email_template = self.jinja_env.from_string(template)
-            html_content = email_template.render(**data, organization_name=self.organization_name)
+            html_content = template_engine.render(
+                template, data, syntax='jinja', static=self.static_context
+            )
             
             # Create email
             msg = MIMEMultipart('alternative')
@@ -393,12 +437,21 @@ class EnhancedNotificationService:
             html_part = MIMEText(html_content, 'html', 'utf-8')
             msg.attach(html_part)
             
-            # Send email
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            server.send_message(msg)
-            server.quit()
+            # Send email, reusing the batch connection when one is open
+            if self._smtp is not None:
+                try:
+                    self._smtp.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # The server dropped the batch connection; reopen it for this
+                    # and the remaining sends (individual sends if that fails)
+                    logger.warning("SMTP batch connection closed by server, reconnecting")
+                    self._smtp = None
+                    self._smtp = self._open_smtp()
+                    self._smtp.send_message(msg)
+            else:
+                server = self._open_smtp()
+                server.send_message(msg)
+                server.quit()
             
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -407,6 +460,36 @@ class EnhancedNotificationService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def _open_smtp(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        server.starttls()
+        server.login(self.smtp_username, self.smtp_password)
+        return server
+    
+    @contextmanager
+    def smtp_batch(self):
+        """Send every email inside the block over a single SMTP connection"""
+        if not self.email_enabled or self._smtp_batch_active:
+            yield
+            return
+        
+        self._smtp_batch_active = True
+        try:
+            self._smtp = self._open_smtp()
+        except Exception as e:
+            logger.error(f"Could not open SMTP connection for batch, sending individually: {str(e)}")
+        
+        try:
+            yield
+        finally:
+            self._smtp_batch_active = False
+            server, self._smtp = self._smtp, None
+            if server is not None:
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+    
     def _send_sms_notification(self, phone_number: str, message: str) -> bool:
         """Send SMS notification"""
         try:
@@ -439,33 +522,37 @@ class EnhancedNotificationService:
             logger.error(f"Failed to send SMS to {phone_number}: {str(e)}")
             return False
     
+    def _missing_required_documents_query(self, db: Session):
+        """(Participant, category name) rows for required categories with no active document"""
+        has_document = exists().where(
+            and_(
+                Document.participant_id == Participant.id,
+                Document.category == DocumentCategory.category_id,
+                Document.status == 'active'
+            )
+        )
+        
+        return db.query(Participant, DocumentCategory.name).join(
+            DocumentCategory,
+            and_(
+                DocumentCategory.is_required == True,
+                DocumentCategory.is_active == True
+            )
+        ).filter(
+            and_(
+                Participant.status == 'active',
+                ~has_document
+            )
+        )
+    
     def _check_missing_required_documents(self, db: Session, participant_id: int) -> List[str]:
         """Check for missing required documents"""
         try:
-            from app.models.document import DocumentCategory
+            rows = self._missing_required_documents_query(db).filter(
+                Participant.id == participant_id
+            ).order_by(DocumentCategory.sort_order, DocumentCategory.name).all()
             
-            # Get required categories
-            required_categories = db.query(DocumentCategory).filter(
-                DocumentCategory.is_required == True,
-                DocumentCategory.is_active == True
-            ).all()
-            
-            missing_docs = []
-            
-            for category in required_categories:
-                # Check if participant has document in this category
-                existing_doc = db.query(Document).filter(
-                    and_(
-                        Document.participant_id == participant_id,
-                        Document.category == category.category_id,
-                        Document.status == 'active'
-                    )
-                ).first()
-                
-                if not existing_doc:
-                    missing_docs.append(category.name)
-            
-            return missing_docs
+            return [category_name for _, category_name in rows]
             
         except Exception as e:
             logger.error(f"Error checking missing documents: {str(e)}")
@@ -495,8 +582,9 @@ class EnhancedNotificationService:
             return False
     
     def _log_notification(self, db: Session, document_id: int, participant_id: int, 
-                         notification_type: str, success: bool, error_message: str = None):
-        """Log notification attempt"""
+                         notification_type: str, success: bool, error_message: str = None,
+                         commit: bool = True):
+        """Log notification attempt; batch callers pass commit=False and commit once"""
         try:
             notification = DocumentNotification(
                 document_id=document_id,
@@ -509,7 +597,8 @@ class EnhancedNotificationService:
             )
             
             db.add(notification)
-            db.commit()
+            if commit:
+                db.commit()
             
         except Exception as e:
             logger.error(f"Error logging notification: {str(e)}")
@@ -0,0 +1,287 @@
+# backend/app/services/document_search.py
+"""
+Full-text search over documents.
+
+PostgreSQL: GIN expression indexes over a weighted tsvector of title,
+original filename and description, and over the text of document chunks.
+The index expressions are recomputed by PostgreSQL on every insert, update
+and delete, so nothing has to be kept in sync by the application.
+
+SQLite: FTS5 tables (documents_fts, document_chunks_fts) maintained by
+triggers on documents and document_chunks.
+
+Any other database, or SQLite built without FTS5, falls back to the
+previous ilike filter.
+"""
+
+import logging
+import re
+import weakref
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, desc, inspect, text
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "english"
+
+# Chunk matches count for less than matches in the document's own fields
+CONTENT_RANK_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_QUERY_TERMS = 16
+
+
+def document_vector_sql(alias: str = "") -> str:
+    """Weighted tsvector of a document; identical in ix_documents_search and queries."""
+    p = f"{alias}." if alias else ""
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({p}title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', regexp_replace(coalesce({p}original_filename, ''), '[._-]+', ' ', 'g')), 'B') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({p}description, '')), 'C')"
+    )
+
+
+def chunk_vector_sql(alias: str = "") -> str:
+    p = f"{alias}." if alias else ""
+    return f"to_tsvector('{SEARCH_CONFIG}', {p}chunk_text)"
+
+
+# SQLite FTS5 readiness per engine, looked up once
+_sqlite_ready: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def search_dialect(db: Session) -> Optional[str]:
+    """'postgresql' or 'sqlite' when full-text search is available, else None."""
+    engine = db.get_bind()
+    name = engine.dialect.name
+    if name == "postgresql":
+        return name
+    if name == "sqlite":
+        key = getattr(engine, "engine", engine)
+        ready = _sqlite_ready.get(key)
+        if ready is None:
+            row = db.execute(text(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'table' "
+                "AND name IN ('documents_fts', 'document_chunks_fts')"
+            )).scalar()
+            ready = _sqlite_ready[key] = row == 2
+        return name if ready else None
+    return None
+
+
+def query_terms(search: Optional[str]) -> List[str]:
+    """Word tokens of a user search string; punctuation and operators are dropped."""
+    return _TOKEN_RE.findall((search or "").lower())[:MAX_QUERY_TERMS]
+
+
+def build_match_query(search: Optional[str], dialect: str) -> Optional[str]:
+    """
+    Translate free text into a prefix-matching query for the dialect.
+
+    Every term must match (AND) and each term matches as a prefix, so
+    'care pla' finds 'Care Plan 2024'.
+    """
+    terms = query_terms(search)
+    if not terms:
+        return None
+    if dialect == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def match_subquery(db: Session, search: str, participant_id: Optional[int] = None,
+                   include_content: bool = False):
+    """
+    Subquery of (document_id, rank) for documents matching ``search``.
+
+    Returns None when full-text search isn't available or the search has
+    no usable terms; callers then fall back to ilike.
+    """
+    dialect = search_dialect(db)
+    if not dialect:
+        return None
+    match_query = build_match_query(search, dialect)
+    if not match_query:
+        return None
+
+    params = {"fts_query": match_query}
+    scoped = participant_id is not None
+    if scoped:
+        params["fts_participant_id"] = participant_id
+
+    if include_content:
+        params["content_weight"] = CONTENT_RANK_WEIGHT
+
+    if dialect == "postgresql":
+        doc_vector, chunk_vector = document_vector_sql("d"), chunk_vector_sql("c")
+        doc_scope = " AND d.participant_id = :fts_participant_id" if scoped else ""
+        chunk_scope = " AND c.participant_id = :fts_participant_id" if scoped else ""
+        parts = [
+            f"SELECT d.id AS document_id, ts_rank({doc_vector}, q.query) AS score "
+            f"FROM documents d, to_tsquery('{SEARCH_CONFIG}', :fts_query) AS q(query) "
+            f"WHERE ({doc_vector}) @@ q.query{doc_scope}"
+        ]
+        if include_content:
+            parts.append(
+                f"SELECT c.document_id, max(ts_rank({chunk_vector}, q.query)) * :content_weight "
+                f"FROM document_chunks c, to_tsquery('{SEARCH_CONFIG}', :fts_query) AS q(query) "
+                f"WHERE {chunk_vector} @@ q.query{chunk_scope} GROUP BY c.document_id"
+            )
+    else:
+        # bm25() can't be called once SQLite flattens this into the outer
+        # query, so read FTS5's hidden rank column instead (bm25 by default,
+        # weighted per column via "rank MATCH"). Lower is better; negate so
+        # it sorts like ts_rank
+        doc_scope = " AND documents_fts.participant_id = :fts_participant_id" if scoped else ""
+        chunk_scope = " AND document_chunks_fts.participant_id = :fts_participant_id" if scoped else ""
+        parts = [
+            "SELECT rowid AS document_id, -documents_fts.rank AS score FROM documents_fts "
+            f"WHERE documents_fts MATCH :fts_query AND documents_fts.rank MATCH 'bm25(10.0, 5.0, 2.0)'{doc_scope}"
+        ]
+        if include_content:
+            parts.append(
+                "SELECT document_id, -min(document_chunks_fts.rank) * :content_weight FROM document_chunks_fts "
+                f"WHERE document_chunks_fts MATCH :fts_query{chunk_scope} GROUP BY document_id"
+            )
+
+    sql = (
+        "SELECT document_id, sum(score) AS rank FROM ("
+        + " UNION ALL ".join(parts)
+        + ") AS matches GROUP BY document_id"
+    )
+    return text(sql).bindparams(**params).columns(document_id=Integer, rank=Float).subquery("search_matches")
+
+
+def search_documents(
+    db: Session,
+    search: str,
+    participant_id: Optional[int] = None,
+    category: Optional[str] = None,
+    include_content: bool = False,
+    page: int = 1,
+    page_size: int = 20,
+) -> Tuple[List[Tuple[Document, float]], int]:
+    """Ranked search across all participants' active documents (or one participant's)."""
+    query = db.query(Document)
+    matches = match_subquery(db, search, participant_id, include_content)
+    if matches is not None:
+        query = db.query(Document, matches.c.rank).join(matches, matches.c.document_id == Document.id)
+    else:
+        from app.services.document_service import DocumentService
+        query = query.filter(DocumentService.search_filter(search))
+
+    query = query.filter(Document.status == "active")
+    if participant_id is not None:
+        query = query.filter(Document.participant_id == participant_id)
+    if category:
+        query = query.filter(Document.category == category)
+
+    total = query.count()
+    if matches is not None:
+        query = query.order_by(desc(matches.c.rank), desc(Document.created_at))
+    else:
+        query = query.order_by(desc(Document.created_at))
+    rows = query.offset((page - 1) * page_size).limit(page_size).all()
+
+    if matches is None:
+        return [(doc, 0.0) for doc in rows], total
+    return [(doc, float(rank or 0.0)) for doc, rank in rows], total
+
+
+# ==========================================
+# SCHEMA
+# ==========================================
+
+_SQLITE_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts (rowid, title, original_filename, description, participant_id)
+        VALUES (new.id, new.title, new.original_filename, new.description, new.participant_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_au
+    AFTER UPDATE OF title, original_filename, description, participant_id ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.id;
+        INSERT INTO documents_fts (rowid, title, original_filename, description, participant_id)
+        VALUES (new.id, new.title, new.original_filename, new.description, new.participant_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.id;
+        DELETE FROM document_chunks_fts WHERE document_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ai AFTER INSERT ON document_chunks BEGIN
+        INSERT INTO document_chunks_fts (rowid, chunk_text, document_id, participant_id)
+        VALUES (new.id, new.chunk_text, new.document_id, new.participant_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_chunks_fts_au AFTER UPDATE OF chunk_text ON document_chunks BEGIN
+        DELETE FROM document_chunks_fts WHERE rowid = old.id;
+        INSERT INTO document_chunks_fts (rowid, chunk_text, document_id, participant_id)
+        VALUES (new.id, new.chunk_text, new.document_id, new.participant_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_chunks_fts_ad AFTER DELETE ON document_chunks BEGIN
+        DELETE FROM document_chunks_fts WHERE rowid = old.id;
+    END""",
+]
+
+
+def _ensure_sqlite_search(engine) -> None:
+    with engine.begin() as conn:
+        existing = {
+            row[0] for row in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name IN ('documents_fts', 'document_chunks_fts')"
+            ))
+        }
+        if "documents_fts" not in existing:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE documents_fts USING fts5("
+                "title, original_filename, description, participant_id UNINDEXED, "
+                "tokenize = 'porter unicode61')"
+            ))
+            conn.execute(text(
+                "INSERT INTO documents_fts (rowid, title, original_filename, description, participant_id) "
+                "SELECT id, title, original_filename, description, participant_id FROM documents"
+            ))
+        if "document_chunks_fts" not in existing:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE document_chunks_fts USING fts5("
+                "chunk_text, document_id UNINDEXED, participant_id UNINDEXED, "
+                "tokenize = 'porter unicode61')"
+            ))
+            conn.execute(text(
+                "INSERT INTO document_chunks_fts (rowid, chunk_text, document_id, participant_id) "
+                "SELECT id, chunk_text, document_id, participant_id FROM document_chunks"
+            ))
+        for trigger in _SQLITE_TRIGGERS:
+            conn.execute(text(trigger))
+
+
+def _ensure_postgres_search(engine) -> None:
+    # CONCURRENTLY keeps documents writable while a large table is indexed;
+    # it cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_search "
+            f"ON documents USING GIN (({document_vector_sql()}))"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_chunks_search "
+            f"ON document_chunks USING GIN (({chunk_vector_sql()}))"
+        ))
+
+
+def ensure_document_search_schema(engine) -> None:
+    """Create the full-text indexes (PostgreSQL) or FTS5 tables and triggers (SQLite)."""
+    try:
+        tables = inspect(engine).get_table_names()
+        if "documents" not in tables or "document_chunks" not in tables:
+            return
+        if engine.dialect.name == "postgresql":
+            _ensure_postgres_search(engine)
+        elif engine.dialect.name == "sqlite":
+            _ensure_sqlite_search(engine)
+            _sqlite_ready.pop(engine, None)
+    except Exception as exc:
+        print(f'[warn] Document search schema check failed: {exc}')
@@ -1,17 +1,55 @@
 ﻿# backend/app/services/document_service.py - COMPLETE FILE WITH FIXED DELETE METHOD
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_, func
+from sqlalchemy import desc, and_, or_, func, distinct
 from app.models.document import Document, DocumentAccess, DocumentCategory, DocumentNotification
 from app.models.participant import Participant
-from typing import List, Optional, Dict, Any, Tuple
+from app.services.blob_store import is_blob_path
+from app.services.document_search import match_subquery
+from app.core.config import settings
+from typing import Callable, List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
+import copy
 import os
+import threading
+import time
 import uuid
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Dashboard statistics are cached per scope for DOCUMENT_STATS_CACHE_SECONDS;
+# scopes are ("participant", id), ("organization",) and ("analytics", id or None)
+_stats_cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+_stats_cache_lock = threading.Lock()
+
+
+def cached_document_stats(scope: Tuple, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Return stats for scope from the cache, computing them when missing or stale."""
+    ttl = settings.DOCUMENT_STATS_CACHE_SECONDS
+    if ttl <= 0:
+        return compute()
+    now = time.monotonic()
+    with _stats_cache_lock:
+        entry = _stats_cache.get(scope)
+        if entry and entry[0] > now:
+            return copy.deepcopy(entry[1])
+    stats = compute()
+    with _stats_cache_lock:
+        _stats_cache[scope] = (now + ttl, stats)
+    return copy.deepcopy(stats)
+
+
+def invalidate_document_stats(participant_id: Optional[int] = None) -> None:
+    """Drop cached stats a document change affects (all scopes when participant_id is None)."""
+    with _stats_cache_lock:
+        if participant_id is None:
+            _stats_cache.clear()
+            return
+        for scope in list(_stats_cache):
+            if scope[0] == "organization" or scope[-1] in (participant_id, None):
+                _stats_cache.pop(scope, None)
+
 class DocumentService:
     
     @staticmethod
@@ -101,6 +139,15 @@ class DocumentService:
         
         db.commit()
     
+    @staticmethod
+    def search_filter(search: str):
+        """Substring match on title, description and filename (no full-text index)"""
+        return or_(
+            Document.title.ilike(f'%{search}%'),
+            Document.description.ilike(f'%{search}%'),
+            Document.original_filename.ilike(f'%{search}%')
+        )
+    
     @staticmethod
     def get_documents_for_participant(
         db: Session,
@@ -112,21 +159,33 @@ class DocumentService:
         sort_by: str = "created_at",
         sort_order: str = "desc",
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        search_content: bool = False
     ) -> Tuple[List[Document], int]:
-        """Get documents for a participant with filtering and pagination"""
+        """Get documents for a participant with filtering and pagination
+        
+        Search returns the substring matches on title, description and
+        filename it always did, plus full-text matches (see document_search)
+        when available; search_content also matches extracted document text.
+        sort_by="relevance" orders full-text matches by rank.
+        """
         
         # Build query
         query = db.query(Document).filter(Document.participant_id == participant_id)
         
         # Apply filters
+        matches = None
         if search:
-            search_filter = or_(
-                Document.title.ilike(f'%{search}%'),
-                Document.description.ilike(f'%{search}%'),
-                Document.original_filename.ilike(f'%{search}%')
-            )
-            query = query.filter(search_filter)
+            matches = match_subquery(db, search, participant_id, include_content=search_content)
+            if matches is not None:
+                # Keep substring matches (partial words such as "lan" in "Plan",
+                # stopwords) that the full-text index does not find; the
+                # participant filter keeps the ilike cheap
+                query = query.outerjoin(matches, matches.c.document_id == Document.id).filter(
+                    or_(matches.c.document_id.isnot(None), DocumentService.search_filter(search))
+                )
+            else:
+                query = query.filter(DocumentService.search_filter(search))
         
         if category:
             query = query.filter(Document.category == category)
@@ -146,7 +205,12 @@ class DocumentService:
                 )
         
         # Apply sorting
-        if sort_order.lower() == "desc":
+        if sort_by == "relevance":
+            if matches is not None:
+                query = query.order_by(desc(func.coalesce(matches.c.rank, 0.0)), desc(Document.created_at))
+            else:
+                query = query.order_by(desc(Document.created_at))
+        elif sort_order.lower() == "desc":
             if sort_by == "created_at":
                 query = query.order_by(desc(Document.created_at))
             elif sort_by == "title":
@@ -174,52 +238,68 @@ class DocumentService:
         return documents, total
     
     @staticmethod
-    def get_document_stats(db: Session, participant_id: int) -> Dict[str, Any]:
-        """Get document statistics for a participant"""
-        
-        # Get base query
-        base_query = db.query(Document).filter(Document.participant_id == participant_id)
-        
-        # Total documents
-        total_documents = base_query.count()
+    def _expiry_conditions(now_utc: datetime) -> Tuple[Any, Any, Any]:
+        """(expired, expiring within 30 days, uploaded within 7 days) conditions"""
+        expired = and_(Document.expiry_date.isnot(None), Document.expiry_date < now_utc)
+        expiring_soon = and_(
+            Document.expiry_date.isnot(None),
+            Document.expiry_date >= now_utc,
+            Document.expiry_date <= now_utc + timedelta(days=30)
+        )
+        recent = Document.created_at >= now_utc - timedelta(days=7)
+        return expired, expiring_soon, recent
+    
+    @staticmethod
+    def _category_counts(db: Session, *filters, extra_columns=()) -> Tuple[Dict[str, int], Dict[str, Any]]:
+        """
+        Counts per active category and overall totals in a single grouped query.
+        
+        Documents without an active category are counted in the totals only.
+        Returns (by_category, totals) where totals holds total_documents,
+        expired_documents, expiring_soon, recent_uploads and any extra_columns.
+        """
+        expired, expiring_soon, recent = DocumentService._expiry_conditions(DocumentService._now_utc())
+        rows = db.query(
+            DocumentCategory.name,
+            func.count(Document.id),
+            func.count(Document.id).filter(expired),
+            func.count(Document.id).filter(expiring_soon),
+            func.count(Document.id).filter(recent),
+            *extra_columns
+        ).select_from(Document).outerjoin(
+            DocumentCategory,
+            and_(DocumentCategory.category_id == Document.category, DocumentCategory.is_active == True)
+        ).filter(*filters).group_by(DocumentCategory.name).order_by(
+            func.min(DocumentCategory.sort_order), DocumentCategory.name
+        ).all()
         
-        # Documents by category - get from database dynamically
-        categories = db.query(DocumentCategory).filter(DocumentCategory.is_active == True).all()
         by_category = {}
-        for category in categories:
-            count = base_query.filter(Document.category == category.category_id).count()
-            if count > 0:
-                by_category[category.name] = count
-        
-        # Use timezone-aware datetime for all comparisons
-        now_utc = DocumentService._now_utc()
-        
-        # Expired documents
-        expired_documents = base_query.filter(
-            and_(Document.expiry_date.isnot(None), Document.expiry_date < now_utc)
-        ).count()
+        totals = {"total_documents": 0, "expired_documents": 0, "expiring_soon": 0, "recent_uploads": 0}
+        for name, total, expired_count, expiring_count, recent_count, *extra in rows:
+            if name is not None and total > 0:
+                by_category[name] = total
+            totals["total_documents"] += total
+            totals["expired_documents"] += expired_count or 0
+            totals["expiring_soon"] += expiring_count or 0
+            totals["recent_uploads"] += recent_count or 0
+            totals["extra"] = extra
+        return by_category, totals
+    
+    @staticmethod
+    def get_document_stats(db: Session, participant_id: int) -> Dict[str, Any]:
+        """Get document statistics for a participant (one query, cached briefly)"""
+        
+        def compute():
+            by_category, totals = DocumentService._category_counts(db, Document.participant_id == participant_id)
+            return {
+                "total_documents": totals["total_documents"],
+                "by_category": by_category,
+                "expired_documents": totals["expired_documents"],
+                "expiring_soon": totals["expiring_soon"],
+                "recent_uploads": totals["recent_uploads"]
+            }
         
-        # Expiring soon (within 30 days)
-        thirty_days_from_now = now_utc + timedelta(days=30)
-        expiring_soon = base_query.filter(
-            and_(
-                Document.expiry_date.isnot(None),
-                Document.expiry_date >= now_utc,
-                Document.expiry_date <= thirty_days_from_now
-            )
-        ).count()
-        
-        # Recent uploads (last 7 days)
-        seven_days_ago = now_utc - timedelta(days=7)
-        recent_uploads = base_query.filter(Document.created_at >= seven_days_ago).count()
-        
-        return {
-            "total_documents": total_documents,
-            "by_category": by_category,
-            "expired_documents": expired_documents,
-            "expiring_soon": expiring_soon,
-            "recent_uploads": recent_uploads
-        }
+        return cached_document_stats(("participant", participant_id), compute)
     
     @staticmethod
     def create_document(
@@ -273,6 +353,7 @@ class DocumentService:
         db.add(document)
         db.commit()
         db.refresh(document)
+        invalidate_document_stats(participant_id)
         
         return document
     
@@ -318,6 +399,7 @@ class DocumentService:
         document.updated_at = DocumentService._now_utc()
         db.commit()
         db.refresh(document)
+        invalidate_document_stats(participant_id)
         
         return document
     
@@ -445,11 +527,14 @@ class DocumentService:
             logger.info(f"Deleting main document record {document_id}")
             db.delete(document)
             db.commit()
+            invalidate_document_stats(participant_id)
             logger.info(f"Successfully deleted document {document_id} from database")
             
             # STEP 8: Delete file from disk (do this last, after successful DB deletion)
             try:
-                if file_path and os.path.exists(file_path):
+                if is_blob_path(file_path):
+                    logger.info(f"File is a shared blob, left for blob collection: {file_path}")
+                elif file_path and os.path.exists(file_path):
                     os.remove(file_path)
                     logger.info(f"Successfully deleted file: {file_path}")
                 else:
@@ -546,57 +631,24 @@ class DocumentService:
     
     @staticmethod
     def get_organization_document_stats(db: Session) -> Dict[str, Any]:
-        """Get organization-wide document statistics"""
-        
-        now_utc = DocumentService._now_utc()
-        
-        # Total documents
-        total_documents = db.query(Document).filter(Document.status == "active").count()
-        
-        # Total participants with documents
-        participants_with_docs = db.query(Document.participant_id).distinct().count()
-        
-        # Documents by category
-        categories = db.query(DocumentCategory).filter(DocumentCategory.is_active == True).all()
-        by_category = {}
-        for category in categories:
-            count = db.query(Document).filter(
-                and_(Document.category == category.category_id, Document.status == "active")
-            ).count()
-            if count > 0:
-                by_category[category.name] = count
-        
-        # Expired documents across organization
-        expired_documents = db.query(Document).filter(
-            and_(
-                Document.expiry_date.isnot(None),
-                Document.expiry_date < now_utc,
-                Document.status == "active"
+        """Get organization-wide document statistics (one query, cached briefly)"""
+        
+        def compute():
+            # Participants are counted across all documents, not only active ones
+            participants_with_docs = db.query(
+                func.count(distinct(Document.participant_id))
+            ).scalar_subquery()
+            by_category, totals = DocumentService._category_counts(
+                db, Document.status == "active", extra_columns=(participants_with_docs,)
             )
-        ).count()
+            extra = totals.get("extra")
+            return {
+                "total_documents": totals["total_documents"],
+                "participants_with_documents": extra[0] if extra else db.query(participants_with_docs).scalar(),
+                "by_category": by_category,
+                "expired_documents": totals["expired_documents"],
+                "expiring_soon": totals["expiring_soon"],
+                "recent_uploads": totals["recent_uploads"]
+            }
         
-        # Expiring soon
-        thirty_days_from_now = now_utc + timedelta(days=30)
-        expiring_soon = db.query(Document).filter(
-            and_(
-                Document.expiry_date.isnot(None),
-                Document.expiry_date >= now_utc,
-                Document.expiry_date <= thirty_days_from_now,
-                Document.status == "active"
-            )
-        ).count()
-        
-        # Recent uploads
-        seven_days_ago = now_utc - timedelta(days=7)
-        recent_uploads = db.query(Document).filter(
-            and_(Document.created_at >= seven_days_ago, Document.status == "active")
-        ).count()
-        
-        return {
-            "total_documents": total_documents,
-            "participants_with_documents": participants_with_docs,
-            "by_category": by_category,
-            "expired_documents": expired_documents,
-            "expiring_soon": expiring_soon,
-            "recent_uploads": recent_uploads
-        }
\ No newline at end of file
+        return cached_document_stats(("organization",), compute)
\ No newline at end of file
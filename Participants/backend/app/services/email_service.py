@@ -10,6 +10,8 @@ import logging
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from app.services.email_templates import template_engine
+
 logger = logging.getLogger(__name__)
 
 class EmailService:
@@ -31,6 +33,15 @@ class EmailService:
         self.organization_address = os.getenv('ORGANIZATION_ADDRESS', '123 Service Street, City, State')
         self.organization_website = os.getenv('ORGANIZATION_WEBSITE', 'www.yourprovider.com.au')
         
+        # Organisation details are folded into the compiled templates once per process
+        self.static_context = {
+            'organization_name': self.organization_name,
+            'organization_phone': self.organization_phone,
+            'organization_email': self.organization_email,
+            'organization_address': self.organization_address,
+            'organization_website': self.organization_website,
+        }
+        
         # Check if email is configured
         self.is_configured = bool(self.smtp_username and self.smtp_password)
         if not self.is_configured:
@@ -70,7 +81,7 @@ class EmailService:
             return self._send_email(
                 to_email=referral.referrer_email,
                 subject=subject,
-                html_content=template.format(**template_data),
+                html_content=self._render(template, template_data),
                 recipient_name=template_data['referrer_name']
             )
             
@@ -123,7 +134,7 @@ class EmailService:
             return self._send_email(
                 to_email=admin_email,
                 subject=subject,
-                html_content=template.format(**template_data),
+                html_content=self._render(template, template_data),
                 recipient_name="Administrator"
             )
             
@@ -166,7 +177,7 @@ class EmailService:
             return self._send_email(
                 to_email=referral.referrer_email,
                 subject=subject,
-                html_content=template.format(**template_data),
+                html_content=self._render(template, template_data),
                 recipient_name=template_data['referrer_name']
             )
             
@@ -203,7 +214,7 @@ class EmailService:
             return self._send_email(
                 to_email=referral.referrer_email,
                 subject=subject,
-                html_content=template.format(**template_data),
+                html_content=self._render(template, template_data),
                 recipient_name=template_data['referrer_name']
             )
             
@@ -261,7 +272,7 @@ class EmailService:
             success = self._send_email(
                 to_email=envelope.signer_email,
                 subject=subject,
-                html_content=template.format(**template_data),
+                html_content=self._render(template, template_data),
                 recipient_name=envelope.signer_name
             )
             
@@ -322,7 +333,7 @@ class EmailService:
                 if self._send_email(
                     to_email=participant.email_address,
                     subject=subject,
-                    html_content=template.format(**template_data),
+                    html_content=self._render(template, template_data),
                     recipient_name=template_data['participant_name']
                 ):
                     recipients_notified += 1
@@ -337,7 +348,7 @@ class EmailService:
                 if self._send_email(
                     to_email=participant.rep_email_address,
                     subject=f"[For {participant.first_name} {participant.last_name}] {subject}",
-                    html_content=template.format(**rep_template_data),
+                    html_content=self._render(template, rep_template_data),
                     recipient_name=rep_template_data['participant_name']
                 ):
                     recipients_notified += 1
@@ -360,7 +371,7 @@ class EmailService:
                 self._send_email(
                     to_email=admin_email,
                     subject=admin_subject,
-                    html_content=admin_template.format(**admin_data),
+                    html_content=self._render(admin_template, admin_data),
                     recipient_name="Administrator"
                 )
             
@@ -418,7 +429,7 @@ class EmailService:
                 if self._send_email(
                     to_email=participant.email_address,
                     subject=subject,
-                    html_content=template.format(**template_data),
+                    html_content=self._render(template, template_data),
                     recipient_name=template_data['participant_name']
                 ):
                     recipients_notified += 1
@@ -433,7 +444,7 @@ class EmailService:
                 if self._send_email(
                     to_email=participant.rep_email_address,
                     subject=f"[For {participant.first_name} {participant.last_name}] {subject}",
-                    html_content=template.format(**rep_template_data),
+                    html_content=self._render(template, rep_template_data),
                     recipient_name=rep_template_data['participant_name']
                 ):
                     recipients_notified += 1
@@ -476,7 +487,7 @@ class EmailService:
                 return self._send_email(
                     to_email=admin_email,
                     subject=admin_subject,
-                    html_content=template.format(**template_data),
+                    html_content=self._render(template, template_data),
                     recipient_name="Administrator"
                 )
             
@@ -511,7 +522,7 @@ class EmailService:
             return self._send_email(
                 to_email=recipient_email,
                 subject=subject,
-                html_content=template.format(**template_data),
+                html_content=self._render(template, template_data),
                 recipient_name="Administrator"
             )
             
@@ -592,6 +603,14 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def _render(self, template: str, template_data: Dict[str, Any]) -> str:
+        """Render a template through the shared compiled-template cache"""
+        return template_engine.render(template, template_data, static=self.static_context)
+    
+    def render_batch(self, template: str, rows: List[Dict[str, Any]]) -> List[str]:
+        """Render one template for a mailing list, compiling it only once"""
+        return template_engine.render_many(template, rows, static=self.static_context)
+    
     def _format_category(self, category: str) -> str:
         """Format category for display"""
         category_names = {
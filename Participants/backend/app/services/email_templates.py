@@ -0,0 +1,221 @@
+# backend/app/services/email_templates.py
+"""
+Compiled, cached rendering for notification email templates.
+
+EmailService keeps its templates as ``str.format`` strings and
+EnhancedNotificationService keeps Jinja strings. Both used to re-parse the
+full HTML on every send. The engine here parses each template once per
+process, folds static values (organisation name, phone, ...) into the
+compiled plan, and renders many recipients against one plan.
+"""
+import logging
+import string
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from jinja2 import BaseLoader, Environment, Template
+
+logger = logging.getLogger(__name__)
+
+_FORMATTER = string.Formatter()
+
+
+def _field_root(field_name: str) -> str:
+    """Return the top-level key of a format field (``doc.title`` -> ``doc``)."""
+    for i, ch in enumerate(field_name):
+        if ch in '.[':
+            return field_name[:i]
+    return field_name
+
+
+def _format_value(value: Any, conversion: Optional[str], format_spec: str) -> str:
+    if conversion:
+        value = _FORMATTER.convert_field(value, conversion)
+    return format(value, format_spec)
+
+
+class FormatPlan:
+    """A ``str.format`` template parsed once into literal and field segments."""
+
+    __slots__ = ('segments',)
+
+    def __init__(self, segments: List[Union[str, Tuple[str, bool, Optional[str], str]]]):
+        self.segments = segments
+
+    @classmethod
+    def parse(cls, source: str) -> 'FormatPlan':
+        segments: List[Any] = []
+        for literal, field_name, format_spec, conversion in _FORMATTER.parse(source):
+            if literal:
+                if segments and isinstance(segments[-1], str):
+                    segments[-1] += literal
+                else:
+                    segments.append(literal)
+            if field_name is not None:
+                simple = _field_root(field_name) == field_name
+                segments.append((field_name, simple, conversion, format_spec or ''))
+        return cls(segments)
+
+    @property
+    def field_names(self) -> List[str]:
+        return [seg[0] for seg in self.segments if not isinstance(seg, str)]
+
+    @property
+    def has_jinja_markup(self) -> bool:
+        """True for hybrid templates whose escaped braces produce Jinja tags."""
+        return any(
+            isinstance(seg, str) and ('{%' in seg or '{{' in seg)
+            for seg in self.segments
+        )
+
+    def bind(self, static: Dict[str, Any]) -> 'FormatPlan':
+        """Return a plan with every field resolvable from ``static`` pre-rendered."""
+        segments: List[Any] = []
+        for seg in self.segments:
+            if not isinstance(seg, str) and _field_root(seg[0]) in static:
+                seg = self._render_field(seg, static)
+            if isinstance(seg, str) and segments and isinstance(segments[-1], str):
+                segments[-1] += seg
+            else:
+                segments.append(seg)
+        return FormatPlan(segments)
+
+    def render(self, data: Dict[str, Any]) -> str:
+        parts = []
+        append = parts.append
+        for seg in self.segments:
+            if isinstance(seg, str):
+                append(seg)
+            else:
+                append(self._render_field(seg, data))
+        return ''.join(parts)
+
+    @staticmethod
+    def _render_field(seg: Tuple[str, bool, Optional[str], str], data: Dict[str, Any]) -> str:
+        field_name, simple, conversion, format_spec = seg
+        if simple:
+            value = data[field_name]
+        else:
+            value, _ = _FORMATTER.get_field(field_name, (), data)
+        if '{' in format_spec:
+            format_spec = _FORMATTER.vformat(format_spec, (), data)
+        return _format_value(value, conversion, format_spec)
+
+    def to_jinja_source(self) -> str:
+        """Translate the plan into equivalent Jinja source."""
+        parts = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                parts.append(seg)
+                continue
+            field_name, _, conversion, format_spec = seg
+            if conversion or format_spec:
+                parts.append(
+                    '{{ %s|format_field(%r, %r) }}' % (field_name, conversion, format_spec)
+                )
+            else:
+                parts.append('{{ %s }}' % field_name)
+        return ''.join(parts)
+
+
+class JinjaPlan:
+    """A compiled Jinja template with optional bound static context."""
+
+    __slots__ = ('template', 'static')
+
+    def __init__(self, template: Template, static: Optional[Dict[str, Any]] = None):
+        self.template = template
+        self.static = static or {}
+
+    def bind(self, static: Dict[str, Any]) -> 'JinjaPlan':
+        return JinjaPlan(self.template, {**self.static, **static})
+
+    def render(self, data: Dict[str, Any]) -> str:
+        if self.static:
+            data = {**self.static, **data}
+        return self.template.render(data)
+
+
+class TemplateEngine:
+    """Process-wide cache of compiled email templates."""
+
+    def __init__(self, max_templates: int = 256):
+        self.max_templates = max_templates
+        self.environment = Environment(loader=BaseLoader(), auto_reload=False)
+        self.environment.filters['format_field'] = lambda value, conversion, spec: _format_value(value, conversion, spec)
+        self._plans: 'OrderedDict[Tuple, Union[FormatPlan, JinjaPlan]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source: str, syntax: str = 'format',
+                static: Optional[Dict[str, Any]] = None) -> Union[FormatPlan, JinjaPlan]:
+        """
+        Return the compiled plan for ``source``, building it on first use.
+
+        ``syntax`` is ``'format'`` for ``str.format`` templates or ``'jinja'``.
+        Hybrid format templates that expand to Jinja tags are compiled to
+        Jinja so their loops are actually evaluated.
+        """
+        static_key = tuple(sorted(static.items())) if static else ()
+        key = (syntax, source, static_key)
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        plan = self._build(source, syntax)
+        if static:
+            plan = plan.bind(static)
+
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_templates:
+                self._plans.popitem(last=False)
+        return plan
+
+    def _build(self, source: str, syntax: str) -> Union[FormatPlan, JinjaPlan]:
+        if syntax == 'jinja':
+            return JinjaPlan(self.environment.from_string(source))
+        if syntax != 'format':
+            raise ValueError(f"Unknown template syntax: {syntax}")
+
+        plan = FormatPlan.parse(source)
+        if plan.has_jinja_markup:
+            return JinjaPlan(self.environment.from_string(plan.to_jinja_source()))
+        return plan
+
+    def render(self, source: str, data: Dict[str, Any], syntax: str = 'format',
+               static: Optional[Dict[str, Any]] = None) -> str:
+        return self.compile(source, syntax, static).render(data)
+
+    def render_many(self, source: str, rows: Iterable[Dict[str, Any]], syntax: str = 'format',
+                    static: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Render one template for many recipients against a single compiled plan."""
+        plan = self.compile(source, syntax, static)
+        return [plan.render(row) for row in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'cached_templates': len(self._plans),
+                'max_templates': self.max_templates,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+template_engine = TemplateEngine()
@@ -1,59 +1,40 @@
 ﻿"""
-Embedding Service for generating vector embeddings using Watsonx.
+Embedding Service for generating vector embeddings.
+
+Vectors come from the configured embedding provider (watsonx, a local
+sentence-transformers model or the hashing vectorizer; see
+app/services/embeddings).
 """
 from typing import List, Optional, Dict, Any
 import logging
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.document_chunk import DocumentChunk
+from app.services.embeddings import EmbeddingProvider, get_embedding_provider
 
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingService:
-    """Service for generating and managing embeddings using Watsonx"""
+    """Service for generating and managing embeddings"""
     
-    def __init__(self):
-        self.model_id = settings.EMBEDDINGS_MODEL
-        self.embeddings_available = settings.is_embeddings_configured
+    def __init__(self, provider: Optional[EmbeddingProvider] = None):
+        self.provider = provider or get_embedding_provider()
+        self.embeddings_available = self.provider is not None
+        self.model_id = self.provider.model_id if self.provider else settings.EMBEDDINGS_MODEL
         
-        if self.embeddings_available:
-            try:
-                from ibm_watsonx_ai import Credentials
-                from ibm_watsonx_ai.foundation_models import Embeddings
-                
-                credentials = Credentials(
-                    url=settings.WATSONX_URL,
-                    api_key=settings.WATSONX_API_KEY
-                )
-                
-                self.embeddings = Embeddings(
-                    model_id=self.model_id,
-                    credentials=credentials,
-                    project_id=settings.WATSONX_PROJECT_ID
-                )
-                
-                logger.info(f"Embeddings initialized with model: {self.model_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to initialize embeddings: {e}")
-                self.embeddings_available = False
-                self.embeddings = None
-        else:
-            self.embeddings = None
+        if not self.embeddings_available:
             logger.warning("Embeddings not configured - using keyword search only")
     
     def generate_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding vector for a single text"""
-        if not self.embeddings_available or not self.embeddings:
+        if not self.embeddings_available:
             return None
         
         try:
-            result = self.embeddings.embed_documents([text])
-            if result and len(result) > 0:
-                return result[0]
-            return None
+            return self.provider.embed_query(text)
             
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
@@ -61,11 +42,11 @@ class EmbeddingService:
     
     def generate_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
         """Generate embeddings for multiple texts"""
-        if not self.embeddings_available or not self.embeddings:
+        if not self.embeddings_available:
             return [None] * len(texts)
         
         try:
-            results = self.embeddings.embed_documents(texts)
+            results = self.provider.embed(texts)
             return results if results else [None] * len(texts)
             
         except Exception as e:
@@ -79,25 +60,20 @@ class EmbeddingService:
             return 0
         
         try:
+            # Unembedded chunks, and chunks embedded by a different model
             chunks = db.query(DocumentChunk).filter(
                 DocumentChunk.document_id == document_id,
-                DocumentChunk.embedding_vector.is_(None)
+                or_(
+                    DocumentChunk.embedding_vector.is_(None),
+                    DocumentChunk.embedding_model.is_(None),
+                    DocumentChunk.embedding_model != self.model_id
+                )
             ).all()
             
             if not chunks:
                 return 0
             
-            texts = [chunk.chunk_text for chunk in chunks]
-            embeddings = self.generate_embeddings_batch(texts)
-            
-            embedded_count = 0
-            for chunk, embedding in zip(chunks, embeddings):
-                if embedding:
-                    chunk.embedding_vector = embedding
-                    chunk.embedding_model = self.model_id
-                    embedded_count += 1
-            
-            db.commit()
+            embedded_count = self.embed_chunks(db, chunks)
             logger.info(f"Embedded {embedded_count}/{len(chunks)} chunks for document {document_id}")
             return embedded_count
             
@@ -106,7 +82,22 @@ class EmbeddingService:
             db.rollback()
             return 0
     
-    def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
+    def embed_chunks(self, db: Session, chunks: List[DocumentChunk]) -> int:
+        """Embed ``chunks`` with the current model and commit; returns how many got a vector"""
+        embeddings = self.generate_embeddings_batch([chunk.chunk_text for chunk in chunks])
+        
+        embedded_count = 0
+        for chunk, embedding in zip(chunks, embeddings):
+            if embedding:
+                chunk.embedding_vector = embedding
+                chunk.embedding_model = self.model_id
+                embedded_count += 1
+        
+        db.commit()
+        return embedded_count
+    
+    @staticmethod
+    def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors"""
         import math
         
@@ -137,7 +128,8 @@ class EmbeddingService:
                 return []
             
             query = db.query(DocumentChunk).filter(
-                DocumentChunk.embedding_vector.isnot(None)
+                DocumentChunk.embedding_vector.isnot(None),
+                DocumentChunk.embedding_model == self.model_id
             )
             
             if participant_id:
@@ -0,0 +1,159 @@
+# backend/app/services/embeddings/__init__.py
+"""
+Embedding providers.
+
+get_embedding_provider() returns a process-wide provider chosen by
+EMBEDDINGS_PROVIDER: "watsonx" (default, remote), "local" (a
+sentence-transformers model in-process) or "hashing" (a dependency-free
+vectorizer). If the configured provider can't be built (no credentials,
+package or model), EMBEDDINGS_FALLBACK is used instead, so semantic search
+keeps working offline. Providers are built once and reused.
+
+A failed build is retried after EMBEDDINGS_RETRY_SECONDS, doubling per
+failure up to EMBEDDINGS_RETRY_MAX_SECONDS, so a transient error (an IAM
+timeout at startup) doesn't pin a worker to the fallback. Switching to and
+from the fallback is logged as an error and reported by
+embedding_provider_status(); chunks store the model that embedded them and
+RAGService re-embeds a participant's stale chunks on their next search once
+the configured provider is back.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.embeddings.base import EmbeddingError, EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+_PROVIDER_ALIASES = {
+    "watsonx": "watsonx",
+    "local": "local",
+    "sentence-transformers": "local",
+    "hashing": "hashing",
+}
+
+_providers: Dict[str, Optional[EmbeddingProvider]] = {}
+_providers_lock = threading.Lock()
+# Provider -> (monotonic time of next attempt, failed attempts, last error)
+_failures: Dict[str, Tuple[float, int, str]] = {}
+_fallback_active = False
+
+
+def _build_provider(name: str) -> EmbeddingProvider:
+    if name == "watsonx":
+        from app.services.embeddings.watsonx import WatsonxEmbeddings
+        return WatsonxEmbeddings(
+            settings.EMBEDDINGS_MODEL,
+            settings.WATSONX_URL,
+            settings.WATSONX_API_KEY,
+            settings.WATSONX_PROJECT_ID,
+            batch_size=settings.EMBEDDINGS_BATCH_SIZE,
+        )
+    if name == "local":
+        from app.services.embeddings.local import SentenceTransformerEmbeddings
+        return SentenceTransformerEmbeddings(
+            settings.EMBEDDINGS_LOCAL_MODEL,
+            batch_size=settings.EMBEDDINGS_BATCH_SIZE,
+            backend=settings.EMBEDDINGS_LOCAL_BACKEND,
+        )
+    if name == "hashing":
+        from app.services.embeddings.local import HashingEmbeddings
+        return HashingEmbeddings(
+            settings.EMBEDDINGS_DIMENSIONS,
+            batch_size=settings.EMBEDDINGS_BATCH_SIZE,
+            workers=settings.EMBEDDINGS_WORKERS,
+        )
+    raise EmbeddingError(f"Unknown embedding provider: {name}")
+
+
+def _provider(name: str) -> Optional[EmbeddingProvider]:
+    """Shared provider called ``name``; None if it can't be built (retried with backoff)."""
+    key = _PROVIDER_ALIASES.get(name.lower())
+    if key is None:
+        logger.error(f"Unknown embedding provider: {name}")
+        return None
+    if key in _providers:
+        return _providers[key]
+    with _providers_lock:
+        if key in _providers:
+            return _providers[key]
+        failure = _failures.get(key)
+        if failure and failure[0] > time.monotonic():
+            return None
+        try:
+            provider = _build_provider(key)
+        except Exception as e:
+            attempts = failure[1] + 1 if failure else 1
+            delay = min(settings.EMBEDDINGS_RETRY_MAX_SECONDS, settings.EMBEDDINGS_RETRY_SECONDS * 2 ** (attempts - 1))
+            _failures[key] = (time.monotonic() + delay, attempts, str(e))
+            logger.error(f"Embedding provider {key} unavailable (attempt {attempts}, retrying in {delay:.0f}s): {e}")
+            return None
+        _providers[key] = provider
+        _failures.pop(key, None)
+        logger.info(f"Embeddings initialized: {key} ({provider.model_id})")
+        return provider
+
+
+def get_embedding_provider(name: Optional[str] = None) -> Optional[EmbeddingProvider]:
+    """The provider called ``name``, or the configured one (with fallback); None if none works."""
+    global _fallback_active
+    if name:
+        return _provider(name)
+    provider = _provider(settings.EMBEDDINGS_PROVIDER)
+    fallback = provider is None and bool(settings.EMBEDDINGS_FALLBACK)
+    if fallback:
+        provider = _provider(settings.EMBEDDINGS_FALLBACK)
+    if fallback != _fallback_active:
+        _fallback_active = fallback
+        if fallback:
+            logger.error(
+                f"Embedding provider {settings.EMBEDDINGS_PROVIDER} unavailable; embedding with "
+                f"{settings.EMBEDDINGS_FALLBACK} until it recovers (vectors from different models are not comparable)"
+            )
+        else:
+            logger.warning(f"Embedding provider {settings.EMBEDDINGS_PROVIDER} recovered; fallback no longer used")
+    return provider
+
+
+def embedding_provider_status() -> Dict[str, Any]:
+    """Configured provider, whether the fallback is in use and pending rebuilds, for rag-status."""
+    now = time.monotonic()
+    with _providers_lock:
+        failures = {
+            key: {"attempts": attempts, "error": error, "retry_in_seconds": max(0, round(retry_at - now))}
+            for key, (retry_at, attempts, error) in _failures.items()
+        }
+        ready = sorted(key for key, provider in _providers.items() if provider is not None)
+    return {
+        "configured": settings.EMBEDDINGS_PROVIDER,
+        "fallback": settings.EMBEDDINGS_FALLBACK or None,
+        "fallback_active": _fallback_active,
+        "ready": ready,
+        "failures": failures,
+    }
+
+
+def set_embedding_provider(name: str, provider: Optional[EmbeddingProvider]) -> None:
+    """Replace a provider, e.g. swap in HashingEmbeddings for "watsonx" in tests."""
+    with _providers_lock:
+        _providers[_PROVIDER_ALIASES.get(name.lower(), name.lower())] = provider
+
+
+def reset_embedding_providers() -> None:
+    global _fallback_active
+    with _providers_lock:
+        _providers.clear()
+        _failures.clear()
+        _fallback_active = False
+
+
+__all__ = [
+    "EmbeddingError",
+    "EmbeddingProvider",
+    "embedding_provider_status",
+    "get_embedding_provider",
+    "reset_embedding_providers",
+    "set_embedding_provider",
+]
@@ -0,0 +1,40 @@
+# backend/app/services/embeddings/base.py
+"""
+Embedding provider interface.
+
+A provider turns texts into vectors; model_id is stored with every chunk
+vector (DocumentChunk.embedding_model), so vectors from different
+providers or models are never compared with each other.
+"""
+from typing import List, Optional
+
+
+class EmbeddingError(Exception):
+    """Raised when an embedding provider can't be built or fails."""
+
+
+class EmbeddingProvider:
+    """Base class; subclasses implement _embed_batch."""
+
+    name = "base"
+
+    def __init__(self, model_id: str, batch_size: int = 64, dimensions: Optional[int] = None):
+        self.model_id = model_id
+        self.batch_size = max(1, batch_size)
+        self.dimensions = dimensions
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Vectors for ``texts``, in order, sent to the model batch_size at a time."""
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    def status(self) -> dict:
+        return {"provider": self.name, "model": self.model_id, "dimensions": self.dimensions}
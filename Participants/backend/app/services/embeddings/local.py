@@ -0,0 +1,175 @@
+# backend/app/services/embeddings/local.py
+"""
+In-process embedding providers for offline and air-gapped deployments.
+
+"local" runs a sentence-transformers model on the CPU (torch, or ONNX /
+OpenVINO where sentence-transformers supports them), encoding whole batches
+at once. "hashing" needs no model or download: signed feature hashing of
+words and word pairs. Vectors are only comparable with other vectors from
+the same scheme, but it is deterministic, dependency-free and fast enough
+to embed thousands of chunks per second; NumPy is used when installed and
+large batches can be spread over EMBEDDINGS_WORKERS processes.
+"""
+import logging
+import math
+import re
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+from typing import List, Optional
+
+from app.services.embeddings.base import EmbeddingError, EmbeddingProvider
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SentenceTransformerEmbeddings(EmbeddingProvider):
+    """sentence-transformers model on the CPU; vectors are L2-normalised."""
+
+    name = "local"
+
+    def __init__(self, model_name: str, batch_size: int = 64, backend: str = "torch"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise EmbeddingError(f"sentence-transformers is not installed: {e}")
+
+        options = {"device": "cpu"}
+        if backend and backend != "torch":
+            options["backend"] = backend
+        try:
+            self.model = SentenceTransformer(model_name, **options)
+        except Exception as e:
+            raise EmbeddingError(f"Could not load embedding model {model_name}: {e}")
+        super().__init__(model_name, batch_size, self.model.get_sentence_embedding_dimension())
+        self.backend = backend
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        ).tolist()
+
+    def status(self) -> dict:
+        return dict(super().status(), backend=self.backend)
+
+
+# ==========================================
+# HASHING
+# ==========================================
+
+# Bump when the features change, so stored vectors are re-embedded
+HASHING_SCHEME = "hashing-v1"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by does for from has have he her his in is it of on or she "
+    "that the their they this to was what when where which who with".split()
+)
+BIGRAM_WEIGHT = 0.5
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(feature: str, dim: int):
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+def _features(text: str):
+    words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+    return [(w, 1.0) for w in words] + [(f"{a} {b}", BIGRAM_WEIGHT) for a, b in zip(words, words[1:])]
+
+
+def _hash_matrix(texts: List[str], dim: int):
+    """NumPy float32 matrix of hashed feature vectors; cheap to send between processes."""
+    rows, columns, values = [], [], []
+    for row, text in enumerate(texts):
+        for feature, weight in _features(text):
+            column, sign = _bucket(feature, dim)
+            rows.append(row)
+            columns.append(column)
+            values.append(sign * weight)
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)),
+              np.asarray(values, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def hash_texts(texts: List[str], dim: int) -> List[List[float]]:
+    """L2-normalised hashed feature vectors."""
+    if NUMPY_AVAILABLE:
+        return _hash_matrix(texts, dim).tolist()
+
+    vectors = []
+    for text in texts:
+        vector = [0.0] * dim
+        for feature, weight in _features(text):
+            column, sign = _bucket(feature, dim)
+            vector[column] += sign * weight
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        vectors.append([v / norm for v in vector])
+    return vectors
+
+
+class HashingEmbeddings(EmbeddingProvider):
+    """Feature-hashing vectorizer; no model, no network, deterministic across processes."""
+
+    name = "hashing"
+
+    # Below this many texts a batch isn't worth sending to other processes
+    PARALLEL_MIN_TEXTS = 512
+
+    def __init__(self, dimensions: int = 384, batch_size: int = 64, workers: int = 0):
+        super().__init__(f"{HASHING_SCHEME}-{dimensions}", batch_size, dimensions)
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a threaded server process is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+            return self._pool
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return hash_texts(texts, self.dimensions)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if self.workers > 1 and len(texts) >= self.PARALLEL_MIN_TEXTS:
+            size = math.ceil(len(texts) / self.workers)
+            slices = [texts[i:i + size] for i in range(0, len(texts), size)]
+            try:
+                if NUMPY_AVAILABLE:
+                    return np.vstack(list(self._get_pool().map(
+                        _hash_matrix, slices, [self.dimensions] * len(slices)
+                    ))).tolist()
+                vectors: List[List[float]] = []
+                for part in self._get_pool().map(hash_texts, slices, [self.dimensions] * len(slices)):
+                    vectors.extend(part)
+                return vectors
+            except Exception as e:
+                logger.warning(f"Embedding worker processes failed, embedding in-process: {e}")
+                with self._pool_lock:
+                    pool, self._pool = self._pool, None
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+        return hash_texts(texts, self.dimensions)
+
+    def status(self) -> dict:
+        return dict(super().status(), workers=self.workers, numpy=NUMPY_AVAILABLE)
@@ -0,0 +1,32 @@
+# backend/app/services/embeddings/watsonx.py
+from typing import List
+
+from app.services.embeddings.base import EmbeddingError, EmbeddingProvider
+
+
+class WatsonxEmbeddings(EmbeddingProvider):
+    """watsonx.ai Embeddings (remote; one round trip per batch)."""
+
+    name = "watsonx"
+
+    def __init__(self, model_id: str, url: str, api_key: str, project_id: str, batch_size: int = 64):
+        super().__init__(model_id, batch_size)
+        if not (url and api_key and project_id):
+            raise EmbeddingError("Watsonx embeddings are not configured")
+        try:
+            from ibm_watsonx_ai import Credentials
+            from ibm_watsonx_ai.foundation_models import Embeddings
+        except ImportError as e:
+            raise EmbeddingError(f"ibm-watsonx-ai is not installed: {e}")
+
+        self.embeddings = Embeddings(
+            model_id=model_id,
+            credentials=Credentials(url=url, api_key=api_key),
+            project_id=project_id
+        )
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.embeddings.embed_documents(texts)
+        if not vectors or len(vectors) != len(texts):
+            raise EmbeddingError("Watsonx returned no embeddings")
+        return vectors
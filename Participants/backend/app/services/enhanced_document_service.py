@@ -1,18 +1,30 @@
 # backend/app/services/enhanced_document_service.py - COMPLETE IMPLEMENTATION
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, desc, func, insert, inspect as sa_inspect, select, update
 from app.models.document import Document, DocumentAccess, DocumentNotification
 from app.models.participant import Participant
 from app.models.document_workflow import DocumentWorkflow, DocumentApproval, WorkflowType, WorkflowStatus, DocumentVersion
+from app.services.storage import get_storage
+from app.services.storage.integrity import scan_storage
+from app.services.document_service import cached_document_stats, invalidate_document_stats
+from app.services.blob_store import recount_blob_refs
+from app.services.ai.generation_cache import invalidate_participant_generations
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
 import os
 import uuid
-from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Documents loaded, versioned and updated per round trip in bulk updates
+BULK_UPDATE_BATCH_SIZE = 500
+
+
+def _json_safe(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata values as stored in change_metadata JSON (datetimes as ISO strings)"""
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in values.items()}
+
 class EnhancedDocumentService:
     
     @staticmethod
@@ -98,6 +110,7 @@ class EnhancedDocumentService:
             db.refresh(document)
             if workflow:
                 db.refresh(workflow)
+            invalidate_document_stats(participant_id)
             
             logger.info(f"Created document {document.id} with workflow: {workflow.id if workflow else 'None'}")
             return document, workflow
@@ -167,6 +180,7 @@ class EnhancedDocumentService:
             
             db.commit()
             db.refresh(approval)
+            invalidate_document_stats(document.participant_id)
             
             logger.info(f"Document {document_id} approved by {approver_name}")
             return approval
@@ -221,6 +235,7 @@ class EnhancedDocumentService:
             
             db.commit()
             db.refresh(approval)
+            invalidate_document_stats(document.participant_id)
             
             logger.info(f"Document {document_id} rejected by {approver_name}")
             return approval
@@ -355,106 +370,215 @@ class EnhancedDocumentService:
     
     @staticmethod
     def get_document_analytics(db: Session, participant_id: Optional[int] = None) -> Dict[str, Any]:
-        """Get document analytics"""
+        """Get document analytics (one grouped query, cached briefly)"""
         try:
-            base_query = db.query(Document)
-            if participant_id:
-                base_query = base_query.filter(Document.participant_id == participant_id)
-            
-            now_utc = datetime.now(timezone.utc)
-            
-            # Basic counts
-            total_documents = base_query.filter(Document.status == "active").count()
-            pending_approval = base_query.filter(Document.status == "pending_approval").count()
-            rejected_documents = base_query.filter(Document.status == "rejected").count()
-            
-            # Expiry analytics
-            expired_docs = base_query.filter(
-                and_(
-                    Document.expiry_date.isnot(None),
-                    Document.expiry_date < now_utc,
-                    Document.status == "active"
-                )
-            ).count()
-            
-            expiring_soon = base_query.filter(
-                and_(
-                    Document.expiry_date.isnot(None),
-                    Document.expiry_date >= now_utc,
-                    Document.expiry_date <= now_utc + timedelta(days=30),
-                    Document.status == "active"
-                )
-            ).count()
-            
-            # Category breakdown
-            category_stats = db.query(
-                Document.category,
-                func.count(Document.id).label('count')
-            ).filter(Document.status == "active")
-            
-            if participant_id:
-                category_stats = category_stats.filter(Document.participant_id == participant_id)
-            
-            category_stats = category_stats.group_by(Document.category).all()
-            
-            # Recent activity
-            recent_uploads = base_query.filter(
-                and_(
-                    Document.created_at >= now_utc - timedelta(days=7),
-                    Document.status.in_(["active", "pending_approval"])
-                )
-            ).count()
-            
-            return {
-                "total_documents": total_documents,
-                "pending_approval": pending_approval,
-                "rejected_documents": rejected_documents,
-                "expired_documents": expired_docs,
-                "expiring_soon": expiring_soon,
-                "recent_uploads": recent_uploads,
-                "category_breakdown": {cat: count for cat, count in category_stats},
-                "approval_rate": (total_documents / (total_documents + rejected_documents)) * 100 if (total_documents + rejected_documents) > 0 else 100
-            }
-            
+            return cached_document_stats(
+                ("analytics", participant_id or None),
+                lambda: EnhancedDocumentService._compute_document_analytics(db, participant_id)
+            )
         except Exception as e:
             logger.error(f"Error getting document analytics: {str(e)}")
             raise e
     
+    @staticmethod
+    def _compute_document_analytics(db: Session, participant_id: Optional[int] = None) -> Dict[str, Any]:
+        now_utc = datetime.now(timezone.utc)
+        active = Document.status == "active"
+        
+        query = db.query(
+            Document.category,
+            func.count(Document.id).filter(active),
+            func.count(Document.id).filter(Document.status == "pending_approval"),
+            func.count(Document.id).filter(Document.status == "rejected"),
+            func.count(Document.id).filter(and_(
+                active,
+                Document.expiry_date.isnot(None),
+                Document.expiry_date < now_utc
+            )),
+            func.count(Document.id).filter(and_(
+                active,
+                Document.expiry_date.isnot(None),
+                Document.expiry_date >= now_utc,
+                Document.expiry_date <= now_utc + timedelta(days=30)
+            )),
+            func.count(Document.id).filter(and_(
+                Document.created_at >= now_utc - timedelta(days=7),
+                Document.status.in_(["active", "pending_approval"])
+            ))
+        )
+        if participant_id:
+            query = query.filter(Document.participant_id == participant_id)
+        
+        totals = [0] * 6
+        category_breakdown = {}
+        for category, *counts in query.group_by(Document.category).all():
+            counts = [c or 0 for c in counts]
+            if counts[0]:
+                category_breakdown[category] = counts[0]
+            totals = [t + c for t, c in zip(totals, counts)]
+        
+        total_documents, pending_approval, rejected_documents, expired_docs, expiring_soon, recent_uploads = totals
+        return {
+            "total_documents": total_documents,
+            "pending_approval": pending_approval,
+            "rejected_documents": rejected_documents,
+            "expired_documents": expired_docs,
+            "expiring_soon": expiring_soon,
+            "recent_uploads": recent_uploads,
+            "category_breakdown": category_breakdown,
+            "approval_rate": (total_documents / (total_documents + rejected_documents)) * 100 if (total_documents + rejected_documents) > 0 else 100
+        }
+    
     @staticmethod
     def bulk_update_documents(
         db: Session,
         document_ids: List[int],
         update_data: Dict[str, Any],
-        created_by: str = "System User"
+        created_by: str = "System User",
+        batch_size: int = BULK_UPDATE_BATCH_SIZE
     ) -> Dict[str, Any]:
-        """Bulk update multiple documents"""
+        """
+        Bulk update multiple documents with version tracking in one transaction.
+        
+        Documents and their latest versions are loaded in batches, changes are
+        diffed in memory, metadata versions are inserted in one multi-row
+        INSERT per batch and documents are updated with one UPDATE ... WHERE id
+        IN (...) per distinct set of changed fields. Missing documents are
+        reported per item; a database error rolls back the whole update.
+        """
+        from app.services.enhanced_version_control_service import EnhancedVersionControlService
+        
+        columns = set(sa_inspect(Document).column_attrs.keys()) - {"id", "version", "created_at", "updated_at"}
+        fields = {field: value for field, value in update_data.items() if field in columns}
+        ids = list(dict.fromkeys(document_ids))
+        
+        updated_count = 0
+        versions_created = 0
+        errors = []
+        now = datetime.now(timezone.utc)
+        # Query.update skips the flush listeners, so their invalidation is done here
+        touched_participants = set()
+        shared_blob_ids = set()
+        
         try:
-            updated_count = 0
-            failed_count = 0
-            errors = []
-            
-            for doc_id in document_ids:
-                try:
-                    EnhancedDocumentService.update_document_with_version_tracking(
-                        db=db,
-                        document_id=doc_id,
-                        update_data=update_data,
-                        created_by=created_by
-                    )
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                documents = {
+                    doc.id: doc for doc in db.query(
+                        Document.id, Document.participant_id, Document.filename, Document.file_path,
+                        Document.storage_key, Document.file_size, Document.mime_type, Document.blob_id,
+                        *[getattr(Document, field) for field in fields]
+                    ).filter(Document.id.in_(batch))
+                }
+                latest_numbers = db.query(
+                    DocumentVersion.document_id,
+                    func.max(DocumentVersion.version_number).label("version_number")
+                ).filter(DocumentVersion.document_id.in_(batch)).group_by(DocumentVersion.document_id).subquery()
+                latest_versions = {
+                    row.document_id: row for row in db.query(
+                        DocumentVersion.id, DocumentVersion.document_id,
+                        DocumentVersion.version_number, DocumentVersion.file_hash
+                    ).join(latest_numbers, and_(
+                        DocumentVersion.document_id == latest_numbers.c.document_id,
+                        DocumentVersion.version_number == latest_numbers.c.version_number
+                    ))
+                }
+                
+                change_sets: Dict[frozenset, List[int]] = {}
+                version_rows = []
+                for doc_id in batch:
+                    doc = documents.get(doc_id)
+                    if doc is None:
+                        errors.append(f"Document {doc_id}: Document not found")
+                        continue
+                    
+                    old_metadata = {}
+                    new_metadata = {}
+                    for field, new_value in fields.items():
+                        old_value = getattr(doc, field)
+                        if old_value != new_value:
+                            old_metadata[field] = old_value
+                            new_metadata[field] = new_value
+                    changed_fields = list(new_metadata)
+                    change_sets.setdefault(frozenset(changed_fields), []).append(doc_id)
                     updated_count += 1
-                except Exception as e:
-                    failed_count += 1
-                    errors.append(f"Document {doc_id}: {str(e)}")
+                    if not changed_fields:
+                        continue
+                    touched_participants.add(doc.participant_id)
+                    if "participant_id" in new_metadata:
+                        touched_participants.add(new_metadata["participant_id"])
+                    if doc.blob_id:
+                        shared_blob_ids.add(doc.blob_id)
+                    
+                    latest = latest_versions.get(doc_id)
+                    change_reason = f"Document metadata updated: {', '.join(changed_fields)}"
+                    changes = EnhancedVersionControlService._calculate_metadata_changes(
+                        _json_safe(old_metadata), _json_safe(new_metadata)
+                    )
+                    version_rows.append({
+                        "document_id": doc_id,
+                        "version_number": (latest.version_number + 1) if latest else 1,
+                        "filename": doc.filename,
+                        "file_path": doc.file_path or doc.storage_key or "",
+                        "file_size": doc.file_size or 0,
+                        "mime_type": doc.mime_type or "application/octet-stream",
+                        "changes_summary": f"Metadata update: {', '.join(changes['changed_fields'])} - {change_reason}",
+                        "change_metadata": {
+                            "change_type": "metadata_update",
+                            "changed_fields": changes["changed_fields"],
+                            "field_changes": changes["field_changes"],
+                            "timestamp": now.isoformat(),
+                            "change_reason": change_reason
+                        },
+                        "file_hash": latest.file_hash if latest else None,
+                        "blob_id": doc.blob_id,
+                        "created_by": created_by,
+                        "is_metadata_only": True
+                    })
+                
+                if version_rows:
+                    # Core insert: the ORM splits a batch wherever a value is None
+                    versions_table = DocumentVersion.__table__
+                    inserted = db.execute(
+                        insert(versions_table).returning(versions_table.c.id, versions_table.c.document_id),
+                        version_rows
+                    ).all()
+                    versions_created += len(inserted)
+                    replaced = [
+                        {"id": latest_versions[doc_id].id, "replaced_by_version_id": version_id, "replaced_at": now}
+                        for version_id, doc_id in inserted if doc_id in latest_versions
+                    ]
+                    if replaced:
+                        db.execute(update(DocumentVersion), replaced)
+                
+                latest_version_number = select(func.max(DocumentVersion.version_number)).where(
+                    DocumentVersion.document_id == Document.id
+                ).scalar_subquery()
+                for changed_fields, doc_ids in change_sets.items():
+                    values = {field: fields[field] for field in changed_fields}
+                    values["updated_at"] = now
+                    if changed_fields:
+                        values["version"] = latest_version_number
+                    db.query(Document).filter(Document.id.in_(doc_ids)).update(values, synchronize_session=False)
+            
+            recount_blob_refs(db, shared_blob_ids)
+            db.commit()
+            db.expire_all()
+            invalidate_document_stats()
+            for participant_id in touched_participants - {None}:
+                invalidate_participant_generations(participant_id)
             
             return {
                 "updated_count": updated_count,
-                "failed_count": failed_count,
+                "failed_count": len(errors),
+                "versions_created": versions_created,
                 "errors": errors,
                 "total_processed": len(document_ids)
             }
             
         except Exception as e:
             logger.error(f"Error in bulk update: {str(e)}")
+            db.rollback()
             raise e
     
     @staticmethod
@@ -504,40 +628,20 @@ class EnhancedDocumentService:
     
     @staticmethod
     def cleanup_orphaned_files(db: Session, dry_run: bool = True) -> Dict[str, Any]:
-        """Clean up orphaned document files"""
+        """Clean up orphaned document files (files on disk no document or version references)"""
         try:
-            # Get all document file paths from database
-            db_files = set()
-            documents = db.query(Document).all()
-            for doc in documents:
-                if doc.file_path and os.path.exists(doc.file_path):
-                    db_files.add(os.path.abspath(doc.file_path))
-            
-            # Get all version file paths
-            versions = db.query(DocumentVersion).all()
-            for version in versions:
-                if version.file_path and os.path.exists(version.file_path):
-                    db_files.add(os.path.abspath(version.file_path))
-            
-            # Scan upload directories for files
-            upload_dir = Path("uploads/documents")
+            # Documents only; other features (e.g. SIL room images) share the storage root
+            upload_dir = get_storage("local").path_for("documents")
             if not upload_dir.exists():
                 return {"message": "Upload directory does not exist"}
             
-            orphaned_files = []
-            total_size = 0
-            
-            for file_path in upload_dir.rglob("*"):
-                if file_path.is_file():
-                    abs_path = str(file_path.absolute())
-                    if abs_path not in db_files:
-                        file_size = file_path.stat().st_size
-                        orphaned_files.append({
-                            "path": abs_path,
-                            "size": file_size,
-                            "modified": datetime.fromtimestamp(file_path.stat().st_mtime)
-                        })
-                        total_size += file_size
+            # Path-only scan: one directory walk plus batched DB rows, no hashing
+            report = scan_storage(db, root=upload_dir, verify_hashes=False)
+            orphaned_files = [
+                {**item, "modified": datetime.fromtimestamp(item["modified"])}
+                for item in report["orphaned"]
+            ]
+            total_size = sum(item["size"] for item in orphaned_files)
             
             if not dry_run:
                 # Actually delete the files
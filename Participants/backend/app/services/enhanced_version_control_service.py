@@ -4,6 +4,10 @@ from sqlalchemy import desc, and_
 from app.models.document import Document
 from app.models.document_workflow import DocumentVersion, DocumentApproval
 from app.models.participant import Participant
+from app.models.stored_blob import StoredBlob
+from app.services.blob_store import attach_blob, recount_blob_refs, share_blob
+from app.services.storage.delivery import set_content_hash
+from app.services.storage.integrity import hash_file
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import os
@@ -11,7 +15,6 @@ import shutil
 import json
 import logging
 from pathlib import Path
-import hashlib
 import difflib
 
 logger = logging.getLogger(__name__)
@@ -26,9 +29,14 @@ class EnhancedVersionControlService:
         new_file_path: str,
         changes_summary: str,
         created_by: str,
-        change_details: Optional[Dict[str, Any]] = None
+        change_details: Optional[Dict[str, Any]] = None,
+        blob: Optional[StoredBlob] = None
     ) -> DocumentVersion:
-        """Create a new version with detailed change tracking"""
+        """Create a new version with detailed change tracking.
+
+        With ``blob`` the file is already in the blob store at new_file_path
+        and is shared by the version and the document instead of copied.
+        """
         try:
             # Get the original document
             document = db.query(Document).filter(Document.id == document_id).first()
@@ -43,20 +51,23 @@ class EnhancedVersionControlService:
             new_version_number = (latest_version.version_number + 1) if latest_version else 1
             
             # Calculate file hash for integrity checking
-            file_hash = EnhancedVersionControlService._calculate_file_hash(new_file_path)
+            file_hash = blob.sha256 if blob else EnhancedVersionControlService._calculate_file_hash(new_file_path)
             
             # Get file size
             file_size = os.path.getsize(new_file_path) if os.path.exists(new_file_path) else 0
             
             # Generate unique filename for the version
-            file_extension = Path(new_file_path).suffix
+            file_extension = Path(new_file_path).suffix if not blob else Path(document.original_filename or "").suffix
             version_filename = f"{document.participant_id}_{document_id}_v{new_version_number}{file_extension}"
-            version_dir = Path(new_file_path).parent / "versions"
-            version_dir.mkdir(exist_ok=True)
-            version_file_path = version_dir / version_filename
-            
-            # Copy file to version storage
-            shutil.copy2(new_file_path, version_file_path)
+            if blob:
+                version_file_path = Path(new_file_path)
+            else:
+                version_dir = Path(new_file_path).parent / "versions"
+                version_dir.mkdir(exist_ok=True)
+                version_file_path = version_dir / version_filename
+                
+                # Copy file to version storage
+                shutil.copy2(new_file_path, version_file_path)
             
             # Prepare change metadata
             change_metadata = {
@@ -97,6 +108,12 @@ class EnhancedVersionControlService:
             document.version = new_version_number
             document.file_size = file_size
             document.updated_at = datetime.now()
+            set_content_hash(document, file_hash)
+            
+            if blob:
+                db.flush()
+                attach_blob(new_version, blob)
+                attach_blob(document, blob)
             
             db.commit()
             db.refresh(new_version)
@@ -153,7 +170,7 @@ class EnhancedVersionControlService:
                 document_id=document_id,
                 version_number=new_version_number,
                 filename=document.filename,  # Keep same filename
-                file_path=document.file_path,  # Keep same path
+                file_path=document.file_path or document.storage_key,  # Keep same file
                 file_size=document.file_size,
                 mime_type=document.mime_type,
                 changes_summary=changes_summary,
@@ -162,6 +179,7 @@ class EnhancedVersionControlService:
                 created_by=created_by,
                 is_metadata_only=True
             )
+            share_blob(db, new_version, document)
             
             db.add(new_version)
             
@@ -320,22 +338,30 @@ class EnhancedVersionControlService:
             
             new_version_number = current_version_number + 1
             
-            # Copy the target version file to a new location
-            target_file_path = Path(target_version.file_path)
-            if not target_file_path.exists():
-                raise ValueError(f"Target version file not found: {target_file_path}")
-            
-            # Generate new filename
-            file_extension = target_file_path.suffix
-            new_filename = f"{document.participant_id}_{document_id}_v{new_version_number}{file_extension}"
-            version_dir = target_file_path.parent
-            new_file_path = version_dir / new_filename
-            
-            # Copy file
-            shutil.copy2(target_file_path, new_file_path)
+            target_blob = db.get(StoredBlob, target_version.blob_id) if target_version.blob_id else None
             
-            # Calculate file hash
-            file_hash = EnhancedVersionControlService._calculate_file_hash(str(new_file_path))
+            if target_blob:
+                # Content-addressed: the restored version shares the target's blob
+                new_file_path = Path(target_version.file_path)
+                new_filename = f"{document.participant_id}_{document_id}_v{new_version_number}{Path(target_version.filename).suffix}"
+                file_hash = target_blob.sha256
+            else:
+                # Copy the target version file to a new location
+                target_file_path = Path(target_version.file_path)
+                if not target_file_path.exists():
+                    raise ValueError(f"Target version file not found: {target_file_path}")
+                
+                # Generate new filename
+                file_extension = target_file_path.suffix
+                new_filename = f"{document.participant_id}_{document_id}_v{new_version_number}{file_extension}"
+                version_dir = target_file_path.parent
+                new_file_path = version_dir / new_filename
+                
+                # Copy file
+                shutil.copy2(target_file_path, new_file_path)
+                
+                # Calculate file hash
+                file_hash = EnhancedVersionControlService._calculate_file_hash(str(new_file_path))
             
             # Prepare rollback metadata
             rollback_metadata = {
@@ -368,6 +394,7 @@ class EnhancedVersionControlService:
             document.version = new_version_number
             document.file_size = target_version.file_size
             document.updated_at = datetime.now()
+            set_content_hash(document, file_hash)
             
             # Mark current version as replaced
             current_version = db.query(DocumentVersion).filter(
@@ -382,6 +409,11 @@ class EnhancedVersionControlService:
                 current_version.replaced_by_version_id = rollback_version.id
                 current_version.replaced_at = datetime.now()
             
+            if target_blob:
+                db.flush()
+                attach_blob(rollback_version, target_blob)
+                attach_blob(document, target_blob)
+            
             db.commit()
             db.refresh(rollback_version)
             
@@ -503,10 +535,15 @@ class EnhancedVersionControlService:
             deleted_count = 0
             deleted_size = 0
             
+            released_blobs = set()
             for version in all_versions:
                 if version.id not in versions_to_keep:
+                    # Blobs may be shared; they are released and collected later
+                    if version.blob_id:
+                        released_blobs.add(version.blob_id)
+                        deleted_size += version.file_size or 0
                     # Delete file if it exists
-                    if os.path.exists(version.file_path):
+                    elif os.path.exists(version.file_path):
                         file_size = os.path.getsize(version.file_path)
                         os.remove(version.file_path)
                         deleted_size += file_size
@@ -515,6 +552,10 @@ class EnhancedVersionControlService:
                     db.delete(version)
                     deleted_count += 1
             
+            if released_blobs:
+                db.flush()
+                recount_blob_refs(db, released_blobs)
+            
             db.commit()
             
             cleanup_result = {
@@ -538,11 +579,7 @@ class EnhancedVersionControlService:
     def _calculate_file_hash(file_path: str) -> str:
         """Calculate SHA-256 hash of file"""
         try:
-            hasher = hashlib.sha256()
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            return hash_file(file_path)
         except Exception:
             return ""
         
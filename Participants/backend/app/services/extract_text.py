@@ -1,7 +1,7 @@
 # backend/app/services/ingest/extract_text.py
 import io
 from typing import List, Dict
-from app.services.storage.cos_storage_ibm import get_object_stream
+from app.services.storage import get_object_stream
 
 def extract_and_chunk(cos_key: str, chunk_size: int = 1200, overlap: int = 150) -> List[Dict]:
     """
@@ -18,7 +18,7 @@ def extract_and_chunk(cos_key: str, chunk_size: int = 1200, overlap: int = 150)
     try:
         # Get document from COS
         stream = get_object_stream(cos_key)
-        data = io.BytesIO(b"".join(stream))
+        data = io.BytesIO(stream["Body"].read())
         
         # Extract text based on file type
         text = ""
@@ -15,11 +15,11 @@ def extract_and_chunk(cos_key: str, chunk_size: int = 1200, overlap: int = 150)
         List of chunks with text and metadata
     """
     try:
-        from app.services.storage.cos_storage_ibm import get_object_stream
+        from app.services.storage import get_object_stream
         
         # Get document from COS
         stream = get_object_stream(cos_key)
-        data = io.BytesIO(b"".join(stream))
+        data = io.BytesIO(stream["Body"].read())
         
         # Extract text based on file type
         text = ""
@@ -0,0 +1,335 @@
+# backend/app/services/invoice_summary_service.py
+
+"""
+Incrementally maintained invoice statistics.
+
+The finance dashboard used to aggregate the whole invoices table on every
+poll. Instead, an after_flush hook turns each ORM insert/update/delete of an
+Invoice into a signed delta and upserts it into invoice_summary on the same
+connection, so the summary commits or rolls back with the invoice itself.
+
+Writes that bypass the ORM unit of work (raw SQL, Query.update) are not seen
+by the hook; reconcile_invoice_summary() recomputes the buckets from the
+invoices table, reports any drift and repairs it.
+"""
+
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, extract, func, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, attributes
+
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.invoice_summary import InvoiceSummary
+
+logger = logging.getLogger(__name__)
+
+TRACKED_ATTRIBUTES = ("status", "issue_date", "payment_date", "total_amount", "amount_paid", "amount_outstanding")
+OUTSTANDING_STATUSES = (InvoiceStatus.draft.value, InvoiceStatus.sent.value)
+CENT = Decimal("0.01")
+
+BucketKey = Tuple[str, str, str]  # status, issue_month, payment_month
+Totals = Tuple[int, Decimal, Decimal, Decimal]  # count, total, paid, outstanding
+
+
+def _money(value: Any) -> Decimal:
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def _month(value: Optional[date]) -> str:
+    if not value:
+        return ""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def _status_value(value: Any) -> str:
+    if value is None:
+        return InvoiceStatus.draft.value
+    return InvoiceStatus(value).value
+
+
+def _bucket(values: Dict[str, Any]) -> Tuple[BucketKey, Totals]:
+    key = (_status_value(values["status"]), _month(values["issue_date"]), _month(values["payment_date"]))
+    totals = (1, _money(values["total_amount"]), _money(values["amount_paid"]), _money(values["amount_outstanding"]))
+    return key, totals
+
+
+def _current_values(invoice: Invoice) -> Dict[str, Any]:
+    return {attr: getattr(invoice, attr) for attr in TRACKED_ATTRIBUTES}
+
+
+def _previous_values(invoice: Invoice) -> Dict[str, Any]:
+    values = {}
+    for attr in TRACKED_ATTRIBUTES:
+        history = attributes.get_history(invoice, attr)
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.unchanged:
+            values[attr] = history.unchanged[0]
+        else:
+            values[attr] = getattr(invoice, attr)
+    return values
+
+
+def _add(deltas: Dict[BucketKey, List], key: BucketKey, totals: Totals, sign: int) -> None:
+    bucket = deltas.setdefault(key, [0, Decimal("0.00"), Decimal("0.00"), Decimal("0.00")])
+    for i, value in enumerate(totals):
+        bucket[i] += sign * value
+
+
+def collect_invoice_deltas(session: Session) -> Dict[BucketKey, List]:
+    """Signed per-bucket deltas for the Invoice rows in the current flush."""
+    deltas: Dict[BucketKey, List] = {}
+
+    for obj in session.new:
+        if isinstance(obj, Invoice):
+            _add(deltas, *_bucket(_current_values(obj)), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Invoice):
+            _add(deltas, *_bucket(_previous_values(obj)), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Invoice) and session.is_modified(obj, include_collections=False):
+            _add(deltas, *_bucket(_previous_values(obj)), -1)
+            _add(deltas, *_bucket(_current_values(obj)), 1)
+
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+_unsupported_dialects = set()
+
+
+def _upsert_statement(dialect_name: str):
+    """Dialect INSERT with on_conflict_do_update, or None where there is none."""
+    if dialect_name == "postgresql":
+        return postgresql.insert(InvoiceSummary.__table__)
+    if dialect_name == "sqlite":
+        return sqlite.insert(InvoiceSummary.__table__)
+    return None
+
+
+def apply_invoice_deltas(connection, deltas: Dict[BucketKey, List]) -> None:
+    """
+    Add deltas to invoice_summary with INSERT ... ON CONFLICT DO UPDATE.
+
+    Skipped (with one warning) on other databases, so invoice writes still
+    succeed; run reconcile_invoice_summary() to bring the summary up to date
+    there.
+    """
+    if not deltas:
+        return
+    dialect_name = connection.dialect.name
+    if _upsert_statement(dialect_name) is None:
+        if dialect_name not in _unsupported_dialects:
+            _unsupported_dialects.add(dialect_name)
+            logger.warning(f"Invoice summary upsert not supported on {dialect_name}; "
+                           "the summary is only updated by reconcile_invoice_summary()")
+        return
+
+    table = InvoiceSummary.__table__
+    now = datetime.now()
+    for (status, issue_month, payment_month), (count, total, paid, outstanding) in deltas.items():
+        stmt = _upsert_statement(dialect_name).values(
+            status=status,
+            issue_month=issue_month,
+            payment_month=payment_month,
+            invoice_count=count,
+            total_amount=total,
+            amount_paid=paid,
+            amount_outstanding=outstanding,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["status", "issue_month", "payment_month"],
+            set_={
+                "invoice_count": table.c.invoice_count + count,
+                "total_amount": table.c.total_amount + total,
+                "amount_paid": table.c.amount_paid + paid,
+                "amount_outstanding": table.c.amount_outstanding + outstanding,
+                "updated_at": now,
+            },
+        )
+        connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_invoice_summary(session: Session, flush_context) -> None:
+    deltas = collect_invoice_deltas(session)
+    if deltas:
+        apply_invoice_deltas(session.connection(), deltas)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history makes SQLAlchemy load the old value before a set, so an
+# invoice modified after its attributes were expired still yields a delta
+# against the right bucket
+for _attr in TRACKED_ATTRIBUTES:
+    event.listen(getattr(Invoice, _attr), "set", _load_previous_value, active_history=True, retval=True)
+
+
+# ==========================================
+# READS
+# ==========================================
+
+def get_invoice_summary(db: Session) -> Dict[str, Any]:
+    """Dashboard totals read from invoice_summary instead of invoices."""
+    rows = db.query(InvoiceSummary).filter(InvoiceSummary.invoice_count != 0).all()
+
+    current_month = _month(datetime.now().date())
+    by_status: Dict[str, Dict[str, Any]] = {}
+    by_month: Dict[str, Dict[str, Any]] = {}
+    total_invoices = 0
+    total_outstanding = Decimal("0.00")
+    total_overdue = Decimal("0.00")
+    paid_this_month = Decimal("0.00")
+
+    for row in rows:
+        total_invoices += row.invoice_count
+        if row.status in OUTSTANDING_STATUSES:
+            total_outstanding += row.amount_outstanding
+        elif row.status == InvoiceStatus.overdue.value:
+            total_overdue += row.amount_outstanding
+        elif row.status == InvoiceStatus.paid.value and row.payment_month >= current_month:
+            paid_this_month += row.total_amount
+
+        for group, label in ((by_status, row.status), (by_month, row.issue_month)):
+            bucket = group.setdefault(label, {"count": 0, "total_amount": Decimal("0.00"),
+                                              "amount_paid": Decimal("0.00"), "amount_outstanding": Decimal("0.00")})
+            bucket["count"] += row.invoice_count
+            bucket["total_amount"] += row.total_amount
+            bucket["amount_paid"] += row.amount_paid
+            bucket["amount_outstanding"] += row.amount_outstanding
+
+    def as_floats(group):
+        return {label: {k: float(v) if isinstance(v, Decimal) else v for k, v in bucket.items()}
+                for label, bucket in sorted(group.items())}
+
+    return {
+        "total_invoices": total_invoices,
+        "total_outstanding": float(total_outstanding),
+        "total_overdue": float(total_overdue),
+        "total_paid_this_month": float(paid_this_month),
+        "by_status": as_floats(by_status),
+        "by_month": as_floats(by_month),
+    }
+
+
+# ==========================================
+# RECONCILIATION
+# ==========================================
+
+def _expected_buckets(db: Session) -> Dict[BucketKey, Totals]:
+    issue_year = extract("year", Invoice.issue_date)
+    issue_month = extract("month", Invoice.issue_date)
+    payment_year = extract("year", Invoice.payment_date)
+    payment_month = extract("month", Invoice.payment_date)
+
+    rows = db.query(
+        Invoice.status, issue_year, issue_month, payment_year, payment_month,
+        func.count(Invoice.id),
+        func.coalesce(func.sum(Invoice.total_amount), 0),
+        func.coalesce(func.sum(Invoice.amount_paid), 0),
+        func.coalesce(func.sum(Invoice.amount_outstanding), 0),
+    ).group_by(Invoice.status, issue_year, issue_month, payment_year, payment_month).all()
+
+    expected: Dict[BucketKey, Totals] = {}
+    for status, iy, im, py, pm, count, total, paid, outstanding in rows:
+        key = (
+            _status_value(status),
+            f"{int(iy):04d}-{int(im):02d}",
+            f"{int(py):04d}-{int(pm):02d}" if py is not None else "",
+        )
+        expected[key] = (int(count), _money(total), _money(paid), _money(outstanding))
+    return expected
+
+
+def reconcile_invoice_summary(db: Session, repair: bool = True) -> Dict[str, Any]:
+    """
+    Compare invoice_summary with a full aggregation of invoices.
+
+    On PostgreSQL the summary table is locked for the duration, so writers
+    wait instead of racing the comparison. Drifted buckets are rewritten
+    with the recomputed values when repair is True.
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE invoice_summary IN EXCLUSIVE MODE"))
+
+        expected = _expected_buckets(db)
+        rows = {(r.status, r.issue_month, r.payment_month): r for r in db.query(InvoiceSummary).all()}
+        empty: Totals = (0, Decimal("0.00"), Decimal("0.00"), Decimal("0.00"))
+
+        drift = []
+        for key in sorted(set(expected) | set(rows)):
+            want = expected.get(key, empty)
+            row = rows.get(key)
+            have = (row.invoice_count, _money(row.total_amount), _money(row.amount_paid),
+                    _money(row.amount_outstanding)) if row else empty
+            if want == have:
+                continue
+
+            drift.append({
+                "status": key[0],
+                "issue_month": key[1],
+                "payment_month": key[2] or None,
+                "expected": {"count": want[0], "total_amount": float(want[1])},
+                "actual": {"count": have[0], "total_amount": float(have[1])},
+            })
+            if not repair:
+                continue
+            if key not in expected:
+                db.delete(row)
+                continue
+            if row is None:
+                row = InvoiceSummary(status=key[0], issue_month=key[1], payment_month=key[2])
+                db.add(row)
+            row.invoice_count, row.total_amount, row.amount_paid, row.amount_outstanding = want
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if drift:
+        logger.warning(f"Invoice summary drift in {len(drift)} bucket(s){' (repaired)' if repair else ''}")
+
+    return {
+        "status": "ok" if not drift else ("repaired" if repair else "drift"),
+        "buckets_checked": len(set(expected) | set(rows)),
+        "drift": drift,
+    }
+
+
+def ensure_invoice_summary_schema(engine) -> None:
+    """Create invoice_summary on existing databases and seed it from invoices."""
+    try:
+        inspector = inspect(engine)
+        tables = inspector.get_table_names()
+        if "invoices" not in tables:
+            return
+
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoices_status_created_at ON invoices (status, created_at)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoices_created_at ON invoices (created_at)"))
+
+        if "invoice_summary" in tables:
+            return
+
+        InvoiceSummary.__table__.create(bind=engine, checkfirst=True)
+        db = Session(bind=engine)
+        try:
+            result = reconcile_invoice_summary(db)
+            print(f"[info] Invoice summary seeded from {result['buckets_checked']} bucket(s)")
+        finally:
+            db.close()
+    except Exception as exc:
+        print(f'[warn] Invoice summary schema check failed: {exc}')
@@ -0,0 +1,196 @@
+# backend/app/services/participant_context_service.py
+"""
+Per-participant context snapshots for AI prompts.
+
+Preparing an AI request used to re-read the participant and rebuild the
+same profile blob every time. The snapshot stores the two pieces prompts
+read (the care plan ``profile`` and the risk prompt's ``risk_notes``) in
+participant_context_snapshots, so a request needs one primary-key lookup.
+
+Any ORM write to a participant marks their snapshot stale in the same
+transaction (after_flush, as for the invoice summary); the next read
+rebuilds it and bumps its version. rebuild_stale_snapshots() refreshes
+them ahead of time. Without the table (schema check failed) snapshots are
+built on every read and writes are left alone.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.care_plan import CarePlan, RiskAssessment
+from app.models.care_plan_version import CarePlanVersion
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+from app.models.participant import Participant
+from app.models.participant_context_snapshot import ParticipantContextSnapshot
+from app.models.risk_assessment_version import RiskAssessmentVersion
+
+logger = logging.getLogger(__name__)
+
+# Rows whose changes make a participant's AI output stale (see generation_cache)
+TRACKED_MODELS = (Document, DocumentChunk, CarePlan, RiskAssessment, CarePlanVersion, RiskAssessmentVersion)
+
+# Whether participant_context_snapshots exists, per engine URL
+_table_ready: Dict[str, bool] = {}
+
+
+def changed_participant_ids(session: Session) -> Set[int]:
+    """Participants touched by the pending flush."""
+    participant_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Participant):
+            participant_ids.add(obj.id)
+        elif isinstance(obj, TRACKED_MODELS):
+            participant_ids.add(obj.participant_id)
+    participant_ids.discard(None)
+    return participant_ids
+
+
+def _snapshot_table_ready(connection) -> bool:
+    url = str(connection.engine.url)
+    ready = _table_ready.get(url)
+    if ready is None:
+        ready = _table_ready[url] = inspect(connection).has_table(ParticipantContextSnapshot.__tablename__)
+        if not ready:
+            logger.warning("participant_context_snapshots is missing; AI context is rebuilt on every read")
+    return ready
+
+
+# ==========================================
+# BUILD
+# ==========================================
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, (date, datetime)) else None
+
+
+def build_participant_snapshot(db: Session, participant_id: int) -> Optional[Dict[str, Any]]:
+    """The participant fields AI prompts use; None if not found."""
+    participant = db.query(Participant).filter(Participant.id == participant_id).first()
+    if not participant:
+        return None
+
+    support_needs = getattr(participant, 'support_needs', None)
+    medical_info = getattr(participant, 'medical_information', None)
+
+    return {
+        "participant_id": participant.id,
+        # Same fields (and order) the care plan prompts have always used
+        "profile": {
+            "id": participant.id,
+            "name": f"{participant.first_name} {participant.last_name}",
+            "date_of_birth": _iso(participant.date_of_birth),
+            "ndis_number": getattr(participant, 'ndis_number', 'Not provided'),
+            "support_needs": getattr(participant, 'support_needs', 'Not specified'),
+            "communication_preferences": getattr(participant, 'communication_preferences', {}),
+        },
+        # Case notes for the risk prompt, as assess_risk built them
+        "risk_notes": [
+            support_needs or "No support needs documented",
+            medical_info or "No medical information available",
+        ],
+    }
+
+
+# ==========================================
+# READ
+# ==========================================
+
+def get_participant_snapshot(db: Session, participant_id: int) -> Optional[Dict[str, Any]]:
+    """
+    The participant's AI context; one lookup when the snapshot is current.
+
+    Returns None if the participant doesn't exist. A rebuilt snapshot is
+    written in a savepoint and lands when the caller commits; the caller's
+    transaction is never committed or rolled back here.
+    """
+    if not _snapshot_table_ready(db.connection()):
+        snapshot = build_participant_snapshot(db, participant_id)
+        return dict(snapshot, version=0) if snapshot is not None else None
+
+    table = ParticipantContextSnapshot.__table__
+    row = db.execute(
+        select(table.c.version, table.c.stale, table.c.snapshot).where(table.c.participant_id == participant_id)
+    ).first()
+    if row is not None and not row.stale:
+        return dict(row.snapshot, version=row.version)
+
+    snapshot = build_participant_snapshot(db, participant_id)
+    if snapshot is None:
+        return None
+
+    try:
+        with db.begin_nested():
+            if row is None:
+                version = 1
+                db.execute(insert(table).values(
+                    participant_id=participant_id, version=version, snapshot=snapshot, stale=False,
+                    built_at=datetime.now()
+                ))
+            else:
+                # Only clear stale if nothing marked it again while we were building
+                version = row.version + 1
+                db.execute(
+                    update(table)
+                    .where(table.c.participant_id == participant_id, table.c.version == row.version)
+                    .values(version=version, snapshot=snapshot, stale=False, built_at=datetime.now())
+                )
+    except IntegrityError:
+        # Another request built it first; only the savepoint is rolled back
+        pass
+    return dict(snapshot, version=version)
+
+
+def rebuild_stale_snapshots(db: Session, participant_ids: Optional[Iterable[int]] = None) -> int:
+    """Rebuild stale snapshots (or the given participants'); returns how many were rebuilt."""
+    query = db.query(ParticipantContextSnapshot.participant_id)
+    if participant_ids is not None:
+        query = query.filter(ParticipantContextSnapshot.participant_id.in_(list(participant_ids)))
+    else:
+        query = query.filter(ParticipantContextSnapshot.stale.is_(True))
+    rebuilt = 0
+    for (participant_id,) in query.all():
+        _mark_stale(db.connection(), [participant_id])
+        if get_participant_snapshot(db, participant_id) is not None:
+            rebuilt += 1
+        db.commit()
+    return rebuilt
+
+
+# ==========================================
+# INVALIDATION
+# ==========================================
+
+def _mark_stale(connection, participant_ids: Iterable[int]) -> None:
+    table = ParticipantContextSnapshot.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.participant_id.in_(list(participant_ids)))
+        .values(stale=True, version=table.c.version + 1)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_snapshots_stale(session: Session, flush_context) -> None:
+    participant_ids = {
+        obj.id for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, Participant) and obj.id is not None
+    }
+    if participant_ids and _snapshot_table_ready(session.connection()):
+        _mark_stale(session.connection(), participant_ids)
+
+
+def ensure_participant_context_schema(engine) -> None:
+    """Create participant_context_snapshots on existing databases."""
+    try:
+        if "participants" not in inspect(engine).get_table_names():
+            return
+        ParticipantContextSnapshot.__table__.create(bind=engine, checkfirst=True)
+        _table_ready[str(engine.url)] = True
+    except Exception as exc:
+        print(f'[warn] Participant context schema check failed: {exc}')
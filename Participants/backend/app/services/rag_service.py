@@ -1,7 +1,10 @@
 # backend/app/services/rag_service.py
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.models.document_chunk import DocumentChunk
+from app.services.context_packer import budget_from_characters, pack_context
 from app.services.embedding_service import EmbeddingService
+from app.services.embeddings import embedding_provider_status
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
@@ -37,6 +40,7 @@ class RAGService:
             
             # Try semantic search first
             if self.embedding_service.embeddings_available:
+                self._reembed_stale_chunks(db, chunks)
                 results = self._semantic_search(
                     query=query,
                     chunks=chunks,
@@ -60,6 +64,25 @@ class RAGService:
             logger.error(f"Error searching participant documents: {e}")
             return []
     
+    def _reembed_stale_chunks(self, db: Session, chunks: List[DocumentChunk]) -> None:
+        """
+        Re-embed chunks whose vectors came from another model (e.g. written
+        while the fallback provider was in use) so semantic search sees them
+        again. Skipped while the fallback is active, so chunks are only ever
+        moved onto the configured provider's model.
+        """
+        model_id = self.embedding_service.model_id
+        stale = [chunk for chunk in chunks if not chunk.embedding_vector or chunk.embedding_model != model_id]
+        if not stale or embedding_provider_status()["fallback_active"]:
+            return
+        
+        try:
+            embedded = self.embedding_service.embed_chunks(db, stale)
+            logger.info(f"Re-embedded {embedded}/{len(stale)} chunks with {model_id}")
+        except Exception as e:
+            logger.error(f"Error re-embedding chunks: {e}")
+            db.rollback()
+    
     def _semantic_search(
         self,
         query: str,
@@ -76,10 +99,10 @@ class RAGService:
                 logger.warning("Failed to generate query embedding")
                 return []
             
-            # Calculate similarities
+            # Calculate similarities (only against vectors from the same model)
             results = []
             for chunk in chunks:
-                if not chunk.embedding_vector:
+                if not chunk.embedding_vector or chunk.embedding_model != self.embedding_service.model_id:
                     continue
                 
                 similarity = EmbeddingService.cosine_similarity(
@@ -151,50 +174,37 @@ class RAGService:
         db: Session,
         participant_id: int,
         query: str,
-        max_context_length: int = 2000
+        max_context_length: int = 2000,
+        max_context_tokens: Optional[int] = None
     ) -> Tuple[str, List[Dict[str, Any]]]:
         """
         Get relevant context from documents for AI query.
         Returns (context_text, source_chunks)
+        
+        Context is packed to max_context_tokens model tokens (see
+        context_packer); max_context_length is the older character limit,
+        converted to tokens when no token budget is given.
         """
         try:
-            # Search for relevant chunks
+            # Retrieve more than will fit so duplicates can be dropped and
+            # several documents represented
             relevant_chunks = self.search_participant_documents(
                 db=db,
                 participant_id=participant_id,
                 query=query,
-                top_k=5
+                top_k=settings.RAG_CANDIDATE_CHUNKS
             )
             
             if not relevant_chunks:
                 return "", []
             
-            # Build context string
-            context_parts = []
-            total_length = 0
-            sources_used = []
+            token_budget = max_context_tokens or budget_from_characters(max_context_length)
+            context_text, sources_used, stats = pack_context(relevant_chunks, token_budget)
             
-            for chunk in relevant_chunks:
-                chunk_text = chunk["chunk_text"]
-                chunk_length = len(chunk_text)
-                
-                # Check if adding this chunk would exceed limit
-                if total_length + chunk_length > max_context_length:
-                    # Try to fit partial chunk
-                    remaining_space = max_context_length - total_length
-                    if remaining_space > 200:  # Only add if meaningful
-                        chunk_text = chunk_text[:remaining_space] + "..."
-                        context_parts.append(chunk_text)
-                        sources_used.append(chunk)
-                    break
-                
-                context_parts.append(chunk_text)
-                sources_used.append(chunk)
-                total_length += chunk_length
-            
-            context_text = "\n\n---\n\n".join(context_parts)
-            
-            logger.info(f"Built context of {total_length} characters from {len(sources_used)} chunks")
+            logger.info(
+                f"Built context of {stats['tokens']}/{token_budget} tokens from {stats['chunks_used']} chunks "
+                f"({stats['documents_used']} documents, {stats['duplicates_removed']} duplicates removed)"
+            )
             
             return context_text, sources_used
             
@@ -0,0 +1,308 @@
+# backend/app/services/rendition_service.py
+"""
+Thumbnail and preview renditions for documents and SIL room images.
+
+Renditions are small WebP (or JPEG) images: the first page of a PDF
+rasterised with PyMuPDF, or a resized copy of an image. They are keyed by
+the SHA-256 of the source file and stored next to it
+(``<dir>/renditions/<sha256>/<name>.<ext>``), so a stored key never
+changes content. Rendition URLs are only content-addressed when they carry
+the source hash (``?v=<sha256>``, see rendition_url()); those responses get
+a year-long immutable lifetime, anything else is revalidated by ETag.
+
+Uploads schedule generate_renditions() as a background task; the
+rendition endpoints fall back to rendering on first request for files
+uploaded before this existed.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+from app.services.storage import get_storage
+from app.services.storage.base import ObjectNotFoundError, StorageBackend, StorageError
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = {
+    "thumb": 256,
+    "preview": 1024,
+}
+RENDITION_FORMAT = os.getenv("RENDITION_FORMAT", "webp").lower()
+RENDITION_QUALITY = int(os.getenv("RENDITION_QUALITY", "80"))
+RENDITION_CACHE_CONTROL = "private, no-cache"
+RENDITION_CACHE_CONTROL_IMMUTABLE = "private, max-age=31536000, immutable"
+
+PDF_TYPES = {"application/pdf"}
+IMAGE_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff"}
+
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+# One lock per rendition key so concurrent first requests render once;
+# entries are [lock, holders] and are dropped when the last holder leaves
+_render_locks: Dict[str, List] = {}
+_render_locks_guard = threading.Lock()
+
+# Source hashes for files uploaded without one recorded; upload keys embed a
+# UUID and are never overwritten, so a key's hash cannot go stale
+_source_hashes: "OrderedDict[str, str]" = OrderedDict()
+_source_hashes_lock = threading.Lock()
+SOURCE_HASH_CACHE_SIZE = 4096
+
+
+class RenditionUnavailable(StorageError):
+    """Raised when a rendition cannot be produced for a source file."""
+
+
+def supports_renditions(content_type: Optional[str]) -> bool:
+    return (content_type or "").lower() in PDF_TYPES | IMAGE_TYPES
+
+
+def rendition_url(url: str, source_hash: Optional[str]) -> str:
+    """Rendition URL, content-addressed with ?v=<sha256> when the source hash is known."""
+    return f"{url}?v={source_hash}" if source_hash else url
+
+
+def _output_format() -> Tuple[str, str, str]:
+    """(Pillow format, mime type, extension) for renditions; JPEG if this Pillow lacks WebP."""
+    fmt = RENDITION_FORMAT if RENDITION_FORMAT in _FORMATS else "webp"
+    if fmt == "webp":
+        from PIL import features
+        if not features.check("webp"):
+            fmt = "jpeg"
+    pil_format, mime_type = _FORMATS[fmt]
+    return pil_format, mime_type, "jpg" if fmt == "jpeg" else fmt
+
+
+# ==========================================
+# SOURCES
+# ==========================================
+
+def _source_backend(source_ref: str) -> Tuple[StorageBackend, str]:
+    """
+    Storage backend and key for a source reference.
+
+    Documents store either an object key (COS) or an absolute local file
+    path; local paths inside LOCAL_STORAGE_ROOT map to local backend keys.
+    """
+    path = Path(source_ref)
+    if path.is_absolute() or path.exists():
+        local = get_storage("local")
+        try:
+            return local, str(PurePosixPath(*path.resolve().relative_to(local.path_for("")).parts))
+        except ValueError:
+            raise RenditionUnavailable(f"Source file is outside local storage: {source_ref}")
+    return get_storage(), source_ref
+
+
+def read_source(source_ref: str) -> bytes:
+    backend, key = _source_backend(source_ref)
+    try:
+        return backend.get_object_stream(key)["Body"].read()
+    except ObjectNotFoundError:
+        raise RenditionUnavailable(f"Source file not found: {source_ref}")
+
+
+def rendition_key(source_ref: str, source_hash: str, name: str) -> str:
+    _, key = _source_backend(source_ref)
+    _, _, ext = _output_format()
+    parent = str(PurePosixPath(key).parent)
+    prefix = "" if parent in ("", ".") else f"{parent}/"
+    return f"{prefix}renditions/{source_hash}/{name}.{ext}"
+
+
+# ==========================================
+# RENDERING
+# ==========================================
+
+def _pdf_first_page(data: bytes, max_size: int):
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        if pdf.page_count == 0:
+            raise RenditionUnavailable("PDF has no pages")
+        page = pdf.load_page(0)
+        # Rasterise straight at the target size instead of full resolution
+        zoom = max_size / max(page.rect.width, page.rect.height, 1)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def _image(data: bytes, max_size: int):
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # Decode JPEGs at a reduced scale when they are much larger than needed
+    image.draft("RGB", (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    return image
+
+
+def render(data: bytes, content_type: str, name: str) -> bytes:
+    """Render one named rendition of ``data`` and return the encoded image bytes."""
+    if name not in RENDITION_SIZES:
+        raise RenditionUnavailable(f"Unknown rendition: {name}")
+    max_size = RENDITION_SIZES[name]
+    content_type = (content_type or "").lower()
+
+    try:
+        if content_type in PDF_TYPES:
+            image = _pdf_first_page(data, max_size)
+        elif content_type in IMAGE_TYPES:
+            image = _image(data, max_size)
+        else:
+            raise RenditionUnavailable(f"No renditions for {content_type or 'unknown type'}")
+
+        from PIL import Image
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        pil_format, _, _ = _output_format()
+        out = io.BytesIO()
+        image.save(out, format=pil_format, quality=RENDITION_QUALITY, optimize=True)
+        return out.getvalue()
+    except RenditionUnavailable:
+        raise
+    except Exception as e:
+        raise RenditionUnavailable(f"Could not render {name}: {e}") from e
+
+
+@contextmanager
+def _render_lock(key: str):
+    with _render_locks_guard:
+        entry = _render_locks.get(key)
+        if entry is None:
+            entry = _render_locks[key] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _render_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _render_locks.pop(key, None)
+
+
+def ensure_rendition(source_ref: str, content_type: str, name: str,
+                     source_hash: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Return (rendition_key, source_hash), rendering and storing it if missing.
+
+    When source_hash is unknown the source is read and hashed first.
+    """
+    data = None
+    if not source_hash:
+        with _source_hashes_lock:
+            source_hash = _source_hashes.get(source_ref)
+            if source_hash:
+                _source_hashes.move_to_end(source_ref)
+    if not source_hash:
+        data = read_source(source_ref)
+        source_hash = hashlib.sha256(data).hexdigest()
+        with _source_hashes_lock:
+            _source_hashes[source_ref] = source_hash
+            while len(_source_hashes) > SOURCE_HASH_CACHE_SIZE:
+                _source_hashes.popitem(last=False)
+
+    backend, _ = _source_backend(source_ref)
+    key = rendition_key(source_ref, source_hash, name)
+    if backend.exists(key):
+        return key, source_hash
+
+    with _render_lock(key):
+        if not backend.exists(key):
+            if data is None:
+                data = read_source(source_ref)
+            _, mime_type, _ = _output_format()
+            backend.put_bytes(key, render(data, content_type, name), mime_type)
+            logger.info(f"Stored {name} rendition {key}")
+    return key, source_hash
+
+
+def open_rendition(source_ref: str, key: str, byte_range=None):
+    backend, _ = _source_backend(source_ref)
+    return backend.get_object_stream(key, byte_range)
+
+
+def generate_renditions(source_ref: str, content_type: str, source_hash: Optional[str] = None) -> Dict[str, str]:
+    """Background task: render every configured rendition for a freshly uploaded file."""
+    if not supports_renditions(content_type):
+        return {}
+
+    keys: Dict[str, str] = {}
+    try:
+        data = read_source(source_ref)
+        source_hash = source_hash or hashlib.sha256(data).hexdigest()
+        backend, _ = _source_backend(source_ref)
+        _, mime_type, _ = _output_format()
+        for name in RENDITION_SIZES:
+            key = rendition_key(source_ref, source_hash, name)
+            with _render_lock(key):
+                if not backend.exists(key):
+                    backend.put_bytes(key, render(data, content_type, name), mime_type)
+            keys[name] = key
+        logger.info(f"Generated {len(keys)} rendition(s) for {source_ref}")
+    except Exception as e:
+        logger.warning(f"Rendition generation failed for {source_ref}: {e}")
+    return keys
+
+
+# ==========================================
+# DELIVERY
+# ==========================================
+
+def rendition_response(request, source_ref: str, content_type: str, name: str,
+                       source_hash: Optional[str] = None, filename: Optional[str] = None,
+                       version: Optional[str] = None):
+    """
+    Serve a rendition.
+
+    ``version`` is the ?v= of the request URL: when it matches the source
+    hash the response is immutable, otherwise the client revalidates. With a
+    known source hash the ETag is computed up front, so a revalidation is
+    answered with 304 before storage is touched; a missing rendition is
+    rendered on first request.
+    """
+    from app.services.storage.delivery import build_file_response, make_etag
+
+    if name not in RENDITION_SIZES or not supports_renditions(content_type):
+        raise RenditionUnavailable(f"No {name} rendition for {content_type or 'unknown type'}")
+
+    if not source_hash:
+        _, source_hash = ensure_rendition(source_ref, content_type, name)
+
+    def opener(byte_range):
+        key, _ = ensure_rendition(source_ref, content_type, name, source_hash)
+        return open_rendition(source_ref, key, byte_range)
+
+    _, mime_type, ext = _output_format()
+    stem = Path(filename).stem if filename else "rendition"
+    return build_file_response(
+        request,
+        opener,
+        etag=make_etag(f"{source_hash}-{name}"),
+        filename=f"{stem}-{name}.{ext}",
+        media_type=mime_type,
+        inline=True,
+        cache_control=(
+            RENDITION_CACHE_CONTROL_IMMUTABLE if version and version == source_hash
+            else RENDITION_CACHE_CONTROL
+        ),
+    )
@@ -10,6 +10,7 @@ from app.models.signing import SigningEnvelope, SignatureEvent
 from app.models.document import Document
 from app.models.participant import Participant
 from app.services.email_service import EmailService
+from app.services.document_service import invalidate_document_stats
 import logging
 
 logger = logging.getLogger(__name__)
@@ -97,6 +98,7 @@ class SigningService:
         self.db.add(env)
         self.db.commit()
         self.db.refresh(env)
+        invalidate_document_stats(participant_id)
         
         # Log the creation event
         self._log(env, "created", note=f"Envelope created for {signer_email}")
@@ -167,6 +169,7 @@ class SigningService:
         env.certificate_json["user_agent"] = ua
         
         self.db.commit()
+        invalidate_document_stats(env.participant_id)
         logger.info(f"Envelope {env.id} signed by {typed_name} from IP {ip}")
     
     def cancel(self, env: SigningEnvelope, reason: Optional[str] = None):
@@ -184,6 +187,7 @@ class SigningService:
                 doc.status = "active"
         
         self.db.commit()
+        invalidate_document_stats(env.participant_id)
         logger.info(f"Envelope {env.id} cancelled: {reason}")
     
     def resend(self, env: SigningEnvelope) -> bool:
@@ -241,6 +245,7 @@ class SigningService:
         
         if count > 0:
             self.db.commit()
+            invalidate_document_stats()
             
         return count
     
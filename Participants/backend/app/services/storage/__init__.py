@@ -0,0 +1,106 @@
+# backend/app/services/storage/__init__.py
+"""
+Object storage layer.
+
+get_storage() returns a process-wide backend chosen by STORAGE_BACKEND:
+"ibm-cos" (default), "local" (files under LOCAL_STORAGE_ROOT) or "memory".
+Backends are built once and reused, so the COS client, its connection pool
+and its IAM token survive across requests.
+"""
+import threading
+from typing import Dict, Optional
+from urllib.parse import quote
+
+from app.core.config import settings
+from app.services.storage.base import ObjectNotFoundError, RangeNotSatisfiableError, StorageBackend, StorageError
+
+_BACKEND_ALIASES = {"cos": "ibm-cos", "ibm-cos": "ibm-cos", "local": "local", "memory": "memory"}
+
+_backends: Dict[str, StorageBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def _build_backend(name: str) -> StorageBackend:
+    if name == "ibm-cos":
+        from app.services.storage.cos_storage_ibm import IBMCOSStorage
+        return IBMCOSStorage(settings.IBM_COS_BUCKET_NAME)
+    if name == "local":
+        from app.services.storage.local_storage import LocalStorage
+        return LocalStorage(settings.LOCAL_STORAGE_ROOT)
+    if name == "memory":
+        from app.services.storage.memory_storage import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_storage(name: Optional[str] = None) -> StorageBackend:
+    """Return the shared backend called ``name``, or the configured default."""
+    key = _BACKEND_ALIASES.get((name or settings.STORAGE_BACKEND).lower())
+    if key is None:
+        raise ValueError(f"Unknown storage backend: {name or settings.STORAGE_BACKEND}")
+
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                backend = _backends[key] = _build_backend(key)
+    return backend
+
+
+def set_storage(name: str, backend: StorageBackend) -> None:
+    """Replace a backend, e.g. swap in MemoryStorage for "ibm-cos" in tests."""
+    with _backends_lock:
+        _backends[_BACKEND_ALIASES.get(name.lower(), name.lower())] = backend
+
+
+def reset_storage() -> None:
+    with _backends_lock:
+        _backends.clear()
+
+
+def object_key(prefix: str, filename: str) -> str:
+    """
+    Creates IBM COS object key without tenant prefix.
+    
+    Examples:
+        prefix='participants/14', filename='Care Plan.pdf'
+        -> 'participants/14/Care Plan.pdf'
+        
+        prefix='referrals', filename='Referral Form.pdf'
+        -> 'referrals/Referral Form.pdf'
+    """
+    safe_name = quote(filename, safe="")
+    return f"{prefix.strip('/')}/{safe_name}"
+
+def put_bytes(key: str, data: bytes, content_type: str | None = None):
+    return get_storage().put_bytes(key, data, content_type)
+
+def get_object_stream(key: str, byte_range=None):
+    return get_storage().get_object_stream(key, byte_range)
+
+def delete_object(key: str):
+    get_storage().delete_object(key)
+
+
+def copy_object(old_key: str, new_key: str):
+    """
+    Move an object within the same bucket by copying then deleting it.
+    """
+    return get_storage().copy_object(old_key, new_key)
+
+
+__all__ = [
+    "ObjectNotFoundError",
+    "RangeNotSatisfiableError",
+    "StorageBackend",
+    "StorageError",
+    "copy_object",
+    "delete_object",
+    "get_object_stream",
+    "get_storage",
+    "object_key",
+    "put_bytes",
+    "reset_storage",
+    "set_storage",
+]
@@ -0,0 +1,155 @@
+# backend/app/services/storage/base.py
+"""
+Storage backend interface.
+
+Every backend stores opaque keys (see object_key) and hands back objects in
+the same shape as boto's get_object, so endpoints can stream from COS, the
+local filesystem or memory without caring which one is configured.
+"""
+import mimetypes
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# (first, last) from a Range header; either side may be None ("500-", "-500")
+ByteRange = Tuple[Optional[int], Optional[int]]
+
+
+class StorageError(Exception):
+    """Raised when a storage backend operation fails."""
+
+
+class ObjectNotFoundError(StorageError):
+    """Raised when a key does not exist in the backend."""
+
+    def __init__(self, key: str):
+        super().__init__(f"Object not found: {key}")
+        self.key = key
+
+
+class RangeNotSatisfiableError(StorageError):
+    """Raised when a requested byte range lies outside the object."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Requested range not satisfiable for object of {size} bytes")
+        self.size = size
+
+
+class ObjectBody:
+    """
+    File-like object body with the parts of botocore's StreamingBody callers use:
+    read(), iter_chunks(), iteration (for StreamingResponse) and close().
+    """
+
+    def __init__(self, fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE, length: Optional[int] = None):
+        self._fileobj = fileobj
+        self.chunk_size = chunk_size
+        self._remaining = length  # None reads to EOF
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if self._remaining is not None:
+            amt = self._remaining if amt is None else min(amt, self._remaining)
+        data = self._fileobj.read() if amt is None else self._fileobj.read(amt)
+        if self._remaining is not None:
+            self._remaining -= len(data)
+        return data
+
+    def iter_chunks(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        size = chunk_size or self.chunk_size
+        try:
+            while True:
+                chunk = self.read(size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        # StreamingResponse calls next() on the body directly, as with StreamingBody
+        chunk = self.read(self.chunk_size)
+        if not chunk:
+            self.close()
+            raise StopIteration
+        return chunk
+
+    def close(self) -> None:
+        self._fileobj.close()
+
+
+def resolve_byte_range(byte_range: ByteRange, size: int) -> Tuple[int, int]:
+    """Turn a (first, last) range into inclusive offsets within an object of ``size`` bytes."""
+    first, last = byte_range
+    if first is None:
+        if not last:
+            raise RangeNotSatisfiableError(size)
+        first, last = max(size - last, 0), size - 1
+    else:
+        last = size - 1 if last is None else min(last, size - 1)
+    if first >= size or first > last:
+        raise RangeNotSatisfiableError(size)
+    return first, last
+
+
+def range_result(first: int, last: int, size: int) -> Dict[str, Any]:
+    return {"ContentLength": last - first + 1, "ContentRange": f"bytes {first}-{last}/{size}"}
+
+
+def guess_content_type(key: str, content_type: Optional[str] = None) -> str:
+    return content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class StorageBackend:
+    """Base class for object storage backends. Implementations must be thread-safe."""
+
+    name = "base"
+    bucket: Optional[str] = None
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def put_fileobj(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> Dict[str, Any]:
+        """Store a file-like object. Backends override this to avoid buffering the whole file."""
+        return self.put_bytes(key, fileobj.read(), content_type)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store an object from an iterable of byte chunks.
+
+        If iterating ``chunks`` raises, nothing is stored under ``key``.
+        Backends override this to keep memory bounded.
+        """
+        return self.put_bytes(key, b"".join(chunks), content_type)
+
+    def get_object_stream(self, key: str, byte_range: Optional[ByteRange] = None) -> Dict[str, Any]:
+        """
+        Return {"Body", "ContentType", "ContentLength"} like boto's get_object.
+
+        With ``byte_range`` only that slice is returned, plus "ContentRange"
+        ("bytes first-last/size"); RangeNotSatisfiableError if it misses.
+        """
+        raise NotImplementedError
+
+    def delete_object(self, key: str) -> None:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def copy(self, old_key: str, new_key: str) -> None:
+        raise NotImplementedError
+
+    def copy_object(self, old_key: str, new_key: str) -> Dict[str, str]:
+        """Move an object within the backend by copying then deleting it."""
+        self.copy(old_key, new_key)
+        self.delete_object(old_key)
+        return {"from": old_key, "to": new_key}
+
+    def _put_result(self, key: str, content_type: str, size: Optional[int] = None) -> Dict[str, Any]:
+        result = {"bucket": self.bucket, "key": key, "content_type": content_type}
+        if size is not None:
+            result["size"] = size
+        return result
@@ -1,52 +1,170 @@
 # backend/app/services/storage/cos_storage_ibm.py
 from ibm_botocore.client import Config
+from ibm_botocore.exceptions import ClientError
 import ibm_boto3
-import uuid, mimetypes
-from urllib.parse import quote
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
 from app.core.config import settings
+from app.services.storage.base import (
+    ByteRange,
+    ObjectNotFoundError,
+    RangeNotSatisfiableError,
+    StorageBackend,
+    guess_content_type,
+)
 
+# Helpers that used to live here; kept importable from this module
+from app.services.storage import object_key, put_bytes, get_object_stream, delete_object, copy_object  # noqa: F401
 
-def _cos():
-    return ibm_boto3.client(
-        "s3",
-        ibm_api_key_id=settings.IBM_COS_API_KEY,
-        ibm_service_instance_id=settings.IBM_COS_SERVICE_INSTANCE_ID,
-        ibm_auth_endpoint=settings.IBM_IAM_AUTH_URL,
-        config=Config(signature_version="oauth"),
-        endpoint_url=settings.IBM_COS_ENDPOINT,
-    )
 
-def object_key(prefix: str, filename: str) -> str:
+class IBMCOSStorage(StorageBackend):
     """
-    Creates IBM COS object key without tenant prefix.
-    
-    Examples:
-        prefix='participants/14', filename='Care Plan.pdf'
-        -> 'participants/14/Care Plan.pdf'
-        
-        prefix='referrals', filename='Referral Form.pdf'
-        -> 'referrals/Referral Form.pdf'
+    IBM Cloud Object Storage backend.
+
+    Holds one long-lived client per process. The client is thread-safe, keeps
+    a pool of up to COS_MAX_POOL_CONNECTIONS keep-alive connections, and its
+    token manager caches the IAM bearer token and refreshes it shortly before
+    expiry, so the IAM exchange happens roughly once an hour instead of on
+    every call.
     """
-    safe_name = quote(filename, safe="")
-    return f"{prefix.strip('/')}/{safe_name}"
 
-def put_bytes(key: str, data: bytes, content_type: str | None = None):
-    ct = content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
-    _cos().put_object(Bucket=settings.IBM_COS_BUCKET_NAME, Key=key, Body=data, ContentType=ct)
-    return {"bucket": settings.IBM_COS_BUCKET_NAME, "key": key, "content_type": ct}
+    name = "ibm-cos"
 
-def get_object_stream(key: str):
-    return _cos().get_object(Bucket=settings.IBM_COS_BUCKET_NAME, Key=key)
+    def __init__(self, bucket: Optional[str] = None):
+        self.bucket = bucket or settings.IBM_COS_BUCKET_NAME
+        self._client = None
+        self._lock = threading.Lock()
 
-def delete_object(key: str):
-    _cos().delete_object(Bucket=settings.IBM_COS_BUCKET_NAME, Key=key)
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = ibm_boto3.client(
+                        "s3",
+                        ibm_api_key_id=settings.IBM_COS_API_KEY,
+                        ibm_service_instance_id=settings.IBM_COS_SERVICE_INSTANCE_ID,
+                        ibm_auth_endpoint=settings.IBM_IAM_AUTH_URL,
+                        config=Config(
+                            signature_version="oauth",
+                            max_pool_connections=settings.COS_MAX_POOL_CONNECTIONS,
+                            connect_timeout=10,
+                            read_timeout=60,
+                            retries={"max_attempts": 3, "mode": "standard"},
+                        ),
+                        endpoint_url=settings.IBM_COS_ENDPOINT,
+                    )
+        return self._client
 
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+        ct = guess_content_type(key, content_type)
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=ct)
+        return self._put_result(key, ct)
 
-def copy_object(old_key: str, new_key: str):
-    """
-    Move an object within the same IBM COS bucket by copying then deleting it.
-    """
-    source = {"Bucket": settings.IBM_COS_BUCKET_NAME, "Key": old_key}
-    _cos().copy_object(Bucket=settings.IBM_COS_BUCKET_NAME, CopySource=source, Key=new_key)
-    _cos().delete_object(Bucket=settings.IBM_COS_BUCKET_NAME, Key=old_key)
-    return {"from": old_key, "to": new_key}
+    def put_fileobj(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> Dict[str, Any]:
+        """Managed upload: large files go up as multipart without being read into memory."""
+        ct = guess_content_type(key, content_type)
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs={"ContentType": ct})
+        return self._put_result(key, ct)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Multipart upload from a chunk iterator.
+
+        Parts of COS_MULTIPART_PART_MB are uploaded on up to
+        COS_MULTIPART_CONCURRENCY threads; reading blocks while every slot
+        is busy, so at most (concurrency + 1) part buffers exist at once.
+        Objects smaller than one part go up as a single PUT.
+        """
+        ct = guess_content_type(key, content_type)
+        part_size = settings.COS_MULTIPART_PART_MB * 1024 * 1024
+        concurrency = max(1, settings.COS_MULTIPART_CONCURRENCY)
+
+        it = iter(chunks)
+        buffer = bytearray()
+        for chunk in it:
+            buffer += chunk
+            if len(buffer) >= part_size:
+                break
+        else:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buffer), ContentType=ct)
+            return self._put_result(key, ct, len(buffer))
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=ct)["UploadId"]
+        slots = threading.BoundedSemaphore(concurrency)
+        futures = []
+        size = 0
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cos-part") as pool:
+                def submit(data: bytes):
+                    slots.acquire()
+                    for done in futures:
+                        if done.done() and done.exception():
+                            slots.release()
+                            raise done.exception()
+                    future = pool.submit(self._upload_part, key, upload_id, len(futures) + 1, data)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+
+                for chunk in it:
+                    buffer += chunk
+                    while len(buffer) >= part_size:
+                        size += part_size
+                        submit(bytes(buffer[:part_size]))
+                        del buffer[:part_size]
+                if buffer or not futures:
+                    size += len(buffer)
+                    submit(bytes(buffer))
+                buffer = bytearray()
+
+            parts: List[Dict[str, Any]] = [future.result() for future in futures]
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except Exception:
+                pass
+            raise
+        return self._put_result(key, ct, size)
+
+    def _upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> Dict[str, Any]:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def get_object_stream(self, key: str, byte_range: Optional[ByteRange] = None) -> Dict[str, Any]:
+        """Ranged reads are a single ranged GET; COS returns ContentRange itself."""
+        params = {"Bucket": self.bucket, "Key": key}
+        if byte_range is not None:
+            first, last = byte_range
+            params["Range"] = f"bytes={'' if first is None else first}-{'' if last is None else last}"
+        try:
+            return self.client.get_object(**params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("NoSuchKey", "404"):
+                raise ObjectNotFoundError(key) from e
+            if code == "InvalidRange":
+                head = self.client.head_object(Bucket=self.bucket, Key=key)
+                raise RangeNotSatisfiableError(head["ContentLength"]) from e
+            raise
+
+    def delete_object(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "NotFound"):
+                return False
+            raise
+
+    def copy(self, old_key: str, new_key: str) -> None:
+        source = {"Bucket": self.bucket, "Key": old_key}
+        self.client.copy_object(Bucket=self.bucket, CopySource=source, Key=new_key)
@@ -0,0 +1,217 @@
+# backend/app/services/storage/delivery.py
+"""
+HTTP delivery of stored files: byte ranges, ETags and conditional GETs.
+
+The document download endpoints hand build_file_response() a way to open
+the object (optionally sliced to a byte range) plus validators from the
+database, so a revalidation that ends in 304 never touches storage and a
+PDF viewer's range requests become ranged storage reads.
+"""
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.services.storage.base import ByteRange, RangeNotSatisfiableError, StorageBackend
+from app.services.storage.local_storage import LocalStorage
+
+# Clients may cache but must revalidate; the ETag makes that a cheap 304
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+Opener = Callable[[Optional[ByteRange]], Dict[str, Any]]
+
+
+def parse_range_header(value: Optional[str]) -> Optional[ByteRange]:
+    """
+    Parse a single-range Range header.
+
+    Multi-range and malformed headers return None and the full body is sent,
+    which RFC 9110 allows.
+    """
+    if not value:
+        return None
+    match = _RANGE_RE.match(value.strip().replace(" ", ""))
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first = int(match.group(1)) if match.group(1) else None
+    last = int(match.group(2)) if match.group(2) else None
+    if first is not None and last is not None and last < first:
+        return None
+    return first, last
+
+
+def make_etag(content_hash: Optional[str] = None, *fallback_parts: Any) -> str:
+    """Strong ETag from a content hash, or a weak one from identifying metadata."""
+    if content_hash:
+        return f'"{content_hash}"'
+    return 'W/"' + "-".join(str(part) for part in fallback_parts if part is not None) + '"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return _as_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-None-Match takes precedence; If-Modified-Since is only used without it."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    since = _parse_http_date(request.headers.get("if-modified-since"))
+    if since and last_modified:
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def _if_range_allows(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """A Range is honoured only if If-Range (when sent) still matches; strong comparison."""
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not etag.startswith("W/") and if_range == etag
+    since = _parse_http_date(if_range)
+    return bool(since and last_modified and _as_utc(last_modified).replace(microsecond=0) == since)
+
+
+def is_initial_request(request: Request) -> bool:
+    """True for a full download or the first range of one, for access logging."""
+    byte_range = parse_range_header(request.headers.get("range"))
+    return byte_range is None or byte_range[0] == 0
+
+
+def content_disposition(filename: Optional[str], inline: bool = False) -> str:
+    disposition = "inline" if inline else "attachment"
+    name = filename or "download"
+    ascii_name = name.encode("ascii", "replace").decode("ascii").replace('"', "")
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(name)}"
+
+
+def build_file_response(
+    request: Request,
+    opener: Opener,
+    *,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    inline: bool = False,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve a stored file with validators and range support.
+
+    ``opener(byte_range)`` returns a get_object-shaped dict; it is not called
+    at all when the client's cached copy is still current.
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+    }
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified).replace(microsecond=0), usegmt=True)
+    headers.update(extra_headers or {})
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range_header(request.headers.get("range"))
+    if byte_range is not None and not _if_range_allows(request, etag, last_modified):
+        byte_range = None
+
+    try:
+        obj = opener(byte_range)
+    except RangeNotSatisfiableError as e:
+        headers["Content-Range"] = f"bytes */{e.size}"
+        return Response(status_code=416, headers=headers)
+
+    headers["Content-Disposition"] = content_disposition(filename, inline)
+    if obj.get("ContentLength") is not None:
+        headers["Content-Length"] = str(obj["ContentLength"])
+
+    status_code = 200
+    if obj.get("ContentRange"):
+        status_code = 206
+        headers["Content-Range"] = obj["ContentRange"]
+
+    return StreamingResponse(
+        obj["Body"],
+        status_code=status_code,
+        media_type=media_type or obj.get("ContentType") or "application/octet-stream",
+        headers=headers,
+    )
+
+
+def storage_opener(storage: StorageBackend, key: str) -> Opener:
+    return lambda byte_range: storage.get_object_stream(key, byte_range)
+
+
+def path_opener(path: str | Path) -> Opener:
+    return lambda byte_range: LocalStorage.open_file(path, byte_range)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[int]:
+    return int(_as_utc(value).timestamp()) if value else None
+
+
+def set_content_hash(document, content_hash: Optional[str]) -> None:
+    """
+    Record the SHA-256 of a Document's current file in extra_metadata, or
+    drop it when unknown. Every path that replaces the bytes must call this,
+    or clients keep revalidating against the old strong ETag.
+    """
+    metadata = dict(document.extra_metadata or {})
+    if content_hash:
+        metadata["sha256"] = content_hash
+    else:
+        metadata.pop("sha256", None)
+    document.extra_metadata = metadata
+
+
+def document_validators(document) -> tuple:
+    """(etag, last_modified) for a Document's current file."""
+    last_modified = document.updated_at or document.uploaded_at or document.created_at
+    content_hash = (document.extra_metadata or {}).get("sha256")
+    etag = make_etag(content_hash, "doc", document.id, document.version, document.file_size, _timestamp(last_modified))
+    return etag, last_modified
+
+
+def version_validators(version) -> tuple:
+    """(etag, last_modified) for a DocumentVersion; versions are immutable once written."""
+    etag = make_etag(version.file_hash, "ver", version.id, version.file_size)
+    return etag, version.created_at
@@ -0,0 +1,270 @@
+# backend/app/services/storage/integrity.py
+"""
+Integrity scan of the local upload tree.
+
+One pass walks LOCAL_STORAGE_ROOT with os.scandir (sizes and mtimes come
+from the directory entries), streams document and version rows from the
+database in batches, and hashes files with large buffers across a thread
+pool; hashlib releases the GIL, so hashing scales with cores and disks.
+
+Results are kept in a manifest (path -> size, mtime, sha256). A re-scan
+only hashes files whose size or mtime changed since the manifest was
+written, which turns a multi-hour full scan into a directory walk.
+
+The report lists referenced files that are missing, files whose content
+no longer matches the recorded SHA-256, and orphaned files no row points
+at. Document files, version files and SIL room images all count as
+references. Blob store files are owned by the blob store (unreferenced
+blobs are collected there) and renditions are derived data, so neither is
+reported as orphaned.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.models.document_workflow import DocumentVersion
+from app.models.sil import RoomImage
+from app.models.stored_blob import StoredBlob
+from app.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+HASH_BUFFER_SIZE = 4 * 1024 * 1024
+MANIFEST_NAME = ".integrity-manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+# Directories whose files are never orphans of a document row
+UNOWNED_DIRS = {"blobs", "renditions"}
+
+FileStat = Tuple[int, int]  # size, mtime_ns
+
+
+def hash_file(path: str | Path, buffer_size: int = HASH_BUFFER_SIZE) -> str:
+    """SHA-256 of a file, read into one reused buffer."""
+    digest = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def walk_files(root: str | Path) -> Iterator[Tuple[str, int, int]]:
+    """Yield (absolute path, size, mtime_ns) for every regular file under root."""
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and entry.name != MANIFEST_NAME:
+                            st = entry.stat(follow_symlinks=False)
+                            yield entry.path, st.st_size, st.st_mtime_ns
+                    except OSError as e:
+                        logger.warning(f"Integrity scan: cannot stat {entry.path}: {e}")
+        except OSError as e:
+            logger.warning(f"Integrity scan: cannot read directory {directory}: {e}")
+
+
+# ==========================================
+# MANIFEST
+# ==========================================
+
+def load_manifest(path: str | Path) -> Dict[str, List]:
+    """{absolute path: [size, mtime_ns, sha256]}; empty if missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            return data.get("files", {})
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Integrity manifest {path} unreadable, doing a full scan: {e}")
+    return {}
+
+
+def save_manifest(path: str | Path, files: Dict[str, List]) -> None:
+    """Write the manifest atomically so an interrupted scan never corrupts it."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".manifest-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            json.dump({"version": MANIFEST_VERSION, "written_at": time.time(), "files": files}, out)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ==========================================
+# DATABASE REFERENCES
+# ==========================================
+
+def referenced_files(db: Session, batch_size: int = 1000) -> Iterator[Tuple[str, int, str, Optional[str], str]]:
+    """
+    Stream (kind, id, file_path, expected sha256, storage provider) for rows
+    that reference a file.
+
+    Only the needed columns are selected and rows are fetched in batches,
+    so memory stays flat however many documents there are.
+    """
+    documents = db.query(Document.id, Document.file_path, Document.extra_metadata, Document.storage_provider) \
+        .filter(Document.file_path.isnot(None)).yield_per(batch_size)
+    for doc_id, file_path, extra_metadata, provider in documents:
+        yield "document", doc_id, file_path, (extra_metadata or {}).get("sha256"), provider or "local"
+
+    # A version's file is wherever its blob is, else with its document's
+    versions = db.query(
+        DocumentVersion.id, DocumentVersion.file_path, DocumentVersion.file_hash,
+        StoredBlob.storage_provider, Document.storage_provider
+    ).outerjoin(StoredBlob, StoredBlob.id == DocumentVersion.blob_id) \
+        .outerjoin(Document, Document.id == DocumentVersion.document_id) \
+        .filter(DocumentVersion.file_path.isnot(None)).yield_per(batch_size)
+    for version_id, file_path, file_hash, blob_provider, document_provider in versions:
+        yield "version", version_id, file_path, file_hash or None, blob_provider or document_provider or "local"
+
+    # Room images without COS are stored locally under their absolute path
+    images = db.query(RoomImage.id, RoomImage.object_key).yield_per(batch_size)
+    for image_id, key in images:
+        yield "room_image", image_id, key, None, "local" if os.path.isabs(key) else "ibm-cos"
+
+
+def _normalise(path: str) -> str:
+    """Absolute path a stored file_path resolves to locally."""
+    return os.path.abspath(Path.cwd() / path)
+
+
+def _is_owned(path: str, root: Path) -> bool:
+    try:
+        parts = Path(path).relative_to(root).parts
+    except ValueError:
+        return True
+    return not any(part in UNOWNED_DIRS for part in parts[:-1])
+
+
+# ==========================================
+# SCAN
+# ==========================================
+
+def scan_storage(
+    db: Session,
+    root: Optional[str | Path] = None,
+    manifest_path: Optional[str | Path] = None,
+    verify_hashes: bool = True,
+    full: bool = False,
+    workers: int = DEFAULT_WORKERS,
+) -> Dict[str, Any]:
+    """
+    Scan the local upload tree against the database.
+
+    verify_hashes=False only compares paths (orphans and missing files);
+    full=True ignores the manifest and re-hashes everything.
+    """
+    started = time.monotonic()
+    root = Path(root) if root else get_storage("local").path_for("")
+    root = Path(os.path.abspath(root))
+    manifest_path = Path(manifest_path) if manifest_path else root / MANIFEST_NAME
+
+    on_disk: Dict[str, FileStat] = {path: (size, mtime) for path, size, mtime in walk_files(root)}
+    total_bytes = sum(size for size, _ in on_disk.values())
+
+    hashes: Dict[str, str] = {}
+    hashed_count, hashed_bytes, reused = 0, 0, 0
+    errors: List[Dict[str, str]] = []
+
+    if verify_hashes:
+        previous = {} if full else load_manifest(manifest_path)
+        to_hash = []
+        for path, (size, mtime) in on_disk.items():
+            entry = previous.get(path)
+            if entry and entry[0] == size and entry[1] == mtime and entry[2]:
+                hashes[path] = entry[2]
+                reused += 1
+            else:
+                to_hash.append(path)
+
+        # Biggest first so one large file doesn't finish the scan alone
+        to_hash.sort(key=lambda p: on_disk[p][0], reverse=True)
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="integrity") as pool:
+            futures = {pool.submit(hash_file, path): path for path in to_hash}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    hashes[path] = future.result()
+                    hashed_count += 1
+                    hashed_bytes += on_disk[path][0]
+                except OSError as e:
+                    errors.append({"path": path, "error": str(e)})
+
+        save_manifest(manifest_path, {
+            path: [on_disk[path][0], on_disk[path][1], digest] for path, digest in hashes.items()
+        })
+
+    referenced = set()
+    missing: List[Dict[str, Any]] = []
+    mismatched: List[Dict[str, Any]] = []
+    rows_checked = 0
+
+    for kind, row_id, file_path, expected, provider in referenced_files(db):
+        rows_checked += 1
+        # A file on disk is referenced whatever the row's provider says (a
+        # document moved to COS keeps its older local version files); the
+        # provider only decides whether an absent file is reported missing
+        path = _normalise(file_path)
+        if path not in on_disk:
+            if provider != "ibm-cos" and Path(path).is_relative_to(root):
+                missing.append({"kind": kind, "id": row_id, "path": path})
+            continue
+        referenced.add(path)
+        if verify_hashes and expected and path in hashes and hashes[path] != expected:
+            mismatched.append({"kind": kind, "id": row_id, "path": path,
+                               "expected": expected, "actual": hashes[path]})
+
+    orphaned = [
+        {"path": path, "size": size, "modified": mtime / 1e9}
+        for path, (size, mtime) in on_disk.items()
+        if path not in referenced and _is_owned(path, root)
+    ]
+
+    report = {
+        "root": str(root),
+        "files_on_disk": len(on_disk),
+        "bytes_on_disk": total_bytes,
+        "rows_checked": rows_checked,
+        "files_hashed": hashed_count,
+        "bytes_hashed": hashed_bytes,
+        "hashes_reused": reused,
+        "missing": missing,
+        "mismatched": mismatched,
+        "orphaned": orphaned,
+        "errors": errors,
+        "duration_seconds": round(time.monotonic() - started, 2),
+    }
+    logger.info(
+        f"Integrity scan of {root}: {len(on_disk)} files, {hashed_count} hashed, {reused} from manifest, "
+        f"{len(missing)} missing, {len(mismatched)} mismatched, {len(orphaned)} orphaned "
+        f"in {report['duration_seconds']}s"
+    )
+    return report
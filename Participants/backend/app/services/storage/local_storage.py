@@ -0,0 +1,118 @@
+# backend/app/services/storage/local_storage.py
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Optional
+
+from app.services.storage.base import (
+    ByteRange,
+    ObjectBody,
+    ObjectNotFoundError,
+    StorageBackend,
+    StorageError,
+    guess_content_type,
+    range_result,
+    resolve_byte_range,
+)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Filesystem backend rooted at a directory; keys map to relative paths.
+
+    Writes go to a temp file in the target directory and are renamed into
+    place, so readers never see a partially written object.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._resolved_root = self.root.resolve()
+        self.bucket = str(self.root)
+
+    def path_for(self, key: str) -> Path:
+        """Absolute path for a key; rejects keys that escape the root."""
+        path = (self._resolved_root / key.lstrip("/")).resolve()
+        if path != self._resolved_root and self._resolved_root not in path.parents:
+            raise StorageError(f"Key escapes storage root: {key}")
+        return path
+
+    def _write(self, key: str, writer) -> int:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                writer(out)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path.stat().st_size
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+        size = self._write(key, lambda out: out.write(data))
+        return self._put_result(key, guess_content_type(key, content_type), size)
+
+    def put_fileobj(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> Dict[str, Any]:
+        size = self._write(key, lambda out: shutil.copyfileobj(fileobj, out, 1024 * 1024))
+        return self._put_result(key, guess_content_type(key, content_type), size)
+
+    def put_stream(self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None) -> Dict[str, Any]:
+        def write_chunks(out):
+            for chunk in chunks:
+                out.write(chunk)
+
+        size = self._write(key, write_chunks)
+        return self._put_result(key, guess_content_type(key, content_type), size)
+
+    def get_object_stream(self, key: str, byte_range: Optional[ByteRange] = None) -> Dict[str, Any]:
+        return self.open_file(self.path_for(key), byte_range, key)
+
+    @staticmethod
+    def open_file(path: str | Path, byte_range: Optional[ByteRange] = None, key: Optional[str] = None) -> Dict[str, Any]:
+        """Open any file as a get_object-shaped result, optionally sliced to a byte range."""
+        try:
+            fileobj = open(path, "rb")
+        except FileNotFoundError:
+            raise ObjectNotFoundError(key or str(path))
+        size = os.fstat(fileobj.fileno()).st_size
+        result = {"ContentType": guess_content_type(str(path)), "ContentLength": size}
+        if byte_range is not None:
+            try:
+                first, last = resolve_byte_range(byte_range, size)
+            except Exception:
+                fileobj.close()
+                raise
+            fileobj.seek(first)
+            result.update(range_result(first, last, size))
+        result["Body"] = ObjectBody(fileobj, length=result["ContentLength"] if byte_range is not None else None)
+        return result
+
+    def delete_object(self, key: str) -> None:
+        self.path_for(key).unlink(missing_ok=True)
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).is_file()
+
+    def copy(self, old_key: str, new_key: str) -> None:
+        source = self.path_for(old_key)
+        if not source.is_file():
+            raise ObjectNotFoundError(old_key)
+        target = self.path_for(new_key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, target)
+
+    def copy_object(self, old_key: str, new_key: str) -> Dict[str, str]:
+        """Move within the same filesystem with a single rename."""
+        source = self.path_for(old_key)
+        if not source.is_file():
+            raise ObjectNotFoundError(old_key)
+        target = self.path_for(new_key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        return {"from": old_key, "to": new_key}
@@ -0,0 +1,63 @@
+# backend/app/services/storage/memory_storage.py
+import io
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.storage.base import (
+    ByteRange,
+    ObjectBody,
+    ObjectNotFoundError,
+    StorageBackend,
+    guess_content_type,
+    range_result,
+    resolve_byte_range,
+)
+
+
+class MemoryStorage(StorageBackend):
+    """In-process backend for tests and local development; contents are lost on restart."""
+
+    name = "memory"
+    bucket = "memory"
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+        ct = guess_content_type(key, content_type)
+        with self._lock:
+            self._objects[key] = (bytes(data), ct)
+        return self._put_result(key, ct, len(data))
+
+    def get_object_stream(self, key: str, byte_range: Optional[ByteRange] = None) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                data, ct = self._objects[key]
+            except KeyError:
+                raise ObjectNotFoundError(key)
+        result = {"ContentType": ct, "ContentLength": len(data)}
+        if byte_range is not None:
+            first, last = resolve_byte_range(byte_range, len(data))
+            data = data[first:last + 1]
+            result.update(range_result(first, last, result["ContentLength"]))
+        result["Body"] = ObjectBody(io.BytesIO(data))
+        return result
+
+    def delete_object(self, key: str) -> None:
+        with self._lock:
+            self._objects.pop(key, None)
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self._objects
+
+    def copy(self, old_key: str, new_key: str) -> None:
+        with self._lock:
+            if old_key not in self._objects:
+                raise ObjectNotFoundError(old_key)
+            self._objects[new_key] = self._objects[old_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._objects.clear()
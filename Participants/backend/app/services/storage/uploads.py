@@ -0,0 +1,148 @@
+# backend/app/services/storage/uploads.py
+"""
+Streaming upload pipeline.
+
+Reads an upload in fixed-size chunks, sniffs the real file type from its
+leading bytes, hashes and size-checks it on the way through, and hands the
+chunks to the storage backend's put_stream (multipart on COS). Memory use
+per upload is bounded by the backend's part buffers, not the file size.
+"""
+import codecs
+import hashlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional
+
+from app.services.storage.base import StorageBackend, StorageError
+
+READ_CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 8192
+
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06")
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1"}
+
+OFFICE_ZIP_TYPES = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+OFFICE_OLE_TYPES = {
+    ".doc": "application/msword",
+    ".xls": "application/vnd.ms-excel",
+}
+
+
+class UploadValidationError(StorageError):
+    """Raised when an upload is rejected; status_code is the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_content_type(head: bytes, filename: str = "") -> Optional[str]:
+    """
+    Identify a file from its first bytes.
+
+    Container formats are narrowed by extension only after the signature
+    matches (a .docx must still be a ZIP). Returns None when nothing matches.
+    """
+    ext = Path(filename or "").suffix.lower()
+
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if len(head) >= 12 and head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return "image/heic"
+    if head.startswith(ZIP_SIGNATURES):
+        return OFFICE_ZIP_TYPES.get(ext, "application/zip")
+    if head.startswith(OLE_SIGNATURE):
+        return OFFICE_OLE_TYPES.get(ext, "application/msword")
+
+    if head and b"\x00" not in head:
+        # A head shorter than SNIFF_BYTES is the whole file; otherwise the
+        # decoder holds back a character cut off at the sniff boundary
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=len(head) < SNIFF_BYTES)
+        except UnicodeDecodeError:
+            return None
+        if ext == ".eml":
+            return "message/rfc822"
+        return "text/plain"
+
+    return None
+
+
+class UploadDigest:
+    """Running size and SHA-256 of the bytes that have passed through."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadValidationError(
+                f"File exceeds {self.max_bytes // (1024 * 1024)} MB", status_code=413
+            )
+        self._sha256.update(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+
+def _chunks(fileobj: BinaryIO, head: bytes, digest: UploadDigest, chunk_size: int) -> Iterator[bytes]:
+    if head:
+        digest.update(head)
+        yield head
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        yield chunk
+
+
+def stream_upload(
+    storage: StorageBackend,
+    key: str,
+    fileobj: BinaryIO,
+    filename: str = "",
+    allowed_types: Optional[Iterable[str]] = None,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = READ_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Validate and stream ``fileobj`` to ``storage`` under ``key``.
+
+    Returns {"key", "content_type", "size", "sha256"}. The stored content
+    type is the sniffed one, not whatever the client declared. Raises
+    UploadValidationError for empty, oversized or disallowed files; a
+    rejected upload leaves nothing behind in storage.
+    """
+    head = fileobj.read(SNIFF_BYTES)
+    if not head:
+        raise UploadValidationError("Uploaded file is empty")
+
+    content_type = sniff_content_type(head, filename)
+    allowed = set(allowed_types) if allowed_types is not None else None
+    if content_type is None or (allowed is not None and content_type not in allowed):
+        detected = content_type or "unrecognised content"
+        raise UploadValidationError(f"File type {detected} not supported. Allowed types: {', '.join(sorted(allowed or []))}")
+
+    digest = UploadDigest(max_bytes)
+    storage.put_stream(key, _chunks(fileobj, head, digest, chunk_size), content_type)
+
+    return {
+        "key": key,
+        "content_type": content_type,
+        "size": digest.size,
+        "sha256": digest.sha256,
+    }
@@ -0,0 +1,337 @@
+# backend/app/services/storage/zip_stream.py
+"""
+Streamed ZIP archives with a layout known before any member is read.
+
+Members are STORED (documents are mostly PDFs and images that don't
+compress further) and each is followed by a data descriptor carrying its
+CRC-32, so every header can be written before the member's bytes are read.
+The archive's exact size and byte layout therefore follow from the member
+names and sizes alone: the response gets a Content-Length, nothing is
+spooled to disk, and any byte range of the archive can be regenerated on
+its own to resume an interrupted download.
+
+Member bytes are fetched ahead on a small thread pool (bounded by member
+count and size), so storage latency overlaps with sending to the client.
+ZIP64 records are only written when the archive needs them.
+"""
+
+import logging
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.services.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    ByteRange,
+    StorageError,
+    range_result,
+    resolve_byte_range,
+)
+
+logger = logging.getLogger(__name__)
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_COUNT_LIMIT = 0xFFFF
+FLAGS = 0x0808  # data descriptor follows the data; names are UTF-8
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_RECORD = struct.Struct("<IHHHHIIH")
+ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+ZIP64_LOCATOR = struct.Struct("<IIQI")
+
+# CRC-32s by content identity, so a resumed download doesn't re-read
+# members it has already sent just to finish the central directory
+CRC_CACHE_SIZE = 100_000
+_crc_cache: "OrderedDict[str, int]" = OrderedDict()
+_crc_cache_lock = threading.Lock()
+
+
+def _cached_crc(key: Optional[str]) -> Optional[int]:
+    if not key:
+        return None
+    with _crc_cache_lock:
+        crc = _crc_cache.get(key)
+        if crc is not None:
+            _crc_cache.move_to_end(key)
+        return crc
+
+
+def _remember_crc(key: Optional[str], crc: int) -> None:
+    if not key:
+        return
+    with _crc_cache_lock:
+        _crc_cache[key] = crc
+        while len(_crc_cache) > CRC_CACHE_SIZE:
+            _crc_cache.popitem(last=False)
+
+
+def _dos_datetime(value: Optional[datetime]) -> tuple:
+    if value is None or value.year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    time_part = (value.hour << 11) | (value.minute << 5) | (value.second // 2)
+    date_part = ((value.year - 1980) << 9) | (value.month << 5) | value.day
+    return time_part, date_part
+
+
+class ZipMember:
+    """
+    One archive member: either in-memory ``data`` or an ``opener`` returning
+    a get_object-shaped dict (see storage.delivery), plus its exact size.
+
+    ``crc_key`` identifies the content (e.g. its SHA-256) for the CRC cache.
+    """
+
+    def __init__(self, name: str, size: int, modified: Optional[datetime] = None,
+                 opener: Optional[Callable[[Optional[ByteRange]], Dict[str, Any]]] = None,
+                 data: Optional[bytes] = None, crc_key: Optional[str] = None):
+        if data is None and opener is None:
+            raise ValueError("ZipMember needs data or an opener")
+        self.name = name
+        self.encoded_name = name.encode("utf-8")
+        self.size = len(data) if data is not None else size
+        self.modified = modified
+        self.opener = opener
+        self.data = data
+        self.crc_key = crc_key
+        self.crc: Optional[int] = zlib.crc32(data) if data is not None else _cached_crc(crc_key)
+        self.header_offset = 0
+        self.header = b""
+
+    @property
+    def data_offset(self) -> int:
+        return self.header_offset + len(self.header)
+
+
+class ZipStream:
+    """Byte-exact, rangeable ZIP archive over a list of members."""
+
+    def __init__(self, members: List[ZipMember], prefetch: int = 4,
+                 prefetch_max_bytes: int = 16 * 1024 * 1024, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.members = members
+        self.prefetch = max(0, prefetch)
+        self.prefetch_max_bytes = prefetch_max_bytes
+        self.chunk_size = chunk_size
+        self.zip64 = False
+        self._layout()
+        if self._needs_zip64():
+            self.zip64 = True
+            self._layout()
+
+    # ------------------------------------------
+    # Layout
+    # ------------------------------------------
+
+    @property
+    def _version(self) -> int:
+        return 45 if self.zip64 else 20
+
+    @property
+    def _descriptor_size(self) -> int:
+        return 24 if self.zip64 else 16
+
+    def _local_header(self, member: ZipMember) -> bytes:
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if self.zip64 else b""
+        dos_time, dos_date = _dos_datetime(member.modified)
+        return LOCAL_HEADER.pack(
+            0x04034B50, self._version, FLAGS, 0, dos_time, dos_date,
+            0, 0, 0, len(member.encoded_name), len(extra)
+        ) + member.encoded_name + extra
+
+    def _central_entry_size(self, member: ZipMember) -> int:
+        return CENTRAL_HEADER.size + len(member.encoded_name) + (28 if self.zip64 else 0)
+
+    def _layout(self) -> None:
+        offset = 0
+        for member in self.members:
+            member.header_offset = offset
+            member.header = self._local_header(member)
+            offset += len(member.header) + member.size + self._descriptor_size
+        self.central_offset = offset
+        self.central_size = sum(self._central_entry_size(m) for m in self.members)
+        end_size = END_RECORD.size + (ZIP64_END_RECORD.size + ZIP64_LOCATOR.size if self.zip64 else 0)
+        self.size = self.central_offset + self.central_size + end_size
+
+    def _needs_zip64(self) -> bool:
+        return (
+            len(self.members) >= ZIP_COUNT_LIMIT
+            or self.central_offset >= ZIP64_LIMIT
+            or self.central_size >= ZIP64_LIMIT
+            or any(m.size >= ZIP64_LIMIT for m in self.members)
+        )
+
+    # ------------------------------------------
+    # Member data
+    # ------------------------------------------
+
+    def _read(self, member: ZipMember, byte_range: Optional[ByteRange] = None) -> Iterator[bytes]:
+        obj = member.opener(byte_range)
+        body = obj["Body"]
+        try:
+            if hasattr(body, "iter_chunks"):
+                yield from body.iter_chunks(self.chunk_size)
+            else:
+                while True:
+                    chunk = body.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            body.close()
+
+    def _fetch(self, member: ZipMember) -> bytes:
+        data = b"".join(self._read(member))
+        if len(data) != member.size:
+            raise StorageError(f"{member.name} is {len(data)} bytes, expected {member.size}")
+        return data
+
+    def _crc(self, member: ZipMember) -> int:
+        """CRC-32 of a member, reading it only if neither computed nor cached."""
+        if member.crc is None:
+            crc, length = 0, 0
+            for chunk in self._read(member):
+                crc = zlib.crc32(chunk, crc)
+                length += len(chunk)
+            if length != member.size:
+                raise StorageError(f"{member.name} is {length} bytes, expected {member.size}")
+            member.crc = crc
+            _remember_crc(member.crc_key, crc)
+        return member.crc
+
+    def _member_bytes(self, member: ZipMember, first: int, end: int,
+                      prefetched: Optional[Future]) -> Iterator[bytes]:
+        """Bytes [first, end) of a member's data, computing its CRC on a full read."""
+        if member.data is not None:
+            yield member.data[first:end]
+            return
+        if prefetched is not None:
+            data = prefetched.result()
+            member.crc = zlib.crc32(data)
+            _remember_crc(member.crc_key, member.crc)
+            yield data[first:end]
+            return
+        if first > 0 or end < member.size:
+            if end > first:
+                yield from self._read(member, (first, end - 1))
+            return
+
+        crc, length = 0, 0
+        for chunk in self._read(member):
+            crc = zlib.crc32(chunk, crc)
+            length += len(chunk)
+            if length > member.size:
+                raise StorageError(f"{member.name} is larger than {member.size} bytes")
+            yield chunk
+        if length != member.size:
+            raise StorageError(f"{member.name} is {length} bytes, expected {member.size}")
+        member.crc = crc
+        _remember_crc(member.crc_key, crc)
+
+    # ------------------------------------------
+    # Records
+    # ------------------------------------------
+
+    def _descriptor(self, member: ZipMember) -> bytes:
+        crc = self._crc(member)
+        if self.zip64:
+            return struct.pack("<IIQQ", 0x08074B50, crc, member.size, member.size)
+        return struct.pack("<IIII", 0x08074B50, crc, member.size, member.size)
+
+    def _central_directory(self) -> bytes:
+        parts = []
+        for member in self.members:
+            dos_time, dos_date = _dos_datetime(member.modified)
+            if self.zip64:
+                size = offset = ZIP64_LIMIT
+                extra = struct.pack("<HHQQQ", 0x0001, 24, member.size, member.size, member.header_offset)
+            else:
+                size, offset, extra = member.size, member.header_offset, b""
+            parts.append(CENTRAL_HEADER.pack(
+                0x02014B50, self._version, self._version, FLAGS, 0, dos_time, dos_date,
+                self._crc(member), size, size, len(member.encoded_name), len(extra), 0, 0, 0, 0, offset
+            ) + member.encoded_name + extra)
+
+        count = len(self.members)
+        if self.zip64:
+            zip64_end_offset = self.central_offset + self.central_size
+            parts.append(ZIP64_END_RECORD.pack(
+                0x06064B50, 44, 45, 45, 0, 0, count, count, self.central_size, self.central_offset
+            ))
+            parts.append(ZIP64_LOCATOR.pack(0x07064B50, 0, zip64_end_offset, 1))
+            parts.append(END_RECORD.pack(0x06054B50, 0, 0, 0xFFFF, 0xFFFF, ZIP64_LIMIT, ZIP64_LIMIT, 0))
+        else:
+            parts.append(END_RECORD.pack(
+                0x06054B50, 0, 0, count, count, self.central_size, self.central_offset, 0
+            ))
+        return b"".join(parts)
+
+    # ------------------------------------------
+    # Streaming
+    # ------------------------------------------
+
+    def iter_range(self, first: int = 0, last: Optional[int] = None) -> Iterator[bytes]:
+        """Yield archive bytes first..last (inclusive)."""
+        end = self.size if last is None else last + 1
+
+        # Members whose data lies wholly inside the range, small enough to prefetch
+        queue = [
+            m for m in self.members
+            if m.data is None and 0 < m.size <= self.prefetch_max_bytes
+            and m.data_offset >= first and m.data_offset + m.size <= end
+        ]
+        pool = ThreadPoolExecutor(max_workers=self.prefetch, thread_name_prefix="zip-prefetch") if self.prefetch and queue else None
+        futures: Dict[int, Future] = {}
+        queue_pos = 0
+
+        def top_up():
+            nonlocal queue_pos
+            while pool and queue_pos < len(queue) and len(futures) < self.prefetch:
+                member = queue[queue_pos]
+                futures[id(member)] = pool.submit(self._fetch, member)
+                queue_pos += 1
+
+        try:
+            for member in self.members:
+                header_start = member.header_offset
+                data_start = member.data_offset
+                descriptor_start = data_start + member.size
+                member_end = descriptor_start + self._descriptor_size
+                if member_end <= first:
+                    continue
+                if header_start >= end:
+                    break
+
+                top_up()
+                if header_start < end and data_start > first:
+                    yield member.header[max(first - header_start, 0):min(end - header_start, len(member.header))]
+                if data_start < end and descriptor_start > first:
+                    yield from self._member_bytes(
+                        member,
+                        max(first - data_start, 0),
+                        min(end - data_start, member.size),
+                        futures.pop(id(member), None),
+                    )
+                if descriptor_start < end:
+                    descriptor = self._descriptor(member)
+                    yield descriptor[max(first - descriptor_start, 0):end - descriptor_start]
+
+            if end > self.central_offset:
+                tail = self._central_directory()
+                yield tail[max(first - self.central_offset, 0):end - self.central_offset]
+        finally:
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def open(self, byte_range: Optional[ByteRange] = None) -> Dict[str, Any]:
+        """get_object-shaped result for storage.delivery.build_file_response."""
+        result = {"ContentType": "application/zip", "ContentLength": self.size}
+        first, last = 0, None
+        if byte_range is not None:
+            first, last = resolve_byte_range(byte_range, self.size)
+            result.update(range_result(first, last, self.size))
+        result["Body"] = (chunk for chunk in self.iter_range(first, last) if chunk)
+        return result
@@ -12,6 +12,7 @@ This service manages Xero authentication tokens with the following security feat
 """
 
 import os
+import threading
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
@@ -20,7 +21,7 @@ from xero_python.api_client import ApiClient
 from xero_python.api_client.configuration import Configuration
 
 from app.models.xero_token import XeroToken
-from app.core.encryption import encrypt_token, decrypt_token
+from app.core.encryption import encrypt_token, decrypt_token_with_rotation
 
 
 # OAuth scopes
@@ -33,6 +34,35 @@ XERO_SCOPES = [
     "accounting.contacts"
 ]
 
+# Decrypted tokens are cached in memory per organization until shortly
+# before they expire, so API calls don't re-query and re-decrypt the row
+TOKEN_CACHE_EXPIRY_MARGIN_SECONDS = 60
+_token_cache: Dict[Optional[int], Dict[str, Any]] = {}
+_token_cache_lock = threading.Lock()
+
+
+def _get_cached_token(organization_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    with _token_cache_lock:
+        token = _token_cache.get(organization_id)
+        if not token:
+            return None
+        current_time = int(datetime.now().timestamp())
+        if token["expires_at"] - TOKEN_CACHE_EXPIRY_MARGIN_SECONDS <= current_time:
+            _token_cache.pop(organization_id, None)
+            return None
+        return {**token, "expires_in": max(0, token["expires_at"] - current_time)}
+
+
+def _cache_token(organization_id: Optional[int], token: Dict[str, Any]) -> None:
+    with _token_cache_lock:
+        _token_cache[organization_id] = dict(token)
+
+
+def invalidate_token_cache(organization_id: Optional[int] = None) -> None:
+    """Drop the cached token for an organization (e.g. after a 401 from Xero)."""
+    with _token_cache_lock:
+        _token_cache.pop(organization_id, None)
+
 
 class XeroTokenService:
     """
@@ -60,6 +90,10 @@ class XeroTokenService:
             Dictionary with token information (as expected by Xero SDK)
             or None if no valid token exists
         """
+        cached = _get_cached_token(self.organization_id)
+        if cached:
+            return cached
+
         print(f"✅ GETTER CALLED: Retrieving token from database for org={self.organization_id}, user={self.user_id}")
 
         # Query for active token
@@ -92,18 +126,28 @@ class XeroTokenService:
 
         # Decrypt tokens
         try:
-            access_token = decrypt_token(token_record.access_token_encrypted)
-            refresh_token = decrypt_token(token_record.refresh_token_encrypted)
-            id_token = decrypt_token(token_record.id_token_encrypted) if token_record.id_token_encrypted else None
+            access_token, rotated_access = decrypt_token_with_rotation(token_record.access_token_encrypted)
+            refresh_token, rotated_refresh = decrypt_token_with_rotation(token_record.refresh_token_encrypted)
+            id_token, rotated_id = decrypt_token_with_rotation(token_record.id_token_encrypted) if token_record.id_token_encrypted else (None, None)
 
             print(f"📦 Retrieved and decrypted token from database (expires at: {token_record.expires_at})")
 
+            # Re-encrypt values still stored under a retired SECRET_KEY
+            if rotated_access:
+                token_record.access_token_encrypted = rotated_access
+            if rotated_refresh:
+                token_record.refresh_token_encrypted = rotated_refresh
+            if rotated_id:
+                token_record.id_token_encrypted = rotated_id
+            if rotated_access or rotated_refresh or rotated_id:
+                print("🔑 Token re-encrypted with the current key")
+
             # Update last used timestamp
             token_record.last_used_at = datetime.now()
             self.db.commit()
 
             # Return in format expected by Xero SDK
-            return {
+            token = {
                 "access_token": access_token,
                 "refresh_token": refresh_token,
                 "id_token": id_token,
@@ -112,6 +156,8 @@ class XeroTokenService:
                 "expires_in": max(0, token_record.expires_at - current_time),
                 "scope": token_record.scope
             }
+            _cache_token(self.organization_id, token)
+            return token
 
         except Exception as e:
             print(f"❌ Error decrypting token: {str(e)}")
@@ -189,6 +235,14 @@ class XeroTokenService:
             self.db.add(new_token)
 
         self.db.commit()
+        _cache_token(self.organization_id, {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "id_token": id_token,
+            "token_type": token_type,
+            "expires_at": expires_at,
+            "scope": scope
+        })
         print("📦 Token has been encrypted and saved to database")
 
     def update_tenant_info(self, tenant_id: str, tenant_name: str) -> None:
@@ -255,6 +309,7 @@ class XeroTokenService:
             token.updated_at = datetime.now()
 
         self.db.commit()
+        invalidate_token_cache(self.organization_id)
         print("📦 All tokens have been revoked")
 
     def get_xero_client(self) -> ApiClient:
@@ -0,0 +1,634 @@
+# backend/app/services/xero_sync_service.py
+
+"""
+Batched, rate-limited Xero sync engine.
+
+Pushes participants (as Xero contacts) and invoices to the Xero Accounting API:
+1. Records are sent in batches of up to XERO_MAX_BATCH_SIZE per request
+2. A per-entity watermark (XeroSyncState) means only changed records go out
+3. Every call passes through a token-bucket scheduler that respects Xero's
+   per-minute and per-day limits, plus Retry-After on 429 responses
+4. The decrypted access token comes from XeroTokenService's in-memory cache
+
+The API base URL is configurable (XERO_API_BASE_URL) so the engine can run
+against scripts/xero_stub_server.py locally.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.participant import Participant
+from app.models.xero_sync import XeroContactLink, XeroSyncState
+
+logger = logging.getLogger(__name__)
+
+XERO_API_BASE_URL = os.getenv("XERO_API_BASE_URL", "https://api.xero.com/api.xro/2.0")
+XERO_MAX_BATCH_SIZE = int(os.getenv("XERO_MAX_BATCH_SIZE", "50"))
+XERO_CALLS_PER_MINUTE = int(os.getenv("XERO_CALLS_PER_MINUTE", "60"))
+XERO_CALLS_PER_DAY = int(os.getenv("XERO_CALLS_PER_DAY", "5000"))
+XERO_MAX_RATE_LIMIT_WAIT_SECONDS = float(os.getenv("XERO_MAX_RATE_LIMIT_WAIT_SECONDS", "120"))
+XERO_SALES_ACCOUNT_CODE = os.getenv("XERO_SALES_ACCOUNT_CODE", "200")
+XERO_REQUEST_TIMEOUT_SECONDS = 30
+XERO_MAX_RETRIES = 3
+
+# Records changed this close to the start of a run are sent again next run;
+# pushes are idempotent upserts, so overlap is cheap while a gap would lose changes.
+# The run start is read from the database clock, which fills updated_at
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+INVOICE_STATUS_TO_XERO = {
+    InvoiceStatus.draft: "DRAFT",
+    InvoiceStatus.sent: "AUTHORISED",
+    InvoiceStatus.overdue: "AUTHORISED",
+    InvoiceStatus.paid: "AUTHORISED",
+    InvoiceStatus.cancelled: "VOIDED",
+}
+
+
+class XeroSyncError(Exception):
+    """Raised when a sync run cannot continue."""
+
+
+class XeroNotConnectedError(XeroSyncError):
+    """Raised when there is no usable Xero token or tenant."""
+
+
+class XeroRateLimitError(XeroSyncError):
+    """Raised when the rate limiter would have to wait longer than allowed."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Xero rate limit reached, retry in {int(retry_after)}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket; callers hold the limiter lock."""
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.clock = clock
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        elapsed = max(0.0, now - self.updated_at)
+        self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available (0 when they already are)."""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.refill_per_second
+
+    def take(self, tokens: float = 1.0) -> None:
+        self.tokens -= tokens
+
+    def clamp(self, remaining: float) -> None:
+        """Trust the server's remaining-calls count when it is lower than ours."""
+        self._refill()
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class XeroRateLimiter:
+    """
+    Scheduler for Xero API calls.
+
+    Xero allows 60 calls per minute and 5,000 calls per day per tenant.
+    A call is only released when both buckets have a token, and a 429
+    blocks every caller until its Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        per_minute: int = XERO_CALLS_PER_MINUTE,
+        per_day: int = XERO_CALLS_PER_DAY,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        self.minute_bucket = TokenBucket(per_minute, per_minute / 60.0, clock)
+        self.day_bucket = TokenBucket(per_day, per_day / 86400.0, clock)
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Block until a call may be made; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = max(
+                    self._blocked_until - self.clock(),
+                    self.minute_bucket.wait_time(),
+                    self.day_bucket.wait_time(),
+                )
+                if wait <= 0:
+                    self.minute_bucket.take()
+                    self.day_bucket.take()
+                    return waited
+
+            if max_wait is not None and waited + wait > max_wait:
+                raise XeroRateLimitError(retry_after=wait)
+            self.sleep(wait)
+            waited += wait
+
+    def penalize(self, retry_after: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self.clock() + retry_after)
+
+    def observe(self, headers) -> None:
+        """Sync bucket levels with Xero's X-MinLimit-Remaining / X-DayLimit-Remaining headers."""
+        with self._lock:
+            for header, bucket in (
+                ("X-MinLimit-Remaining", self.minute_bucket),
+                ("X-DayLimit-Remaining", self.day_bucket),
+            ):
+                value = headers.get(header)
+                if value is not None:
+                    try:
+                        bucket.clamp(int(value))
+                    except ValueError:
+                        pass
+
+
+# Xero limits apply per tenant, so limiters are shared process-wide per tenant
+_rate_limiters: Dict[str, XeroRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_rate_limiter(tenant_id: str) -> XeroRateLimiter:
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(tenant_id)
+        if limiter is None:
+            limiter = XeroRateLimiter()
+            _rate_limiters[tenant_id] = limiter
+        return limiter
+
+
+def get_http_session() -> requests.Session:
+    """Long-lived HTTP session so Xero calls reuse pooled connections."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+        return _http_session
+
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class XeroSyncEngine:
+    """
+    Pushes contact and invoice deltas to Xero in batches.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        tenant_id: str,
+        access_token_provider: Callable[[], Optional[str]],
+        organization_id: Optional[int] = None,
+        base_url: str = XERO_API_BASE_URL,
+        session: Optional[requests.Session] = None,
+        rate_limiter: Optional[XeroRateLimiter] = None,
+        batch_size: int = XERO_MAX_BATCH_SIZE,
+        max_rate_limit_wait: float = XERO_MAX_RATE_LIMIT_WAIT_SECONDS,
+        on_unauthorized: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Args:
+            db: Database session
+            tenant_id: Xero tenant (organisation) ID sent with every call
+            access_token_provider: Returns the current decrypted access token
+            organization_id: Local organization whose watermarks are used
+            base_url: Xero Accounting API root (override for a stub server)
+            session: HTTP session; defaults to the shared pooled session
+            rate_limiter: Defaults to the process-wide limiter for the tenant
+            batch_size: Records per request, capped at Xero's limit of 50
+            max_rate_limit_wait: Longest a single call may wait for the limiter
+            on_unauthorized: Called when Xero rejects the token (401)
+        """
+        self.db = db
+        self.tenant_id = tenant_id
+        self.access_token_provider = access_token_provider
+        self.organization_id = organization_id
+        self.base_url = base_url.rstrip("/")
+        self.session = session or get_http_session()
+        self.rate_limiter = rate_limiter or get_rate_limiter(tenant_id)
+        self.batch_size = max(1, min(batch_size, 50))
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.on_unauthorized = on_unauthorized
+        self.api_calls = 0
+
+    @classmethod
+    def for_organization(cls, db: Session, organization_id: Optional[int] = None, **kwargs) -> "XeroSyncEngine":
+        """Build an engine from the stored (encrypted) Xero connection."""
+        from app.services.xero_service import XeroTokenService, invalidate_token_cache
+
+        token_service = XeroTokenService(db, organization_id=organization_id)
+        tenant_id = token_service.get_tenant_id()
+        if not tenant_id:
+            raise XeroNotConnectedError("Xero is not connected")
+
+        def access_token_provider() -> Optional[str]:
+            token = token_service.get_token_from_storage()
+            return token["access_token"] if token else None
+
+        return cls(
+            db,
+            tenant_id,
+            access_token_provider,
+            organization_id=organization_id,
+            on_unauthorized=lambda: invalidate_token_cache(organization_id),
+            **kwargs,
+        )
+
+    # ==========================================
+    # PUBLIC SYNC METHODS
+    # ==========================================
+
+    def sync_all(self, invoice_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Push contact deltas, then invoice deltas (or the given invoices)."""
+        contacts = self.sync_contacts()
+        invoices = self.sync_invoices(invoice_ids)
+        return {
+            "synced": contacts["synced"] + invoices["synced"],
+            "failed": contacts["failed"] + invoices["failed"],
+            "api_calls": self.api_calls,
+            "contacts": contacts,
+            "invoices": invoices,
+        }
+
+    def sync_contacts(self) -> Dict[str, Any]:
+        """Push participants that have invoices and changed since the contact watermark."""
+        state = self._get_state("contact")
+        run_started = self._db_now() - WATERMARK_OVERLAP
+
+        has_invoice = exists().where(Invoice.participant_id == Participant.id)
+        is_linked = exists().where(XeroContactLink.participant_id == Participant.id)
+        query = self.db.query(Participant.id).filter(has_invoice)
+        if state.last_synced_at:
+            changed_at = func.coalesce(Participant.updated_at, Participant.created_at)
+            query = query.filter(or_(~is_linked, changed_at > state.last_synced_at))
+        participant_ids = [row[0] for row in query.order_by(Participant.id)]
+
+        return self._run(state, run_started, participant_ids, self._push_contact_batch, advance_watermark=True)
+
+    def sync_invoices(self, invoice_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Push invoices changed since the invoice watermark.
+
+        When invoice_ids is given only those invoices are pushed and the
+        watermark is left alone.
+        """
+        state = self._get_state("invoice")
+        run_started = self._db_now() - WATERMARK_OVERLAP
+
+        query = self.db.query(Invoice.id)
+        if invoice_ids is not None:
+            query = query.filter(Invoice.id.in_(invoice_ids))
+        else:
+            # Cancelled invoices Xero has never seen have nothing to void
+            query = query.filter(
+                or_(Invoice.status != InvoiceStatus.cancelled, Invoice.xero_invoice_id.isnot(None))
+            )
+            if state.last_synced_at:
+                changed_at = func.coalesce(Invoice.updated_at, Invoice.created_at)
+                query = query.filter(
+                    or_(Invoice.xero_invoice_id.is_(None), changed_at > state.last_synced_at)
+                )
+        ids = [row[0] for row in query.order_by(Invoice.id)]
+
+        return self._run(state, run_started, ids, self._push_invoice_batch,
+                         advance_watermark=invoice_ids is None)
+
+    # ==========================================
+    # BATCH PUSHERS
+    # ==========================================
+
+    def _push_contact_batch(self, participant_ids: List[int], result: Dict[str, Any]) -> None:
+        participants = self.db.query(Participant).filter(Participant.id.in_(participant_ids)).order_by(Participant.id).all()
+        links = {
+            link.participant_id: link
+            for link in self.db.query(XeroContactLink).filter(XeroContactLink.participant_id.in_(participant_ids))
+        }
+
+        payload = [self._contact_payload(p, links.get(p.id)) for p in participants]
+        response_items = self._post_batch("Contacts", payload)
+
+        for participant, item in zip(participants, response_items):
+            error = self._validation_error(item)
+            contact_id = item.get("ContactID")
+            if error or not contact_id:
+                self._record_failure(result, "participant", participant.id, error or "No ContactID returned")
+                continue
+
+            link = links.get(participant.id)
+            if link:
+                link.xero_contact_id = contact_id
+                link.synced_at = datetime.now()
+            else:
+                self.db.add(XeroContactLink(participant_id=participant.id, xero_contact_id=contact_id))
+            result["synced"] += 1
+
+        self.db.commit()
+
+    def _push_invoice_batch(self, invoice_ids: List[int], result: Dict[str, Any]) -> None:
+        invoices = self.db.query(Invoice).options(selectinload(Invoice.items)).filter(
+            Invoice.id.in_(invoice_ids)
+        ).order_by(Invoice.id).all()
+        contact_ids = {
+            link.participant_id: link.xero_contact_id
+            for link in self.db.query(XeroContactLink).filter(
+                XeroContactLink.participant_id.in_({inv.participant_id for inv in invoices})
+            )
+        }
+
+        to_send = []
+        for invoice in invoices:
+            contact_id = contact_ids.get(invoice.participant_id)
+            if not contact_id:
+                self._record_failure(result, "invoice", invoice.id, "Participant has not been synced as a Xero contact")
+                continue
+            to_send.append(invoice)
+
+        if not to_send:
+            return
+
+        response_items = self._post_batch(
+            "Invoices",
+            [self._invoice_payload(inv, contact_ids[inv.participant_id]) for inv in to_send],
+        )
+
+        for invoice, item in zip(to_send, response_items):
+            error = self._validation_error(item)
+            xero_invoice_id = item.get("InvoiceID")
+            if error or not xero_invoice_id:
+                self._record_failure(result, "invoice", invoice.id, error or "No InvoiceID returned")
+                continue
+
+            if invoice.xero_invoice_id != xero_invoice_id:
+                # Keep updated_at as-is so recording the Xero ID doesn't re-queue the invoice
+                self.db.query(Invoice).filter(Invoice.id == invoice.id).update(
+                    {Invoice.xero_invoice_id: xero_invoice_id, Invoice.updated_at: Invoice.updated_at},
+                    synchronize_session=False,
+                )
+            result["synced"] += 1
+
+        self.db.commit()
+
+    # ==========================================
+    # PAYLOADS
+    # ==========================================
+
+    def _contact_payload(self, participant: Participant, link: Optional[XeroContactLink]) -> Dict[str, Any]:
+        name = f"{participant.first_name} {participant.last_name}".strip()
+        if participant.ndis_number:
+            # Xero contact names must be unique
+            name = f"{name} ({participant.ndis_number})"
+
+        payload: Dict[str, Any] = {
+            "Name": name,
+            "FirstName": participant.first_name,
+            "LastName": participant.last_name,
+            "ContactNumber": str(participant.id),
+            "AccountNumber": participant.ndis_number or "",
+            "EmailAddress": participant.email_address or "",
+            "Phones": [{"PhoneType": "DEFAULT", "PhoneNumber": participant.phone_number or ""}],
+            "Addresses": [{
+                "AddressType": "STREET",
+                "AddressLine1": participant.street_address or "",
+                "City": participant.city or "",
+                "Region": participant.state or "",
+                "PostalCode": participant.postcode or "",
+                "Country": "Australia",
+            }],
+        }
+        if link:
+            payload["ContactID"] = link.xero_contact_id
+        return payload
+
+    def _invoice_payload(self, invoice: Invoice, contact_id: str) -> Dict[str, Any]:
+        line_items = [
+            {
+                "Description": " - ".join(filter(None, [
+                    item.service_type,
+                    f"{item.date.isoformat()} {item.start_time}-{item.end_time}",
+                    item.support_worker_name,
+                ])),
+                "Quantity": float(item.hours),
+                "UnitAmount": float(item.hourly_rate),
+                "LineAmount": float(item.total_amount),
+                "AccountCode": XERO_SALES_ACCOUNT_CODE,
+            }
+            for item in invoice.items
+        ]
+        if not line_items:
+            line_items = [{
+                "Description": f"Services {invoice.billing_period_start.isoformat()} to {invoice.billing_period_end.isoformat()}",
+                "Quantity": 1,
+                "UnitAmount": float(invoice.subtotal),
+                "AccountCode": XERO_SALES_ACCOUNT_CODE,
+            }]
+
+        payload: Dict[str, Any] = {
+            "Type": "ACCREC",
+            "Contact": {"ContactID": contact_id},
+            "InvoiceNumber": invoice.invoice_number,
+            "Reference": f"{invoice.billing_period_start.isoformat()} to {invoice.billing_period_end.isoformat()}",
+            "Date": invoice.issue_date.isoformat(),
+            "Status": INVOICE_STATUS_TO_XERO.get(invoice.status, "DRAFT"),
+            "LineAmountTypes": "Exclusive" if float(invoice.gst_amount or 0) > 0 else "NoTax",
+            "LineItems": line_items,
+        }
+        if invoice.due_date:
+            payload["DueDate"] = invoice.due_date.isoformat()
+        if invoice.xero_invoice_id:
+            payload["InvoiceID"] = invoice.xero_invoice_id
+        return payload
+
+    # ==========================================
+    # HTTP
+    # ==========================================
+
+    def _post_batch(self, endpoint: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        POST one batch (create or update) and return the per-record results.
+
+        summarizeErrors=false makes Xero report validation errors per record
+        instead of rejecting the whole batch.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        body = {endpoint: records}
+
+        for attempt in range(XERO_MAX_RETRIES + 1):
+            access_token = self.access_token_provider()
+            if not access_token:
+                raise XeroNotConnectedError("Xero token is missing or expired - reconnect Xero")
+
+            self.rate_limiter.acquire(max_wait=self.max_rate_limit_wait)
+            self.api_calls += 1
+            response = self.session.post(
+                url,
+                params={"summarizeErrors": "false"},
+                json=body,
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "xero-tenant-id": self.tenant_id,
+                    "Accept": "application/json",
+                },
+                timeout=XERO_REQUEST_TIMEOUT_SECONDS,
+            )
+            self.rate_limiter.observe(response.headers)
+
+            if response.status_code == 429:
+                retry_after = float(response.headers.get("Retry-After", "60"))
+                logger.warning(f"Xero rate limit hit on {endpoint}, retrying in {retry_after}s")
+                self.rate_limiter.penalize(retry_after)
+                continue
+
+            if response.status_code == 401:
+                if self.on_unauthorized:
+                    self.on_unauthorized()
+                raise XeroNotConnectedError("Xero rejected the access token - reconnect Xero")
+
+            if response.status_code >= 500:
+                logger.warning(f"Xero {endpoint} returned {response.status_code} (attempt {attempt + 1})")
+                self.rate_limiter.sleep(min(2 ** attempt, 10))
+                continue
+
+            if response.status_code not in (200, 400):
+                raise XeroSyncError(f"Xero {endpoint} request failed: {response.status_code} {response.text[:200]}")
+
+            data = response.json()
+            # Xero puts per-record results under "Elements" on a 400
+            items = data.get(endpoint) or data.get("Elements") or []
+            if response.status_code == 400 and not items:
+                raise XeroSyncError(f"Xero rejected the {endpoint} batch: {data.get('Message', response.text[:200])}")
+            if len(items) != len(records):
+                raise XeroSyncError(
+                    f"Xero {endpoint} returned {len(items)} results for {len(records)} records"
+                )
+            return items
+
+        raise XeroSyncError(f"Xero {endpoint} request failed after {XERO_MAX_RETRIES + 1} attempts")
+
+    # ==========================================
+    # HELPERS
+    # ==========================================
+
+    def _run(self, state: XeroSyncState, run_started: datetime, ids: List[int],
+             push_batch: Callable[[List[int], Dict[str, Any]], None],
+             advance_watermark: bool) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"pending": len(ids), "synced": 0, "failed": 0, "errors": []}
+
+        try:
+            for batch in _chunks(ids, self.batch_size):
+                push_batch(batch, result)
+        except XeroSyncError as e:
+            self.db.rollback()
+            result["errors"].append(str(e))
+            result["aborted"] = True
+            logger.error(f"Xero {state.entity_type} sync aborted: {str(e)}")
+
+        state.last_run_at = datetime.now()
+        state.items_synced = result["synced"]
+        state.items_failed = result["failed"] + (len(ids) - result["synced"] - result["failed"])
+        if result.get("aborted"):
+            state.last_status = "error"
+            state.last_error = result["errors"][-1]
+        elif result["failed"]:
+            state.last_status = "partial"
+            state.last_error = result["errors"][-1]["error"]
+        else:
+            state.last_status = "success"
+            state.last_error = None
+            if advance_watermark:
+                state.last_synced_at = run_started
+        self.db.commit()
+
+        logger.info(
+            f"Xero {state.entity_type} sync: {result['synced']} synced, "
+            f"{result['failed']} failed of {len(ids)} pending"
+        )
+        return result
+
+    def _db_now(self) -> datetime:
+        """
+        Current time on the database clock, naive like the updated_at columns.
+
+        updated_at/created_at are filled by the database's now(); the app
+        host's clock can be in another time zone, hours off.
+        """
+        now = self.db.scalar(select(func.now()))
+        return now.replace(tzinfo=None) if now.tzinfo else now
+
+    def _get_state(self, entity_type: str) -> XeroSyncState:
+        query = self.db.query(XeroSyncState).filter(XeroSyncState.entity_type == entity_type)
+        if self.organization_id:
+            query = query.filter(XeroSyncState.organization_id == self.organization_id)
+        else:
+            query = query.filter(XeroSyncState.organization_id.is_(None))
+
+        state = query.first()
+        if not state:
+            state = XeroSyncState(organization_id=self.organization_id, entity_type=entity_type)
+            self.db.add(state)
+            self.db.commit()
+        return state
+
+    @staticmethod
+    def _validation_error(item: Dict[str, Any]) -> Optional[str]:
+        errors = item.get("ValidationErrors") or []
+        if errors or item.get("HasValidationErrors") or item.get("StatusAttributeString") == "ERROR":
+            messages = [e.get("Message", "") for e in errors if isinstance(e, dict)]
+            return "; ".join(filter(None, messages)) or "Xero validation error"
+        return None
+
+    @staticmethod
+    def _record_failure(result: Dict[str, Any], entity: str, local_id: int, error: str) -> None:
+        result["failed"] += 1
+        result["errors"].append({entity: local_id, "error": error})
+
+
+def get_sync_status(db: Session, organization_id: Optional[int] = None) -> Dict[str, Any]:
+    """Summarise the last sync run per entity for the status endpoint."""
+    query = db.query(XeroSyncState)
+    if organization_id:
+        query = query.filter(XeroSyncState.organization_id == organization_id)
+    else:
+        query = query.filter(XeroSyncState.organization_id.is_(None))
+
+    states = {state.entity_type: state for state in query}
+    last_runs = [s.last_run_at for s in states.values() if s.last_run_at]
+    return {
+        "last_sync": max(last_runs).isoformat() if last_runs else None,
+        "entities": {
+            entity_type: {
+                "last_synced_at": state.last_synced_at.isoformat() if state.last_synced_at else None,
+                "last_run_at": state.last_run_at.isoformat() if state.last_run_at else None,
+                "last_status": state.last_status,
+                "last_error": state.last_error,
+                "items_synced": state.items_synced,
+                "items_failed": state.items_failed,
+            }
+            for entity_type, state in states.items()
+        },
+    }
@@ -0,0 +1,33 @@
+# backend/app/tasks/ai_draft_task.py - BATCH AI DRAFT JOB TASK
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.services.ai.draft_batch import resume_unfinished_jobs
+import logging
+
+logger = logging.getLogger(__name__)
+
+def ai_draft_task(db: Session = None):
+    """Finish queued or interrupted batch AI draft jobs in this process"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        job_ids = resume_unfinished_jobs(db, wait=True)
+        logger.info(f"Ran {len(job_ids)} AI draft job(s)")
+        return {"status": "success", "jobs": job_ids}
+        
+    except Exception as e:
+        logger.error(f"Error running AI draft jobs: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+# Run overnight via cron to draft large batches outside working hours:
+#   0 1 * * * python -m app.tasks.ai_draft_task
+if __name__ == "__main__":
+    result = ai_draft_task()
+    print(f"AI draft job result: {result}")
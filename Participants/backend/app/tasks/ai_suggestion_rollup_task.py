@@ -0,0 +1,35 @@
+# backend/app/tasks/ai_suggestion_rollup_task.py - AI SUGGESTION ROLLUP RECONCILIATION TASK
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.services.ai_suggestion_service import reconcile_suggestion_rollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+def reconcile_suggestion_rollup_task(db: Session = None, repair: bool = True):
+    """Verify ai_suggestion_daily against the ai_suggestions table, repairing any drift"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        result = reconcile_suggestion_rollup(db, repair=repair)
+        if result["drift"]:
+            for bucket in result["drift"]:
+                logger.warning(f"AI suggestion rollup drift: {bucket}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error in AI suggestion rollup reconciliation: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+# Run nightly via cron, e.g. 30 2 * * * python -m app.tasks.ai_suggestion_rollup_task
+if __name__ == "__main__":
+    import sys
+    result = reconcile_suggestion_rollup_task(repair="--check" not in sys.argv)
+    print(f"AI suggestion rollup reconciliation result: {result}")
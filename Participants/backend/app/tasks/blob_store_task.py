@@ -0,0 +1,56 @@
+# backend/app/tasks/blob_store_task.py - BLOB STORE MIGRATION AND COLLECTION TASK
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.services.blob_store import collect_unreferenced_blobs, fold_existing_files
+import logging
+
+logger = logging.getLogger(__name__)
+
+def migrate_to_blob_store_task(db: Session = None, dry_run: bool = False):
+    """Fold existing document and version files into the deduplicated blob store"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        result = fold_existing_files(db, dry_run=dry_run)
+        logger.info(f"Blob store migration: {result}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error in blob store migration: {str(e)}")
+        db.rollback()
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+def collect_blobs_task(db: Session = None, dry_run: bool = False):
+    """Delete blobs that no document or version references any more"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        return collect_unreferenced_blobs(db, dry_run=dry_run)
+        
+    except Exception as e:
+        logger.error(f"Error collecting unreferenced blobs: {str(e)}")
+        db.rollback()
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+# One-off after deploy:  python -m app.tasks.blob_store_task --migrate [--dry-run]
+# Then nightly via cron, e.g. 30 2 * * * python -m app.tasks.blob_store_task
+if __name__ == "__main__":
+    import sys
+    dry_run = "--dry-run" in sys.argv
+    if "--migrate" in sys.argv:
+        print(f"Blob store migration result: {migrate_to_blob_store_task(dry_run=dry_run)}")
+    print(f"Blob collection result: {collect_blobs_task(dry_run=dry_run)}")
@@ -1,9 +1,9 @@
 # backend/app/tasks/document_expiry_task.py - SIMPLE EXPIRY NOTIFICATION TASK
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.orm import contains_eager
 from app.core.database import get_db, SessionLocal
 from app.models.document import Document
-from app.models.participant import Participant
 from app.services.email_service import EmailService
 from datetime import datetime, timedelta
 import logging
@@ -27,21 +27,27 @@ def check_and_notify_expiring_documents(db: Session = None):
         notifications_sent = 0
         errors = 0
         
-        # Check for documents expiring in 30 days
-        thirty_days = datetime.now() + timedelta(days=30)
-        expiring_docs = db.query(Document).join(Participant).filter(
+        # Check for documents expiring in 30 days; participants come back in the same query
+        now = datetime.now()
+        thirty_days = now + timedelta(days=30)
+        expiring_docs = db.query(Document).join(Document.participant).options(
+            contains_eager(Document.participant)
+        ).filter(
             and_(
                 Document.expiry_date.isnot(None),
                 Document.expiry_date <= thirty_days,
-                Document.expiry_date >= datetime.now(),
+                Document.expiry_date >= now,
                 Document.status == 'active'
             )
-        ).all()
+        ).order_by(Document.expiry_date).all()
         
         for doc in expiring_docs:
             try:
                 participant = doc.participant
-                days_until_expiry = (doc.expiry_date - datetime.now()).days
+                expiry_date = doc.expiry_date
+                if expiry_date.tzinfo is not None:
+                    expiry_date = expiry_date.astimezone().replace(tzinfo=None)
+                days_until_expiry = (expiry_date - now).days
                 
                 success = email_service.send_expiry_notification(
                     participant, doc, days_until_expiry
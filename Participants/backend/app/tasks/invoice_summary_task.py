@@ -0,0 +1,35 @@
+# backend/app/tasks/invoice_summary_task.py - INVOICE SUMMARY RECONCILIATION TASK
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.services.invoice_summary_service import reconcile_invoice_summary
+import logging
+
+logger = logging.getLogger(__name__)
+
+def reconcile_invoice_summary_task(db: Session = None, repair: bool = True):
+    """Verify invoice_summary against the invoices table, repairing any drift"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        result = reconcile_invoice_summary(db, repair=repair)
+        if result["drift"]:
+            for bucket in result["drift"]:
+                logger.warning(f"Invoice summary drift: {bucket}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error in invoice summary reconciliation: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+# Run nightly via cron, e.g. 15 2 * * * python -m app.tasks.invoice_summary_task
+if __name__ == "__main__":
+    import sys
+    result = reconcile_invoice_summary_task(repair="--check" not in sys.argv)
+    print(f"Invoice summary reconciliation result: {result}")
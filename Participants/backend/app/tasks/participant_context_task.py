@@ -0,0 +1,33 @@
+# backend/app/tasks/participant_context_task.py - PARTICIPANT AI CONTEXT SNAPSHOT TASK
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.services.participant_context_service import rebuild_stale_snapshots
+import logging
+
+logger = logging.getLogger(__name__)
+
+def participant_context_task(db: Session = None):
+    """Rebuild stale participant context snapshots so AI requests find them current"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        rebuilt = rebuild_stale_snapshots(db)
+        logger.info(f"Rebuilt {rebuilt} participant context snapshot(s)")
+        return {"status": "success", "rebuilt": rebuilt}
+        
+    except Exception as e:
+        logger.error(f"Error rebuilding participant context snapshots: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+# Run every few minutes via cron; snapshots are otherwise rebuilt on first use:
+#   */5 * * * * python -m app.tasks.participant_context_task
+if __name__ == "__main__":
+    result = participant_context_task()
+    print(f"Participant context snapshot result: {result}")
@@ -0,0 +1,41 @@
+# backend/app/tasks/storage_integrity_task.py - STORAGE INTEGRITY SCAN TASK
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.services.storage.integrity import DEFAULT_WORKERS, scan_storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+def storage_integrity_task(db: Session = None, full: bool = False, workers: int = DEFAULT_WORKERS):
+    """Scan local uploads for missing, corrupted and orphaned files"""
+    if not db:
+        db = SessionLocal()
+        should_close = True
+    else:
+        should_close = False
+    
+    try:
+        report = scan_storage(db, full=full, workers=workers)
+        for item in report["missing"]:
+            logger.warning(f"Missing file for {item['kind']} {item['id']}: {item['path']}")
+        for item in report["mismatched"]:
+            logger.error(f"Checksum mismatch for {item['kind']} {item['id']}: {item['path']}")
+        return report
+        
+    except Exception as e:
+        logger.error(f"Error in storage integrity scan: {str(e)}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        if should_close:
+            db.close()
+
+# Run nightly via cron; only changed files are re-hashed thanks to the manifest:
+#   0 3 * * * python -m app.tasks.storage_integrity_task [--full] [--workers N]
+if __name__ == "__main__":
+    import sys
+    workers = DEFAULT_WORKERS
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    report = storage_integrity_task(full="--full" in sys.argv, workers=workers)
+    summary = {k: (len(v) if isinstance(v, list) else v) for k, v in report.items()}
+    print(f"Storage integrity scan result: {summary}")
@@ -27,6 +27,7 @@ sys.path.insert(0, str(backend_dir))
 
 from app.core.database import engine, Base
 from app.models.xero_token import XeroToken
+from app.models.xero_sync import XeroSyncState, XeroContactLink
 
 def run_migration():
     """Create the xero_tokens table in the database"""
@@ -47,6 +48,11 @@ def run_migration():
 
         print("   [OK] xero_tokens table created successfully!")
 
+        # Sync engine watermarks and participant -> contact links
+        XeroSyncState.__table__.create(bind=engine, checkfirst=True)
+        XeroContactLink.__table__.create(bind=engine, checkfirst=True)
+        print("   [OK] xero_sync_state and xero_contact_links tables created successfully!")
+
         print("\n3. Verifying table structure...")
         from sqlalchemy import inspect
         inspector = inspect(engine)
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for email template rendering.
+
+Compares per-send str.format / Jinja from_string against the compiled
+template engine, for single renders and for a batch mailing list.
+
+    python scripts/benchmark_email_templates.py [iterations]
+"""
+import sys
+import time
+from pathlib import Path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from jinja2 import BaseLoader, Environment
+
+from app.services.email_service import EmailService
+from app.services.email_templates import TemplateEngine
+from app.services.document_notification_service import EnhancedNotificationService
+
+
+def bench(label, fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {iterations / elapsed:>12,.0f} renders/sec")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    email = EmailService()
+    notifications = EnhancedNotificationService()
+    engine = TemplateEngine()
+
+    format_template = email._get_referral_confirmation_template()
+    format_data = {
+        'referrer_name': 'Alex Smith',
+        'referrer_first_name': 'Alex',
+        'client_name': 'Jordan Lee',
+        'client_first_name': 'Jordan',
+        'referral_id': 1234,
+        'submission_date': '01/07/2025 at 09:30 AM',
+        'urgency_level': 'High',
+        'support_category': 'Core Supports',
+        'referred_for': 'Daily living',
+        'current_date': '01/07/2025',
+        **email.static_context,
+    }
+
+    jinja_template = notifications._get_missing_documents_template()
+    jinja_data = {
+        'participant': {'first_name': 'Jordan', 'last_name': 'Lee'},
+        'missing_documents': ['NDIS Plan', 'Service Agreement', 'Medical Consent'],
+        'missing_count': 3,
+        'organization_name': notifications.organization_name,
+    }
+
+    print(f"Iterations: {iterations:,}")
+    print("-" * 70)
+    bench("str.format per send", lambda: format_template.format(**format_data), iterations)
+    bench("engine.render (compiled plan)",
+          lambda: engine.render(format_template, format_data), iterations)
+    bench("engine.render (static fields bound)",
+          lambda: engine.render(format_template, format_data, static=email.static_context), iterations)
+
+    env = Environment(loader=BaseLoader())
+    bench("jinja from_string per send",
+          lambda: env.from_string(jinja_template).render(**jinja_data), max(iterations // 20, 1))
+    bench("engine.render jinja (cached template)",
+          lambda: engine.render(jinja_template, jinja_data, syntax='jinja'), iterations)
+
+    rows = [dict(format_data, referral_id=i, client_name=f"Client {i}") for i in range(1000)]
+    batches = max(iterations // 1000, 1)
+    start = time.perf_counter()
+    for _ in range(batches):
+        [format_template.format(**row) for row in rows]
+    baseline = batches * len(rows) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(batches):
+        engine.render_many(format_template, rows, static=email.static_context)
+    batched = batches * len(rows) / (time.perf_counter() - start)
+    print(f"{'mailing list, str.format':<45} {baseline:>12,.0f} renders/sec")
+    print(f"{'mailing list, engine.render_many':<45} {batched:>12,.0f} renders/sec")
+    print("-" * 70)
+    print(engine.get_stats())
+
+
+if __name__ == "__main__":
+    main()
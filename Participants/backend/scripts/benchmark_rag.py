@@ -0,0 +1,393 @@
+"""
+Offline quality and latency benchmark for the RAG pipeline.
+
+Generates a synthetic participant document corpus (seeded, so every run
+sees the same text), ingests it into an in-memory SQLite database with
+DocumentChunkingService's splitter, embeds the chunks through
+EmbeddingService and runs labelled queries through RAGService. Reports
+chunking and ingest throughput, index (embedding) build time, p50/p95/p99
+query latency, and recall@k / hit rate / MRR for semantic and keyword
+search.
+
+Embeddings use the hashing provider by default, so results are
+deterministic and no network, credentials or database server are needed;
+--provider local or watsonx measures those instead. Results are written as
+JSON; pass --compare with an earlier run's JSON to see what changed between
+commits.
+
+    python scripts/benchmark_rag.py [--participants 40] [--queries 200] [--out rag.json] [--compare base.json]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every mapper DocumentChunk's relationships need)
+from app.models import vaccination  # noqa: F401
+from app.models.document_chunk import DocumentChunk
+from app.services.document_chunking_service import DocumentChunkingService
+from app.services.embedding_service import EmbeddingService
+from app.services.embeddings import get_embedding_provider
+from app.services.embeddings.local import HashingEmbeddings
+from app.services.rag_service import RAGService
+
+K_VALUES = (1, 3, 5, 10)
+
+
+# ==========================================
+# SYNTHETIC CORPUS
+# ==========================================
+
+FIRST_NAMES = ["Alex", "Jordan", "Sam", "Riley", "Casey", "Morgan", "Taylor", "Jamie", "Charlie", "Robin"]
+LAST_NAMES = ["Nguyen", "Smith", "Patel", "Williams", "Brown", "Chen", "Kelly", "Singh", "Martin", "Walker"]
+
+DOCUMENT_TYPES = [
+    "Occupational Therapy Assessment", "GP Summary Letter", "Behaviour Support Plan",
+    "Speech Pathology Report", "Physiotherapy Review", "Support Coordinator Notes",
+    "Hospital Discharge Summary", "Dietitian Report",
+]
+
+# (topic, fact template, question template, slot values)
+FACTS = [
+    ("mobility", "{name} uses a {aid} for {activity} and needs standby assistance on uneven ground.",
+     "What mobility aid does {name} use for {activity}?",
+     {"aid": ["four-wheeled walker", "manual wheelchair", "quad stick", "power wheelchair"],
+      "activity": ["community outings", "transfers at home", "shopping trips", "appointments"]}),
+    ("medication", "{name} takes {drug} {dose} each {time} and the dose is administered by support staff.",
+     "When does {name} take {drug}?",
+     {"drug": ["sodium valproate", "metformin", "risperidone", "baclofen", "levetiracetam"],
+      "dose": ["250mg", "500mg", "1mg", "10mg"], "time": ["morning", "evening", "lunchtime"]}),
+    ("diet", "{name} follows a {diet} diet with {fluids} fluids because of {reason}.",
+     "What diet and fluid texture does {name} need?",
+     {"diet": ["minced and moist", "soft and bite-sized", "pureed", "low sodium"],
+      "fluids": ["mildly thick", "moderately thick", "thin"],
+      "reason": ["dysphagia", "reflux", "a choking episode last year"]}),
+    ("behaviour", "When {trigger} occurs {name} may {behaviour}; staff should {strategy}.",
+     "How should staff respond when {name} experiences {trigger}?",
+     {"trigger": ["a change to the daily routine", "loud noise", "waiting in queues", "a new support worker"],
+      "behaviour": ["leave the room", "become verbally distressed", "refuse personal care"],
+      "strategy": ["offer a visual schedule", "move to a quiet space", "use a calm low voice"]}),
+    ("communication", "{name} communicates using {method} and understands {level} instructions.",
+     "How does {name} communicate?",
+     {"method": ["Key Word Sign", "a speech generating device", "a picture exchange book", "short spoken phrases"],
+      "level": ["one-step", "two-step", "simple written"]}),
+    ("personal_care", "{name} requires {ratio} assistance with {task} and prefers a {gender} support worker.",
+     "What help does {name} need with {task}?",
+     {"ratio": ["1:1", "2:1", "prompting only"], "task": ["showering", "dressing", "toileting", "grooming"],
+      "gender": ["female", "male"]}),
+    ("falls", "{name} had {count} falls in the last {period}, mostly {where}, and wears a {device}.",
+     "How many falls has {name} had recently?",
+     {"count": ["two", "three", "four"], "period": ["three months", "six months"],
+      "where": ["at night", "in the bathroom", "on the front steps"],
+      "device": ["personal alarm pendant", "hip protector", "bed sensor mat"]}),
+    ("community", "{name} attends {program} on {day} to build {skill} skills.",
+     "Which community program does {name} attend?",
+     {"program": ["a supported art studio", "a men's shed", "a swimming group", "a cooking class"],
+      "day": ["Mondays", "Wednesdays", "Fridays"], "skill": ["social", "independent living", "fine motor"]}),
+    ("sleep", "{name} sleeps {hours} hours and overnight support checks happen every {interval}.",
+     "How often are overnight support checks for {name}?",
+     {"hours": ["six", "seven", "nine"], "interval": ["two hours", "four hours", "hour"]}),
+    ("transport", "{name} travels by {mode} and needs {support} to get to {place}.",
+     "How does {name} travel to {place}?",
+     {"mode": ["wheelchair accessible taxi", "community bus", "train"],
+      "support": ["a support worker", "verbal prompting", "door to door assistance"],
+      "place": ["day program", "work", "therapy sessions"]}),
+]
+
+FILLER = [
+    "This report was prepared following a review of the participant's current NDIS plan.",
+    "Supports should be reviewed at the next plan reassessment or sooner if needs change.",
+    "The participant and their nominee were present and consented to the assessment.",
+    "Recommendations are made in line with the reasonable and necessary criteria.",
+    "Please contact the author if further information is required.",
+    "Goals were discussed with the participant and family members during the session.",
+    "Progress towards goals has been steady over the reporting period.",
+    "The support team has been informed of these recommendations.",
+    "A copy of this report has been provided to the support coordinator.",
+    "Risks have been considered and strategies documented in the support plan.",
+]
+
+
+def build_corpus(rng: random.Random, participants: int, documents_per_participant: int):
+    """Participants' documents, plus one labelled fact per (participant, topic, document)."""
+    corpus, facts = [], []
+    for pid in range(1, participants + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        for doc_index in range(documents_per_participant):
+            doc_id = len(corpus) + 1
+            paragraphs = []
+            for topic, template, question, slots in rng.sample(FACTS, rng.randint(3, 5)):
+                values = {key: rng.choice(options) for key, options in slots.items()}
+                fact = template.format(name=name.split()[0], **values)
+                facts.append({
+                    "participant_id": pid,
+                    "document_id": doc_id,
+                    "topic": topic,
+                    "fact": fact,
+                    "query": question.format(name=name.split()[0], **values),
+                })
+                filler = rng.sample(FILLER, rng.randint(3, 6))
+                filler.insert(rng.randint(0, len(filler)), fact)
+                paragraphs.append(" ".join(filler))
+            corpus.append({
+                "participant_id": pid,
+                "document_id": doc_id,
+                "title": f"{rng.choice(DOCUMENT_TYPES)} - {name}",
+                "text": "\n\n".join(paragraphs),
+            })
+    return corpus, facts
+
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def latency_summary(samples_ms):
+    return {
+        "count": len(samples_ms),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def ingest(db, corpus, embedding_service, chunk_size, overlap):
+    """Chunk and store every document, then embed (the index build); returns timings."""
+    chunk_seconds = 0.0
+    store_start = time.perf_counter()
+    chunk_count = characters = 0
+    for doc in corpus:
+        start = time.perf_counter()
+        pieces = DocumentChunkingService._split_text_into_chunks(doc["text"], chunk_size=chunk_size, overlap=overlap)
+        chunk_seconds += time.perf_counter() - start
+        characters += len(doc["text"])
+        db.add_all(
+            DocumentChunk(
+                document_id=doc["document_id"],
+                participant_id=doc["participant_id"],
+                chunk_index=index,
+                chunk_text=piece,
+                chunk_size=len(piece),
+                chunk_metadata={"document_title": doc["title"], "total_chunks": len(pieces)},
+            )
+            for index, piece in enumerate(pieces)
+        )
+        chunk_count += len(pieces)
+    db.commit()
+    store_seconds = time.perf_counter() - store_start
+
+    index_start = time.perf_counter()
+    embedded = sum(embedding_service.embed_document_chunks(db, doc["document_id"]) for doc in corpus)
+    index_seconds = time.perf_counter() - index_start
+
+    return {
+        "documents": len(corpus),
+        "characters": characters,
+        "chunks": chunk_count,
+        "chunks_embedded": embedded,
+        "chunking_seconds": round(chunk_seconds, 4),
+        "chunking_mb_per_second": round(characters / 1e6 / chunk_seconds, 2) if chunk_seconds else None,
+        "ingest_seconds": round(store_seconds, 4),
+        "ingest_documents_per_second": round(len(corpus) / store_seconds, 1),
+        "ingest_chunks_per_second": round(chunk_count / store_seconds, 1),
+        "index_build_seconds": round(index_seconds, 4),
+        "index_chunks_per_second": round(embedded / index_seconds, 1) if index_seconds else None,
+    }
+
+
+def relevant_chunk_ids(db, fact):
+    rows = db.query(DocumentChunk.id).filter(
+        DocumentChunk.participant_id == fact["participant_id"],
+        DocumentChunk.document_id == fact["document_id"],
+        DocumentChunk.chunk_text.contains(fact["fact"][:60]),
+    ).all()
+    return {row.id for row in rows}
+
+
+def run_queries(db, rag, facts, top_k, warmup=5):
+    for fact in facts[:warmup]:
+        rag.search_participant_documents(db, fact["participant_id"], fact["query"], top_k=top_k, similarity_threshold=0.0)
+
+    latencies, recall, hits, reciprocal_ranks = [], {k: [] for k in K_VALUES}, {k: 0 for k in K_VALUES}, []
+    search_types = {}
+    for fact in facts:
+        relevant = fact["relevant"]
+        start = time.perf_counter()
+        results = rag.search_participant_documents(
+            db, fact["participant_id"], fact["query"], top_k=top_k, similarity_threshold=0.0
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked = [r["chunk_id"] for r in results]
+        for result in results[:1]:
+            search_types[result["search_type"]] = search_types.get(result["search_type"], 0) + 1
+        for k in K_VALUES:
+            found = relevant.intersection(ranked[:k])
+            recall[k].append(len(found) / len(relevant))
+            hits[k] += bool(found)
+        rank = next((i for i, chunk_id in enumerate(ranked, 1) if chunk_id in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "latency": latency_summary(latencies),
+        "recall": {f"@{k}": round(sum(recall[k]) / len(facts), 4) for k in K_VALUES},
+        "hit_rate": {f"@{k}": round(hits[k] / len(facts), 4) for k in K_VALUES},
+        "mrr": round(sum(reciprocal_ranks) / len(facts), 4),
+        "search_types": search_types,
+    }
+
+
+def run_context(db, rag, facts, context_tokens):
+    latencies = []
+    for fact in facts:
+        start = time.perf_counter()
+        rag.get_context_for_ai(db, fact["participant_id"], fact["query"], max_context_tokens=context_tokens)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"token_budget": context_tokens, "latency": latency_summary(latencies)}
+
+
+# ==========================================
+# REPORTING
+# ==========================================
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            out.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return out
+    return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+
+
+def compare(current, baseline):
+    """Print metrics that changed against a baseline run."""
+    before, after = flatten(baseline.get("results", {})), flatten(current["results"])
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')}):")
+    print(f"{'metric':<45} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key in sorted(after):
+        if key not in before or before[key] == after[key]:
+            continue
+        change = f"{(after[key] - before[key]) / before[key] * 100:+.1f}%" if before[key] else "n/a"
+        print(f"{key:<45} {before[key]:>12} {after[key]:>12} {change:>9}")
+    if current["config"] != baseline.get("config"):
+        print("Note: configurations differ, so results are not directly comparable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--participants", type=int, default=40)
+    parser.add_argument("--documents", type=int, default=6, help="documents per participant")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=max(K_VALUES))
+    parser.add_argument("--chunk-size", type=int, default=DocumentChunkingService.CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=DocumentChunkingService.CHUNK_OVERLAP)
+    parser.add_argument("--provider", default="hashing", help="embedding provider: hashing, local or watsonx")
+    parser.add_argument("--dim", type=int, default=384, help="hashing embedding dimensions")
+    parser.add_argument("--workers", type=int, default=0, help="hashing embedding processes")
+    parser.add_argument("--context-tokens", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="rag_benchmark.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus, facts = build_corpus(rng, args.participants, args.documents)
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    DocumentChunk.__table__.create(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+
+    if args.provider == "hashing":
+        provider = HashingEmbeddings(args.dim, workers=args.workers)
+    else:
+        provider = get_embedding_provider(args.provider)
+        if provider is None:
+            sys.exit(f"Embedding provider {args.provider} is unavailable")
+    embedding_service = EmbeddingService(provider)
+    ingest_results = ingest(db, corpus, embedding_service, args.chunk_size, args.overlap)
+
+    # Facts cut by chunking still count if they survive in one chunk
+    for fact in facts:
+        fact["relevant"] = relevant_chunk_ids(db, fact)
+    labelled = [fact for fact in facts if fact["relevant"]]
+    queries = random.Random(args.seed + 1).sample(labelled, min(args.queries, len(labelled)))
+
+    rag = RAGService()
+    rag.embedding_service = embedding_service
+    semantic = run_queries(db, rag, queries, args.top_k)
+    context = run_context(db, rag, queries, args.context_tokens)
+
+    embedding_service.embeddings_available = False
+    keyword = run_queries(db, rag, queries, args.top_k)
+
+    report = {
+        "benchmark": "rag",
+        "embedding_model": provider.model_id,
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": {
+            "ingest": ingest_results,
+            "labelled_facts": len(labelled),
+            "semantic": semantic,
+            "keyword": keyword,
+            "context": context,
+        },
+    }
+
+    print(f"Corpus: {ingest_results['documents']} documents, {ingest_results['chunks']} chunks, "
+          f"{len(queries)} labelled queries")
+    print("-" * 72)
+    print(f"{'chunking':<28} {ingest_results['chunking_mb_per_second']:>10} MB/s")
+    print(f"{'ingest':<28} {ingest_results['ingest_chunks_per_second']:>10} chunks/s")
+    print(f"{'index build':<28} {ingest_results['index_build_seconds']:>10} s "
+          f"({ingest_results['index_chunks_per_second']} chunks/s)")
+    for label, result in (("semantic", semantic), ("keyword", keyword)):
+        latency = result["latency"]
+        print(f"{label + ' p50/p95/p99':<28} {latency['p50_ms']:>8.2f} / {latency['p95_ms']:.2f} / {latency['p99_ms']:.2f} ms")
+        print(f"{label + ' recall':<28} " + "  ".join(f"{k} {v:.3f}" for k, v in result["recall"].items())
+              + f"  MRR {result['mrr']:.3f}")
+    latency = context["latency"]
+    print(f"{'context p50/p95/p99':<28} {latency['p50_ms']:>8.2f} / {latency['p95_ms']:.2f} / {latency['p99_ms']:.2f} ms")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("-" * 72)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Check how many SQL statements the dashboard document stats cost.
+
+Each stats call must issue a single statement when the cache is cold and
+none while the cached entry is fresh. Runs against DATABASE_URL inside a
+transaction that is rolled back, so nothing is left behind.
+
+    python scripts/test_document_stats_queries.py
+"""
+import sys
+from pathlib import Path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.document import Document
+from app.models.participant import Participant
+from app.services.document_service import DocumentService, invalidate_document_stats
+
+statements = []
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def statements_for(call):
+    statements.clear()
+    call()
+    return len(statements)
+
+
+if settings.DOCUMENT_STATS_CACHE_SECONDS <= 0:
+    settings.DOCUMENT_STATS_CACHE_SECONDS = 30
+
+connection = engine.connect()
+transaction = connection.begin()
+db = Session(bind=connection, join_transaction_mode="create_savepoint")
+
+try:
+    # One active document so the organization query returns a row
+    db.add(Document(filename="stats-query-check.pdf", title="Stats query check", status="active"))
+    db.flush()
+    participant = db.query(Participant).first()
+    participant_id = participant.id if participant else 0
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+
+    checks = [
+        ("get_document_stats", lambda: DocumentService.get_document_stats(db, participant_id)),
+        ("get_organization_document_stats", lambda: DocumentService.get_organization_document_stats(db)),
+    ]
+    failures = 0
+    for name, call in checks:
+        invalidate_document_stats()
+        cold = statements_for(call)
+        warm = statements_for(call)
+        ok = cold == 1 and warm == 0
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {cold} statement(s) uncached, {warm} cached")
+finally:
+    if event.contains(engine, "before_cursor_execute", count_statement):
+        event.remove(engine, "before_cursor_execute", count_statement)
+    invalidate_document_stats()
+    db.close()
+    transaction.rollback()
+    connection.close()
+
+sys.exit(1 if failures else 0)
@@ -0,0 +1,98 @@
+"""
+Local stub of the Xero Accounting API for exercising XeroSyncEngine.
+
+Accepts batched POSTs to /Contacts and /Invoices, assigns IDs, echoes
+records back in Xero's response shape, reports X-MinLimit-Remaining and
+answers 429 + Retry-After once the per-minute limit is exceeded.
+
+    python scripts/xero_stub_server.py --port 8765 --per-minute 60
+    XERO_API_BASE_URL=http://127.0.0.1:8765 uvicorn app.main:app
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+ID_FIELDS = {"Contacts": "ContactID", "Invoices": "InvoiceID"}
+
+
+class XeroStubState:
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.calls = []
+        self.records = {"Contacts": {}, "Invoices": {}}
+        self.lock = threading.Lock()
+
+    def take_call(self):
+        """Return (allowed, remaining, retry_after) for a sliding one-minute window."""
+        with self.lock:
+            now = time.monotonic()
+            self.calls = [t for t in self.calls if now - t < 60]
+            if len(self.calls) >= self.per_minute:
+                return False, 0, int(60 - (now - self.calls[0])) + 1
+            self.calls.append(now)
+            return True, self.per_minute - len(self.calls), 0
+
+
+def make_handler(state: XeroStubState):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, str(value))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            endpoint = urlparse(self.path).path.rstrip("/").rsplit("/", 1)[-1]
+            if endpoint not in ID_FIELDS:
+                return self._send(404, {"Message": f"Unknown endpoint {endpoint}"})
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self._send(401, {"Message": "Unauthorized"})
+
+            allowed, remaining, retry_after = state.take_call()
+            if not allowed:
+                return self._send(429, {"Message": "Rate limit exceeded"},
+                                  {"Retry-After": retry_after, "X-Rate-Limit-Problem": "minute"})
+
+            length = int(self.headers.get("Content-Length", "0"))
+            records = json.loads(self.rfile.read(length) or b"{}").get(endpoint, [])
+            id_field = ID_FIELDS[endpoint]
+
+            results = []
+            with state.lock:
+                for record in records:
+                    record = dict(record)
+                    record.setdefault(id_field, str(uuid.uuid4()))
+                    record["StatusAttributeString"] = "OK"
+                    state.records[endpoint][record[id_field]] = record
+                    results.append(record)
+
+            self._send(200, {endpoint: results}, {"X-MinLimit-Remaining": remaining})
+
+        def log_message(self, format, *args):
+            print(f"[xero-stub] {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Xero API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--per-minute", type=int, default=60)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(XeroStubState(args.per_minute)))
+    print(f"Xero stub listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()